@@ -0,0 +1,300 @@
+"""
+Analytics Module
+================
+Incrementally maintained rollups of a candidate partition for the recruiter dashboard.
+
+The rollups hold only counters (positions, locations, tech stack, experience
+ranges, funnel stage reached, positions per month) plus each candidate's
+contribution, so a save, update or erasure adjusts them in O(1) and reading
+them never scans the records. They are persisted to <data_dir>/rollups.json
+(written behind a few seconds after a change, and at exit) together with the
+record store's modification time, and rebuilt from the store when the file is
+missing, its count disagrees with the store, or the store changed after it was
+written. Every change bumps `version`, which readers use as a cache key.
+
+Rollups live in the process that writes the partition; other processes pick
+up its changes the next time they load the file.
+"""
+
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import serialization
+
+
+# Fields collected by the conversation, in funnel order
+FUNNEL_FIELDS = [
+    ('name', 'Name'),
+    ('email', 'Email'),
+    ('phone', 'Phone'),
+    ('experience', 'Experience'),
+    ('position', 'Position'),
+    ('location', 'Location'),
+    ('tech_stack', 'Tech stack'),
+    ('technical_answers', 'Technical answers')
+]
+
+EXPERIENCE_RANGES = ['0-2 years', '2-5 years', '5-10 years', '10+ years']
+
+
+def experience_range(experience) -> Optional[str]:
+    """Bucket free-text experience ("4 years") as get_statistics() always has"""
+    try:
+        years = float(str(experience).split()[0])
+    except (ValueError, IndexError):
+        return None
+    if years < 2:
+        return '0-2 years'
+    if years < 5:
+        return '2-5 years'
+    if years < 10:
+        return '5-10 years'
+    return '10+ years'
+
+
+def funnel_stage(record: Dict) -> int:
+    """Number of funnel fields the candidate got through, inferred from the record"""
+    for stage, (field, _) in enumerate(FUNNEL_FIELDS):
+        if not record.get(field):
+            return stage
+    return len(FUNNEL_FIELDS)
+
+
+def _contribution(record: Dict) -> List:
+    """What one record adds to the counters: [stage, position, location, tech, experience range, month]"""
+    tech_stack = record.get('tech_stack', [])
+    return [
+        funnel_stage(record),
+        record.get('position', 'Unknown'),
+        record.get('location', 'Unknown'),
+        list(tech_stack) if isinstance(tech_stack, (list, tuple)) else [],
+        experience_range(record.get('experience', '0')),
+        str(record.get('timestamp', ''))[:7] or 'unknown'
+    ]
+
+
+def _bump(counter: Dict, key, delta: int):
+    value = counter.get(key, 0) + delta
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+class CandidateRollups:
+    """Counters over one partition, kept current by CandidateDataHandler"""
+    
+    # Persisted alongside the members so loading does not replay them
+    COUNTERS = ('positions', 'locations', 'tech', 'experience', 'stages', 'months')
+    
+    def __init__(self, path: Path, flush_interval: float = 2.0,
+                 source_mtime: Optional[Callable[[], int]] = None):
+        """
+        Initialize empty rollups
+        
+        Args:
+            path: Persistence file
+            flush_interval: Shortest time between write-behind flushes (seconds)
+            source_mtime: Modification time of the record store (RecordStore.last_modified)
+        """
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.source_mtime = source_mtime
+        self.version = 0
+        self._members: Dict[str, List] = {}
+        self._reset_counters()
+        self._dirty = False
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        atexit.register(self.close)
+    
+    def _reset_counters(self):
+        self._positions: Dict[str, int] = {}
+        self._locations: Dict[str, int] = {}
+        self._tech: Dict[str, int] = {}
+        self._experience = {name: 0 for name in EXPERIENCE_RANGES}
+        self._stages = [0] * (len(FUNNEL_FIELDS) + 1)
+        self._months: Dict[str, Dict[str, int]] = {}
+    
+    def _apply(self, contribution: List, delta: int):
+        stage, position, location, tech_stack, experience, month = contribution
+        self._stages[stage] += delta
+        _bump(self._positions, position, delta)
+        _bump(self._locations, location, delta)
+        for tech in tech_stack:
+            _bump(self._tech, tech, delta)
+        if experience is not None:
+            self._experience[experience] += delta
+        by_position = self._months.setdefault(month, {})
+        _bump(by_position, position, delta)
+        if not by_position:
+            del self._months[month]
+    
+    def load(self, expected_count: Optional[int] = None) -> bool:
+        """
+        Load persisted rollups
+        
+        Args:
+            expected_count: Records in the store; a different member count means the file is stale
+            
+        Returns:
+            bool: True if loaded, False if the caller should rebuild()
+        """
+        try:
+            state = serialization.load_file(self.path)
+            current_mtime = self.source_mtime() if self.source_mtime is not None else None
+        except (OSError, ValueError):
+            return False
+        members = state.get('members', {})
+        if expected_count is not None and len(members) != expected_count:
+            return False
+        if current_mtime is not None and state.get('source_mtime', -1) < current_mtime:
+            # The store changed after the last write (e.g. the process exited before flushing)
+            return False
+        with self._lock:
+            self._members = members
+            counters = state.get('counters')
+            if counters:
+                (self._positions, self._locations, self._tech, self._experience,
+                 self._stages, self._months) = (counters[name] for name in self.COUNTERS)
+            else:
+                self._reset_counters()
+                for contribution in members.values():
+                    self._apply(contribution, 1)
+            self.version = state.get('version', 0)
+            self._dirty = False
+        return True
+    
+    def rebuild(self, records: Iterable[Dict]):
+        """Recompute the rollups from every record"""
+        with self._lock:
+            self._members = {}
+            self._reset_counters()
+            for record in records:
+                self._add(record)
+            self.version += 1
+            self._dirty = True
+            self.flush()
+    
+    def _add(self, record: Dict):
+        candidate_id = record.get('candidate_id')
+        previous = self._members.get(candidate_id)
+        if previous is not None:
+            self._apply(previous, -1)
+        contribution = _contribution(record)
+        self._members[candidate_id] = contribution
+        self._apply(contribution, 1)
+    
+    def add(self, record: Dict):
+        """Count a saved record, replacing its previous contribution"""
+        with self._lock:
+            self._add(record)
+            self._changed()
+    
+    def remove(self, candidate_id: str):
+        """Forget a deleted record (unknown IDs are ignored)"""
+        with self._lock:
+            contribution = self._members.pop(candidate_id, None)
+            if contribution is None:
+                return
+            self._apply(contribution, -1)
+            self._changed()
+    
+    def _changed(self):
+        self.version += 1
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._timer is None:
+            # Write the end of a burst even if no further change arrives
+            self._timer = threading.Timer(self.flush_interval, self._flush_later)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _flush_later(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self.flush()
+            except OSError:
+                # Retried with the next change or at exit
+                pass
+    
+    def flush(self):
+        """Write the rollups if they changed since the last write"""
+        with self._lock:
+            if not self._dirty:
+                return
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            counters = {name: getattr(self, '_' + name) for name in self.COUNTERS}
+            state = {'version': self.version, 'counters': counters, 'members': self._members}
+            if self.source_mtime is not None:
+                state['source_mtime'] = self.source_mtime()
+            serialization.dump_file(state, temp_path, pretty=False)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+    
+    def close(self):
+        """Write pending changes"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            self.flush()
+        except OSError:
+            # The partition was removed; there is nowhere left to write
+            pass
+    
+    def statistics(self) -> Dict:
+        """Counters in the shape of CandidateDataHandler.get_statistics()"""
+        with self._lock:
+            return {
+                'total_candidates': len(self._members),
+                'positions': dict(self._positions),
+                'locations': dict(self._locations),
+                'tech_stack_frequency': dict(self._tech),
+                'experience_ranges': dict(self._experience)
+            }
+    
+    def funnel(self) -> List[Dict]:
+        """
+        Saved candidates reaching each funnel stage
+        
+        Records are saved only on exit once an email is known, so this never
+        shows drop-off before the email; telemetry measures that.
+        
+        Returns:
+            list: {'stage', 'reached', 'dropped'} per field, 'dropped' being the
+                  candidates who stopped right before it
+        """
+        with self._lock:
+            stages = list(self._stages)
+        result = []
+        reached = sum(stages)
+        for index, (_, label) in enumerate(FUNNEL_FIELDS):
+            dropped = stages[index]
+            reached -= dropped
+            result.append({'stage': label, 'reached': reached, 'dropped': dropped})
+        return result
+    
+    def positions_over_time(self) -> Dict[str, Dict[str, int]]:
+        """Applications per month ("YYYY-MM") and position"""
+        with self._lock:
+            return {month: dict(counts) for month, counts in sorted(self._months.items())}
+    
+    def snapshot(self) -> Dict:
+        """Everything the dashboard shows, with the version it reflects"""
+        with self._lock:
+            return {
+                'version': self.version,
+                'statistics': self.statistics(),
+                'funnel': self.funnel(),
+                'positions_over_time': self.positions_over_time()
+            }
@@ -0,0 +1,479 @@
+"""
+Answer Scoring Module
+=====================
+Asynchronous grading of candidates' technical answers.
+
+Each answer is graded against the questions that were asked, first by a cheap
+keyword/rubric model and then, optionally, by an LLM pass. Scores are written
+back into the candidate record:
+
+    answer_score     overall score (0-10)
+    answer_scoring   per-question scores, method, version and a hash of the answers
+
+Scoring runs in a background thread pool. Backlogs are processed in batches
+(one generate_batch() call per batch for the LLM pass) and are resumable: a
+checkpoint file records finished candidates, and records already scored by the
+current version for the same answers are skipped.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import serialization
+from utils import extract_keywords, extract_numbered_items
+
+
+# Bump when the rubric changes so stored scores are recomputed
+SCORER_VERSION = 1
+
+CHECKPOINT_FILE = '.scoring_checkpoint'
+
+# Words that signal explanation, trade-offs or concrete experience
+RUBRIC_TERMS = {
+    'because', 'therefore', 'instead', 'trade-off', 'tradeoff', 'however', 'example',
+    'performance', 'latency', 'memory', 'scale', 'scaling', 'cache', 'caching', 'index',
+    'test', 'tests', 'testing', 'monitor', 'monitoring', 'profile', 'profiling', 'benchmark',
+    'security', 'transaction', 'concurrency', 'async', 'thread', 'threads', 'deploy',
+    'production', 'refactor', 'design', 'pattern', 'complexity', 'measured', 'optimize',
+    'optimized', 'debug', 'debugged', 'migration', 'rollback', 'failure', 'retry'
+}
+
+# Answers that carry no information
+NON_ANSWERS = {'', 'no', 'n/a', 'na', 'idk', "i don't know", 'i dont know', 'not sure', 'skip', 'pass'}
+
+
+def _stem(word: str) -> str:
+    """Crude stem so 'indexes', 'indexing' and 'index' match"""
+    return word[:5] if len(word) > 5 else word
+
+
+def split_answers(answer_text: str, question_count: int) -> List[str]:
+    """
+    Split a free-text reply into one answer per question
+    
+    Numbered replies ("1. ...") are split by number; a reply with one paragraph
+    per question is split by paragraph. Otherwise the whole reply is used for
+    every question.
+    
+    Args:
+        answer_text: Candidate's reply
+        question_count: Number of questions asked
+        
+    Returns:
+        list: One answer per question
+    """
+    answer_text = (answer_text or '').strip()
+    if question_count <= 0:
+        return []
+    
+    numbered = re.split(r'(?m)^\s*\**(\d+)[.):]\**\s+', answer_text)
+    if len(numbered) > 2:
+        answers = [''] * question_count
+        for number, text in zip(numbered[1::2], numbered[2::2]):
+            index = int(number) - 1
+            if 0 <= index < question_count:
+                answers[index] = text.strip()
+        return answers
+    
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', answer_text) if p.strip()]
+    if len(paragraphs) == question_count:
+        return paragraphs
+    
+    return [answer_text] * question_count
+
+
+class RubricScorer:
+    """Keyword/rubric model: coverage of the question, depth and specificity"""
+    
+    name = 'rubric'
+    
+    def __init__(self, target_words: int = 60):
+        """
+        Configure the rubric
+        
+        Args:
+            target_words: Answer length that earns the full depth score
+        """
+        self.target_words = target_words
+    
+    def score(self, question: str, answer: str, tech_stack: Optional[List[str]] = None) -> Dict:
+        """
+        Score one answer
+        
+        Args:
+            question: Question asked
+            answer: Candidate's answer
+            tech_stack: Candidate's technologies (mentions count as specific)
+            
+        Returns:
+            dict: score (0-10) with coverage, depth and specificity (0-1)
+        """
+        if answer.strip().lower().rstrip('.!') in NON_ANSWERS:
+            return {'score': 0.0, 'coverage': 0.0, 'depth': 0.0, 'specificity': 0.0}
+        
+        answer_words = extract_keywords(answer)
+        answer_stems = {_stem(word) for word in answer_words}
+        question_stems = {_stem(word) for word in extract_keywords(question)}
+        
+        coverage = len(question_stems & answer_stems) / len(question_stems) if question_stems else 0.0
+        depth = min(len(answer.split()) / self.target_words, 1.0)
+        
+        tech_terms = {word for tech in tech_stack or [] for word in extract_keywords(tech)}
+        signals = len(set(answer_words) & RUBRIC_TERMS) + len(set(answer_words) & tech_terms)
+        if re.search(r'\d', answer):
+            signals += 1
+        if re.search(r'\w+\(\)|`[^`]+`|\w+_\w+|[a-z]+[A-Z]\w+', answer):
+            signals += 1
+        specificity = min(signals / 4, 1.0)
+        
+        score = 10 * (0.45 * coverage + 0.25 * depth + 0.30 * specificity)
+        return {
+            'score': round(score, 2),
+            'coverage': round(coverage, 3),
+            'depth': round(depth, 3),
+            'specificity': round(specificity, 3)
+        }
+
+
+class LLMScorer:
+    """Optional second pass: the LLM grades each answer from 0 to 10"""
+    
+    name = 'llm'
+    
+    PROMPT = """You are a senior technical interviewer grading a candidate's answer.
+
+Question: {question}
+Answer: {answer}
+
+Grade the answer from 0 (wrong or empty) to 10 (excellent, precise and practical).
+Reply with JSON only: {{"score": <0-10>, "feedback": "<one sentence>"}}"""
+    
+    def __init__(self, backend=None, max_tokens: int = 120):
+        """
+        Configure the LLM pass
+        
+        Args:
+            backend: LLMBackend (defaults to the shared backend)
+            max_tokens: Maximum tokens per grade
+        """
+        if backend is None:
+            from llm_backends import get_backend
+            backend = get_backend()
+        self.backend = backend
+        self.max_tokens = max_tokens
+    
+    @staticmethod
+    def parse(text: str) -> Optional[Dict]:
+        """Extract score and feedback from an LLM reply"""
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if match:
+            try:
+                data = serialization.loads(match.group(0))
+                return {'score': max(0.0, min(float(data['score']), 10.0)),
+                        'feedback': str(data.get('feedback', '')).strip()}
+            except (ValueError, KeyError, TypeError):
+                pass
+        
+        match = re.search(r'(\d+(?:\.\d+)?)\s*(?:/\s*10)?', text)
+        if match:
+            return {'score': max(0.0, min(float(match.group(1)), 10.0)), 'feedback': ''}
+        return None
+    
+    def score_batch(self, items: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Grade several question/answer pairs in one batched backend call
+        
+        Args:
+            items: Dicts with question and answer
+            
+        Returns:
+            list: Parsed grade per item (None where the reply could not be parsed)
+        """
+        requests = [
+            {
+                'messages': [{"role": "user", "content": self.PROMPT.format(**item)}],
+                'max_tokens': self.max_tokens,
+                'temperature': 0.0
+            }
+            for item in items
+        ]
+        return [self.parse(reply) for reply in self.backend.generate_batch(requests)]
+
+
+def answers_hash(record: Dict) -> str:
+    """Hash the questions and answers a score was computed from"""
+    # Stays on stdlib json: the hash is stored with each score, so its bytes
+    # must not change with the installed serialization backend
+    payload = json.dumps([record.get('technical_questions', []), record.get('technical_answers', '')],
+                         ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def needs_scoring(record: Dict) -> bool:
+    """
+    Check whether a record has answers without a current score
+    
+    Args:
+        record: Candidate record
+        
+    Returns:
+        bool: True if the record should be (re)scored
+    """
+    if not (record.get('technical_answers') or '').strip():
+        return False
+    scoring = record.get('answer_scoring') or {}
+    return scoring.get('version') != SCORER_VERSION or scoring.get('answers_hash') != answers_hash(record)
+
+
+def score_records(records: List[Dict], rubric: Optional[RubricScorer] = None,
+                  llm: Optional[LLMScorer] = None) -> List[Dict]:
+    """
+    Score a batch of candidate records
+    
+    Args:
+        records: Candidate records with technical_answers
+        rubric: Rubric model (defaults to RubricScorer())
+        llm: Optional LLM pass; its grade is averaged with the rubric score
+        
+    Returns:
+        list: Fields to write on each record (answer_score, answer_scoring)
+    """
+    rubric = rubric or RubricScorer()
+    per_record = []
+    pending = []
+    
+    for record in records:
+        questions = record.get('technical_questions') or []
+        if isinstance(questions, str):
+            questions = extract_numbered_items(questions)
+        if not questions:
+            # Questions were not stored (older records): grade the reply as a whole
+            questions = [f"Technical questions about {', '.join(record.get('tech_stack', []) or [])}"]
+        
+        answers = split_answers(record.get('technical_answers', ''), len(questions))
+        items = []
+        for question, answer in zip(questions, answers):
+            item = {'question': question, **rubric.score(question, answer, record.get('tech_stack'))}
+            items.append(item)
+            if llm is not None and item['score'] > 0:
+                pending.append((item, {'question': question, 'answer': answer}))
+        per_record.append(items)
+    
+    if llm is not None and pending:
+        try:
+            grades = llm.score_batch([pair for _, pair in pending])
+        except Exception:
+            grades = [None] * len(pending)
+        for (item, _), grade in zip(pending, grades):
+            if grade is not None:
+                item['rubric_score'] = item['score']
+                item['llm_score'] = grade['score']
+                item['feedback'] = grade['feedback']
+                item['score'] = round((item['rubric_score'] + grade['score']) / 2, 2)
+    
+    results = []
+    scored_at = datetime.now().isoformat()
+    for record, items in zip(records, per_record):
+        overall = round(sum(item['score'] for item in items) / len(items), 2) if items else 0.0
+        results.append({
+            'answer_score': overall,
+            'answer_scoring': {
+                'version': SCORER_VERSION,
+                'method': 'rubric+llm' if any('llm_score' in item for item in items) else 'rubric',
+                'answers_hash': answers_hash(record),
+                'scored_at': scored_at,
+                'questions': items
+            }
+        })
+    return results
+
+
+class ScoringPipeline:
+    """Background worker pool that scores answers and writes them to the candidate store"""
+    
+    def __init__(self, data_handler, workers: int = 2, use_llm: bool = False, backend=None,
+                 batch_size: int = 32):
+        """
+        Set up the pipeline
+        
+        Args:
+            data_handler: CandidateDataHandler holding the records
+            workers: Worker threads
+            use_llm: Add the LLM pass after the rubric
+            backend: LLMBackend for the LLM pass (defaults to the shared backend)
+            batch_size: Records scored per batch in backlog runs
+        """
+        self.data_handler = data_handler
+        self.rubric = RubricScorer()
+        self.llm = LLMScorer(backend) if use_llm else None
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_file = os.path.join(str(data_handler.data_dir), CHECKPOINT_FILE)
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='answer-scoring')
+        self._checkpoint_lock = threading.Lock()
+    
+    def _load_checkpoint(self) -> Dict[str, str]:
+        """Candidate ID -> answers hash for every finished candidate"""
+        done = {}
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[2] == str(SCORER_VERSION):
+                        done[parts[0]] = parts[1]
+        return done
+    
+    def _append_checkpoint(self, entries: List[Dict]):
+        """Record finished candidates so an interrupted backlog run resumes after them"""
+        with self._checkpoint_lock:
+            with open(self.checkpoint_file, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(f"{entry['candidate_id']} {entry['answers_hash']} {SCORER_VERSION}\n")
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _score_and_store(self, records: List[Dict]) -> int:
+        """Score a batch, write the results and checkpoint it"""
+        updates = score_records(records, self.rubric, self.llm)
+        finished = []
+        for record, update in zip(records, updates):
+            if self.data_handler.update_candidate_data(record['candidate_id'], update) is not None:
+                finished.append({'candidate_id': record['candidate_id'],
+                                 'answers_hash': update['answer_scoring']['answers_hash']})
+        self._append_checkpoint(finished)
+        return len(finished)
+    
+    def submit(self, candidate_id: str) -> Future:
+        """
+        Queue one candidate for scoring
+        
+        Args:
+            candidate_id: Candidate to score
+            
+        Returns:
+            Future: Resolves to the updated record (None if there was nothing to score)
+        """
+        def task():
+            record = self.data_handler.get_candidate_data(candidate_id)
+            if not record or not needs_scoring(record):
+                return None
+            self._score_and_store([record])
+            return self.data_handler.get_candidate_data(candidate_id)
+        
+        return self._executor.submit(task)
+    
+    def _pending_batches(self, records: Iterable[Dict], limit: Optional[int]) -> Iterable[List[Dict]]:
+        """Group records that still need scoring into batches"""
+        done = self._load_checkpoint()
+        batch, queued = [], 0
+        
+        for record in records:
+            if limit is not None and queued >= limit:
+                break
+            if not needs_scoring(record) or done.get(record.get('candidate_id')) == answers_hash(record):
+                continue
+            batch.append(record)
+            queued += 1
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        
+        if batch:
+            yield batch
+    
+    def score_backlog(self, limit: Optional[int] = None,
+                      progress: Optional[Callable[[int], None]] = None) -> Dict:
+        """
+        Score every stored candidate that has unscored answers
+        
+        Batches run on the worker pool; at most two batches per worker are in
+        flight, so the store is streamed rather than loaded at once.
+        
+        Args:
+            limit: Maximum candidates to score in this run
+            progress: Called with the running count after each batch
+            
+        Returns:
+            dict: Candidates scored, batches run and batches that failed
+        """
+        summary = {'scored': 0, 'batches': 0, 'failed_batches': 0}
+        inflight: List[Future] = []
+        max_inflight = 2 * self.workers
+        
+        def collect(future: Future):
+            try:
+                summary['scored'] += future.result()
+                summary['batches'] += 1
+            except Exception:
+                summary['failed_batches'] += 1
+            if progress:
+                progress(summary['scored'])
+        
+        for batch in self._pending_batches(self.data_handler.iter_candidates(), limit):
+            inflight.append(self._executor.submit(self._score_and_store, batch))
+            if len(inflight) >= max_inflight:
+                collect(inflight.pop(0))
+        
+        for future in inflight:
+            collect(future)
+        
+        return summary
+    
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        self._executor.shutdown(wait=wait)
+
+
+def create_scoring_pipeline(data_handler) -> ScoringPipeline:
+    """
+    Create a pipeline configured from the environment
+    
+    Reads ANSWER_SCORING_WORKERS, ANSWER_SCORING_LLM (1 to enable the LLM pass)
+    and ANSWER_SCORING_BATCH_SIZE.
+    
+    Args:
+        data_handler: CandidateDataHandler holding the records
+        
+    Returns:
+        ScoringPipeline: New pipeline
+    """
+    return ScoringPipeline(
+        data_handler,
+        workers=int(os.getenv('ANSWER_SCORING_WORKERS', '2')),
+        use_llm=os.getenv('ANSWER_SCORING_LLM', '0').strip().lower() in ('1', 'true', 'yes', 'on'),
+        batch_size=int(os.getenv('ANSWER_SCORING_BATCH_SIZE', '32'))
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_handler import CandidateDataHandler
+    
+    parser = argparse.ArgumentParser(description="Score candidates' technical answers")
+    parser.add_argument('--data-dir', default='candidate_data', help='Candidate data directory')
+    parser.add_argument('--workers', type=int, default=4, help='Worker threads')
+    parser.add_argument('--batch-size', type=int, default=32, help='Records per batch')
+    parser.add_argument('--llm', action='store_true', help='Add the LLM grading pass')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum candidates to score')
+    parser.add_argument('--candidate', help='Score a single candidate ID')
+    args = parser.parse_args()
+    
+    pipeline = ScoringPipeline(CandidateDataHandler(data_dir=args.data_dir), workers=args.workers,
+                               use_llm=args.llm, batch_size=args.batch_size)
+    
+    if args.candidate:
+        record = pipeline.submit(args.candidate).result()
+        print(serialization.dumps(record.get('answer_scoring') if record else None, pretty=True))
+    else:
+        result = pipeline.score_backlog(args.limit, progress=lambda n: print(f"\rscored {n}", end='', flush=True))
+        print()
+        for key, value in result.items():
+            print(f"{key}: {value}")
+    pipeline.shutdown()
@@ -0,0 +1,849 @@
+"""
+API Server Module
+=================
+Headless asyncio HTTP API around HiringAssistant and CandidateDataHandler.
+
+Endpoints:
+
+    GET    /health
+    GET    /metrics                               LLM queue wait times (see rate_limiter)
+    POST   /sessions                              start a screening session
+    GET    /sessions/{id}                         session progress (full state for admins)
+    POST   /sessions/{id}/messages                send a message, get the reply
+    POST   /sessions/{id}/messages/stream         same, reply streamed as server-sent events
+    GET    /candidates?q=&location=&position=&tech=&limit=   (admin)
+    POST   /candidates                                       (admin)
+    GET    /candidates/{id}                                  (admin)
+    PATCH  /candidates/{id}                                  (admin)
+    DELETE /candidates/{id}                                  (admin)
+    WS     /sessions/ws?session_id=               chat over a WebSocket (new session if omitted)
+
+Admin requests carry "Authorization: Bearer <API_ADMIN_TOKEN>". The candidate
+routes are refused when API_ADMIN_TOKEN is not set, so a server exposed to
+the careers site never serves the candidate pool by default.
+
+Requests choose a tenant's storage partition (see tenants) with an X-Tenant
+header or ?tenant=; a session keeps the tenant it was started with.
+
+The event loop never blocks: engine turns, LLM calls and storage work run in a
+sized thread pool, and streamed replies cross from that pool to the loop
+through a bounded queue, so a slow client pauses generation instead of
+buffering it. Session state lives in SQLite (<data_dir>/api_sessions.db), but
+each process keeps its own in-memory search and dedup indexes and analytics
+rollups over the candidate partitions, so run a single worker per data
+directory (one worker's saves are invisible to another's search, and a repeat
+application landing on the other worker would not be merged). The same goes
+for the Streamlit app: give it and the API server separate data directories
+(see data_handler):
+
+    uvicorn api_server:create_app --factory
+    python api_server.py serve
+    python api_server.py loadtest --url http://127.0.0.1:8000 --users 50
+    python api_server.py soak --url ws://127.0.0.1:8000 --connections 5000
+
+WebSocket frames are JSON text. The server opens with
+{"type": "session", "session_id", "stage", "message"?, "done"}; each client
+{"type": "message", "content"} is answered by {"type": "token", "text"}
+frames and a {"type": "result", ...} frame shaped like the POST reply. After
+WS_HEARTBEAT_SECONDS of silence the server sends {"type": "ping"}; any client
+frame (normally {"type": "pong"}) proves the peer is alive. Connections that
+miss a heartbeat, or send no message for WS_IDLE_TIMEOUT_SECONDS, are closed
+with code 1001 and can reconnect with their session_id. An idle connection
+costs one suspended coroutine, so a single process holds thousands of them
+(up to WS_MAX_CONNECTIONS).
+"""
+
+import asyncio
+import functools
+import hmac
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import serialization
+from chatbot_engine import HiringAssistant
+from data_handler import CandidateDataHandler
+from rate_limiter import get_scheduler, llm_context
+from response_cache import get_response_cache
+from tenants import DEFAULT_TENANT, TenantRegistry, UnknownTenant, validate_tenant_id
+from transcript_log import turn_event
+from utils import is_exit_command
+
+
+class SessionNotFound(KeyError):
+    """The session does not exist or has expired"""
+
+
+class SessionConflict(RuntimeError):
+    """The session changed concurrently or is already finished"""
+
+
+class SessionStore:
+    """Conversation state in SQLite, shared by every worker process"""
+    
+    def __init__(self, db_path: Path):
+        """
+        Open (or create) a session store
+        
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at TEXT NOT NULL, state BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+    
+    def _conn(self) -> sqlite3.Connection:
+        """Connection for the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def create(self, state: Dict):
+        """Insert a new session (state['version'] is set to 1)"""
+        state['version'] = 1
+        with self._conn() as conn:
+            conn.execute("INSERT INTO sessions (session_id, version, updated_at, state) VALUES (?, 1, ?, ?)",
+                         (state['session_id'], datetime.now().isoformat(), serialization.dumpb(state)))
+    
+    def get(self, session_id: str) -> Dict:
+        """Fetch a session; raises SessionNotFound"""
+        row = self._conn().execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            raise SessionNotFound(session_id)
+        return serialization.loads(row[0])
+    
+    def save(self, state: Dict):
+        """
+        Write a session back if nobody else has since it was read
+        
+        Raises:
+            SessionConflict: The stored version moved on
+        """
+        expected = state['version']
+        state['version'] = expected + 1
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "UPDATE sessions SET version = ?, updated_at = ?, state = ? WHERE session_id = ? AND version = ?",
+                (state['version'], datetime.now().isoformat(), serialization.dumpb(state), state['session_id'],
+                 expected)
+            )
+        if cursor.rowcount == 0:
+            state['version'] = expected
+            raise SessionConflict(state['session_id'])
+    
+    def purge_idle(self, max_idle: timedelta) -> int:
+        """Delete sessions untouched for longer than max_idle"""
+        cutoff = (datetime.now() - max_idle).isoformat()
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+class ScreeningService:
+    """Blocking screening logic; the HTTP layer runs it in worker threads"""
+    
+    def __init__(self, tenants: TenantRegistry, sessions: SessionStore,
+                 assistant_factory: Callable[[], HiringAssistant] = HiringAssistant,
+                 transcript_log=None, scoring_factory: Optional[Callable] = None, telemetry=None):
+        """
+        Initialize the service
+        
+        Args:
+            tenants: Candidate storage partitions
+            sessions: Conversation state store (shared by all tenants)
+            assistant_factory: Builds a HiringAssistant per turn (keeps LLM usage per turn)
+            transcript_log: TranscriptLog receiving every turn (optional)
+            scoring_factory: Builds a tenant's ScoringPipeline from its handler (optional)
+            telemetry: Telemetry receiving session start and exit events (optional; the
+                       assistants report stage changes themselves)
+        """
+        self.tenants = tenants
+        self.sessions = sessions
+        self.assistant_factory = assistant_factory
+        self.transcript_log = transcript_log
+        self.scoring_factory = scoring_factory
+        self.telemetry = telemetry
+        self._pipelines: Dict[str, object] = {}
+        self._pipelines_lock = threading.Lock()
+    
+    def handler(self, tenant: Optional[str] = None) -> CandidateDataHandler:
+        """A tenant's candidate storage (raises UnknownTenant)"""
+        return self.tenants.get(tenant)
+    
+    def _scoring_pipeline(self, tenant: str):
+        if self.scoring_factory is None:
+            return None
+        tenant = tenant or DEFAULT_TENANT
+        with self._pipelines_lock:
+            if tenant not in self._pipelines:
+                self._pipelines[tenant] = self.scoring_factory(self.handler(tenant))
+            return self._pipelines[tenant]
+    
+    def start_session(self, tenant: Optional[str] = None) -> Dict:
+        """
+        Start a conversation
+        
+        Args:
+            tenant: Client the candidate applies to (default tenant if None)
+            
+        Returns:
+            dict: session_id, tenant, stage and the greeting
+        """
+        tenant = validate_tenant_id(tenant or DEFAULT_TENANT)
+        self.handler(tenant)
+        state = {
+            'session_id': uuid.uuid4().hex,
+            'tenant': tenant,
+            'stage': 'greeting',
+            'candidate_data': {},
+            'seq': 0,
+            'done': False,
+            'candidate_id': None
+        }
+        self.sessions.create(state)
+        if self.telemetry is not None:
+            self.telemetry.emit('stage_entered', state['stage'], session=state['session_id'], tenant=tenant)
+        return {'session_id': state['session_id'], 'tenant': tenant, 'stage': state['stage'],
+                'message': self.assistant_factory().generate_greeting()}
+    
+    def get_session(self, session_id: str) -> Dict:
+        return self.sessions.get(session_id)
+    
+    def _load_open(self, session_id: str) -> Dict:
+        state = self.sessions.get(session_id)
+        if state['done']:
+            raise SessionConflict(f"Session {session_id} has ended")
+        return state
+    
+    def _finish(self, state: Dict, assistant: HiringAssistant, content: str) -> Dict:
+        """End the conversation: farewell, save the application, record the exit"""
+        state['seq'] += 1
+        state['done'] = True
+        if self.transcript_log is not None:
+            self.transcript_log.append({'type': 'exit', 'session_id': state['session_id'], 'seq': state['seq'],
+                                        'stage': state['stage'], 'input': content})
+        if self.telemetry is not None:
+            self.telemetry.emit('exited', state['stage'], session=state['session_id'], tenant=state.get('tenant'))
+        
+        if state['candidate_data'].get('email'):
+            handler = self.handler(state.get('tenant'))
+            candidate_id = handler.save_candidate_data(state['candidate_data'])
+            handler.register_artifact(candidate_id, 'transcript', state['session_id'])
+            pipeline = self._scoring_pipeline(state.get('tenant'))
+            if pipeline is not None:
+                pipeline.submit(candidate_id)
+            state['candidate_id'] = candidate_id
+        
+        return {'message': assistant.generate_farewell(state['candidate_data']), 'stage': state['stage'],
+                'extracted_data': {}}
+    
+    def _record(self, state: Dict, content: str, response: Dict, latency_ms: float, assistant: HiringAssistant):
+        """Apply a processed turn to the session and log it"""
+        state['seq'] += 1
+        if self.transcript_log is not None:
+            self.transcript_log.append(turn_event(state['session_id'], state['seq'], content, state['stage'],
+                                                  response, latency_ms, assistant.take_llm_usage()))
+        state['stage'] = response['stage']
+        state['candidate_data'].update(response['extracted_data'])
+    
+    def _reply(self, state: Dict, response: Dict) -> Dict:
+        return {'message': response['message'], 'stage': state['stage'], 'extracted_data': response['extracted_data'],
+                'done': state['done'], 'candidate_id': state['candidate_id']}
+    
+    def send_message(self, session_id: str, content: str) -> Dict:
+        """
+        Process one message
+        
+        Args:
+            session_id: Session to continue
+            content: Candidate's message
+            
+        Returns:
+            dict: Reply message, new stage, extracted data, done flag and saved candidate ID
+        """
+        state = self._load_open(session_id)
+        assistant = self.assistant_factory()
+        
+        if is_exit_command(content):
+            response = self._finish(state, assistant, content)
+        else:
+            start = time.perf_counter()
+            with llm_context(tenant=state.get('tenant'), session=session_id):
+                response = assistant.process_input(content, state['stage'], state['candidate_data'])
+            self._record(state, content, response, (time.perf_counter() - start) * 1000, assistant)
+        
+        self.sessions.save(state)
+        return self._reply(state, response)
+    
+    def stream_message(self, session_id: str, content: str) -> Iterator[Dict]:
+        """
+        Process one message, streaming the reply
+        
+        Yields:
+            dict: {'type': 'token', 'text'} chunks, then {'type': 'result', ...} like send_message()
+        """
+        state = self._load_open(session_id)
+        assistant = self.assistant_factory()
+        
+        if is_exit_command(content):
+            response = self._finish(state, assistant, content)
+            yield {'type': 'token', 'text': response['message']}
+        else:
+            start = time.perf_counter()
+            response = None
+            with llm_context(tenant=state.get('tenant'), session=session_id):
+                for event in assistant.stream_input(content, state['stage'], state['candidate_data']):
+                    if event['type'] == 'result':
+                        response = {key: event[key] for key in ('message', 'stage', 'extracted_data')}
+                    else:
+                        yield event
+            self._record(state, content, response, (time.perf_counter() - start) * 1000, assistant)
+        
+        self.sessions.save(state)
+        yield {'type': 'result', **self._reply(state, response)}
+
+
+async def iterate_in_thread(factory: Callable[[], Iterator], maxsize: int = 16) -> AsyncIterator:
+    """
+    Consume a blocking iterator from the event loop
+    
+    The iterator runs in the default executor and hands items over through a
+    bounded queue: when the consumer falls behind, the producer thread blocks
+    instead of buffering without limit.
+    
+    Args:
+        factory: Returns the blocking iterator (called in the worker thread)
+        maxsize: Items buffered between producer and consumer
+        
+    Yields:
+        Items of the iterator; its exceptions are re-raised here
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    done = object()
+    cancelled = threading.Event()
+    
+    def produce():
+        try:
+            for item in factory():
+                if cancelled.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put((item, None)), loop).result()
+        except BaseException as exc:
+            asyncio.run_coroutine_threadsafe(queue.put((done, exc)), loop).result()
+            return
+        asyncio.run_coroutine_threadsafe(queue.put((done, None)), loop).result()
+    
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        # The consumer stopped early: let the producer finish its pending put and exit
+        cancelled.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def create_app(service: Optional[ScreeningService] = None, admin_token: Optional[str] = None):
+    """
+    Build the Starlette application
+    
+    Args:
+        service: Screening service (defaults to one configured from the environment:
+                 API_DATA_DIR, API_SESSION_TTL_HOURS, API_THREADS)
+        admin_token: Bearer token for the candidate routes (defaults to API_ADMIN_TOKEN;
+                     empty disables them)
+                 
+    Returns:
+        Starlette: ASGI application
+    """
+    from contextlib import asynccontextmanager
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route, WebSocketRoute
+    from starlette.websockets import WebSocket, WebSocketDisconnect
+    
+    class FastJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return serialization.dumpb(content)
+    
+    if service is None:
+        from answer_scoring import create_scoring_pipeline
+        from telemetry import get_telemetry
+        from transcript_log import get_transcript_log
+        
+        tenants = TenantRegistry(os.getenv('API_DATA_DIR', 'candidate_data'))
+        service = ScreeningService(tenants, SessionStore(tenants.base_dir / "api_sessions.db"),
+                                   transcript_log=get_transcript_log(),
+                                   scoring_factory=create_scoring_pipeline,
+                                   telemetry=get_telemetry())
+    
+    session_ttl = timedelta(hours=float(os.getenv('API_SESSION_TTL_HOURS', '24')))
+    heartbeat = float(os.getenv('WS_HEARTBEAT_SECONDS', '20'))
+    idle_timeout = float(os.getenv('WS_IDLE_TIMEOUT_SECONDS', '900'))
+    max_connections = int(os.getenv('WS_MAX_CONNECTIONS', '10000'))
+    queue_size = int(os.getenv('WS_QUEUE_SIZE', '16'))
+    if admin_token is None:
+        admin_token = os.getenv('API_ADMIN_TOKEN', '')
+    sockets = set()
+    
+    def error(status: int, message: str) -> JSONResponse:
+        return FastJSONResponse({'error': message}, status_code=status)
+    
+    def is_admin(request: Request) -> bool:
+        scheme, _, supplied = request.headers.get('authorization', '').partition(' ')
+        return bool(admin_token) and scheme.lower() == 'bearer' and \
+            hmac.compare_digest(supplied.strip().encode(), admin_token.encode())
+    
+    def admin_only(endpoint):
+        @functools.wraps(endpoint)
+        async def guarded(request: Request):
+            if not admin_token:
+                return error(403, "Candidate API is disabled (set API_ADMIN_TOKEN)")
+            if not is_admin(request):
+                return error(401, "Admin token required")
+            return await endpoint(request)
+        return guarded
+    
+    def tenant_of(connection) -> Optional[str]:
+        return connection.headers.get('x-tenant') or connection.query_params.get('tenant')
+    
+    async def read_json(request: Request) -> Dict:
+        body = await request.body()
+        data = serialization.loads(body) if body else {}
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+    
+    async def health(request: Request):
+        return FastJSONResponse({'status': 'ok', 'websockets': len(sockets)})
+    
+    async def metrics(request: Request):
+        scheduler = get_scheduler()
+        response_cache = get_response_cache()
+        return FastJSONResponse({'llm_queue': scheduler.get_metrics() if scheduler else None,
+                                 'response_cache': response_cache.get_metrics() if response_cache else None,
+                                 'websockets': len(sockets)})
+    
+    async def start_session(request: Request):
+        return FastJSONResponse(await asyncio.to_thread(service.start_session, tenant_of(request)), status_code=201)
+    
+    async def get_session(request: Request):
+        state = await asyncio.to_thread(service.get_session, request.path_params['session_id'])
+        if not is_admin(request):
+            # Session IDs travel through the browser; personal data stays behind the admin token
+            state = {key: state.get(key) for key in ('session_id', 'tenant', 'stage', 'seq', 'done')}
+        return FastJSONResponse(state)
+    
+    async def send_message(request: Request):
+        data = await read_json(request)
+        content = str(data.get('content', '')).strip()
+        if not content:
+            return error(400, "'content' is required")
+        return FastJSONResponse(await asyncio.to_thread(service.send_message, request.path_params['session_id'], content))
+    
+    async def stream_message(request: Request):
+        data = await read_json(request)
+        content = str(data.get('content', '')).strip()
+        if not content:
+            return error(400, "'content' is required")
+        session_id = request.path_params['session_id']
+        # Fail before the 200 status is sent if the session cannot take a message
+        state = await asyncio.to_thread(service.get_session, session_id)
+        if state['done']:
+            return error(409, "Session has ended")
+        
+        async def events():
+            try:
+                async for event in iterate_in_thread(lambda: service.stream_message(session_id, content)):
+                    yield b'event: ' + event['type'].encode() + b'\ndata: ' + serialization.dumpb(event) + b'\n\n'
+            except (SessionConflict, SessionNotFound) as exc:
+                yield b'event: error\ndata: ' + serialization.dumpb({'error': str(exc)}) + b'\n\n'
+        
+        return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    async def chat_socket(websocket: WebSocket):
+        await websocket.accept()
+        if len(sockets) >= max_connections:
+            # 1013: try again later
+            await websocket.close(code=1013, reason="Server at capacity")
+            return
+        
+        sockets.add(websocket)
+        try:
+            session_id = websocket.query_params.get('session_id')
+            if session_id:
+                try:
+                    state = await asyncio.to_thread(service.get_session, session_id)
+                except SessionNotFound:
+                    await websocket.close(code=4404, reason="Session not found")
+                    return
+                await send_frame(websocket, {'type': 'session', 'session_id': session_id,
+                                             'stage': state['stage'], 'done': state['done']})
+                if state['done']:
+                    await websocket.close()
+                    return
+            else:
+                session = await asyncio.to_thread(service.start_session, tenant_of(websocket))
+                session_id = session['session_id']
+                await send_frame(websocket, {'type': 'session', **session, 'done': False})
+            await converse(websocket, session_id)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sockets.discard(websocket)
+    
+    async def send_frame(websocket: WebSocket, frame: Dict):
+        await websocket.send_text(serialization.dumps(frame))
+    
+    async def converse(websocket: WebSocket, session_id: str):
+        """Serve one connection: a turn at a time, heartbeats while idle"""
+        loop = asyncio.get_running_loop()
+        last_frame = last_message = loop.time()
+        # A pending receive survives heartbeat timeouts, so no frame is lost to cancellation
+        receiver = None
+        try:
+            while True:
+                if receiver is None:
+                    receiver = asyncio.ensure_future(websocket.receive())
+                done, _ = await asyncio.wait((receiver,), timeout=heartbeat)
+                now = loop.time()
+                if not done:
+                    if now - last_message >= idle_timeout:
+                        await websocket.close(code=1001, reason="Idle timeout")
+                        return
+                    if now - last_frame >= 2 * heartbeat:
+                        await websocket.close(code=1001, reason="Heartbeat timeout")
+                        return
+                    await send_frame(websocket, {'type': 'ping'})
+                    continue
+                
+                message = receiver.result()
+                receiver = None
+                if message['type'] == 'websocket.disconnect':
+                    return
+                last_frame = now
+                try:
+                    frame = serialization.loads(message.get('text') or message.get('bytes') or b'')
+                except ValueError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    await send_frame(websocket, {'type': 'error', 'error': "Frames must be JSON objects"})
+                    continue
+                if frame.get('type') == 'ping':
+                    await send_frame(websocket, {'type': 'pong'})
+                    continue
+                if frame.get('type') != 'message':
+                    continue
+                content = str(frame.get('content', '')).strip()
+                if not content:
+                    await send_frame(websocket, {'type': 'error', 'error': "'content' is required"})
+                    continue
+                
+                # Each send waits for the socket to drain, and the bounded queue
+                # pauses the engine thread while this client is behind
+                result = None
+                try:
+                    async for event in iterate_in_thread(lambda: service.stream_message(session_id, content),
+                                                         queue_size):
+                        await send_frame(websocket, event)
+                        result = event
+                except (SessionConflict, SessionNotFound) as exc:
+                    await send_frame(websocket, {'type': 'error', 'error': str(exc)})
+                last_frame = last_message = loop.time()
+                if result is None or result.get('done'):
+                    await websocket.close()
+                    return
+        finally:
+            if receiver is not None:
+                receiver.cancel()
+    
+    async def list_candidates(request: Request):
+        params = request.query_params
+        tech = [t.strip() for t in params.get('tech', '').split(',') if t.strip()] or None
+        results = await asyncio.to_thread(
+            lambda: service.handler(tenant_of(request)).search_candidates(
+                params.get('q', ''), location=params.get('location'), position=params.get('position'),
+                tech_stack=tech, status=params.get('status'), limit=int(params.get('limit', 20))
+            )
+        )
+        return FastJSONResponse({'candidates': results})
+    
+    async def create_candidate(request: Request):
+        data = await read_json(request)
+        if not data.get('email'):
+            return error(400, "'email' is required")
+        handler = await asyncio.to_thread(service.handler, tenant_of(request))
+        candidate_id = await asyncio.to_thread(handler.save_candidate_data, data)
+        return FastJSONResponse(await asyncio.to_thread(handler.get_candidate_data, candidate_id), status_code=201)
+    
+    async def get_candidate(request: Request):
+        handler = await asyncio.to_thread(service.handler, tenant_of(request))
+        record = await asyncio.to_thread(handler.get_candidate_data, request.path_params['candidate_id'])
+        return FastJSONResponse(record) if record else error(404, "Candidate not found")
+    
+    async def update_candidate(request: Request):
+        updates = await read_json(request)
+        updates.pop('candidate_id', None)
+        handler = await asyncio.to_thread(service.handler, tenant_of(request))
+        record = await asyncio.to_thread(handler.update_candidate_data, request.path_params['candidate_id'], updates)
+        return FastJSONResponse(record) if record else error(404, "Candidate not found")
+    
+    async def delete_candidate(request: Request):
+        handler = await asyncio.to_thread(service.handler, tenant_of(request))
+        deleted = await asyncio.to_thread(handler.delete_candidate_data, request.path_params['candidate_id'])
+        return FastJSONResponse({'deleted': True}) if deleted else error(404, "Candidate not found")
+    
+    async def session_not_found(request: Request, exc: Exception):
+        return error(404, "Session not found")
+    
+    async def conflict(request: Request, exc: Exception):
+        return error(409, "Session was updated concurrently or has ended")
+    
+    async def unknown_tenant(request: Request, exc: Exception):
+        return error(404, str(exc))
+    
+    async def bad_request(request: Request, exc: Exception):
+        return error(400, str(exc))
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        # Engine turns may wait on a remote LLM, so size the pool for concurrent sessions
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=int(os.getenv('API_THREADS', '64')), thread_name_prefix='api')
+        )
+        
+        async def purge_sessions():
+            while True:
+                await asyncio.to_thread(service.sessions.purge_idle, session_ttl)
+                await asyncio.sleep(600)
+        
+        purger = asyncio.create_task(purge_sessions())
+        yield
+        purger.cancel()
+    
+    routes = [
+        Route('/health', health),
+        Route('/metrics', metrics),
+        Route('/sessions', start_session, methods=['POST']),
+        WebSocketRoute('/sessions/ws', chat_socket),
+        Route('/sessions/{session_id}', get_session),
+        Route('/sessions/{session_id}/messages', send_message, methods=['POST']),
+        Route('/sessions/{session_id}/messages/stream', stream_message, methods=['POST']),
+        Route('/candidates', admin_only(list_candidates)),
+        Route('/candidates', admin_only(create_candidate), methods=['POST']),
+        Route('/candidates/{candidate_id}', admin_only(get_candidate)),
+        Route('/candidates/{candidate_id}', admin_only(update_candidate), methods=['PATCH']),
+        Route('/candidates/{candidate_id}', admin_only(delete_candidate), methods=['DELETE']),
+    ]
+    app = Starlette(routes=routes, lifespan=lifespan, exception_handlers={
+        SessionNotFound: session_not_found,
+        SessionConflict: conflict,
+        UnknownTenant: unknown_tenant,
+        ValueError: bad_request,
+    })
+    app.state.service = service
+    return app
+
+
+# Scripted candidate used by the load test
+LOADTEST_SCRIPT = [
+    "Jordan Smith",
+    "jordan.{n}@example.com",
+    "+1 555 010 {n:04d}",
+    "4 years",
+    "Platform Engineer",
+    "Remote",
+    "Python, PostgreSQL, Docker",
+    "I use connection pooling and index the columns used in joins.",
+    "bye"
+]
+
+
+async def loadtest(url: str, users: int = 50, conversations: int = 4) -> Dict:
+    """
+    Drive full screening conversations against a running server
+    
+    Args:
+        url: Server base URL
+        users: Concurrent simulated candidates
+        conversations: Conversations per user
+        
+    Returns:
+        dict: Requests, requests per second and latency percentiles
+    """
+    import httpx
+    
+    latencies: List[float] = []
+    
+    async def timed(client, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        return response.json()
+    
+    async def user(client, index: int):
+        for conversation in range(conversations):
+            n = index * conversations + conversation
+            session = await timed(client, 'POST', '/sessions')
+            for line in LOADTEST_SCRIPT:
+                await timed(client, 'POST', f"/sessions/{session['session_id']}/messages",
+                            json={'content': line.format(n=n)})
+    
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client, i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2)
+    }
+
+
+async def soak(url: str, connections: int = 1000, hold: float = 60) -> Dict:
+    """
+    Hold many idle WebSocket sessions open against a running server
+    
+    Every connection answers heartbeats; one message per connection at the end
+    checks that the server still serves turns.
+    
+    Args:
+        url: Server base URL (ws://host:port)
+        connections: Concurrent idle connections
+        hold: Seconds to stay idle
+        
+    Returns:
+        dict: Connections opened, still open after the hold, and reply latency percentiles
+    """
+    import websockets
+    
+    health_url = url.replace('ws://', 'http://', 1).replace('wss://', 'https://', 1) + '/health'
+    sockets = []
+    replies: Dict[int, asyncio.Queue] = {}
+    
+    async def listen(index: int, socket):
+        try:
+            async for raw in socket:
+                frame = serialization.loads(raw)
+                if frame['type'] == 'ping':
+                    await socket.send(serialization.dumps({'type': 'pong'}))
+                elif frame['type'] != 'token':
+                    await replies[index].put(frame)
+        except websockets.ConnectionClosed:
+            pass
+        await replies[index].put(None)
+    
+    async def open_one(index: int):
+        socket = await websockets.connect(url + '/sessions/ws', ping_interval=None, max_queue=64)
+        replies[index] = asyncio.Queue()
+        sockets.append(socket)
+        listener = asyncio.create_task(listen(index, socket))
+        await replies[index].get()
+        return listener
+    
+    start = time.perf_counter()
+    listeners = []
+    for batch in range(0, connections, 200):
+        listeners.extend(await asyncio.gather(*(open_one(i) for i in range(batch, min(batch + 200, connections)))))
+    connect_seconds = time.perf_counter() - start
+    
+    await asyncio.sleep(hold)
+    
+    import httpx
+    async with httpx.AsyncClient() as client:
+        server_count = (await client.get(health_url)).json().get('websockets')
+    
+    latencies: List[float] = []
+    
+    async def talk(index: int, socket):
+        start = time.perf_counter()
+        await socket.send(serialization.dumps({'type': 'message', 'content': 'Jordan Smith'}))
+        if await replies[index].get() is not None:
+            latencies.append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(talk(i, socket) for i, socket in enumerate(sockets)), return_exceptions=True)
+    for socket in sockets:
+        await socket.close()
+    await asyncio.gather(*listeners, return_exceptions=True)
+    
+    latencies.sort()
+    return {
+        'connections': len(sockets),
+        'connect_seconds': round(connect_seconds, 2),
+        'open_on_server': server_count,
+        'answered': len(latencies),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Screening API server")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    serve_parser = subparsers.add_parser('serve', help='Run the server with uvicorn')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--workers', type=int, default=1,
+                              help='Worker processes; candidate indexes are per process, so keep 1 per data directory')
+    
+    load_parser = subparsers.add_parser('loadtest', help='Run scripted conversations against a server')
+    load_parser.add_argument('--url', default='http://127.0.0.1:8000')
+    load_parser.add_argument('--users', type=int, default=50)
+    load_parser.add_argument('--conversations', type=int, default=4)
+    
+    soak_parser = subparsers.add_parser('soak', help='Hold idle WebSocket sessions open against a server')
+    soak_parser.add_argument('--url', default='ws://127.0.0.1:8000')
+    soak_parser.add_argument('--connections', type=int, default=1000)
+    soak_parser.add_argument('--hold', type=float, default=60)
+    
+    args = parser.parse_args()
+    
+    if args.command == 'serve':
+        import sys
+        import uvicorn
+        
+        if args.workers > 1:
+            print("warning: workers do not share candidate search/dedup indexes or rollups; "
+                  "saves on one worker are invisible to the others and repeat applications "
+                  "are not merged across workers", file=sys.stderr)
+        # Per-message deflate keeps zlib state per socket; frames are small JSON, so skip it
+        uvicorn.run('api_server:create_app', factory=True, host=args.host, port=args.port,
+                    workers=args.workers, log_level='warning', ws_per_message_deflate=False)
+    elif args.command == 'soak':
+        for key, value in asyncio.run(soak(args.url, args.connections, args.hold)).items():
+            print(f"{key}: {value}")
+    else:
+        for key, value in asyncio.run(loadtest(args.url, args.users, args.conversations)).items():
+            print(f"{key}: {value}")
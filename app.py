@@ -3,25 +3,37 @@ TalentScout Hiring Assistant Chatbot
 =====================================
 An intelligent chatbot for screening candidates using Hugging Face LLMs.
 
+Run one app process per candidate data directory, and do not point the API
+server at the same directory (see data_handler for why there is one writer).
+
 Author: AI/ML Intern Candidate
 Version: 1.0.0
 """
 
 import streamlit as st
-import json
 import re
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from io import BytesIO
 import base64
+import time
+import uuid
 
 # Import custom modules
 from chatbot_engine import HiringAssistant
 from data_handler import CandidateDataHandler
-from utils import validate_email, validate_phone, sanitize_input
+from utils import validate_email, validate_phone, sanitize_input, is_exit_command
+from pdf_renderer import render_candidate_pdf
+from exporters import records_to_csv, records_to_xlsx
+from answer_scoring import ScoringPipeline, create_scoring_pipeline
+from transcript_log import TranscriptLog, get_transcript_log, turn_event
+from retention import RetentionManager, create_retention_manager
+from rate_limiter import llm_context
+from telemetry import get_telemetry
+from profiling import profiled
+from tenants import DEFAULT_TENANT, get_tenant_registry
+import serialization
 
 # Load environment variables
 load_dotenv()
@@ -542,122 +554,54 @@ st.markdown("""
 
 def export_to_json(data: dict) -> str:
     """Export candidate data to JSON format"""
-    return json.dumps(data, indent=2)
+    return serialization.dumps(data, pretty=True)
 
 
 def export_to_csv(data: dict) -> bytes:
     """Export candidate data to CSV format"""
-    # Convert dict to DataFrame
-    df_data = {}
-    for key, value in data.items():
-        if isinstance(value, list):
-            df_data[key] = ', '.join(map(str, value))
-        else:
-            df_data[key] = value
-    
-    df = pd.DataFrame([df_data])
-    return df.to_csv(index=False).encode('utf-8')
+    return records_to_csv([data])
 
 
 def export_to_excel(data: dict) -> bytes:
     """Export candidate data to Excel format"""
-    # Convert dict to DataFrame
-    df_data = {}
-    for key, value in data.items():
-        if isinstance(value, list):
-            df_data[key] = ', '.join(map(str, value))
-        else:
-            df_data[key] = value
-    
-    df = pd.DataFrame([df_data])
-    
-    # Create Excel file in memory
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Candidate Data', index=False)
-    output.seek(0)
-    return output.getvalue()
+    return records_to_xlsx([data], sheet_name='Candidate Data')
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
 def export_to_pdf(data: dict) -> bytes:
-    """Export candidate data to PDF format using HTML"""
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.units import inch
-    
-    # Create PDF in memory
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#00ffff'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
-    
-    # Add title
-    elements.append(Paragraph("TalentScout AI - Candidate Profile", title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Create table data
-    table_data = [['Field', 'Value']]
-    for key, value in data.items():
-        field_name = key.replace('_', ' ').title()
-        if isinstance(value, list):
-            field_value = ', '.join(map(str, value))
-        else:
-            field_value = str(value)
-        table_data.append([field_name, field_value])
-    
-    # Create table
-    table = Table(table_data, colWidths=[2.5*inch, 4*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00ffff')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#0a0e27')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Add footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.grey,
-        alignment=1
-    )
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", footer_style))
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
+    """Export candidate data to PDF format (cached per candidate data across reruns)"""
+    return render_candidate_pdf(data)
+
+
+@st.cache_resource
+def get_data_handler(tenant: str = DEFAULT_TENANT) -> CandidateDataHandler:
+    """Shared data handler per tenant so in-memory indexes are built once per process"""
+    return get_tenant_registry().get(tenant)
+
+
+@st.cache_resource
+def get_transcript() -> TranscriptLog:
+    """Shared append-only log of every conversation turn"""
+    return get_transcript_log()
 
 
+@st.cache_resource
+def get_scoring_pipeline(tenant: str = DEFAULT_TENANT) -> ScoringPipeline:
+    """Shared background pool per tenant that scores technical answers after each application"""
+    return create_scoring_pipeline(get_data_handler(tenant))
+
+
+@st.cache_resource
+def get_retention_manager(tenant: str = DEFAULT_TENANT) -> Optional[RetentionManager]:
+    """Background retention passes per tenant, enabled by setting RETENTION_INTERVAL_HOURS"""
+    interval = os.getenv('RETENTION_INTERVAL_HOURS')
+    if not interval:
+        return None
+    # Transcripts are one log for every tenant, pruned by the default tenant's manager
+    manager = create_retention_manager(get_data_handler(tenant), prune_transcripts=tenant == DEFAULT_TENANT)
+    manager.start(float(interval) * 3600)
+    return manager
+
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -669,10 +613,34 @@ def initialize_session_state():
         st.session_state.conversation_stage = 'greeting'
     if 'chatbot' not in st.session_state:
         st.session_state.chatbot = HiringAssistant()
+    if 'tenant' not in st.session_state:
+        # Embedding pages can preselect the client with ?tenant=<id>
+        st.session_state.tenant = DEFAULT_TENANT
+        requested = st.query_params.get('tenant')
+        if requested:
+            try:
+                get_data_handler(requested.strip().lower())
+                st.session_state.tenant = requested.strip().lower()
+            except ValueError:
+                st.warning(f"Unknown client '{requested}', using the default partition.")
     if 'data_handler' not in st.session_state:
-        st.session_state.data_handler = CandidateDataHandler()
+        select_tenant(st.session_state.tenant)
     if 'conversation_active' not in st.session_state:
         st.session_state.conversation_active = True
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.turn_seq = 0
+        telemetry = get_telemetry()
+        if telemetry is not None:
+            telemetry.emit('stage_entered', st.session_state.conversation_stage,
+                           session=st.session_state.session_id, tenant=st.session_state.tenant)
+
+
+def select_tenant(tenant: str):
+    """Point the session at a tenant's storage partition"""
+    st.session_state.tenant = tenant
+    st.session_state.data_handler = get_data_handler(tenant)
+    get_retention_manager(tenant)
 
 
 def render_header():
@@ -688,6 +656,19 @@ def render_header():
 def render_sidebar():
     """Render the sidebar with candidate information and progress"""
     with st.sidebar:
+        tenants = get_tenant_registry().tenants()
+        if len(tenants) > 1:
+            # The partition is fixed once the candidate has started answering
+            tenant = st.selectbox(
+                "Client",
+                tenants,
+                index=tenants.index(st.session_state.tenant) if st.session_state.tenant in tenants else 0,
+                disabled=len(st.session_state.messages) > 1
+            )
+            if tenant != st.session_state.tenant:
+                select_tenant(tenant)
+            st.markdown("---")
+        
         st.markdown("### Candidate Progress")
         
         # Progress calculation
@@ -708,6 +689,8 @@ def render_sidebar():
         if st.session_state.candidate_data:
             st.markdown("### Collected Information")
             for key, value in st.session_state.candidate_data.items():
+                if key in ('technical_questions', 'job_matches'):
+                    continue
                 if key == 'tech_stack' and isinstance(value, list):
                     st.markdown(f"**{key.replace('_', ' ').title()}:**")
                     tech_html = ''.join([f'<span class="tech-tag">{tech}</span>' for tech in value])
@@ -785,7 +768,7 @@ def render_sidebar():
                     st.error(f"PDF export requires reportlab library. Install it with: pip install reportlab")
         else:
             st.info("No data to export yet. Complete the conversation first.")
-
+        
         
         st.markdown("---")
         st.markdown("""
@@ -804,29 +787,59 @@ def render_chat_messages():
             st.markdown(f'<div class="message-bot">{message["content"]}</div>', unsafe_allow_html=True)
 
 
+@profiled
 def handle_user_input(user_input: str):
     """Process user input and generate responses"""
     # Add user message
     st.session_state.messages.append({"role": "user", "content": user_input})
     
     # Check for exit keywords
-    exit_keywords = ['exit', 'quit', 'bye', 'goodbye', 'end', 'stop']
-    if any(keyword in user_input.lower() for keyword in exit_keywords):
+    if is_exit_command(user_input):
         st.session_state.conversation_active = False
+        st.session_state.turn_seq += 1
+        get_transcript().append({
+            'type': 'exit',
+            'session_id': st.session_state.session_id,
+            'seq': st.session_state.turn_seq,
+            'stage': st.session_state.conversation_stage,
+            'input': user_input
+        })
+        telemetry = get_telemetry()
+        if telemetry is not None:
+            telemetry.emit('exited', st.session_state.conversation_stage,
+                           session=st.session_state.session_id, tenant=st.session_state.tenant)
         farewell_message = st.session_state.chatbot.generate_farewell(st.session_state.candidate_data)
         st.session_state.messages.append({"role": "assistant", "content": farewell_message})
         
         # Save candidate data
         if st.session_state.candidate_data.get('email'):
-            st.session_state.data_handler.save_candidate_data(st.session_state.candidate_data)
+            candidate_id = st.session_state.data_handler.save_candidate_data(st.session_state.candidate_data)
+            st.session_state.data_handler.register_artifact(candidate_id, 'transcript', st.session_state.session_id)
+            get_scoring_pipeline(st.session_state.tenant).submit(candidate_id)
         return
     
     # Get response from chatbot
-    response = st.session_state.chatbot.process_input(
+    stage = st.session_state.conversation_stage
+    start = time.perf_counter()
+    with llm_context(tenant=st.session_state.tenant, session=st.session_state.session_id):
+        response = st.session_state.chatbot.process_input(
+            user_input,
+            stage,
+            st.session_state.candidate_data
+        )
+    latency_ms = (time.perf_counter() - start) * 1000
+    
+    # Record the turn in the transcript log
+    st.session_state.turn_seq += 1
+    get_transcript().append(turn_event(
+        st.session_state.session_id,
+        st.session_state.turn_seq,
         user_input,
-        st.session_state.conversation_stage,
-        st.session_state.candidate_data
-    )
+        stage,
+        response,
+        latency_ms,
+        st.session_state.chatbot.take_llm_usage()
+    ))
     
     # Update conversation stage and candidate data
     st.session_state.conversation_stage = response['stage']
@@ -0,0 +1,510 @@
+"""
+Audit Log Module
+================
+Structured, buffered audit trail of data operations (saves, merges, deletions).
+
+Each event is one JSON line: timestamp, action, candidate ID and details.
+log() only puts the event on a queue and into an in-memory ring buffer of
+recent events; a background writer drains the queue in batches into the current
+segment file, which stays open between batches:
+
+    audit/audit-<created>-<pid>-<instance>-<n>.jsonl
+
+A segment is closed once it passes max_bytes or rotate_interval seconds. On
+close a sidecar index (<segment>.idx) records the byte offset of every event by
+action and candidate ID plus the time range, so query() seeks straight to the
+matching lines and skips segments that cannot match. Segments without a sidecar
+(still being written by another process, or left by a crash) are scanned.
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import serialization
+
+
+# Distinguishes logs opened on the same directory by one process
+_instance_counter = itertools.count(1)
+
+
+class _SegmentIndex:
+    """Byte offsets of the events in one segment, by action and candidate"""
+    
+    def __init__(self):
+        self.events = 0
+        self.first_ts: Optional[str] = None
+        self.last_ts: Optional[str] = None
+        self.actions: Dict[str, List[int]] = defaultdict(list)
+        self.candidates: Dict[str, List[int]] = defaultdict(list)
+    
+    def add(self, event: Dict, offset: int):
+        self.events += 1
+        self.first_ts = self.first_ts or event['ts']
+        self.last_ts = event['ts']
+        self.actions[event['action']].append(offset)
+        if event.get('candidate_id'):
+            self.candidates[event['candidate_id']].append(offset)
+    
+    def snapshot(self) -> '_SegmentIndex':
+        """Copy that stays consistent while this index keeps growing"""
+        index = _SegmentIndex()
+        index.events, index.first_ts, index.last_ts = self.events, self.first_ts, self.last_ts
+        index.actions.update((key, list(offsets)) for key, offsets in self.actions.items())
+        index.candidates.update((key, list(offsets)) for key, offsets in self.candidates.items())
+        return index
+    
+    def to_dict(self) -> Dict:
+        return {
+            'events': self.events,
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+            'actions': self.actions,
+            'candidates': self.candidates
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> '_SegmentIndex':
+        index = cls()
+        index.events = data['events']
+        index.first_ts = data['first_ts']
+        index.last_ts = data['last_ts']
+        index.actions.update(data['actions'])
+        index.candidates.update(data['candidates'])
+        return index
+    
+    def offsets(self, action: Optional[str], candidate_id: Optional[str]) -> Optional[List[int]]:
+        """Offsets matching the filters (None when neither filter is set)"""
+        if action is None and candidate_id is None:
+            return None
+        if candidate_id is None:
+            return self.actions.get(action, [])
+        matches = self.candidates.get(candidate_id, [])
+        if action is not None:
+            wanted = set(self.actions.get(action, []))
+            matches = [offset for offset in matches if offset in wanted]
+        return matches
+
+
+def _sidecar(segment: Path) -> Path:
+    return segment.with_name(segment.name + '.idx')
+
+
+def _build_index(segment: Path) -> _SegmentIndex:
+    """Index a segment by scanning it"""
+    index = _SegmentIndex()
+    offset = 0
+    with open(segment, 'rb') as f:
+        for line in f:
+            if line.strip():
+                try:
+                    index.add(serialization.loads(line), offset)
+                except ValueError:
+                    # Torn final line from an interrupted write
+                    break
+            offset += len(line)
+    return index
+
+
+def _matches(event: Dict, action: Optional[str], candidate_id: Optional[str],
+             since: Optional[str], until: Optional[str]) -> bool:
+    return ((action is None or event.get('action') == action)
+            and (candidate_id is None or event.get('candidate_id') == candidate_id)
+            and (since is None or event.get('ts', '') >= since)
+            and (until is None or event.get('ts', '') <= until))
+
+
+class AuditLog:
+    """Asynchronous JSONL audit writer with rotation and indexed queries"""
+    
+    def __init__(self, log_dir: str = "audit", max_bytes: int = 16 * 1024 * 1024,
+                 rotate_interval: float = 24 * 3600, ring_size: int = 1000,
+                 batch_size: int = 256, flush_interval: float = 1.0):
+        """
+        Open an audit log
+        
+        Args:
+            log_dir: Directory holding segment files
+            max_bytes: Size after which a new segment is started
+            rotate_interval: Age in seconds after which a new segment is started
+            ring_size: Recent events kept in memory for recent()
+            batch_size: Queued events that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+        """
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending: List[Dict] = []
+        self._recent: deque = deque(maxlen=ring_size)
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        
+        self._instance = next(_instance_counter)
+        self._segment_count = 0
+        self._segment: Optional[Path] = None
+        self._file = None
+        self._opened_at = 0.0
+        self._index = _SegmentIndex()
+        self._sidecars: Dict[Path, _SegmentIndex] = {}
+        
+        self._writer = threading.Thread(target=self._flush_loop, name='audit-log', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+    
+    def log(self, action: str, candidate_id: Optional[str] = None, **details):
+        """
+        Record an event without blocking on disk I/O
+        
+        Args:
+            action: Event type, e.g. SAVE_CANDIDATE_DATA
+            candidate_id: Candidate the event concerns
+            **details: Additional JSON-serializable fields
+        """
+        event = {'ts': datetime.now().isoformat(), 'action': action, 'candidate_id': candidate_id}
+        event.update(details)
+        self._recent.append(event)
+        self._queue.put(event)
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+    
+    def recent(self, limit: int = 50, action: Optional[str] = None,
+               candidate_id: Optional[str] = None) -> List[Dict]:
+        """
+        Latest events from the in-memory ring buffer, newest first
+        
+        Args:
+            limit: Maximum events
+            action: Only events with this action
+            candidate_id: Only events for this candidate
+            
+        Returns:
+            list: Matching events
+        """
+        results = []
+        for event in reversed(list(self._recent)):
+            if _matches(event, action, candidate_id, None, None):
+                results.append(event)
+                if len(results) >= limit:
+                    break
+        return results
+    
+    def _flush_loop(self):
+        """Write queued events every flush_interval or when a batch fills"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError:
+                # Keep the loop alive; the batch is retried on a fresh segment
+                with self._write_lock:
+                    self._file = None
+                    self._segment = None
+    
+    def _open_segment(self):
+        """Start a new segment file (caller holds the write lock)"""
+        self._segment_count += 1
+        created = datetime.now().strftime('%Y%m%d%H%M%S')
+        name = f"audit-{created}-{os.getpid()}-{self._instance}-{self._segment_count:04d}.jsonl"
+        self._segment = self.log_dir / name
+        self._file = open(self._segment, 'ab')
+        self._opened_at = time.monotonic()
+        self._index = _SegmentIndex()
+    
+    def _close_segment(self):
+        """Close the current segment and write its sidecar index (caller holds the write lock)"""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            if self._index.events:
+                with open(_sidecar(self._segment), 'wb') as f:
+                    f.write(serialization.dumpb(self._index.to_dict()))
+        finally:
+            self._file = None
+            self._segment = None
+    
+    def _needs_rotation(self) -> bool:
+        return (self._file is None
+                or self._file.tell() >= self.max_bytes
+                or time.monotonic() - self._opened_at >= self.rotate_interval)
+    
+    def flush(self) -> int:
+        """
+        Write queued events to the current segment
+        
+        Returns:
+            int: Number of events written
+        """
+        with self._write_lock:
+            batch, self._pending = self._pending, []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return 0
+            
+            try:
+                if self._needs_rotation():
+                    self._close_segment()
+                    self._open_segment()
+                
+                offset = self._file.tell()
+                lines = [serialization.dumpb(event) + b'\n' for event in batch]
+                self._file.write(b''.join(lines))
+                self._file.flush()
+            except OSError:
+                self._pending = batch
+                raise
+            
+            for event, line in zip(batch, lines):
+                self._index.add(event, offset)
+                offset += len(line)
+            return len(batch)
+    
+    def rotate(self):
+        """Flush and close the current segment so the next event starts a new one"""
+        self.flush()
+        with self._write_lock:
+            self._close_segment()
+    
+    def close(self):
+        """Flush remaining events, write the sidecar index and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        try:
+            self.flush()
+            with self._write_lock:
+                self._close_segment()
+        except OSError:
+            # The log directory was removed; there is nowhere left to write
+            pass
+    
+    def active_segment(self) -> Optional[Path]:
+        """Segment currently open for writing, if any"""
+        with self._write_lock:
+            return self._segment
+    
+    def segments(self) -> List[Path]:
+        """Segment files in write order"""
+        return sorted(self.log_dir.glob("audit-*.jsonl"))
+    
+    def _segment_index(self, segment: Path) -> Optional[_SegmentIndex]:
+        """Index for a segment: in memory if current, from the sidecar, else None"""
+        with self._write_lock:
+            if segment == self._segment:
+                return self._index.snapshot()
+        
+        # Closed segments never change, so their sidecars are parsed once
+        index = self._sidecars.get(segment)
+        if index is None:
+            sidecar = _sidecar(segment)
+            if not sidecar.exists():
+                return None
+            index = _SegmentIndex.from_dict(serialization.load_file(sidecar))
+            self._sidecars[segment] = index
+        return index
+    
+    def query(self, action: Optional[str] = None, candidate_id: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Find logged events
+        
+        Args:
+            action: Only events with this action
+            candidate_id: Only events for this candidate
+            since: Only events at or after this ISO timestamp
+            until: Only events at or before this ISO timestamp
+            limit: Maximum events
+            
+        Yields:
+            dict: Matching events, oldest first
+        """
+        self.flush()
+        found = 0
+        
+        for segment in self.segments():
+            index = self._segment_index(segment)
+            
+            if index is None:
+                events = (event for event in serialization.iter_jsonl(segment))
+            else:
+                if not index.events:
+                    continue
+                if (since is not None and index.last_ts < since) or (until is not None and index.first_ts > until):
+                    continue
+                offsets = index.offsets(action, candidate_id)
+                if offsets == []:
+                    continue
+                events = self._read_events(segment, offsets)
+            
+            for event in events:
+                if _matches(event, action, candidate_id, since, until):
+                    yield event
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+    
+    def redact(self, candidate_ids) -> int:
+        """
+        Strip the details of every event about the given candidates (erasure)
+        
+        Lines are overwritten in place with the timestamp, action and ID only,
+        padded to the same length, so offsets and sidecar indexes stay valid
+        and only the affected lines are touched.
+        
+        Args:
+            candidate_ids: Candidates to redact
+            
+        Returns:
+            int: Number of events redacted
+        """
+        wanted = set(candidate_ids)
+        self.flush()
+        redacted = 0
+        
+        for segment in self.segments():
+            index = self._segment_index(segment) or _build_index(segment)
+            offsets = sorted(offset for candidate_id in wanted for offset in index.candidates.get(candidate_id, []))
+            if not offsets:
+                continue
+            with open(segment, 'r+b') as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    line = f.readline()
+                    event = serialization.loads(line)
+                    if event.get('redacted'):
+                        continue
+                    stub = {key: event.get(key) for key in ('ts', 'action', 'candidate_id')}
+                    replacement = serialization.dumpb({**stub, 'redacted': True})
+                    if len(replacement) >= len(line):
+                        replacement = serialization.dumpb(stub)
+                    f.seek(offset)
+                    f.write(replacement.ljust(len(line) - 1) + b'\n')
+                    redacted += 1
+        
+        self._recent = deque(
+            ({key: event.get(key) for key in ('ts', 'action', 'candidate_id')}
+             if event.get('candidate_id') in wanted else event for event in list(self._recent)),
+            maxlen=self._recent.maxlen
+        )
+        return redacted
+    
+    @staticmethod
+    def _read_events(segment: Path, offsets: Optional[List[int]]) -> Iterator[Dict]:
+        """Read the lines at the given offsets, or the whole segment when offsets is None"""
+        if offsets is None:
+            yield from serialization.iter_jsonl(segment)
+            return
+        with open(segment, 'rb') as f:
+            for offset in sorted(offsets):
+                f.seek(offset)
+                yield serialization.loads(f.readline())
+    
+    def reindex(self, min_age: float = 3600) -> int:
+        """
+        Write sidecar indexes for segments that lack one
+        
+        Args:
+            min_age: Skip segments modified more recently than this many seconds
+                     (they may still be open in another process)
+                     
+        Returns:
+            int: Sidecars written
+        """
+        written = 0
+        now = time.time()
+        for segment in self.segments():
+            if segment == self._segment or _sidecar(segment).exists():
+                continue
+            if now - segment.stat().st_mtime < min_age:
+                continue
+            with open(_sidecar(segment), 'wb') as f:
+                f.write(serialization.dumpb(_build_index(segment).to_dict()))
+            written += 1
+        return written
+
+
+_logs: Dict[str, AuditLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_audit_log(log_dir: Optional[str] = None) -> AuditLog:
+    """
+    Get the shared audit log for a directory
+    
+    Args:
+        log_dir: Segment directory (defaults to AUDIT_LOG_DIR, then audit)
+        
+    Returns:
+        AuditLog: Shared log
+    """
+    log_dir = str(log_dir or os.getenv('AUDIT_LOG_DIR', 'audit'))
+    with _logs_lock:
+        log = _logs.get(log_dir)
+        if log is None or not log.log_dir.is_dir():
+            if log is not None:
+                log.close()
+            log = AuditLog(
+                log_dir,
+                max_bytes=int(os.getenv('AUDIT_LOG_MAX_BYTES', 16 * 1024 * 1024)),
+                rotate_interval=float(os.getenv('AUDIT_LOG_ROTATE_HOURS', 24)) * 3600
+            )
+            _logs[log_dir] = log
+        return log
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Query the audit log")
+    parser.add_argument('--log-dir', default=os.getenv('AUDIT_LOG_DIR', 'candidate_data/audit'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    query_parser = subparsers.add_parser('query', help='Print matching events as JSON lines')
+    query_parser.add_argument('--action', default=None)
+    query_parser.add_argument('--candidate', default=None)
+    query_parser.add_argument('--since', default=None, help='ISO timestamp')
+    query_parser.add_argument('--until', default=None, help='ISO timestamp')
+    query_parser.add_argument('--limit', type=int, default=None)
+    
+    subparsers.add_parser('stats', help='Count segments and events per action')
+    
+    reindex_parser = subparsers.add_parser('reindex', help='Index segments left without a sidecar')
+    reindex_parser.add_argument('--min-age', type=float, default=3600, help='Seconds since last write')
+    
+    args = parser.parse_args()
+    log = AuditLog(args.log_dir)
+    
+    if args.command == 'query':
+        for event in log.query(args.action, args.candidate, args.since, args.until, args.limit):
+            print(serialization.dumps(event))
+    elif args.command == 'stats':
+        counts: Dict[str, int] = defaultdict(int)
+        for segment in log.segments():
+            index = log._segment_index(segment) or _build_index(segment)
+            for action, offsets in index.actions.items():
+                counts[action] += len(offsets)
+        print(f"segments: {len(log.segments())}")
+        for action, count in sorted(counts.items()):
+            print(f"{action}: {count}")
+    else:
+        print(f"sidecars written: {log.reindex(args.min_age)}")
@@ -1,30 +1,75 @@
 """
 Hiring Assistant Chatbot Engine
 ================================
-Handles conversation flow, context management, and LLM integration using Hugging Face.
+Handles conversation flow, context management, and LLM integration through pluggable backends.
 """
 
 import os
 import re
-from typing import Dict, List, Optional, Tuple
-from huggingface_hub import InferenceClient
-import json
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+from llm_backends import LLMBackend, get_backend
+from rate_limiter import llm_context
+from question_bank import QuestionBank, get_question_bank
+from question_index import QuestionIndex, get_question_index
+from job_matching import JobSpecStore, get_job_store
+from telemetry import Telemetry, get_telemetry
+from profiling import profiled
+from response_cache import ResponseCache, get_response_cache, render_template
+from utils import extract_numbered_items
+import serialization
+
+
+# Tech stack categories for question generation and skill parsing
+TECH_CATEGORIES = {
+    'languages': ['python', 'javascript', 'java', 'c++', 'c#', 'go', 'rust', 'ruby', 'php', 'swift', 'kotlin', 'typescript'],
+    'frameworks': ['react', 'angular', 'vue', 'django', 'flask', 'fastapi', 'spring', 'express', 'nodejs', 'node.js', 'nextjs', 'next.js', 'laravel'],
+    'databases': ['mysql', 'postgresql', 'mongodb', 'redis', 'cassandra', 'dynamodb', 'sqlite', 'oracle', 'sql server'],
+    'tools': ['docker', 'kubernetes', 'git', 'jenkins', 'aws', 'azure', 'gcp', 'terraform', 'ansible'],
+    'ml_frameworks': ['tensorflow', 'pytorch', 'scikit-learn', 'keras', 'pandas', 'numpy', 'opencv']
+}
+
+# Reply used when the LLM is unavailable for a free-form message
+CONTEXTUAL_FALLBACK = "I understand. Is there anything specific you'd like to know or discuss about the application process?"
+
 
 class HiringAssistant:
     """Main chatbot engine for the hiring assistant"""
     
-    def __init__(self):
-        """Initialize the chatbot with Hugging Face client"""
-        self.hf_token = os.getenv('HUGGINGFACE_API_KEY', '')
+    def __init__(self, backend: Optional[LLMBackend] = None, question_bank: Optional[QuestionBank] = None,
+                 question_index: Optional[QuestionIndex] = None, job_store: Optional[JobSpecStore] = None,
+                 telemetry: Optional[Telemetry] = None, response_cache: Optional[ResponseCache] = None,
+                 record_usage: bool = True):
+        """
+        Initialize the chatbot with an LLM backend
+        
+        Args:
+            backend: Generation backend (defaults to the shared backend selected by LLM_BACKEND)
+            question_bank: Pre-generated question bank (defaults to QUESTION_BANK_PATH if built)
+            question_index: Semantic question index for fallbacks (defaults to QUESTION_INDEX_PATH if built)
+            job_store: Open roles matched against the candidate's stack (defaults to JOB_DATA_DIR if present)
+            telemetry: Funnel event store (defaults to TELEMETRY_DB if set)
+            response_cache: Cache of free-form replies (defaults to RESPONSE_CACHE_PATH if set)
+            record_usage: Fall back to the shared telemetry and response cache; replays and
+                profiling runs pass False so they neither count as real sessions nor fill the cache
+        """
+        self.backend = backend or get_backend()
+        self.question_bank = question_bank if question_bank is not None else get_question_bank()
+        self.question_index = question_index if question_index is not None else get_question_index()
+        self.job_store = job_store if job_store is not None else get_job_store()
+        if not record_usage:
+            self.telemetry = telemetry
+            self.response_cache = response_cache
+        else:
+            self.telemetry = telemetry if telemetry is not None else get_telemetry()
+            self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        
+        # LLM usage since the last take_llm_usage() call (tokens estimated at ~4 characters each)
+        self.llm_usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
         
-        # Initialize Hugging Face Inference Client
-        # Using Mistral-7B-Instruct for better performance
-        self.client = InferenceClient(
-            model="mistralai/Mistral-7B-Instruct-v0.2",
-            token=self.hf_token
-        )
+        # Stage of the turn being processed; LLM calls are scheduled by funnel position
+        self.current_stage = None
         
         # Conversation stages
         self.stages = [
@@ -41,16 +86,30 @@ class HiringAssistant:
         ]
         
         # Tech stack categories for question generation
-        self.tech_categories = {
-            'languages': ['python', 'javascript', 'java', 'c++', 'c#', 'go', 'rust', 'ruby', 'php', 'swift', 'kotlin', 'typescript'],
-            'frameworks': ['react', 'angular', 'vue', 'django', 'flask', 'fastapi', 'spring', 'express', 'nodejs', 'node.js', 'nextjs', 'next.js', 'laravel'],
-            'databases': ['mysql', 'postgresql', 'mongodb', 'redis', 'cassandra', 'dynamodb', 'sqlite', 'oracle', 'sql server'],
-            'tools': ['docker', 'kubernetes', 'git', 'jenkins', 'aws', 'azure', 'gcp', 'terraform', 'ansible'],
-            'ml_frameworks': ['tensorflow', 'pytorch', 'scikit-learn', 'keras', 'pandas', 'numpy', 'opencv']
-        }
+        self.tech_categories = TECH_CATEGORIES
         
         self.conversation_context = []
     
+    def _generate(self, messages: List[Dict], max_tokens: int, temperature: float) -> str:
+        """Call the backend and record usage"""
+        self.llm_usage['calls'] += 1
+        self.llm_usage['prompt_tokens'] += sum(len(m.get('content', '')) for m in messages) // 4
+        with self._llm_context():
+            response = self.backend.generate(messages, max_tokens=max_tokens, temperature=temperature)
+        self.llm_usage['completion_tokens'] += len(response) // 4
+        return response
+    
+    def _llm_context(self):
+        """Tag LLM calls with the current stage for the rate limiter's fair queue"""
+        stage = self.current_stage
+        return llm_context(stage=stage, priority=self.stages.index(stage) if stage in self.stages else None)
+    
+    def take_llm_usage(self) -> Dict:
+        """Return LLM usage since the last call and reset the counters"""
+        usage = self.llm_usage
+        self.llm_usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        return usage
+    
     def generate_greeting(self) -> str:
         """Generate initial greeting message"""
         return """👋 **Welcome to TalentScout AI!**
@@ -70,13 +129,26 @@ I'll guide you through a brief conversation to understand your background and sk
 _💡 Tip: You can type 'exit', 'quit', or 'bye' anytime to end our conversation._
 """
     
+    @staticmethod
+    def _format_job_matches(job_matches: Optional[List[Dict]]) -> str:
+        """Markdown list of matched open roles (empty when there are none)"""
+        if not job_matches:
+            return ''
+        lines = []
+        for match in job_matches:
+            location = f" ({match['location']})" if match.get('location') else ''
+            lines.append(f"- **{match['title']}**{location} - {match['score']:.0f}% match")
+        return "\n**Open roles that match your skills:**\n" + '\n'.join(lines) + "\n"
+    
     def generate_farewell(self, candidate_data: Dict) -> str:
         """Generate farewell message"""
         name = candidate_data.get('name', 'there')
+        matches_section = self._format_job_matches(candidate_data.get('job_matches'))
+        
         return f"""🎉 **Thank you, {name}!**
 
 It was great talking with you! I've collected all the necessary information for your application.
-
+{matches_section}
 **Next Steps:**
 1. 📧 Our recruitment team will review your profile within 2-3 business days
 2. 📞 You'll receive an email or phone call if your profile matches our requirements
@@ -161,8 +233,15 @@ _Feel free to start a new conversation anytime!_
         
         return categorized
     
-    def generate_technical_questions(self, tech_stack: List[str]) -> str:
+    def generate_technical_questions(self, tech_stack: List[str], experience: Optional[str] = None,
+                                     position: Optional[str] = None) -> str:
         """Generate technical questions based on the candidate's tech stack"""
+        # Assemble from the pre-generated bank; the LLM only covers technologies the bank lacks
+        if self.question_bank is not None:
+            bank_response = self._questions_from_bank(tech_stack, experience)
+            if bank_response:
+                return bank_response
+        
         categorized = self.categorize_tech_stack(tech_stack)
         
         prompt = f"""You are an expert technical interviewer. Generate 3-5 technical screening questions based on the candidate's tech stack.
@@ -187,22 +266,23 @@ Generate the questions now:"""
                 }
             ]
             
-            response = ""
-            for message in self.client.chat_completion(
-                messages=messages,
-                max_tokens=800,
-                temperature=0.7,
-                stream=True
-            ):
-                if message.choices[0].delta.content:
-                    response += message.choices[0].delta.content
+            response = self._generate(messages, max_tokens=800, temperature=0.7)
             
             # Format the response
-            formatted_response = f"""🎯 **Technical Assessment Questions**
+            return self._format_questions(tech_stack, response)
+            
+        except Exception as e:
+            # Fallback questions if API fails
+            fallback_questions = self._generate_fallback_questions(tech_stack, position, experience)
+            return fallback_questions
+    
+    def _format_questions(self, tech_stack: List[str], questions: str) -> str:
+        """Wrap a numbered question list in the assessment message"""
+        return f"""🎯 **Technical Assessment Questions**
 
 Based on your tech stack ({', '.join(tech_stack[:3])}{'...' if len(tech_stack) > 3 else ''}), here are some questions to assess your expertise:
 
-{response}
+{questions}
 
 ---
 
@@ -214,17 +294,53 @@ Based on your tech stack ({', '.join(tech_stack[:3])}{'...' if len(tech_stack) >
 
 Would you like to answer these questions now, or would you prefer to schedule a technical interview later?
 """
-            
-            return formatted_response
-            
-        except Exception as e:
-            # Fallback questions if API fails
-            fallback_questions = self._generate_fallback_questions(tech_stack)
-            return fallback_questions
     
-    def _generate_fallback_questions(self, tech_stack: List[str]) -> str:
+    def _questions_from_bank(self, tech_stack: List[str], experience: Optional[str]) -> Optional[str]:
+        """Build the question set from the bank, or None if the bank covers nothing"""
+        questions, uncovered = self.question_bank.assemble(tech_stack, experience, count=5)
+        
+        if not questions:
+            return None
+        
+        if uncovered:
+            # Leave room for LLM questions on the technologies the bank lacks
+            questions = questions[:3]
+            prompt = f"""You are an expert technical interviewer. Write 2 practical screening questions about: {', '.join(uncovered)}.
+Output only a numbered list, one question per line."""
+            try:
+                response = self._generate([{"role": "user", "content": prompt}], max_tokens=200, temperature=0.7)
+                questions.extend(extract_numbered_items(response))
+            except Exception:
+                pass
+        
+        numbered = '\n'.join(f"{i}. {question}" for i, question in enumerate(questions[:5], start=1))
+        return self._format_questions(tech_stack, numbered)
+    
+    def _generate_fallback_questions(self, tech_stack: List[str], position: Optional[str] = None,
+                                     experience: Optional[str] = None) -> str:
         """Generate fallback questions if LLM fails"""
         questions = []
+        
+        # Retrieve relevant, diverse questions from the semantic index when one is built
+        if self.question_index is not None:
+            hits = self.question_index.search(tech_stack, position, k=5, experience=experience)
+            questions = [f"{i}. {hit['question']}" for i, hit in enumerate(hits, start=1)]
+        
+        if not questions:
+            questions = self._template_questions(tech_stack)
+        
+        return f"""🎯 **Technical Assessment Questions**
+
+Based on your tech stack ({', '.join(tech_stack[:3])}{'...' if len(tech_stack) > 3 else ''}), here are some questions:
+
+{chr(10).join(questions[:5])}
+
+Would you like to answer these now or schedule a technical interview?
+"""
+    
+    def _template_questions(self, tech_stack: List[str]) -> List[str]:
+        """Fixed questions on the first language, framework and database"""
+        questions = []
         categorized = self.categorize_tech_stack(tech_stack)
         
         # Language questions
@@ -246,18 +362,13 @@ Would you like to answer these questions now, or would you prefer to schedule a
         questions.append("4. Describe a challenging technical problem you solved recently and your approach to solving it.")
         questions.append("5. How do you stay updated with the latest trends and technologies in your tech stack?")
         
-        return f"""🎯 **Technical Assessment Questions**
-
-Based on your tech stack ({', '.join(tech_stack[:3])}{'...' if len(tech_stack) > 3 else ''}), here are some questions:
-
-{chr(10).join(questions[:5])}
-
-Would you like to answer these now or schedule a technical interview?
-"""
+        return questions
     
+    @profiled
     def process_input(self, user_input: str, current_stage: str, candidate_data: Dict) -> Dict:
         """Process user input and determine next action"""
         user_input = user_input.strip()
+        self.current_stage = current_stage
         
         response = {
             'message': '',
@@ -360,14 +471,23 @@ _Example: Python, React, Node.js, MongoDB, Docker, AWS_
             tech_stack = [tech.strip() for tech in re.split(r'[,;/]', user_input) if tech.strip()]
             
             if len(tech_stack) > 0:
+                questions = self.generate_technical_questions(
+                    tech_stack, candidate_data.get('experience'), candidate_data.get('position')
+                )
                 response['extracted_data']['tech_stack'] = tech_stack
+                # Keep the questions asked so answers can be scored against them
+                response['extracted_data']['technical_questions'] = extract_numbered_items(questions)
+                
+                # Rank open roles now so the application summary can suggest them
+                if self.job_store is not None:
+                    response['extracted_data']['job_matches'] = self.job_store.match(tech_stack, limit=3)
                 response['message'] = f"""Awesome tech stack! 💪 I've recorded:
 
 {', '.join([f'**{tech}**' for tech in tech_stack])}
 
 Now, let me generate some technical questions to assess your expertise in these technologies. This will just take a moment...
 
-{self.generate_technical_questions(tech_stack)}
+{questions}
 """
                 response['stage'] = 'technical_questions'
             else:
@@ -392,7 +512,7 @@ I've recorded your answers. Our technical team will review them along with your
 🎯 **Position:** {candidate_data.get('position', 'N/A')}
 📍 **Location:** {candidate_data.get('location', 'N/A')}
 ⚡ **Tech Stack:** {', '.join(candidate_data.get('tech_stack', []))}
-
+{self._format_job_matches(candidate_data.get('job_matches'))}
 Is there anything you'd like to add or modify? (Type 'no' to finish, or provide additional information)
 """
             response['stage'] = 'farewell'
@@ -401,35 +521,131 @@ Is there anything you'd like to add or modify? (Type 'no' to finish, or provide
             # Fallback response
             response['message'] = self._generate_contextual_response(user_input, candidate_data)
         
+        self._emit_stage_events(current_stage, response['stage'], len(user_input))
         return response
     
-    def _generate_contextual_response(self, user_input: str, candidate_data: Dict) -> str:
-        """Generate contextual response using LLM"""
+    def _emit_stage_events(self, current_stage: str, next_stage: str, input_chars: int):
+        """Report the turn's outcome to funnel telemetry (session and tenant come from llm_context)"""
+        if self.telemetry is None:
+            return
+        if next_stage != current_stage:
+            self.telemetry.emit('stage_completed', current_stage)
+            self.telemetry.emit('stage_entered', next_stage)
+        elif current_stage != self.stages[-1]:
+            # Every stage before the farewell advances unless its extractor rejected the answer
+            self.telemetry.emit('validation_failed', current_stage, input_chars=input_chars)
+    
+    def stream_input(self, user_input: str, current_stage: str, candidate_data: Dict) -> Iterator[Dict]:
+        """
+        Process user input like process_input(), streaming the reply as it is produced
+        
+        Stages with scripted replies and cached (shareable) replies yield the whole
+        message as one chunk; other free-form replies stream LLM tokens as the
+        backend emits them.
+        
+        Args:
+            user_input: Raw user input
+            current_stage: Current conversation stage
+            candidate_data: Data collected so far
+            
+        Yields:
+            dict: {'type': 'token', 'text': ...} chunks, then
+                  {'type': 'result', 'message', 'stage', 'extracted_data'}
+        """
+        if current_stage in self.stages[:-1]:
+            response = self.process_input(user_input, current_stage, candidate_data)
+            yield {'type': 'token', 'text': response['message']}
+            yield {'type': 'result', **response}
+            return
+        
+        self.current_stage = current_stage
+        try:
+            cached = self._cached_reply(user_input, candidate_data)
+        except Exception:
+            cached = None
+        if cached is not None:
+            yield {'type': 'token', 'text': cached}
+            yield {'type': 'result', 'message': cached, 'stage': current_stage, 'extracted_data': {}}
+            return
+        
+        messages = self._contextual_messages(user_input.strip(), candidate_data)
+        self.llm_usage['calls'] += 1
+        self.llm_usage['prompt_tokens'] += sum(len(m['content']) for m in messages) // 4
+        chunks = []
+        try:
+            with self._llm_context():
+                for chunk in self.backend.stream(messages, max_tokens=200, temperature=0.7):
+                    chunks.append(chunk)
+                    yield {'type': 'token', 'text': chunk}
+        except Exception:
+            if not chunks:
+                chunks = [CONTEXTUAL_FALLBACK]
+                yield {'type': 'token', 'text': CONTEXTUAL_FALLBACK}
+        
+        message = ''.join(chunks)
+        self.llm_usage['completion_tokens'] += len(message) // 4
+        yield {'type': 'result', 'message': message.strip(), 'stage': current_stage, 'extracted_data': {}}
+    
+    def _contextual_messages(self, user_input: str, candidate_data: Dict) -> List[Dict]:
+        """Prompt for a free-form reply"""
         prompt = f"""You are a friendly and professional hiring assistant chatbot for TalentScout recruitment agency.
 
 Context: You are having a conversation with a candidate. Here's what you know:
-{json.dumps(candidate_data, indent=2)}
+{serialization.dumps(candidate_data)}
 
 User said: "{user_input}"
 
 Provide a helpful, professional response. Keep it concise (2-3 sentences). If the user seems to want to end the conversation, politely acknowledge it.
 
 Response:"""
+        return [{"role": "user", "content": prompt}]
+    
+    def _template_messages(self, user_input: str) -> List[Dict]:
+        """Prompt for a reply that suits any candidate, with slots instead of their details"""
+        prompt = f"""You are a friendly and professional hiring assistant chatbot for TalentScout recruitment agency.
+
+A candidate who has finished their screening said: "{user_input}"
+
+Provide a helpful, professional response that suits any candidate. Keep it concise (2-3 sentences). You do not know who the candidate is: where their details belong, write exactly one of these placeholders instead: {{first_name}}, {{position}}, {{location}}.
+
+Response:"""
+        return [{"role": "user", "content": prompt}]
+    
+    def _cached_reply(self, user_input: str, candidate_data: Dict) -> Optional[str]:
+        """
+        Reply from the response cache, filling it on a miss
+        
+        A missing entry is generated from a prompt without the candidate's data,
+        so a shared reply can only carry slots, never another candidate's details.
+        
+        Returns:
+            str: Reply for the candidate, or None when the message is not cacheable
+                 or the generated reply is not safe to share
+        """
+        cache_key = self.response_cache.key(user_input) if self.response_cache is not None else None
+        if not cache_key:
+            return None
+        cached = self.response_cache.get(cache_key, candidate_data)
+        if cached is not None:
+            return cached
         
+        template = self._generate(self._template_messages(user_input.strip()), max_tokens=200, temperature=0.7).strip()
+        if template and self.response_cache.put(cache_key, candidate_data, template):
+            return render_template(template, candidate_data)
+        return None
+    
+    def _generate_contextual_response(self, user_input: str, candidate_data: Dict) -> str:
+        """Generate contextual response using LLM (served from the response cache when shareable)"""
         try:
-            messages = [{"role": "user", "content": prompt}]
+            cached = self._cached_reply(user_input, candidate_data)
+            if cached is not None:
+                return cached
+            
+            messages = self._contextual_messages(user_input, candidate_data)
             
-            response = ""
-            for message in self.client.chat_completion(
-                messages=messages,
-                max_tokens=200,
-                temperature=0.7,
-                stream=True
-            ):
-                if message.choices[0].delta.content:
-                    response += message.choices[0].delta.content
+            response = self._generate(messages, max_tokens=200, temperature=0.7)
             
             return response.strip()
         
         except:
-            return "I understand. Is there anything specific you'd like to know or discuss about the application process?"
+            return CONTEXTUAL_FALLBACK
@@ -2,50 +2,106 @@
 Data Handler Module
 ===================
 Handles secure storage and retrieval of candidate data with privacy compliance.
+
+One process writes to a data directory. The search and dedup indexes and the
+analytics rollups live in the process that built them, so a second writer on
+the same directory (another API worker, the Streamlit app next to the API
+server, a second Streamlit replica) would search stale indexes and miss repeat
+applications saved by the other one. Offline tools (erasure, deduplication,
+retention) are safe to run, but a running writer only sees their changes after
+a restart.
 """
 
-import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import hashlib
 import csv
+import threading
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 
+from search_index import CandidateSearchIndex
+from dedup import DeduplicationIndex, find_duplicate_groups, merge_records
+from exporters import EXPORT_FORMATS, stream_export, write_export
+from record_store import STORAGE_BACKENDS, create_record_store
+from audit_log import AuditLog, get_audit_log
+from erasure import ArtifactManifest, ErasureManager
+from analytics import CandidateRollups
+import serialization
+
+
+# Columns of the summary CSV, one row per candidate
+SUMMARY_FIELDS = [
+    'timestamp', 'candidate_id', 'name', 'email', 'phone',
+    'experience', 'position', 'location', 'tech_stack', 'status'
+]
+
+# Per-record locks, striped by candidate ID so memory stays bounded
+RECORD_LOCK_STRIPES = 64
+
 
 class CandidateDataHandler:
     """Handles candidate data storage with privacy and security measures"""
     
-    def __init__(self, data_dir: str = "candidate_data"):
-        """Initialize data handler with storage directory"""
+    # Supported behaviours when a repeat applicant is saved
+    MERGE_POLICIES = ('merge', 'keep_both')
+    
+    def __init__(self, data_dir: str = "candidate_data", merge_policy: str = 'merge',
+                 storage: Optional[str] = None):
+        """
+        Initialize data handler with storage directory
+        
+        Args:
+            data_dir: Candidate data directory
+            merge_policy: Behaviour for repeat applicants ('merge' or 'keep_both')
+            storage: Record storage backend ('json' or 'sqlite'; defaults to CANDIDATE_STORAGE, then 'json')
+        """
+        if merge_policy not in self.MERGE_POLICIES:
+            raise ValueError(f"merge_policy must be one of {self.MERGE_POLICIES}")
+        self.merge_policy = merge_policy
+        
+        self.storage = storage or os.getenv('CANDIDATE_STORAGE', 'json')
+        if self.storage not in STORAGE_BACKENDS:
+            raise ValueError(f"storage must be one of {STORAGE_BACKENDS}")
+        
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
-        # Create subdirectories
+        # Complete records (one JSON file each, or a single compressed SQLite file)
         self.json_dir = self.data_dir / "json"
-        self.json_dir.mkdir(exist_ok=True)
+        self.store = create_record_store(self.storage, self.data_dir)
         
         self.csv_file = self.data_dir / "candidates_summary.csv"
+        self._csv_lock = threading.Lock()
         self._initialize_csv()
+        
+        # Structured JSONL audit trail, written in the background
+        self.audit_log: AuditLog = get_audit_log(self.data_dir / "audit")
+        
+        # Where derived copies of each candidate live, for erasure
+        self.manifest = ArtifactManifest(self.data_dir / "artifacts.db")
+        self.eraser = ErasureManager(self, self.manifest)
+        
+        # Built lazily on the first search, then kept current on save/delete
+        self._search_index: Optional[CandidateSearchIndex] = None
+        self._search_index_lock = threading.Lock()
+        self._dedup_index: Optional[DeduplicationIndex] = None
+        self._dedup_index_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Updates and merges read-modify-write a record; one at a time per record
+        self._record_locks = [threading.Lock() for _ in range(RECORD_LOCK_STRIPES)]
+        
+        # Dashboard counters, loaded from disk and updated on every change
+        self.rollups = CandidateRollups(self.data_dir / "rollups.json", source_mtime=self.store.last_modified)
+        if not self.rollups.load(self.store.count()):
+            self.rollups.rebuild(self.iter_candidates())
     
     def _initialize_csv(self):
         """Initialize CSV file with headers if it doesn't exist"""
         if not self.csv_file.exists():
-            headers = [
-                'timestamp',
-                'candidate_id',
-                'name',
-                'email',
-                'phone',
-                'experience',
-                'position',
-                'location',
-                'tech_stack',
-                'status'
-            ]
-            
             with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
                 writer.writeheader()
     
     def _generate_candidate_id(self, email: str) -> str:
@@ -85,9 +141,43 @@ class CandidateDataHandler:
         if not candidate_data.get('email'):
             raise ValueError("Email is required to save candidate data")
         
+        dedup_index = self._get_dedup_index()
+        
+        # Lookup and write happen under one lock so concurrent repeat applications can't both miss
+        with self._save_lock:
+            return self._save_locked(candidate_data, dedup_index)
+    
+    @contextmanager
+    def _locked_records(self, candidate_ids: Iterable[str]):
+        """Hold the locks of several records, taken in stripe order so holders cannot deadlock"""
+        stripes = sorted({hash(candidate_id) % len(self._record_locks) for candidate_id in candidate_ids})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._record_locks[stripe])
+            yield
+    
+    def _save_locked(self, candidate_data: Dict, dedup_index: DeduplicationIndex) -> str:
+        """Body of save_candidate_data, run under the save lock"""
+        timestamp = datetime.now().isoformat()
+        
+        # Repeat applicants are merged into their original record
+        if self.merge_policy == 'merge':
+            existing_id = dedup_index.find_exact(candidate_data)
+            if existing_id:
+                with self._locked_records([existing_id]):
+                    existing = self.get_candidate_data(existing_id)
+                    if existing:
+                        record = merge_records(existing, {**candidate_data, 'timestamp': timestamp})
+                        self._write_record(record)
+                        self._append_to_csv(record, supersede=True)
+                        self.eraser.schedule_compaction()
+                        self._update_indexes(record)
+                        self._log_save_action(existing_id, self._anonymize_sensitive_data(candidate_data),
+                                              action='MERGE_CANDIDATE_DATA')
+                        return existing_id
+        
         # Generate unique ID
         candidate_id = self._generate_candidate_id(candidate_data['email'])
-        timestamp = datetime.now().isoformat()
         
         # Prepare complete record
         record = {
@@ -97,89 +187,256 @@ class CandidateDataHandler:
             **candidate_data
         }
         
+        # Flag fuzzy matches (same name and stack, different contact details) for review
+        possible_duplicates = [cid for cid, _ in dedup_index.find_similar(record)]
+        if possible_duplicates:
+            record['possible_duplicates'] = possible_duplicates
+        
         # Save detailed JSON
-        json_file = self.json_dir / f"{candidate_id}.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(record, f, indent=2, ensure_ascii=False)
+        self._write_record(record)
         
         # Append to CSV summary
         self._append_to_csv(record)
         
+        # Keep the search and dedup indexes current
+        self._update_indexes(record)
+        
         # Log anonymized data
         self._log_save_action(candidate_id, self._anonymize_sensitive_data(candidate_data))
         
         return candidate_id
     
-    def _append_to_csv(self, record: Dict):
-        """Append record to CSV file"""
-        with open(self.csv_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                'timestamp', 'candidate_id', 'name', 'email', 'phone',
-                'experience', 'position', 'location', 'tech_stack', 'status'
-            ])
+    def _write_record(self, record: Dict):
+        """Write a complete record to the record store"""
+        self.store.put(record)
+    
+    def update_candidate_data(self, candidate_id: str, updates: Dict) -> Optional[Dict]:
+        """
+        Update fields of an existing candidate record
+        
+        Args:
+            candidate_id: Unique candidate identifier
+            updates: Fields to set on the record
             
-            # Prepare row
-            row = {
-                'timestamp': record.get('timestamp', ''),
-                'candidate_id': record.get('candidate_id', ''),
-                'name': record.get('name', ''),
-                'email': record.get('email', ''),
-                'phone': record.get('phone', ''),
-                'experience': record.get('experience', ''),
-                'position': record.get('position', ''),
-                'location': record.get('location', ''),
-                'tech_stack': ', '.join(record.get('tech_stack', [])),
-                'status': record.get('status', 'pending_review')
-            }
+        Returns:
+            Optional[Dict]: Updated record or None if not found
+        """
+        # Held across the read and the write so a concurrent merge or score is not lost
+        with self._locked_records([candidate_id]):
+            record = self.get_candidate_data(candidate_id)
+            
+            if not record:
+                return None
             
-            writer.writerow(row)
+            record.update(updates)
+            record['candidate_id'] = candidate_id
+            self._write_record(record)
+            self._update_indexes(record)
+        
+        return record
     
-    def _log_save_action(self, candidate_id: str, anonymized_data: Dict):
-        """Log save action with anonymized data"""
-        log_file = self.data_dir / "activity_log.txt"
+    def _append_to_csv(self, record: Dict, supersede: bool = False):
+        """
+        Append record to CSV file
         
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n{'='*50}\n")
-            f.write(f"Timestamp: {datetime.now().isoformat()}\n")
-            f.write(f"Action: SAVE_CANDIDATE_DATA\n")
-            f.write(f"Candidate ID: {candidate_id}\n")
-            f.write(f"Data (Anonymized): {json.dumps(anonymized_data, indent=2)}\n")
+        Args:
+            record: Record to summarize
+            supersede: The candidate already has rows; mark them for background compaction
+        """
+        with self._csv_lock:
+            with open(self.csv_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+                writer.writerow(self._summary_row(record))
+            if supersede:
+                self.manifest.supersede([record['candidate_id']])
+    
+    @staticmethod
+    def _summary_row(record: Dict) -> Dict:
+        """Summary CSV row for a record"""
+        return {
+            'timestamp': record.get('timestamp', ''),
+            'candidate_id': record.get('candidate_id', ''),
+            'name': record.get('name', ''),
+            'email': record.get('email', ''),
+            'phone': record.get('phone', ''),
+            'experience': record.get('experience', ''),
+            'position': record.get('position', ''),
+            'location': record.get('location', ''),
+            'tech_stack': ', '.join(record.get('tech_stack', [])),
+            'status': record.get('status', 'pending_review')
+        }
+    
+    def _log_save_action(self, candidate_id: str, anonymized_data: Dict, action: str = 'SAVE_CANDIDATE_DATA'):
+        """Log save action with anonymized data"""
+        self.audit_log.log(action, candidate_id, data=anonymized_data)
     
     def get_candidate_data(self, candidate_id: str) -> Optional[Dict]:
         """Retrieve candidate data by ID"""
-        json_file = self.json_dir / f"{candidate_id}.json"
-        
-        if json_file.exists():
-            with open(json_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        
-        return None
+        return self.store.get(candidate_id)
     
     def search_by_email(self, email: str) -> List[Dict]:
         """Search candidates by email"""
-        results = []
-        
-        for json_file in self.json_dir.glob("*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get('email', '').lower() == email.lower():
-                    results.append(data)
-        
-        return results
+        return self.store.find_by_email(email)
     
     def get_all_candidates(self) -> List[Dict]:
         """Get all candidates (for admin purposes)"""
-        candidates = []
-        
-        for json_file in self.json_dir.glob("*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                candidates.append(json.load(f))
+        candidates = list(self.store.iter_records())
         
         # Sort by timestamp
         candidates.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         
         return candidates
     
+    def iter_candidates(self) -> Iterator[Dict]:
+        """
+        Yield stored candidates one at a time without loading them all
+        
+        Unlike get_all_candidates(), records come in storage order, not by timestamp.
+        """
+        yield from self.store.iter_records()
+    
+    def _get_search_index(self) -> CandidateSearchIndex:
+        """Return the search index, building it from disk on first use"""
+        with self._search_index_lock:
+            if self._search_index is None:
+                index = CandidateSearchIndex()
+                index.add_many(self.iter_candidates())
+                self._search_index = index
+        
+        return self._search_index
+    
+    def _get_dedup_index(self) -> DeduplicationIndex:
+        """Return the deduplication index, building it from disk on first use"""
+        with self._dedup_index_lock:
+            if self._dedup_index is None:
+                index = DeduplicationIndex()
+                # Oldest first so exact lookups resolve to the original application
+                for record in sorted(self.iter_candidates(), key=lambda x: x.get('timestamp', '')):
+                    index.add(record)
+                self._dedup_index = index
+        
+        return self._dedup_index
+    
+    def _update_indexes(self, record: Dict):
+        """Add a saved record to the rollups and the in-memory indexes that have been built"""
+        self.rollups.add(record)
+        if self._search_index is not None:
+            self._search_index.add(record)
+        if self._dedup_index is not None:
+            self._dedup_index.add(record)
+    
+    def _remove_from_indexes(self, candidate_id: str):
+        """Drop a deleted record from the rollups and the in-memory indexes that have been built"""
+        self.rollups.remove(candidate_id)
+        if self._search_index is not None:
+            self._search_index.remove(candidate_id)
+        if self._dedup_index is not None:
+            self._dedup_index.remove(candidate_id)
+    
+    def deduplicate_candidates(self, dry_run: bool = False) -> Dict:
+        """
+        Merge existing duplicate records (same normalized email or phone)
+        
+        Each group is merged into its oldest record and the other files are removed.
+        
+        Args:
+            dry_run: Only report what would be merged
+            
+        Returns:
+            dict: Report with 'groups', 'merged' and 'possible_duplicates'
+        """
+        groups, fuzzy_pairs = find_duplicate_groups(self.iter_candidates())
+        
+        merged_count = 0
+        if not dry_run:
+            with self._save_lock:
+                merged_count = self._merge_groups(groups)
+        
+        return {
+            'groups': len(groups),
+            'merged': merged_count,
+            'possible_duplicates': fuzzy_pairs
+        }
+    
+    def _merge_groups(self, groups: List[List[str]]) -> int:
+        """Merge each duplicate group into its oldest record, returning the number of records removed"""
+        merged_count = 0
+        for group in groups:
+            with self._locked_records(group):
+                records = [r for r in (self.get_candidate_data(cid) for cid in group) if r]
+                records.sort(key=lambda x: x.get('timestamp', ''))
+                if len(records) < 2:
+                    continue
+                
+                primary = records[0]
+                for duplicate in records[1:]:
+                    primary = merge_records(primary, duplicate)
+                duplicate_ids = [r['candidate_id'] for r in records[1:]]
+                
+                self._write_record(primary)
+                self._append_to_csv(primary, supersede=True)
+                self._update_indexes(primary)
+                
+                for duplicate_id in duplicate_ids:
+                    self.store.delete(duplicate_id)
+                    self._remove_from_indexes(duplicate_id)
+                    merged_count += 1
+                
+                # Duplicates' rows go with the next compaction; their artifacts now belong to the primary
+                self.manifest.tombstone(duplicate_ids)
+                self.manifest.reassign(duplicate_ids, primary['candidate_id'])
+                
+                self._log_save_action(primary['candidate_id'], {'merged_ids': duplicate_ids},
+                                      action='DEDUPLICATE_CANDIDATES')
+        
+        if merged_count:
+            self.eraser.schedule_compaction()
+        return merged_count
+    
+    def search_candidates(self, query: str = '', location: Optional[str] = None,
+                          position: Optional[str] = None, min_experience: Optional[float] = None,
+                          max_experience: Optional[float] = None, tech_stack: Optional[List[str]] = None,
+                          status: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """
+        Full-text search over answers, tech stack, position and location
+        
+        Args:
+            query: Free-text query ranked with BM25 (empty for filters only)
+            location: Location substring filter
+            position: Position substring filter
+            min_experience: Minimum years of experience
+            max_experience: Maximum years of experience
+            tech_stack: Technologies every result must list
+            status: Record status filter
+            limit: Maximum number of results
+            
+        Returns:
+            list: Matching candidate records with a 'search_score' field, best first
+        """
+        hits = self._get_search_index().search(
+            query,
+            location=location,
+            position=position,
+            min_experience=min_experience,
+            max_experience=max_experience,
+            tech_stack=tech_stack,
+            status=status,
+            limit=limit
+        )
+        
+        results = []
+        for candidate_id, score in hits:
+            data = self.get_candidate_data(candidate_id)
+            if data:
+                data['search_score'] = round(score, 4)
+                results.append(data)
+        
+        return results
+    
+    def get_search_facets(self, field: str) -> Dict[str, int]:
+        """Get value counts for a search facet ('location', 'position', 'tech_stack', 'status')"""
+        return self._get_search_index().facet_counts(field)
+    
     def delete_candidate_data(self, candidate_id: str) -> bool:
         """
         Delete candidate data (GDPR right to erasure)
@@ -190,19 +447,34 @@ class CandidateDataHandler:
         Returns:
             bool: True if deleted, False if not found
         """
-        json_file = self.json_dir / f"{candidate_id}.json"
+        return self.erase_candidates([candidate_id])['records'] > 0
+    
+    def erase_candidates(self, candidate_ids: List[str], transcript_log=None) -> Dict:
+        """
+        Erase candidates and every derived artifact in one pass
+        
+        Removes the records, their exports and transcript sessions, redacts their
+        audit events and tombstones their summary rows for background compaction.
         
-        if json_file.exists():
-            # Log deletion
-            log_file = self.data_dir / "deletion_log.txt"
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"{datetime.now().isoformat()} - Deleted candidate: {candidate_id}\n")
+        Args:
+            candidate_ids: Candidates to erase
+            transcript_log: Log holding the candidates' sessions (defaults to the shared log)
             
-            # Delete file
-            json_file.unlink()
-            return True
+        Returns:
+            dict: Counts of erased records, files, transcript events and audit events
+        """
+        return self.eraser.erase(candidate_ids, transcript_log)
+    
+    def register_artifact(self, candidate_id: str, kind: str, location: str):
+        """
+        Record a derived copy of a candidate's data for erasure
         
-        return False
+        Args:
+            candidate_id: Candidate the artifact belongs to
+            kind: 'export', 'bulk_export' or 'transcript'
+            location: File path, or session ID for transcripts
+        """
+        self.manifest.add(candidate_id, kind, location)
     
     def export_candidate_data(self, candidate_id: str, format: str = 'json') -> Optional[str]:
         """
@@ -225,8 +497,7 @@ class CandidateDataHandler:
         
         if format == 'json':
             export_file = export_dir / f"{candidate_id}_export.json"
-            with open(export_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            serialization.dump_file(data, export_file, pretty=True)
         
         elif format == 'csv':
             export_file = export_dir / f"{candidate_id}_export.csv"
@@ -235,54 +506,63 @@ class CandidateDataHandler:
                 writer.writerow(['Field', 'Value'])
                 for key, value in data.items():
                     if isinstance(value, list):
-                        value = ', '.join(value)
+                        # Job matches are dicts; export them by title
+                        value = ', '.join(item.get('title', '') if isinstance(item, dict) else str(item)
+                                          for item in value)
                     writer.writerow([key, value])
         
+        self.register_artifact(candidate_id, 'export', str(export_file))
         return str(export_file)
     
-    def get_statistics(self) -> Dict:
-        """Get statistics about stored candidates"""
-        candidates = self.get_all_candidates()
-        
-        stats = {
-            'total_candidates': len(candidates),
-            'positions': {},
-            'locations': {},
-            'tech_stack_frequency': {},
-            'experience_ranges': {
-                '0-2 years': 0,
-                '2-5 years': 0,
-                '5-10 years': 0,
-                '10+ years': 0
-            }
-        }
+    def stream_all_candidates(self, format: str = 'jsonl') -> Iterator[bytes]:
+        """
+        Stream the whole candidate pool as export file chunks
         
-        for candidate in candidates:
-            # Position stats
-            position = candidate.get('position', 'Unknown')
-            stats['positions'][position] = stats['positions'].get(position, 0) + 1
-            
-            # Location stats
-            location = candidate.get('location', 'Unknown')
-            stats['locations'][location] = stats['locations'].get(location, 0) + 1
+        Args:
+            format: Export format ('jsonl', 'csv', 'xlsx' or 'pdf')
             
-            # Tech stack frequency
-            for tech in candidate.get('tech_stack', []):
-                stats['tech_stack_frequency'][tech] = stats['tech_stack_frequency'].get(tech, 0) + 1
+        Returns:
+            Iterator[bytes]: File chunks suitable for a chunked download
+        """
+        return stream_export(self.iter_candidates(), format)
+    
+    def export_all_candidates(self, format: str = 'jsonl') -> str:
+        """
+        Export the whole candidate pool to the exports directory
+        
+        Args:
+            format: Export format ('jsonl', 'csv', 'xlsx' or 'pdf')
             
-            # Experience ranges
-            experience = candidate.get('experience', '0')
-            try:
-                years = float(experience.split()[0])
-                if years < 2:
-                    stats['experience_ranges']['0-2 years'] += 1
-                elif years < 5:
-                    stats['experience_ranges']['2-5 years'] += 1
-                elif years < 10:
-                    stats['experience_ranges']['5-10 years'] += 1
-                else:
-                    stats['experience_ranges']['10+ years'] += 1
-            except:
-                pass
-        
-        return stats
+        Returns:
+            str: Path to exported file
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        
+        export_dir = self.data_dir / "exports"
+        export_dir.mkdir(exist_ok=True)
+        
+        extension = EXPORT_FORMATS[format][0]
+        export_file = export_dir / f"all_candidates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        exported_ids = []
+        
+        def tracked():
+            for record in self.iter_candidates():
+                exported_ids.append(record['candidate_id'])
+                yield record
+        
+        write_export(tracked(), str(export_file), format)
+        self.manifest.add_many((candidate_id, 'bulk_export', str(export_file)) for candidate_id in exported_ids)
+        
+        return str(export_file)
+    
+    def get_statistics(self) -> Dict:
+        """Get statistics about stored candidates (read from the rollups, no record scan)"""
+        return self.rollups.statistics()
+    
+    def close(self):
+        """Wait for background summary compaction, persist the rollups and close the record store and manifest"""
+        self.eraser.shutdown()
+        self.rollups.close()
+        self.manifest.close()
+        self.store.close()
@@ -0,0 +1,388 @@
+"""
+Deduplication Module
+====================
+Detects repeat applicants by normalized email/phone and fuzzy name + tech stack similarity.
+"""
+
+import hashlib
+import operator
+import re
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Providers that ignore dots in the local part of an address
+DOT_INSENSITIVE_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+
+def normalize_email(email: str) -> str:
+    """
+    Normalize an email address for duplicate detection
+    
+    Args:
+        email: Raw email address
+        
+    Returns:
+        str: Lowercased address without plus-tags (empty if invalid)
+    """
+    email = (email or '').strip().lower()
+    if '@' not in email:
+        return ''
+    
+    local, domain = email.rsplit('@', 1)
+    local = local.split('+', 1)[0]
+    
+    if domain in DOT_INSENSITIVE_DOMAINS:
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    
+    return f"{local}@{domain}" if local else ''
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Normalize a phone number for duplicate detection
+    
+    Args:
+        phone: Raw phone number
+        
+    Returns:
+        str: Last 10 digits (empty if too short to be meaningful)
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) < 7:
+        return ''
+    return digits[-10:]
+
+
+def _shingles(record: Dict) -> Set[str]:
+    """Build the shingle set used for MinHash (name trigrams + tech names)"""
+    name = re.sub(r'[^a-z ]', '', str(record.get('name', '') or '').lower())
+    name = ' '.join(sorted(name.split()))
+    
+    shingles = {f"n:{name[i:i + 3]}" for i in range(max(len(name) - 2, 0))}
+    shingles.update(f"t:{str(tech).lower().strip()}" for tech in record.get('tech_stack', []) or [])
+    return shingles
+
+
+class MinHasher:
+    """MinHash signatures computed from a single wide hash per shingle"""
+    
+    def __init__(self, num_perm: int = 32):
+        """Initialize hasher with the signature length"""
+        self.num_perm = num_perm
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+    
+    def signature(self, shingles: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        """Compute the MinHash signature of a shingle set"""
+        hashes = [
+            self._unpack(hashlib.shake_128(s.encode('utf-8')).digest(4 * self.num_perm))
+            for s in shingles
+        ]
+        if not hashes:
+            return None
+        return tuple(map(min, zip(*hashes)))
+    
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimate Jaccard similarity from two signatures"""
+        return sum(map(operator.eq, sig_a, sig_b)) / len(sig_a)
+
+
+def _claim_key(index: Dict[str, str], holders: Dict[str, List[str]], key: str, candidate_id: str):
+    """Register a record under an exact-match key; the oldest holder owns it"""
+    if key:
+        holders.setdefault(key, []).append(candidate_id)
+        index.setdefault(key, candidate_id)
+
+
+def _release_key(index: Dict[str, str], holders: Dict[str, List[str]], key: str, candidate_id: str):
+    """Unregister a record from a key, handing ownership to the next holder"""
+    if not key:
+        return
+    remaining = holders.get(key, [])
+    if candidate_id in remaining:
+        remaining.remove(candidate_id)
+    if not remaining:
+        holders.pop(key, None)
+        index.pop(key, None)
+    elif index.get(key) == candidate_id:
+        index[key] = remaining[0]
+
+
+class DeduplicationIndex:
+    """Exact (email/phone) and LSH fuzzy index over candidate records"""
+    
+    def __init__(self, num_perm: int = 32, bands: int = 4, threshold: float = 0.7,
+                 max_candidates: int = 64):
+        """
+        Initialize an empty index
+        
+        Args:
+            num_perm: MinHash signature length
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+            threshold: Minimum estimated similarity for a fuzzy match
+            max_candidates: Cap on LSH candidates verified per lookup, which keeps
+                lookups bounded when many records share common names or stacks
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        
+        self.email_index: Dict[str, str] = {}
+        self.phone_index: Dict[str, str] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.keys: Dict[str, Tuple[str, str]] = {}
+        # Every record holding a key, oldest first, so the key survives its owner's removal
+        self._email_holders: Dict[str, List[str]] = {}
+        self._phone_holders: Dict[str, List[str]] = {}
+        
+        self._lock = threading.RLock()
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """Split a signature into LSH band keys"""
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+    
+    def record_signature(self, record: Dict) -> Optional[Tuple[int, ...]]:
+        """Compute the MinHash signature of a record's name and tech stack"""
+        return self.hasher.signature(_shingles(record))
+    
+    def add(self, record: Dict, signature: Optional[Tuple[int, ...]] = None):
+        """
+        Add or replace a record in the index
+        
+        Args:
+            record: Stored candidate record (must contain candidate_id)
+            signature: Precomputed signature from record_signature()
+        """
+        candidate_id = record.get('candidate_id')
+        if not candidate_id:
+            return
+        
+        email = normalize_email(record.get('email', ''))
+        phone = normalize_phone(record.get('phone', ''))
+        if signature is None:
+            signature = self.record_signature(record)
+        
+        with self._lock:
+            old_email, old_phone = self.keys.get(candidate_id, ('', ''))
+            self._remove_signature(candidate_id)
+            
+            # First record wins so lookups resolve to the original application
+            if email != old_email:
+                _release_key(self.email_index, self._email_holders, old_email, candidate_id)
+                _claim_key(self.email_index, self._email_holders, email, candidate_id)
+            if phone != old_phone:
+                _release_key(self.phone_index, self._phone_holders, old_phone, candidate_id)
+                _claim_key(self.phone_index, self._phone_holders, phone, candidate_id)
+            self.keys[candidate_id] = (email, phone)
+            
+            if signature is not None:
+                self.signatures[candidate_id] = signature
+                for key in self._band_keys(signature):
+                    self.buckets.setdefault(key, set()).add(candidate_id)
+    
+    def remove(self, candidate_id: str) -> bool:
+        """
+        Remove a record from the index
+        
+        Args:
+            candidate_id: Unique candidate identifier
+            
+        Returns:
+            bool: True if the record was indexed
+        """
+        with self._lock:
+            if candidate_id not in self.keys:
+                return False
+            
+            email, phone = self.keys.pop(candidate_id)
+            _release_key(self.email_index, self._email_holders, email, candidate_id)
+            _release_key(self.phone_index, self._phone_holders, phone, candidate_id)
+            self._remove_signature(candidate_id)
+            return True
+    
+    def _remove_signature(self, candidate_id: str):
+        """Drop a record from the LSH buckets"""
+        signature = self.signatures.pop(candidate_id, None)
+        if signature is not None:
+            for key in self._band_keys(signature):
+                bucket = self.buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(candidate_id)
+                    if not bucket:
+                        del self.buckets[key]
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def find_exact(self, record: Dict) -> Optional[str]:
+        """
+        Find an existing record with the same normalized email or phone
+        
+        Args:
+            record: Candidate data to look up
+            
+        Returns:
+            Optional[str]: Matching candidate ID, email match preferred
+        """
+        email = normalize_email(record.get('email', ''))
+        phone = normalize_phone(record.get('phone', ''))
+        
+        with self._lock:
+            if email and email in self.email_index:
+                return self.email_index[email]
+            if phone and phone in self.phone_index:
+                return self.phone_index[phone]
+        return None
+    
+    def find_similar(self, record: Dict, exclude: Optional[str] = None,
+                     signature: Optional[Tuple[int, ...]] = None) -> List[Tuple[str, float]]:
+        """
+        Find fuzzy matches on name + tech stack through LSH buckets
+        
+        Args:
+            record: Candidate data to look up
+            exclude: Candidate ID to leave out of the results
+            signature: Precomputed signature from record_signature()
+            
+        Returns:
+            list: (candidate_id, estimated similarity) tuples, best first
+        """
+        if signature is None:
+            signature = self.record_signature(record)
+        if signature is None:
+            return []
+        
+        with self._lock:
+            candidates: Set[str] = set()
+            for key in self._band_keys(signature):
+                for candidate_id in self.buckets.get(key, ()):
+                    if len(candidates) >= self.max_candidates:
+                        break
+                    candidates.add(candidate_id)
+            candidates.discard(exclude)
+            
+            matches = []
+            for candidate_id in candidates:
+                score = MinHasher.similarity(signature, self.signatures[candidate_id])
+                if score >= self.threshold:
+                    matches.append((candidate_id, round(score, 3)))
+        
+        matches.sort(key=lambda item: item[1], reverse=True)
+        return matches
+
+
+def merge_records(existing: Dict, incoming: Dict) -> Dict:
+    """
+    Merge a repeat application into the existing record
+    
+    Newer non-empty values win, tech stacks are unioned and the original
+    candidate_id and first application time are kept.
+    
+    Args:
+        existing: Stored candidate record
+        incoming: New candidate data
+        
+    Returns:
+        dict: Merged record
+    """
+    merged = dict(existing)
+    
+    for key, value in incoming.items():
+        if key in ('candidate_id', 'first_applied', 'applications'):
+            continue
+        if value in (None, '', []):
+            continue
+        if key == 'tech_stack':
+            seen = {str(tech).lower() for tech in merged.get('tech_stack', [])}
+            combined = list(merged.get('tech_stack', []))
+            for tech in value:
+                if str(tech).lower() not in seen:
+                    seen.add(str(tech).lower())
+                    combined.append(tech)
+            merged['tech_stack'] = combined
+        else:
+            merged[key] = value
+    
+    merged['first_applied'] = existing.get('first_applied', existing.get('timestamp', ''))
+    merged['applications'] = existing.get('applications', 1) + incoming.get('applications', 1)
+    merged['timestamp'] = max(existing.get('timestamp', ''), incoming.get('timestamp', '')) or datetime.now().isoformat()
+    
+    return merged
+
+
+def find_duplicate_groups(records: Iterable[Dict]) -> Tuple[List[List[str]], List[Tuple[str, str, float]]]:
+    """
+    Group records that share a normalized email or phone
+    
+    Args:
+        records: Candidate records to scan
+        
+    Returns:
+        tuple: (groups of exact duplicate IDs, fuzzy (id, id, score) pairs)
+    """
+    index = DeduplicationIndex()
+    parent: Dict[str, str] = {}
+    
+    def find(node: str) -> str:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    
+    fuzzy_pairs = []
+    for record in records:
+        candidate_id = record.get('candidate_id')
+        if not candidate_id:
+            continue
+        parent[candidate_id] = candidate_id
+        
+        email = normalize_email(record.get('email', ''))
+        phone = normalize_phone(record.get('phone', ''))
+        with index._lock:
+            for match in (index.email_index.get(email) if email else None,
+                          index.phone_index.get(phone) if phone else None):
+                if match:
+                    parent[find(candidate_id)] = find(match)
+        
+        # Only the closest fuzzy match is reported per record
+        signature = index.record_signature(record)
+        for match, score in index.find_similar(record, signature=signature):
+            if find(match) != find(candidate_id):
+                fuzzy_pairs.append((match, candidate_id, score))
+                break
+        
+        index.add(record, signature=signature)
+    
+    groups: Dict[str, List[str]] = {}
+    for candidate_id in parent:
+        groups.setdefault(find(candidate_id), []).append(candidate_id)
+    
+    duplicate_groups = [ids for ids in groups.values() if len(ids) > 1]
+    fuzzy_pairs = [(a, b, s) for a, b, s in fuzzy_pairs if find(a) != find(b)]
+    
+    return duplicate_groups, fuzzy_pairs
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_handler import CandidateDataHandler
+    
+    parser = argparse.ArgumentParser(description="Merge duplicate candidate records")
+    parser.add_argument('--data-dir', default='candidate_data', help='Candidate data directory')
+    parser.add_argument('--dry-run', action='store_true', help='Report duplicates without merging')
+    args = parser.parse_args()
+    
+    report = CandidateDataHandler(data_dir=args.data_dir).deduplicate_candidates(dry_run=args.dry_run)
+    print(f"Duplicate groups: {report['groups']}")
+    print(f"Records merged: {report['merged']}")
+    print(f"Possible fuzzy duplicates: {len(report['possible_duplicates'])}")
@@ -0,0 +1,369 @@
+"""
+Erasure Module
+==============
+GDPR right-to-erasure across every place candidate data ends up.
+
+A per-candidate artifact manifest (SQLite, <data_dir>/artifacts.db) records
+derived artifacts as they are created: single-candidate exports, bulk exports
+containing the candidate, the transcript sessions the candidate spoke in and
+the cold segment holding an archived record.
+Erasing a batch of IDs then touches each artifact once:
+
+- records are removed from the record store in one transaction
+- manifest files are unlinked; transcript and archive segments holding the
+  candidates are rewritten once per batch
+- audit events are redacted in place through the audit log's offset index
+- rows in the append-only summary CSV are tombstoned and dropped by a single
+  background compaction instead of one full rewrite per candidate
+
+Merged records use the same compaction: the fresh summary row is appended and
+the candidate is marked superseded, so only its last row survives.
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Artifact kinds tracked in the manifest
+ARTIFACT_KINDS = ('export', 'bulk_export', 'transcript', 'archive')
+
+# Artifact kinds that are files removed outright on erasure
+FILE_ARTIFACTS = ('export', 'bulk_export')
+
+
+class ArtifactManifest:
+    """Candidate -> artifact locations, plus tombstones and superseded rows awaiting compaction"""
+    
+    def __init__(self, db_path: Path):
+        """
+        Open (or create) a manifest
+        
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "candidate_id TEXT NOT NULL, kind TEXT NOT NULL, location TEXT NOT NULL, "
+                "PRIMARY KEY (candidate_id, kind, location))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_location ON artifacts (location)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tombstones (candidate_id TEXT PRIMARY KEY, erased_at TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS superseded (candidate_id TEXT PRIMARY KEY)")
+    
+    def add(self, candidate_id: str, kind: str, location: str):
+        """Record one artifact"""
+        self.add_many([(candidate_id, kind, location)])
+    
+    def add_many(self, rows: Iterable[Tuple[str, str, str]]):
+        """
+        Record artifacts in one transaction
+        
+        Args:
+            rows: (candidate_id, kind, location) tuples
+        """
+        rows = list(rows)
+        for _, kind, _ in rows:
+            if kind not in ARTIFACT_KINDS:
+                raise ValueError(f"Unknown artifact kind: {kind}")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO artifacts (candidate_id, kind, location) VALUES (?, ?, ?)", rows
+            )
+    
+    def locations(self, candidate_ids: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Look up the artifacts of several candidates
+        
+        Args:
+            candidate_ids: Candidates to look up
+            
+        Returns:
+            dict: Candidate ID -> [(kind, location)]
+        """
+        result: Dict[str, List[Tuple[str, str]]] = {}
+        with self._lock:
+            for chunk in _chunks(candidate_ids):
+                rows = self._conn.execute(
+                    f"SELECT candidate_id, kind, location FROM artifacts "
+                    f"WHERE candidate_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for candidate_id, kind, location in rows:
+                    result.setdefault(candidate_id, []).append((kind, location))
+        return result
+    
+    def forget(self, candidate_ids: List[str], locations: Iterable[str] = ()):
+        """Drop the entries of erased candidates and of removed files"""
+        locations = list(locations)
+        with self._lock, self._conn:
+            for chunk in _chunks(candidate_ids):
+                self._conn.execute(
+                    f"DELETE FROM artifacts WHERE candidate_id IN ({','.join('?' * len(chunk))})", chunk
+                )
+            for chunk in _chunks(locations):
+                self._conn.execute(
+                    f"DELETE FROM artifacts WHERE location IN ({','.join('?' * len(chunk))})", chunk
+                )
+    
+    def remove(self, rows: Iterable[Tuple[str, str, str]]):
+        """Drop specific (candidate_id, kind, location) entries"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM artifacts WHERE candidate_id = ? AND kind = ? AND location = ?", list(rows)
+            )
+    
+    def reassign(self, candidate_ids: List[str], target_id: str):
+        """
+        Move the artifacts of merged-away candidates to the record they were merged into
+        
+        Args:
+            candidate_ids: Candidates whose entries move
+            target_id: Candidate that now owns the artifacts
+        """
+        with self._lock, self._conn:
+            for chunk in _chunks(candidate_ids):
+                placeholders = ','.join('?' * len(chunk))
+                self._conn.execute(
+                    f"INSERT OR IGNORE INTO artifacts (candidate_id, kind, location) "
+                    f"SELECT ?, kind, location FROM artifacts WHERE candidate_id IN ({placeholders})",
+                    [target_id, *chunk]
+                )
+                self._conn.execute(f"DELETE FROM artifacts WHERE candidate_id IN ({placeholders})", chunk)
+    
+    def tombstone(self, candidate_ids: List[str]):
+        """Mark candidates whose summary rows must be compacted away"""
+        erased_at = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tombstones (candidate_id, erased_at) VALUES (?, ?)",
+                [(candidate_id, erased_at) for candidate_id in candidate_ids]
+            )
+    
+    def tombstones(self) -> set:
+        """IDs awaiting compaction"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT candidate_id FROM tombstones")}
+    
+    def clear_tombstones(self, candidate_ids: Iterable[str]):
+        """Remove tombstones once their rows are gone"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM tombstones WHERE candidate_id = ?",
+                                   [(candidate_id,) for candidate_id in candidate_ids])
+    
+    def supersede(self, candidate_ids: List[str]):
+        """Mark candidates whose earlier summary rows must be compacted away, keeping the last"""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO superseded (candidate_id) VALUES (?)",
+                                   [(candidate_id,) for candidate_id in candidate_ids])
+    
+    def superseded(self) -> set:
+        """IDs whose older rows await compaction"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT candidate_id FROM superseded")}
+    
+    def clear_superseded(self, candidate_ids: Iterable[str]):
+        """Remove superseded marks once only the last row is left"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM superseded WHERE candidate_id = ?",
+                                   [(candidate_id,) for candidate_id in candidate_ids])
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _chunks(items: List[str], size: int = 500) -> Iterable[List[str]]:
+    """Split a list to stay under SQLite's bound-parameter limit"""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _id_position(header: Optional[List[str]]) -> int:
+    """Column of candidate_id in the summary CSV"""
+    return header.index('candidate_id') if header and 'candidate_id' in header else 1
+
+
+class ErasureManager:
+    """Erase candidates from the record store and every derived artifact"""
+    
+    def __init__(self, handler, manifest: ArtifactManifest):
+        """
+        Initialize the erasure manager
+        
+        Args:
+            handler: CandidateDataHandler owning the store, summary CSV and audit log
+            manifest: Artifact manifest of the handler's data directory
+        """
+        self.handler = handler
+        self.manifest = manifest
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='summary-compaction')
+        self._pending: Optional[Future] = None
+        self._pending_lock = threading.Lock()
+    
+    def erase(self, candidate_ids: Iterable[str], transcript_log=None) -> Dict:
+        """
+        Erase a batch of candidates in one pass
+        
+        Args:
+            candidate_ids: Candidates to erase
+            transcript_log: Log holding the candidates' sessions (defaults to the shared log)
+            
+        Returns:
+            dict: Counts of erased records, files, transcript events and audit events
+        """
+        ids = list(dict.fromkeys(candidate_ids))
+        if not ids:
+            return {'requested': 0, 'records': 0, 'files': 0, 'transcript_events': 0, 'audit_events': 0}
+        
+        artifacts = self.manifest.locations(ids)
+        files = set()
+        sessions = set()
+        archives: Dict[str, List[str]] = {}
+        for candidate_id, entries in artifacts.items():
+            for kind, location in entries:
+                if kind in FILE_ARTIFACTS:
+                    files.add(location)
+                elif kind == 'transcript':
+                    sessions.add(location)
+                elif kind == 'archive':
+                    archives.setdefault(location, []).append(candidate_id)
+        
+        erased = self.handler.store.delete_many(ids)
+        if archives:
+            from retention import rewrite_archive_segment
+            for location, archived_ids in archives.items():
+                erased.extend(record['candidate_id'] for record in rewrite_archive_segment(location, archived_ids))
+        for candidate_id in ids:
+            self.handler._remove_from_indexes(candidate_id)
+        
+        removed_files = 0
+        for location in files:
+            try:
+                os.remove(location)
+                removed_files += 1
+            except FileNotFoundError:
+                pass
+        
+        transcript_events = 0
+        if sessions:
+            if transcript_log is None:
+                from transcript_log import get_transcript_log
+                transcript_log = get_transcript_log()
+            transcript_events = transcript_log.purge_sessions(sessions)
+        
+        audit_events = self.handler.audit_log.redact(ids)
+        
+        self.manifest.tombstone(ids)
+        self.manifest.forget(ids, files)
+        for candidate_id in erased:
+            self.handler.audit_log.log('ERASE_CANDIDATE', candidate_id)
+        self.schedule_compaction()
+        
+        return {
+            'requested': len(ids),
+            'records': len(erased),
+            'files': removed_files,
+            'transcript_events': transcript_events,
+            'audit_events': audit_events
+        }
+    
+    def schedule_compaction(self) -> Future:
+        """
+        Compact the summary CSV in the background
+        
+        Erasures arriving while a compaction is queued share it.
+        
+        Returns:
+            Future: Resolves to the number of rows removed
+        """
+        with self._pending_lock:
+            if self._pending is None or self._pending.running() or self._pending.done():
+                self._pending = self._compactor.submit(self.compact_summary)
+            return self._pending
+    
+    def compact_summary(self) -> int:
+        """
+        Rewrite the summary CSV without tombstoned rows or superseded older rows
+        
+        Returns:
+            int: Rows removed
+        """
+        csv_file = self.handler.csv_file
+        temp_file = csv_file.with_name(csv_file.name + '.tmp')
+        removed = 0
+        
+        # Merges append and mark under the same lock, so no mark is cleared before its row is seen
+        with self.handler._csv_lock:
+            tombstones = self.manifest.tombstones()
+            superseded = self.manifest.superseded()
+            if not tombstones and not superseded:
+                return 0
+            
+            if csv_file.exists():
+                # First pass finds the row each superseded candidate keeps
+                last_rows: Dict[str, int] = {}
+                if superseded:
+                    with open(csv_file, 'r', newline='', encoding='utf-8') as source:
+                        reader = csv.reader(source)
+                        position = _id_position(next(reader, None))
+                        for line, row in enumerate(reader):
+                            if len(row) > position and row[position] in superseded:
+                                last_rows[row[position]] = line
+                
+                with open(csv_file, 'r', newline='', encoding='utf-8') as source, \
+                        open(temp_file, 'w', newline='', encoding='utf-8') as target:
+                    reader = csv.reader(source)
+                    writer = csv.writer(target)
+                    header = next(reader, None)
+                    if header is not None:
+                        writer.writerow(header)
+                    position = _id_position(header)
+                    for line, row in enumerate(reader):
+                        candidate_id = row[position] if len(row) > position else None
+                        if candidate_id in tombstones or \
+                                (candidate_id in last_rows and last_rows[candidate_id] != line):
+                            removed += 1
+                        else:
+                            writer.writerow(row)
+                os.replace(temp_file, csv_file)
+            
+            self.manifest.clear_tombstones(tombstones)
+            self.manifest.clear_superseded(superseded)
+        return removed
+    
+    def shutdown(self):
+        """Wait for a queued compaction and stop the worker"""
+        self._compactor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    from data_handler import CandidateDataHandler
+    
+    parser = argparse.ArgumentParser(description="Erase candidates and their derived artifacts")
+    parser.add_argument('--data-dir', default='candidate_data')
+    parser.add_argument('ids', nargs='*', help='Candidate IDs (read one per line from stdin if omitted)')
+    args = parser.parse_args()
+    
+    ids = args.ids or [line.strip() for line in sys.stdin if line.strip()]
+    handler = CandidateDataHandler(data_dir=args.data_dir)
+    result = handler.erase_candidates(ids)
+    handler.close()
+    for key, value in result.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,376 @@
+"""
+Export Module
+=============
+Lightweight CSV/XLSX writers and streaming exporters for the candidate pool.
+
+Tabular exports use the stdlib csv module and openpyxl write-only mode directly,
+without building pandas DataFrames. The iter_* exporters take an iterable of
+records (e.g. CandidateDataHandler.iter_candidates()) and yield the file as byte
+chunks, so exports of any size run in bounded memory and can be sent as a
+chunked HTTP response or written straight to disk.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import serialization
+
+
+# Size of the byte chunks yielded by the streaming exporters
+CHUNK_SIZE = 64 * 1024
+
+# Column order for tabular exports
+EXPORT_FIELDS = [
+    'candidate_id',
+    'timestamp',
+    'status',
+    'name',
+    'email',
+    'phone',
+    'experience',
+    'position',
+    'location',
+    'tech_stack',
+    'technical_answers',
+    'answer_score'
+]
+
+# Fields written as datetime cells in spreadsheets
+DATETIME_FIELDS = {'timestamp', 'first_applied'}
+
+# File extension and MIME type per export format
+EXPORT_FORMATS = {
+    'jsonl': ('jsonl', 'application/x-ndjson'),
+    'csv': ('csv', 'text/csv'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': ('pdf', 'application/pdf')
+}
+
+
+def _flatten_value(value) -> str:
+    """Convert a record value into a single cell string"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(map(str, value))
+    if isinstance(value, dict):
+        return serialization.dumps(value)
+    return str(value)
+
+
+def _typed_value(key: str, value):
+    """Convert a record value into a typed spreadsheet cell"""
+    if isinstance(value, (bool, int, float)):
+        return value
+    if key in DATETIME_FIELDS and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return _flatten_value(value)
+
+
+def collect_fields(records: List[Dict]) -> List[str]:
+    """
+    Collect column names from records in first-seen order
+    
+    Args:
+        records: Candidate records or session data
+        
+    Returns:
+        list: Union of record keys
+    """
+    fields = {}
+    for record in records:
+        for key in record:
+            fields.setdefault(key, None)
+    return list(fields)
+
+
+def records_to_csv(records: List[Dict], fields: Optional[List[str]] = None) -> bytes:
+    """
+    Serialize one or more records to CSV with the stdlib csv module
+    
+    Args:
+        records: Candidate records (a single candidate is a one-item list)
+        fields: Columns to export (defaults to the union of record keys)
+        
+    Returns:
+        bytes: UTF-8 encoded CSV
+    """
+    fields = fields or collect_fields(records)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for record in records:
+        writer.writerow([_flatten_value(record.get(field)) for field in fields])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _write_xlsx(f, records: Iterable[Dict], fields: List[str], sheet_name: str,
+                header: Optional[List[str]] = None):
+    """Write records to an XLSX file object using openpyxl write-only mode"""
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(header or fields)
+    
+    for record in records:
+        sheet.append([_typed_value(field, record.get(field)) for field in fields])
+    
+    workbook.save(f)
+
+
+def records_to_xlsx(records: List[Dict], fields: Optional[List[str]] = None,
+                    sheet_name: str = 'Candidate Data') -> bytes:
+    """
+    Serialize one or more records to an XLSX workbook
+    
+    Numbers stay numeric and timestamps are written as datetime cells.
+    
+    Args:
+        records: Candidate records (a single candidate is a one-item list)
+        fields: Columns to export (defaults to the union of record keys)
+        sheet_name: Worksheet title
+        
+    Returns:
+        bytes: XLSX file
+    """
+    fields = fields or collect_fields(records)
+    buffer = io.BytesIO()
+    _write_xlsx(buffer, records, fields, sheet_name)
+    return buffer.getvalue()
+
+
+def _file_chunks(f, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the contents of an open binary file in chunks"""
+    f.seek(0)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_jsonl(records: Iterable[Dict], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records as JSON Lines
+    
+    Args:
+        records: Candidate records
+        chunk_size: Approximate size of yielded chunks
+        
+    Yields:
+        bytes: UTF-8 encoded JSONL chunks
+    """
+    buffer = []
+    size = 0
+    
+    for record in records:
+        line = serialization.dumpb(record) + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_csv(records: Iterable[Dict], fields: Optional[List[str]] = None,
+             chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records as CSV with a fixed header
+    
+    Args:
+        records: Candidate records
+        fields: Columns to export (defaults to EXPORT_FIELDS)
+        chunk_size: Approximate size of yielded chunks
+        
+    Yields:
+        bytes: UTF-8 encoded CSV chunks
+    """
+    fields = fields or EXPORT_FIELDS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    
+    for record in records:
+        writer.writerow([_flatten_value(record.get(field)) for field in fields])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_xlsx(records: Iterable[Dict], fields: Optional[List[str]] = None,
+              chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records as an XLSX workbook using openpyxl write-only mode
+    
+    Rows are flushed to openpyxl's temporary worksheet files as they are
+    appended, and the finished workbook is spooled to disk before streaming.
+    
+    Args:
+        records: Candidate records
+        fields: Columns to export (defaults to EXPORT_FIELDS)
+        chunk_size: Size of yielded chunks
+        
+    Yields:
+        bytes: XLSX file chunks
+    """
+    fields = fields or EXPORT_FIELDS
+    header = [field.replace('_', ' ').title() for field in fields]
+    
+    with tempfile.TemporaryFile() as f:
+        _write_xlsx(f, records, fields, 'Candidates', header=header)
+        yield from _file_chunks(f, chunk_size)
+
+
+def iter_pdf_report(records: Iterable[Dict], chunk_size: int = CHUNK_SIZE,
+                    title: str = "TalentScout AI - Candidate Pool Report") -> Iterator[bytes]:
+    """
+    Stream a multi-page PDF report with one block per candidate
+    
+    Pages are drawn directly on a reportlab canvas as records arrive, so only
+    the compressed page streams are held until the file is written.
+    
+    Args:
+        records: Candidate records
+        chunk_size: Size of yielded chunks
+        title: Report title printed on every page
+        
+    Yields:
+        bytes: PDF file chunks
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+    
+    width, height = letter
+    margin = 0.6 * inch
+    line_height = 12
+    
+    with tempfile.TemporaryFile() as f:
+        pdf = canvas.Canvas(f, pagesize=letter, pageCompression=1)
+        page_number = 0
+        
+        def start_page() -> float:
+            nonlocal page_number
+            page_number += 1
+            pdf.setFillColor(colors.HexColor('#0a0e27'))
+            pdf.setFont('Helvetica-Bold', 14)
+            pdf.drawString(margin, height - margin, title)
+            pdf.setFont('Helvetica', 8)
+            pdf.setFillColor(colors.grey)
+            pdf.drawRightString(width - margin, margin / 2, f"Page {page_number}")
+            return height - margin - 2 * line_height
+        
+        y = start_page()
+        count = 0
+        
+        for record in records:
+            lines = [
+                f"{record.get('name', 'N/A')}  |  {record.get('position', 'N/A')}  |  {record.get('location', 'N/A')}",
+                f"Email: {record.get('email', 'N/A')}   Phone: {record.get('phone', 'N/A')}   "
+                f"Experience: {record.get('experience', 'N/A')}",
+                f"Tech Stack: {_flatten_value(record.get('tech_stack', []))}",
+                f"ID: {record.get('candidate_id', '')}   Status: {record.get('status', '')}   "
+                f"Submitted: {record.get('timestamp', '')}"
+            ]
+            block_height = (len(lines) + 1) * line_height
+            
+            if y - block_height < margin:
+                pdf.showPage()
+                y = start_page()
+            
+            pdf.setFillColor(colors.black)
+            pdf.setFont('Helvetica-Bold', 10)
+            pdf.drawString(margin, y, lines[0][:110])
+            pdf.setFont('Helvetica', 8)
+            for offset, line in enumerate(lines[1:], start=1):
+                pdf.drawString(margin, y - offset * line_height, line[:140])
+            y -= block_height
+            count += 1
+        
+        pdf.setFont('Helvetica', 8)
+        pdf.setFillColor(colors.grey)
+        pdf.drawString(margin, margin / 2,
+                       f"{count} candidates - generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        pdf.save()
+        
+        yield from _file_chunks(f, chunk_size)
+
+
+# Streaming exporter per format
+EXPORTERS: Dict[str, Callable[..., Iterator[bytes]]] = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+    'xlsx': iter_xlsx,
+    'pdf': iter_pdf_report
+}
+
+
+def stream_export(records: Iterable[Dict], format: str = 'jsonl',
+                  chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records in the requested format
+    
+    Args:
+        records: Candidate records
+        format: One of 'jsonl', 'csv', 'xlsx', 'pdf'
+        chunk_size: Approximate size of yielded chunks
+        
+    Yields:
+        bytes: Export file chunks
+    """
+    if format not in EXPORTERS:
+        raise ValueError(f"Unsupported export format: {format}")
+    return EXPORTERS[format](records, chunk_size=chunk_size)
+
+
+def write_export(records: Iterable[Dict], path: str, format: str = 'jsonl') -> int:
+    """
+    Write a streaming export to a file
+    
+    Args:
+        records: Candidate records
+        path: Destination file path
+        format: One of 'jsonl', 'csv', 'xlsx', 'pdf'
+        
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in stream_export(records, format):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_handler import CandidateDataHandler
+    
+    parser = argparse.ArgumentParser(description="Export the whole candidate pool")
+    parser.add_argument('--data-dir', default='candidate_data', help='Candidate data directory')
+    parser.add_argument('--format', default='jsonl', choices=sorted(EXPORTERS), help='Export format')
+    parser.add_argument('--output', help='Output file (defaults to the exports directory)')
+    args = parser.parse_args()
+    
+    handler = CandidateDataHandler(data_dir=args.data_dir)
+    if args.output:
+        size = write_export(handler.iter_candidates(), args.output, args.format)
+        print(f"Wrote {size} bytes to {args.output}")
+    else:
+        print(f"Exported to {handler.export_all_candidates(args.format)}")
@@ -0,0 +1,436 @@
+"""
+Job Matching Module
+===================
+Open roles and reverse matching of candidates to them.
+
+Job descriptions are parsed into required and nice-to-have skills using the
+assistant's tech vocabulary and stored as JSON files. An inverted index maps
+each skill to the open jobs that ask for it, so matching a candidate's stack
+only touches the postings for their own skills.
+"""
+
+import hashlib
+import heapq
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import serialization
+from question_bank import TECH_ALIASES, normalize_tech
+
+
+# Weight of a matched skill in the job score
+REQUIRED_WEIGHT = 1.0
+NICE_TO_HAVE_WEIGHT = 0.5
+
+_NICE_MARKERS = re.compile(r'nice[- ]to[- ]have|preferred|bonus|a plus|is a plus|desirable|optional|good to have')
+_REQUIRED_MARKERS = re.compile(r'requir|must[- ]have|qualifications|what you need|you have|skills')
+
+
+def _default_categories() -> Dict[str, List[str]]:
+    from chatbot_engine import TECH_CATEGORIES
+    return TECH_CATEGORIES
+
+
+class SkillExtractor:
+    """Finds known technologies in free text and canonicalizes their spelling"""
+    
+    def __init__(self, tech_categories: Optional[Dict[str, List[str]]] = None):
+        """
+        Build the matcher
+        
+        Args:
+            tech_categories: Category -> technologies (defaults to the assistant's vocabulary)
+        """
+        self.tech_categories = tech_categories or _default_categories()
+        
+        terms = {tech: normalize_tech(tech) for items in self.tech_categories.values() for tech in items}
+        terms.update({alias: canonical for alias, canonical in TECH_ALIASES.items()})
+        self.vocabulary = set(terms.values())
+        self._canonical = terms
+        
+        # Longest terms first so 'node.js' wins over 'node' and 'sql server' over 'sql'
+        alternation = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        self._pattern = re.compile(rf'(?<![\w+#.\-])({alternation})(?![\w+#\-]|\.\w)')
+    
+    def find(self, text: str) -> List[str]:
+        """
+        Find technologies mentioned in text
+        
+        Args:
+            text: Free text
+            
+        Returns:
+            list: Canonical technology names in order of first mention
+        """
+        found = {}
+        for match in self._pattern.finditer(text.lower()):
+            found.setdefault(self._canonical[match.group(1)], None)
+        return list(found)
+    
+    def canonical(self, tech: str) -> List[str]:
+        """
+        Canonicalize one skill as typed by a candidate
+        
+        Args:
+            tech: Skill (e.g. "React.js", "Python 3.11")
+            
+        Returns:
+            list: Known technologies it names, or the normalized skill itself
+        """
+        key = normalize_tech(tech)
+        if key in self.vocabulary:
+            return [key]
+        return self.find(key) or ([key] if key else [])
+    
+    def categorize(self, skills: List[str]) -> Dict[str, List[str]]:
+        """Group canonical skills by category"""
+        categorized = {category: [] for category in self.tech_categories}
+        categorized['other'] = []
+        for skill in skills:
+            category = next((c for c, items in self.tech_categories.items()
+                             if skill in {normalize_tech(item) for item in items}), 'other')
+            categorized[category].append(skill)
+        return {category: items for category, items in categorized.items() if items}
+
+
+def parse_job_description(text: str, extractor: Optional[SkillExtractor] = None) -> Dict[str, List[str]]:
+    """
+    Split a job description's skills into required and nice-to-have
+    
+    Lines under a "Nice to have" / "Preferred" / "Bonus" heading, or containing
+    such a marker themselves, are nice-to-have; everything else is required.
+    
+    Args:
+        text: Job description
+        extractor: Skill extractor (defaults to the assistant's vocabulary)
+        
+    Returns:
+        dict: required and nice_to_have skill lists
+    """
+    extractor = extractor or SkillExtractor()
+    required, nice = {}, {}
+    section_is_nice = False
+    
+    for line in text.splitlines():
+        lowered = line.strip().lower()
+        if not lowered:
+            continue
+        
+        skills = extractor.find(lowered)
+        is_heading = lowered.endswith(':') or lowered.startswith('#') or not skills
+        
+        if _NICE_MARKERS.search(lowered):
+            if is_heading:
+                section_is_nice = True
+                if not skills:
+                    continue
+            target = nice
+        elif is_heading and _REQUIRED_MARKERS.search(lowered):
+            section_is_nice = False
+            target = required
+        else:
+            target = nice if section_is_nice else required
+        
+        for skill in skills:
+            target.setdefault(skill, None)
+    
+    return {
+        'required': list(required),
+        'nice_to_have': [skill for skill in nice if skill not in required]
+    }
+
+
+class JobSpecStore:
+    """Job specs on disk plus an in-memory inverted skill -> job index"""
+    
+    def __init__(self, data_dir: str = "job_data", tech_categories: Optional[Dict[str, List[str]]] = None):
+        """
+        Open (or create) a job store
+        
+        Args:
+            data_dir: Directory holding job JSON files
+            tech_categories: Category -> technologies used to parse descriptions
+        """
+        self.data_dir = Path(data_dir)
+        self.jobs_dir = self.data_dir / "jobs"
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.extractor = SkillExtractor(tech_categories)
+        
+        self._jobs: Dict[str, Dict] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loaded_mtime = 0
+        
+        self._load()
+    
+    def _load(self):
+        """(Re)build the index from the job files (caller holds the lock or is initializing)"""
+        # Taken before reading so a change made during the load triggers another one
+        self._loaded_mtime = self.jobs_dir.stat().st_mtime_ns
+        self._jobs.clear()
+        self._postings.clear()
+        self._totals.clear()
+        for job_file in self.jobs_dir.glob("*.json"):
+            self._index_job(serialization.load_file(job_file))
+    
+    def refresh(self) -> bool:
+        """
+        Reload the jobs if another process added or closed some
+        
+        Every write replaces a file, so the jobs directory's mtime changes with it.
+        
+        Returns:
+            bool: True if the jobs were reloaded
+        """
+        try:
+            mtime = self.jobs_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            if mtime == self._loaded_mtime:
+                return False
+            self._load()
+            return True
+    
+    def __len__(self) -> int:
+        return len(self._jobs)
+    
+    def _index_job(self, job: Dict):
+        """Add an open job to the inverted index (caller holds the lock or is initializing)"""
+        self._jobs[job['job_id']] = job
+        if job.get('status', 'open') != 'open':
+            return
+        
+        total = 0.0
+        for skill in job['required_skills']:
+            self._postings[skill][job['job_id']] = REQUIRED_WEIGHT
+            total += REQUIRED_WEIGHT
+        for skill in job['nice_to_have_skills']:
+            self._postings[skill].setdefault(job['job_id'], NICE_TO_HAVE_WEIGHT)
+            total += NICE_TO_HAVE_WEIGHT
+        self._totals[job['job_id']] = total
+    
+    def _unindex_job(self, job_id: str):
+        """Remove a job's postings (caller holds the lock)"""
+        job = self._jobs.get(job_id)
+        if not job:
+            return
+        for skill in job['required_skills'] + job['nice_to_have_skills']:
+            postings = self._postings.get(skill)
+            if postings is not None:
+                postings.pop(job_id, None)
+                if not postings:
+                    del self._postings[skill]
+        self._totals.pop(job_id, None)
+    
+    def _write_job(self, job: Dict):
+        job_file = self.jobs_dir / f"{job['job_id']}.json"
+        temp_file = job_file.with_name(job_file.name + '.tmp')
+        serialization.dump_file(job, temp_file, pretty=True)
+        os.replace(temp_file, job_file)
+    
+    def add_job(self, title: str, description: str = '', required: Optional[List[str]] = None,
+                nice_to_have: Optional[List[str]] = None, location: Optional[str] = None) -> Dict:
+        """
+        Add an open job
+        
+        Args:
+            title: Job title
+            description: Job description; skills are parsed from it unless given explicitly
+            required: Required skills (overrides parsing)
+            nice_to_have: Nice-to-have skills (overrides parsing)
+            location: Job location
+            
+        Returns:
+            dict: Stored job spec
+        """
+        parsed = parse_job_description(description, self.extractor) if description else \
+            {'required': [], 'nice_to_have': []}
+        
+        def canonical(skills: List[str]) -> List[str]:
+            result = {}
+            for skill in skills:
+                for name in self.extractor.canonical(skill):
+                    result.setdefault(name, None)
+            return list(result)
+        
+        required_skills = canonical(required) if required is not None else parsed['required']
+        nice_skills = canonical(nice_to_have) if nice_to_have is not None else parsed['nice_to_have']
+        nice_skills = [skill for skill in nice_skills if skill not in required_skills]
+        
+        job = {
+            'job_id': hashlib.md5(f"{title}_{datetime.now().isoformat()}".encode()).hexdigest()[:12],
+            'title': title,
+            'location': location or '',
+            'description': description,
+            'required_skills': required_skills,
+            'nice_to_have_skills': nice_skills,
+            'categories': self.extractor.categorize(required_skills + nice_skills),
+            'status': 'open',
+            'created_at': datetime.now().isoformat()
+        }
+        
+        with self._lock:
+            self._write_job(job)
+            self._index_job(job)
+        
+        return job
+    
+    def close_job(self, job_id: str) -> bool:
+        """
+        Close a job so it no longer matches candidates
+        
+        Args:
+            job_id: Job identifier
+            
+        Returns:
+            bool: True if the job existed
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            self._unindex_job(job_id)
+            job['status'] = 'closed'
+            self._write_job(job)
+        return True
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a job spec by ID"""
+        return self._jobs.get(job_id)
+    
+    def list_jobs(self, status: Optional[str] = 'open') -> List[Dict]:
+        """List jobs, newest first (all jobs when status is None)"""
+        self.refresh()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if status is None or job.get('status', 'open') == status]
+        return sorted(jobs, key=lambda job: job.get('created_at', ''), reverse=True)
+    
+    def match(self, tech_stack: List[str], limit: int = 3, min_score: float = 1.0) -> List[Dict]:
+        """
+        Rank open jobs for a candidate's tech stack
+        
+        The score is the weighted share of the job's skills the candidate has
+        (required skills count double); required_match is the share of required
+        skills covered.
+        
+        Args:
+            tech_stack: Candidate's technologies
+            limit: Maximum jobs to return
+            min_score: Minimum score (0-100) to include a job
+            
+        Returns:
+            list: Dicts with job_id, title, location, score, required_match and matched_skills
+        """
+        self.refresh()
+        skills = {name for tech in tech_stack for name in self.extractor.canonical(tech)}
+        
+        weights: Dict[str, float] = defaultdict(float)
+        required_hits: Dict[str, int] = defaultdict(int)
+        with self._lock:
+            for skill in skills:
+                for job_id, weight in self._postings.get(skill, {}).items():
+                    weights[job_id] += weight
+                    if weight == REQUIRED_WEIGHT:
+                        required_hits[job_id] += 1
+            
+            # Rank on the raw sums; only the returned jobs are turned into result dicts
+            ranked = heapq.nlargest(
+                limit,
+                ((weight / self._totals[job_id], required_hits[job_id], job_id)
+                 for job_id, weight in weights.items()
+                 if self._totals[job_id] and 100 * weight / self._totals[job_id] >= min_score)
+            )
+            
+            results = []
+            for share, hits, job_id in ranked:
+                job = self._jobs[job_id]
+                required = job['required_skills']
+                results.append({
+                    'job_id': job_id,
+                    'title': job['title'],
+                    'location': job.get('location', ''),
+                    'score': round(100 * share, 1),
+                    'required_match': round(100 * hits / len(required), 1) if required else 100.0,
+                    'matched_skills': sorted(skills.intersection(required + job['nice_to_have_skills']))
+                })
+        
+        return results
+
+
+_stores: Dict[str, JobSpecStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_job_store(data_dir: Optional[str] = None) -> Optional[JobSpecStore]:
+    """
+    Open the shared job store for this process
+    
+    The store reloads itself when the job files change on disk, so jobs added
+    or closed from the CLI or another worker are picked up without a restart.
+    
+    Args:
+        data_dir: Job directory (defaults to JOB_DATA_DIR, then job_data)
+        
+    Returns:
+        Optional[JobSpecStore]: The store, or None if no jobs have been added yet
+    """
+    data_dir = data_dir or os.getenv('JOB_DATA_DIR', 'job_data')
+    with _stores_lock:
+        if data_dir not in _stores:
+            # Not cached while missing, so jobs added later are picked up
+            if not (Path(data_dir) / "jobs").is_dir():
+                return None
+            _stores[data_dir] = JobSpecStore(data_dir)
+        return _stores[data_dir]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Manage open roles and match candidates to them")
+    parser.add_argument('--data-dir', default=os.getenv('JOB_DATA_DIR', 'job_data'), help='Job data directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    add_parser = subparsers.add_parser('add', help='Add a job from a description file (or stdin)')
+    add_parser.add_argument('title')
+    add_parser.add_argument('--file', help='Job description file (defaults to stdin)')
+    add_parser.add_argument('--location', default=None)
+    
+    subparsers.add_parser('list', help='List open jobs')
+    
+    match_parser = subparsers.add_parser('match', help='Match a tech stack to open jobs')
+    match_parser.add_argument('tech_stack', help='Comma-separated technologies')
+    match_parser.add_argument('--limit', type=int, default=5)
+    
+    close_parser = subparsers.add_parser('close', help='Close a job')
+    close_parser.add_argument('job_id')
+    
+    args = parser.parse_args()
+    store = JobSpecStore(args.data_dir)
+    
+    if args.command == 'add':
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                description = f.read()
+        else:
+            description = sys.stdin.read()
+        job = store.add_job(args.title, description, location=args.location)
+        print(serialization.dumps({key: job[key] for key in ('job_id', 'required_skills', 'nice_to_have_skills')}, pretty=True))
+    elif args.command == 'list':
+        for job in store.list_jobs():
+            print(f"{job['job_id']}  {job['title']}  [{', '.join(job['required_skills'])}]")
+    elif args.command == 'match':
+        stack = [t.strip() for t in args.tech_stack.split(',') if t.strip()]
+        for result in store.match(stack, args.limit):
+            print(f"{result['score']:5.1f}  {result['title']}  ({', '.join(result['matched_skills'])})")
+    else:
+        print("Closed" if store.close_job(args.job_id) else "Job not found")
@@ -0,0 +1,279 @@
+"""
+LLM Backends Module
+===================
+Pluggable text-generation backends for the hiring assistant.
+
+The backend is chosen through configuration (LLM_BACKEND environment variable):
+
+- huggingface (default): remote Hugging Face Inference API
+- llama_cpp: CPU-only local GGUF model through llama-cpp-python, kept warm in memory
+"""
+
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+
+
+class LLMBackend:
+    """Base class for chat-completion backends"""
+    
+    name = 'base'
+    
+    # True when generate_batch() does better than one call per request
+    supports_batching = False
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Stream a chat completion as text chunks
+        
+        Args:
+            messages: Chat messages ({"role": ..., "content": ...})
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            
+        Yields:
+            str: Generated text chunks
+        """
+        raise NotImplementedError
+    
+    def generate(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> str:
+        """
+        Generate a complete chat response
+        
+        Args:
+            messages: Chat messages ({"role": ..., "content": ...})
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            
+        Returns:
+            str: Generated text
+        """
+        return ''.join(self.stream(messages, max_tokens=max_tokens, temperature=temperature))
+    
+    def generate_batch(self, requests: List[Dict]) -> List[str]:
+        """
+        Generate responses for several requests
+        
+        Args:
+            requests: Keyword arguments for generate() (messages, max_tokens, temperature)
+            
+        Returns:
+            list: Generated text per request, in order
+        """
+        return [self.generate(**request) for request in requests]
+
+
+class HuggingFaceBackend(LLMBackend):
+    """Remote generation through the Hugging Face Inference API"""
+    
+    name = 'huggingface'
+    
+    def __init__(self, model: str = DEFAULT_HF_MODEL, token: Optional[str] = None):
+        """Configure the remote model (the client is created on first use)"""
+        self.model = model
+        self.token = token if token is not None else os.getenv('HUGGINGFACE_API_KEY', '')
+        self._client = None
+    
+    @property
+    def client(self):
+        """Hugging Face InferenceClient, created lazily"""
+        if self._client is None:
+            from huggingface_hub import InferenceClient
+            self._client = InferenceClient(model=self.model, token=self.token)
+        return self._client
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        for message in self.client.chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        ):
+            if message.choices[0].delta.content:
+                yield message.choices[0].delta.content
+
+
+# Loaded llama.cpp models, shared by every backend instance in the process, each with
+# the lock its context needs: the lock must be as shared as the model it guards
+_local_models: Dict[tuple, Tuple[object, threading.Lock]] = {}
+_local_models_lock = threading.Lock()
+
+# Marks the end of a local token stream
+_STREAM_END = object()
+
+
+class LlamaCppBackend(LLMBackend):
+    """CPU-only local generation with a quantized GGUF model via llama-cpp-python"""
+    
+    name = 'llama_cpp'
+    
+    # One model lock per batch instead of per request, so queued sessions run back to back
+    supports_batching = True
+    
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 n_batch: int = 512):
+        """
+        Configure the local model
+        
+        Args:
+            model_path: Path to a GGUF model file (e.g. a Q4_K_M quantized instruct model)
+            n_ctx: Context window size
+            n_threads: CPU threads for inference (defaults to all cores)
+            n_batch: Prompt-processing batch size
+        """
+        if not model_path:
+            raise ValueError("LOCAL_MODEL_PATH must point to a GGUF model for the llama_cpp backend")
+        
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads or os.cpu_count()
+        self.n_batch = n_batch
+    
+    def _loaded(self) -> Tuple[object, threading.Lock]:
+        """The model, kept in memory for the lifetime of the process, and its lock"""
+        key = (self.model_path, self.n_ctx, self.n_threads, self.n_batch)
+        with _local_models_lock:
+            if key not in _local_models:
+                from llama_cpp import Llama
+                model = Llama(
+                    model_path=self.model_path,
+                    n_ctx=self.n_ctx,
+                    n_threads=self.n_threads,
+                    n_batch=self.n_batch,
+                    verbose=False
+                )
+                # A llama.cpp context is not thread-safe, so sessions take turns on the warm model
+                _local_models[key] = (model, threading.Lock())
+            return _local_models[key]
+    
+    @property
+    def model(self):
+        """The loaded model"""
+        return self._loaded()[0]
+    
+    @property
+    def model_lock(self) -> threading.Lock:
+        """Lock held while generating, shared by every backend using the same model"""
+        return self._loaded()[1]
+    
+    def warm_up(self):
+        """Load the model ahead of the first request"""
+        return self.model
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        # Generate on a worker thread into an unbounded queue, so a slow reader never
+        # holds the model: the lock is released as soon as generation finishes
+        model, lock = self._loaded()
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        
+        def generate():
+            try:
+                with lock:
+                    for chunk in model.create_chat_completion(
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True
+                    ):
+                        if cancelled.is_set():
+                            break
+                        content = chunk['choices'][0]['delta'].get('content')
+                        if content:
+                            chunks.put(content)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_STREAM_END)
+        
+        threading.Thread(target=generate, name='llama-cpp-stream', daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # A reader that stops early frees the model at the next token
+            cancelled.set()
+    
+    def generate_batch(self, requests: List[Dict]) -> List[str]:
+        # Hold the model for the whole batch so queued sessions are served back to back
+        model, lock = self._loaded()
+        results = []
+        with lock:
+            for request in requests:
+                completion = model.create_chat_completion(
+                    messages=request['messages'],
+                    max_tokens=request.get('max_tokens', 512),
+                    temperature=request.get('temperature', 0.7)
+                )
+                results.append(completion['choices'][0]['message']['content'] or '')
+        return results
+
+
+# Backend classes selectable through LLM_BACKEND
+BACKENDS = {
+    HuggingFaceBackend.name: HuggingFaceBackend,
+    LlamaCppBackend.name: LlamaCppBackend
+}
+
+_backends: Dict[str, LLMBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Create a backend from environment configuration
+    
+    Args:
+        name: Backend name (defaults to LLM_BACKEND, then 'huggingface')
+        
+    Returns:
+        LLMBackend: New backend instance
+    """
+    name = (name or os.getenv('LLM_BACKEND', HuggingFaceBackend.name)).strip().lower()
+    
+    if name == HuggingFaceBackend.name:
+        return HuggingFaceBackend(model=os.getenv('HF_MODEL', DEFAULT_HF_MODEL))
+    
+    if name == LlamaCppBackend.name:
+        threads = os.getenv('LOCAL_MODEL_THREADS')
+        return LlamaCppBackend(
+            model_path=os.getenv('LOCAL_MODEL_PATH', ''),
+            n_ctx=int(os.getenv('LOCAL_MODEL_CTX', '4096')),
+            n_threads=int(threads) if threads else None
+        )
+    
+    raise ValueError(f"Unknown LLM backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Get the shared backend for this process, creating it on first use
+    
+    Every HiringAssistant in the process uses the same backend instance, so a
+    local model is loaded once and stays warm across sessions, concurrent
+    identical prompts are coalesced (see llm_batching) and the remaining calls
+    share one rate-limited queue (see rate_limiter).
+    
+    Args:
+        name: Backend name (defaults to LLM_BACKEND, then 'huggingface')
+        
+    Returns:
+        LLMBackend: Shared backend instance
+    """
+    from llm_batching import wrap_backend
+    from rate_limiter import wrap_rate_limit
+    
+    key = (name or os.getenv('LLM_BACKEND', HuggingFaceBackend.name)).strip().lower()
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = wrap_backend(wrap_rate_limit(create_backend(key)))
+        return _backends[key]
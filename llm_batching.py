@@ -0,0 +1,244 @@
+"""
+LLM Request Batching Module
+===========================
+Micro-batching and request coalescing between HiringAssistant and its backend.
+
+Identical in-flight prompts share a single backend call (single-flight). When the
+backend supports batched generation, distinct prompts arriving within a short
+window are grouped into one generate_batch() call.
+
+Each call keeps its caller's rate-limit context (see rate_limiter). A shared call
+that is refused with RateLimitExceeded only fails for the session that made it;
+requests from other sessions are retried under their own quota.
+"""
+
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import serialization
+from llm_backends import LLMBackend
+from rate_limiter import RateLimitExceeded, current_context
+
+
+def _flow(context: Dict) -> Tuple[str, Optional[str]]:
+    """Rate-limit flow (tenant, session) of a request context"""
+    return str(context.get('tenant') or 'default'), context.get('session')
+
+
+class _Pending:
+    """A request waiting for the batch dispatcher"""
+    
+    __slots__ = ('key', 'request', 'future', 'context', 'flow')
+    
+    def __init__(self, key: str, request: Dict, future: Future, context: contextvars.Context, flow: tuple):
+        self.key = key
+        self.request = request
+        self.future = future
+        self.context = context
+        self.flow = flow
+
+
+class CoalescingBackend(LLMBackend):
+    """Backend wrapper that coalesces duplicate prompts and batches distinct ones"""
+    
+    name = 'coalescing'
+    
+    def __init__(self, backend: LLMBackend, max_batch_size: int = 8, max_wait_ms: float = 20.0):
+        """
+        Wrap a backend
+        
+        Args:
+            backend: Backend that performs generation
+            max_batch_size: Most requests sent in one generate_batch() call
+            max_wait_ms: Longest time a request waits for a batch to fill
+        """
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        
+        self._inflight: Dict[str, Tuple[Future, tuple]] = {}
+        self._pending: List[_Pending] = []
+        self._lock = threading.Lock()
+        self._pending_ready = threading.Condition(self._lock)
+        self._dispatcher: Optional[threading.Thread] = None
+        
+        self._metrics = {
+            'requests': 0,
+            'coalesced': 0,
+            'backend_calls': 0,
+            'backend_requests': 0,
+            'batches': 0
+        }
+    
+    @property
+    def supports_batching(self) -> bool:
+        return self.backend.supports_batching
+    
+    @staticmethod
+    def _request_key(messages: List[Dict], max_tokens: int, temperature: float) -> str:
+        """Hash a request so identical prompts map to the same key"""
+        payload = serialization.dumpb([messages, max_tokens, temperature], sort_keys=True)
+        return hashlib.sha256(payload).hexdigest()
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        # Token streams belong to one client, so they bypass coalescing
+        return self.backend.stream(messages, max_tokens=max_tokens, temperature=temperature)
+    
+    def generate(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> str:
+        key = self._request_key(messages, max_tokens, temperature)
+        request = {'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature}
+        flow = _flow(current_context())
+        
+        with self._lock:
+            self._metrics['requests'] += 1
+        
+        while True:
+            future, owner = self._submit(key, request, flow)
+            try:
+                return future.result()
+            except RateLimitExceeded:
+                if owner == flow:
+                    raise
+                # Refused under another session's quota: try again under this caller's own
+    
+    def _submit(self, key: str, request: Dict, flow: tuple) -> Tuple[Future, tuple]:
+        """
+        Join the in-flight call for a request, or start one
+        
+        Returns:
+            tuple: (future for the result, flow of the caller that started the call)
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                self._metrics['coalesced'] += 1
+                return entry
+            
+            future = Future()
+            self._inflight[key] = (future, flow)
+            
+            if self.backend.supports_batching:
+                self._pending.append(_Pending(key, request, future, contextvars.copy_context(), flow))
+                self._ensure_dispatcher()
+                self._pending_ready.notify()
+                return future, flow
+        
+        # No batching available: the first caller runs the request for everyone waiting on it
+        try:
+            self._record_call(1)
+            result, error = self.backend.generate(**request), None
+        except Exception as e:
+            result, error = None, e
+        
+        # Leave the in-flight table first, so callers retrying after an error start a new call
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return future, flow
+    
+    def generate_batch(self, requests: List[Dict]) -> List[str]:
+        return [self.generate(**request) for request in requests]
+    
+    def _record_call(self, size: int):
+        """Count one backend call covering `size` requests"""
+        with self._lock:
+            self._metrics['backend_calls'] += 1
+            self._metrics['backend_requests'] += size
+            if size > 1:
+                self._metrics['batches'] += 1
+    
+    def _ensure_dispatcher(self):
+        """Start the batch dispatcher thread (caller holds the lock)"""
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='llm-batcher', daemon=True)
+            self._dispatcher.start()
+    
+    def _next_batch(self) -> List[_Pending]:
+        """Wait for pending requests, then up to max_wait for the batch to fill"""
+        with self._lock:
+            while not self._pending:
+                self._pending_ready.wait()
+            
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._pending_ready.wait(remaining)
+            
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+    
+    def _dispatch_loop(self):
+        """Send pending requests to the backend in batches"""
+        while True:
+            batch = self._next_batch()
+            retry = []
+            try:
+                self._record_call(len(batch))
+                # The batch is admitted under the rate-limit context of its first request
+                results = batch[0].context.run(self.backend.generate_batch, [item.request for item in batch])
+                outcomes = [(item, result, None) for item, result in zip(batch, results)]
+            except RateLimitExceeded as e:
+                # Only the first request's quota refused the call; other sessions go round again
+                retry = [item for item in batch if item.flow != batch[0].flow]
+                outcomes = [(item, None, e) for item in batch if item.flow == batch[0].flow]
+            except Exception as e:
+                outcomes = [(item, None, e) for item in batch]
+            
+            with self._lock:
+                for item, _, _ in outcomes:
+                    self._inflight.pop(item.key, None)
+                self._pending[:0] = retry
+            
+            for item, result, error in outcomes:
+                if error is not None:
+                    item.future.set_exception(error)
+                else:
+                    item.future.set_result(result)
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get coalescing and batching metrics
+        
+        Returns:
+            dict: Counters plus the backend calls saved and average batch size
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        
+        metrics['calls_saved'] = metrics['requests'] - metrics['backend_calls']
+        metrics['amplification'] = round(metrics['requests'] / metrics['backend_calls'], 2) if metrics['backend_calls'] else 0.0
+        metrics['avg_batch_size'] = round(metrics['backend_requests'] / metrics['backend_calls'], 2) if metrics['backend_calls'] else 0.0
+        return metrics
+
+
+def wrap_backend(backend: LLMBackend) -> LLMBackend:
+    """
+    Wrap a backend with coalescing unless disabled by configuration
+    
+    Reads LLM_COALESCE (set to 0 to disable), LLM_BATCH_MAX_SIZE and LLM_BATCH_MAX_WAIT_MS.
+    
+    Args:
+        backend: Backend that performs generation
+        
+    Returns:
+        LLMBackend: Wrapped (or unchanged) backend
+    """
+    if os.getenv('LLM_COALESCE', '1').strip().lower() in ('0', 'false', 'no', 'off'):
+        return backend
+    
+    return CoalescingBackend(
+        backend,
+        max_batch_size=int(os.getenv('LLM_BATCH_MAX_SIZE', '8')),
+        max_wait_ms=float(os.getenv('LLM_BATCH_MAX_WAIT_MS', '20'))
+    )
@@ -0,0 +1,166 @@
+"""
+Recruiter Analytics
+===================
+Admin page of the multipage app: conversation funnel (from telemetry),
+saved applications per field reached, tech-stack frequency, experience
+distribution and positions over time.
+
+The page reads the partition's precomputed rollups (see analytics), never the
+candidate records, so a render costs the same at 100 or 100k candidates.
+Derived tables are cached on (tenant, rollups version) and rebuilt only after
+the data changes. The page is disabled unless ANALYTICS_PASSWORD is set.
+"""
+
+import hmac
+import os
+import time
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from analytics import EXPERIENCE_RANGES
+from telemetry import get_telemetry
+from tenants import DEFAULT_TENANT, get_tenant_registry
+
+load_dotenv()
+
+st.set_page_config(
+    page_title="TalentScout - Analytics",
+    page_icon="TS",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_tables(tenant: str, version: int, _snapshot: dict) -> dict:
+    """
+    Turn a rollups snapshot into chart tables (cached per tenant and data version)
+    
+    Tables are column dicts (column name -> list of values), which st.bar_chart
+    and st.line_chart take directly.
+    
+    Args:
+        tenant: Tenant the snapshot belongs to (cache key)
+        version: Rollups version of the snapshot (cache key)
+        _snapshot: CandidateRollups.snapshot() (not hashed)
+        
+    Returns:
+        dict: Column tables for each chart
+    """
+    statistics = _snapshot['statistics']
+    funnel = _snapshot['funnel']
+    tech = sorted(statistics['tech_stack_frequency'].items(), key=lambda item: -item[1])
+    positions = sorted(statistics['positions'].items(), key=lambda item: -item[1])
+    over_time = _snapshot['positions_over_time']
+    months = sorted(over_time)
+    return {
+        'total': statistics['total_candidates'],
+        'funnel': {
+            'stage': [row['stage'] for row in funnel],
+            'reached': [row['reached'] for row in funnel],
+            'dropped': [row['dropped'] for row in funnel]
+        },
+        'tech': {'technology': [name for name, _ in tech], 'candidates': [count for _, count in tech]},
+        'experience': {
+            'experience': list(EXPERIENCE_RANGES),
+            'candidates': [statistics['experience_ranges'].get(name, 0) for name in EXPERIENCE_RANGES]
+        },
+        'positions': [name for name, _ in positions],
+        'over_time': {
+            'month': months,
+            **{position: [over_time[month].get(position, 0) for month in months] for position, _ in positions}
+        }
+    }
+
+
+def authorized() -> bool:
+    """Ask for ANALYTICS_PASSWORD once per session"""
+    password = os.getenv('ANALYTICS_PASSWORD')
+    if not password:
+        # The page sits in the chat app's sidebar, so candidates can open it
+        st.info("Set ANALYTICS_PASSWORD to enable this page.")
+        return False
+    if st.session_state.get('analytics_authorized'):
+        return True
+    entered = st.text_input("Analytics password", type="password")
+    if entered and hmac.compare_digest(entered, password):
+        st.session_state.analytics_authorized = True
+        st.rerun()
+    if entered:
+        st.error("Incorrect password")
+    return False
+
+
+def main():
+    """Render the dashboard"""
+    st.title("Recruiter Analytics")
+    if not authorized():
+        return
+    
+    registry = get_tenant_registry()
+    tenants = registry.tenants()
+    with st.sidebar:
+        tenant = DEFAULT_TENANT
+        if len(tenants) > 1:
+            tenant = st.selectbox("Client", tenants)
+        top_n = st.slider("Technologies shown", min_value=5, max_value=50, value=15)
+    
+    rollups = registry.get(tenant).rollups
+    snapshot = rollups.snapshot()
+    tables = build_tables(tenant, snapshot['version'], snapshot)
+    
+    funnel = tables['funnel']
+    completed = funnel['reached'][-1] if funnel['reached'] else 0
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Candidates", f"{tables['total']:,}")
+    col2.metric("Completed screening", f"{completed:,}")
+    col3.metric("Completion rate", f"{completed / tables['total']:.0%}" if tables['total'] else "-")
+    
+    st.subheader("Conversation funnel")
+    telemetry = get_telemetry()
+    if telemetry is None:
+        st.info("Set TELEMETRY_DB to measure where candidates leave the conversation, "
+                "including before an email is collected.")
+    else:
+        hours = st.select_slider("Window", options=[24, 24 * 7, 24 * 30, 24 * 365], value=24 * 7,
+                                 format_func=lambda value: f"{value // 24} days")
+        stages = telemetry.stage_summary(since=time.time() - hours * 3600, tenant=tenant)
+        if not stages:
+            st.info("No conversations in this window.")
+        else:
+            columns = ['entered', 'completed', 'validation_failed', 'exited', 'avg_duration_ms',
+                       'retries_per_completion']
+            table = {'stage': [row['stage'] for row in stages],
+                     **{column: [row[column] for row in stages] for column in columns}}
+            st.bar_chart(table, x='stage', y=['entered', 'completed', 'exited'])
+            st.dataframe(table, hide_index=True, use_container_width=True)
+    
+    st.subheader("Saved applications by last field reached")
+    st.caption("Applications are saved when the candidate leaves after giving an email, "
+               "so drop-off before the email is only visible in the conversation funnel above.")
+    st.bar_chart(funnel, x='stage', y=['reached', 'dropped'])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Tech stack frequency")
+        tech = tables['tech']
+        st.bar_chart({column: values[:top_n] for column, values in tech.items()}, x='technology', y='candidates')
+    with col2:
+        st.subheader("Experience distribution")
+        st.bar_chart(tables['experience'], x='experience', y='candidates')
+    
+    st.subheader("Positions over time")
+    over_time = tables['over_time']
+    if not over_time['month']:
+        st.info("No applications yet.")
+    else:
+        selected = st.multiselect("Positions", tables['positions'], default=tables['positions'][:5])
+        if selected:
+            st.line_chart({column: over_time[column] for column in ['month'] + selected}, x='month', y=selected)
+    
+    st.caption(f"Data version {snapshot['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Profiling
+=========
+Admin page of the multipage app: start and stop profiling of this process
+and download the files (see profiling).
+
+The page runs in the chat app's process, so it profiles live conversations.
+It is disabled unless PROFILING_PASSWORD is set.
+"""
+
+import hmac
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from profiling import get_profiler
+
+load_dotenv()
+
+st.set_page_config(
+    page_title="TalentScout - Profiling",
+    page_icon="TS",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+
+def authorized() -> bool:
+    """Ask for PROFILING_PASSWORD once per session"""
+    password = os.getenv('PROFILING_PASSWORD')
+    if not password:
+        st.info("Set PROFILING_PASSWORD to enable this page.")
+        return False
+    if st.session_state.get('profiling_authorized'):
+        return True
+    entered = st.text_input("Profiling password", type="password")
+    if entered and hmac.compare_digest(entered, password):
+        st.session_state.profiling_authorized = True
+        st.rerun()
+    if entered:
+        st.error("Incorrect password")
+    return False
+
+
+def main():
+    """Render the controls"""
+    st.title("Profiling")
+    if not authorized():
+        return
+    
+    profiler = get_profiler()
+    status = profiler.status()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.subheader("Sampling")
+        if status['sampling']:
+            st.write(f"Running, {status['samples']:,} samples")
+            if st.button("Stop and write"):
+                profiler.stop_sampling()
+                st.rerun()
+        else:
+            seconds = st.number_input("Seconds", min_value=1, max_value=3600, value=30)
+            requests_only = st.checkbox("Request threads only", value=True)
+            if st.button("Start sampling"):
+                profiler.start_sampling(float(seconds), requests_only=requests_only)
+                st.rerun()
+    
+    with col2:
+        st.subheader("cProfile window")
+        if status['cprofile_remaining']:
+            st.write(f"{status['cprofile_remaining']} requests to go")
+            if st.button("Close window now"):
+                profiler.stop_cprofile()
+                st.rerun()
+        else:
+            requests = st.number_input("Requests", min_value=1, max_value=10000, value=50)
+            if st.button("Profile next requests"):
+                profiler.start_cprofile(int(requests))
+                st.rerun()
+    
+    with col3:
+        st.subheader("Memory")
+        if st.button("Take tracemalloc snapshot"):
+            st.success(f"Wrote {profiler.tracemalloc_snapshot()}")
+        if status['tracemalloc'] and st.button("Stop tracing"):
+            profiler.stop_tracemalloc()
+            st.rerun()
+    
+    st.subheader("Files")
+    files = profiler.files()
+    if not files:
+        st.info("No profiles yet.")
+    for path in files[:50]:
+        st.download_button(f"{path.name} ({path.stat().st_size / 1024:.0f} KiB)", data=path.read_bytes(),
+                           file_name=path.name, key=str(path))
+
+
+if __name__ == "__main__":
+    main()
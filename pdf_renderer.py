@@ -0,0 +1,260 @@
+"""
+PDF Renderer Module
+===================
+Candidate profile PDFs with styles and layout built once per process.
+
+reportlab is imported and the stylesheet, paragraph styles and table style are
+constructed on first use only; every later render reuses them. Batches of
+profiles can be rendered into one document or a zip, optionally in a process pool.
+"""
+
+import io
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+
+# Batches smaller than this are rendered in-process even when a pool is requested
+MIN_POOL_BATCH = 32
+
+
+@lru_cache(maxsize=1)
+def get_pdf_template() -> Dict:
+    """
+    Build fonts, styles and layout settings once per process
+    
+    Returns:
+        dict: reportlab modules and prebuilt styles shared by every render
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import inch
+    
+    styles = getSampleStyleSheet()
+    
+    return {
+        'page_size': letter,
+        'margins': {'topMargin': 0.5 * inch, 'bottomMargin': 0.5 * inch},
+        'col_widths': [2.5 * inch, 4 * inch],
+        'title_spacer': 0.3 * inch,
+        'footer_spacer': 0.5 * inch,
+        'title_style': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#00ffff'),
+            spaceAfter=30,
+            alignment=1  # Center
+        ),
+        'footer_style': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.grey,
+            alignment=1
+        ),
+        'table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00ffff')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#0a0e27')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+        ]),
+        'SimpleDocTemplate': SimpleDocTemplate,
+        'Table': Table,
+        'Paragraph': Paragraph,
+        'Spacer': Spacer,
+        'PageBreak': PageBreak
+    }
+
+
+def _profile_flowables(data: Dict, template: Dict) -> List:
+    """Build the flowables for one candidate profile"""
+    Paragraph = template['Paragraph']
+    Spacer = template['Spacer']
+    
+    elements = [
+        Paragraph("TalentScout AI - Candidate Profile", template['title_style']),
+        Spacer(1, template['title_spacer'])
+    ]
+    
+    table_data = [['Field', 'Value']]
+    for key, value in data.items():
+        field_name = key.replace('_', ' ').title()
+        if isinstance(value, list):
+            field_value = ', '.join(map(str, value))
+        else:
+            field_value = str(value)
+        table_data.append([field_name, field_value])
+    
+    table = template['Table'](table_data, colWidths=template['col_widths'])
+    table.setStyle(template['table_style'])
+    
+    elements.append(table)
+    elements.append(Spacer(1, template['footer_spacer']))
+    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                              template['footer_style']))
+    return elements
+
+
+def _build(elements: List, template: Dict) -> bytes:
+    """Lay out flowables into a PDF document in memory"""
+    buffer = io.BytesIO()
+    doc = template['SimpleDocTemplate'](buffer, pagesize=template['page_size'], **template['margins'])
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_candidate_pdf(data: Dict) -> bytes:
+    """
+    Render a single candidate profile
+    
+    Args:
+        data: Candidate data
+        
+    Returns:
+        bytes: PDF document
+    """
+    template = get_pdf_template()
+    return _build(_profile_flowables(data, template), template)
+
+
+def render_profiles_document(candidates: Iterable[Dict]) -> bytes:
+    """
+    Render many candidate profiles into one document, one profile per page
+    
+    Args:
+        candidates: Candidate records
+        
+    Returns:
+        bytes: PDF document
+    """
+    template = get_pdf_template()
+    elements = []
+    for data in candidates:
+        if elements:
+            elements.append(template['PageBreak']())
+        elements.extend(_profile_flowables(data, template))
+    return _build(elements, template)
+
+
+def _profile_filename(data: Dict, position: int) -> str:
+    """File name for a profile inside a zip archive"""
+    return f"{data.get('candidate_id') or f'candidate_{position}'}.pdf"
+
+
+def render_profiles_zip(candidates: Iterable[Dict], processes: Optional[int] = None) -> bytes:
+    """
+    Render candidate profiles as separate PDFs inside a zip archive
+    
+    Args:
+        candidates: Candidate records
+        processes: Worker processes for rendering (None or 1 renders in-process)
+        
+    Returns:
+        bytes: Zip archive
+    """
+    candidates = list(candidates)
+    buffer = io.BytesIO()
+    
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for position, (data, pdf) in enumerate(zip(candidates, render_batch(candidates, processes))):
+            archive.writestr(_profile_filename(data, position), pdf)
+    
+    return buffer.getvalue()
+
+
+def render_batch(candidates: List[Dict], processes: Optional[int] = None) -> List[bytes]:
+    """
+    Render one PDF per candidate, optionally across a process pool
+    
+    Each worker process builds the template once and reuses it for its share
+    of the batch. Small batches stay in-process since pool start-up dominates.
+    
+    Args:
+        candidates: Candidate records
+        processes: Worker processes (None or 1 renders in-process)
+        
+    Returns:
+        list: PDF documents in input order
+    """
+    if not processes or processes <= 1 or len(candidates) < MIN_POOL_BATCH:
+        return [render_candidate_pdf(data) for data in candidates]
+    
+    chunksize = max(1, len(candidates) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(render_candidate_pdf, candidates, chunksize=chunksize))
+
+
+def benchmark(count: int = 200, processes: Optional[int] = None) -> Dict:
+    """
+    Measure rendering throughput
+    
+    Args:
+        count: Number of profiles to render
+        processes: Worker processes for the batch run
+        
+    Returns:
+        dict: PDFs per second for the first render, warm renders and the batch run
+    """
+    sample = {
+        'name': 'Benchmark Candidate',
+        'email': 'benchmark@example.com',
+        'phone': '123-456-7890',
+        'experience': '5 years',
+        'position': 'Software Engineer',
+        'location': 'Remote',
+        'tech_stack': ['Python', 'Django', 'PostgreSQL', 'Docker']
+    }
+    candidates = [{**sample, 'candidate_id': f'bench{i:06d}'} for i in range(count)]
+    
+    get_pdf_template.cache_clear()
+    start = time.perf_counter()
+    render_candidate_pdf(sample)
+    cold = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for data in candidates:
+        render_candidate_pdf(data)
+    warm = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    render_batch(candidates, processes)
+    batch = time.perf_counter() - start
+    
+    return {
+        'count': count,
+        'processes': processes or 1,
+        'cold_pdfs_per_second': round(1 / cold, 2),
+        'warm_pdfs_per_second': round(count / warm, 2),
+        'batch_pdfs_per_second': round(count / batch, 2)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark candidate PDF rendering")
+    parser.add_argument('--count', type=int, default=200, help='Profiles to render')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes for the batch run')
+    args = parser.parse_args()
+    
+    for key, value in benchmark(args.count, args.processes).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,440 @@
+"""
+Profiling Module
+================
+Opt-in profiling of a running node, switched on without a redeploy.
+
+Three tools, each writing files to PROFILE_DIR (default profiles/):
+
+- sampling: a background thread reads every thread's stack each
+  PROFILE_SAMPLE_MS and writes collapsed stacks when stopped
+  (sample-*.folded, one "frame;frame;... count" line per stack, the format of
+  `py-spy record --format raw`; feed it to flamegraph.pl or speedscope).
+  With requests_only, only threads inside a profiled request are sampled.
+- cProfile window: deterministic profiling of the next N requests, written as
+  pstats (cprofile-*.prof, for snakeviz or `python -m pstats`) plus collapsed
+  stacks of the call graph (cprofile-*.folded).
+- tracemalloc: snapshots (tracemalloc-*.snapshot, loadable with
+  tracemalloc.Snapshot.load) and the top allocation growth since the
+  previous snapshot (tracemalloc-*.txt).
+
+A request is one process_input() call or one Streamlit turn; nested requests
+count once. When nothing is running, a request costs one attribute check.
+
+Start from the environment at process start:
+
+    PROFILE_MODE=sample|cprofile|tracemalloc
+    PROFILE_SECONDS=30      sampling duration
+    PROFILE_REQUESTS=50     cProfile window
+
+or at runtime from the admin page (pages/2_Profiling.py) or get_profiler().
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def _collapse(frame) -> str:
+    """Stack of a frame, root first, as one collapsed line"""
+    labels = []
+    while frame is not None:
+        labels.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def pstats_to_folded(stats: pstats.Stats) -> Counter:
+    """
+    Approximate collapsed stacks from a cProfile call graph
+    
+    cProfile keeps caller/callee pairs rather than full stacks, so each
+    function's own time is attributed along its heaviest caller chain.
+    
+    Args:
+        stats: Loaded profile
+        
+    Returns:
+        Counter: Collapsed stack -> own time in microseconds
+    """
+    entries = stats.stats
+    folded = Counter()
+    for func, (_, _, own_time, _, callers) in entries.items():
+        chain = [func]
+        seen = {func}
+        current = callers
+        while current:
+            caller = max(current, key=lambda c: current[c][3])
+            if caller in seen:
+                break
+            chain.append(caller)
+            seen.add(caller)
+            current = entries.get(caller, (0, 0, 0, 0, {}))[4]
+        labels = [f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in reversed(chain)]
+        micros = int(own_time * 1e6)
+        if micros:
+            folded[';'.join(labels)] += micros
+    return folded
+
+
+def _write_folded(path: Path, stacks: Counter):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """Sampling, cProfile windows and tracemalloc snapshots for one process"""
+    
+    def __init__(self, output_dir: str = "profiles", sample_interval: float = 0.005):
+        """
+        Initialize an idle profiler
+        
+        Args:
+            output_dir: Directory receiving profile files (created on first write)
+            sample_interval: Seconds between stack samples
+        """
+        self.output_dir = Path(output_dir)
+        self.sample_interval = sample_interval
+        # Checked on every request; True only while a tool needs the request hook
+        self.active = False
+        
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._request_threads: Dict[int, int] = {}
+        
+        self._sampler: Optional[threading.Thread] = None
+        self._sampling_stop = threading.Event()
+        self._requests_only = False
+        self._samples = Counter()
+        self._sample_count = 0
+        
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._cprofile_remaining = 0
+        self._cprofile_busy = False
+        
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+    
+    def _path(self, kind: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return self.output_dir / f"{kind}-{stamp}-{os.getpid()}{suffix}"
+    
+    def _update_active(self):
+        self.active = self._cprofile is not None or (self._sampler is not None and self._requests_only)
+    
+    @contextmanager
+    def request(self):
+        """Mark a request: counted by the cProfile window and eligible for request-only sampling"""
+        depth = getattr(self._local, 'depth', 0)
+        if not self.active or depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+        
+        thread_id = threading.get_ident()
+        profile = None
+        with self._lock:
+            self._request_threads[thread_id] = self._request_threads.get(thread_id, 0) + 1
+            # cProfile hooks one thread at a time; concurrent requests are left out of the window
+            if self._cprofile is not None and not self._cprofile_busy:
+                profile = self._cprofile
+                self._cprofile_busy = True
+        
+        self._local.depth = 1
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self._local.depth = 0
+            finish = False
+            with self._lock:
+                if self._request_threads[thread_id] > 1:
+                    self._request_threads[thread_id] -= 1
+                else:
+                    del self._request_threads[thread_id]
+                if profile is not None:
+                    self._cprofile_busy = False
+                    self._cprofile_remaining -= 1
+                    finish = self._cprofile_remaining <= 0
+            if finish:
+                self.stop_cprofile()
+    
+    # Sampling
+    
+    def start_sampling(self, seconds: Optional[float] = None, requests_only: bool = False) -> bool:
+        """
+        Start the stack sampler
+        
+        Args:
+            seconds: Stop and write after this long (None: until stop_sampling())
+            requests_only: Sample only threads inside a request
+            
+        Returns:
+            bool: False if sampling was already running
+        """
+        with self._lock:
+            if self._sampler is not None:
+                return False
+            self._samples = Counter()
+            self._sample_count = 0
+            self._requests_only = requests_only
+            self._sampling_stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, args=(seconds,),
+                                             name='profiler-sampler', daemon=True)
+            self._update_active()
+        self._sampler.start()
+        return True
+    
+    def _sample_loop(self, seconds: Optional[float]):
+        """Collect stacks until stopped or the duration elapses"""
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds if seconds else None
+        names = {}
+        while not self._sampling_stop.wait(self.sample_interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            frames = sys._current_frames()
+            if self._requests_only:
+                with self._lock:
+                    wanted = set(self._request_threads)
+            else:
+                wanted = frames.keys()
+            for thread_id in wanted:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self._samples[f"{names.get(thread_id, thread_id)};{_collapse(frame)}"] += 1
+            self._sample_count += 1
+        if deadline is not None and not self._sampling_stop.is_set():
+            self._write_samples()
+    
+    def _write_samples(self) -> Optional[Path]:
+        with self._lock:
+            if self._sampler is None:
+                return None
+            samples, self._samples = self._samples, Counter()
+            self._sampler = None
+            self._update_active()
+        path = self._path('sample', '.folded')
+        _write_folded(path, samples)
+        return path
+    
+    def stop_sampling(self) -> Optional[Path]:
+        """
+        Stop the sampler and write its collapsed stacks
+        
+        Returns:
+            Path: Written .folded file, or None if sampling was not running
+        """
+        sampler = self._sampler
+        if sampler is None:
+            return None
+        self._sampling_stop.set()
+        if sampler is not threading.current_thread():
+            sampler.join()
+        return self._write_samples()
+    
+    # Deterministic profiling
+    
+    def start_cprofile(self, requests: int = 50) -> bool:
+        """
+        Profile the next requests with cProfile
+        
+        Args:
+            requests: Window size; the profile is written once it is complete
+            
+        Returns:
+            bool: False if a window was already open
+        """
+        with self._lock:
+            if self._cprofile is not None:
+                return False
+            self._cprofile = cProfile.Profile()
+            self._cprofile_remaining = max(1, requests)
+            self._update_active()
+        return True
+    
+    def stop_cprofile(self) -> Optional[Path]:
+        """
+        Close the cProfile window early (or on completion) and write it
+        
+        Returns:
+            Path: Written .prof file, or None if no window was open
+        """
+        with self._lock:
+            profile = self._cprofile
+            if profile is None or self._cprofile_busy:
+                # A request still holds the profiler; it closes the window when done
+                if profile is not None:
+                    self._cprofile_remaining = 0
+                return None
+            self._cprofile = None
+            self._update_active()
+        
+        path = self._path('cprofile', '.prof')
+        profile.dump_stats(str(path))
+        try:
+            stats = pstats.Stats(str(path))
+        except TypeError:
+            # Nothing was recorded
+            return path
+        _write_folded(path.with_suffix('.folded'), pstats_to_folded(stats))
+        return path
+    
+    # Memory
+    
+    def tracemalloc_snapshot(self, nframes: int = 25, top: int = 30) -> Path:
+        """
+        Take a tracemalloc snapshot (starting tracing if needed)
+        
+        The first call only starts tracing and records the baseline; later
+        calls also write the top allocation growth since the previous snapshot.
+        
+        Args:
+            nframes: Frames kept per allocation when tracing starts
+            top: Lines in the growth report
+            
+        Returns:
+            Path: Written .snapshot file
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        path = self._path('tracemalloc', '.snapshot')
+        snapshot.dump(str(path))
+        
+        lines = [f"traced: {tracemalloc.get_traced_memory()[0] / 1024:.0f} KiB "
+                 f"(peak {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB)"]
+        if self._last_snapshot is not None:
+            lines += [str(stat) for stat in snapshot.compare_to(self._last_snapshot, 'lineno')[:top]]
+        else:
+            lines += [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        path.with_suffix('.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        self._last_snapshot = snapshot
+        return path
+    
+    def stop_tracemalloc(self):
+        """Stop tracing allocations and drop the baseline"""
+        tracemalloc.stop()
+        self._last_snapshot = None
+    
+    def status(self) -> Dict:
+        """
+        Current profiling state
+        
+        Returns:
+            dict: sampling, samples, cprofile_remaining, tracemalloc and the written files
+        """
+        return {
+            'sampling': self._sampler is not None,
+            'samples': self._sample_count,
+            'cprofile_remaining': self._cprofile_remaining if self._cprofile is not None else 0,
+            'tracemalloc': tracemalloc.is_tracing(),
+            'files': self.files()
+        }
+    
+    def files(self) -> List[Path]:
+        """Profile files written so far, newest first"""
+        if not self.output_dir.is_dir():
+            return []
+        return sorted((path for path in self.output_dir.iterdir() if path.is_file()),
+                      key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """
+    Get the process profiler, starting PROFILE_MODE on first use
+    
+    Returns:
+        Profiler: Shared profiler writing to PROFILE_DIR
+    """
+    global _profiler
+    if _profiler is not None:
+        return _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            profiler = Profiler(os.getenv('PROFILE_DIR', 'profiles'),
+                                float(os.getenv('PROFILE_SAMPLE_MS', '5')) / 1000)
+            mode = os.getenv('PROFILE_MODE', '').strip().lower()
+            if mode == 'sample':
+                profiler.start_sampling(float(os.getenv('PROFILE_SECONDS', '30')))
+            elif mode == 'cprofile':
+                profiler.start_cprofile(int(os.getenv('PROFILE_REQUESTS', '50')))
+            elif mode == 'tracemalloc':
+                profiler.tracemalloc_snapshot()
+            _profiler = profiler
+        return _profiler
+
+
+def profiled(func):
+    """Run each call of the decorated function as a profiler request"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler or get_profiler()
+        if not profiler.active:
+            return func(*args, **kwargs)
+        with profiler.request():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Profile replayed conversations offline")
+    parser.add_argument('--mode', choices=['sample', 'cprofile', 'tracemalloc'], default='cprofile')
+    parser.add_argument('--output-dir', default=os.getenv('PROFILE_DIR', 'profiles'))
+    parser.add_argument('--log-dir', default=os.getenv('TRANSCRIPT_LOG_DIR', 'transcripts'))
+    parser.add_argument('--limit', type=int, default=None, help='Maximum sessions to replay')
+    args = parser.parse_args()
+    
+    # The engine's hooks use the shared profiler, so configure that one
+    os.environ['PROFILE_DIR'] = args.output_dir
+    os.environ.pop('PROFILE_MODE', None)
+    import profiling
+    from chatbot_engine import HiringAssistant
+    from transcript_log import OfflineBackend, TranscriptLog, replay
+    
+    profiler = profiling.get_profiler()
+    if args.mode == 'sample':
+        profiler.start_sampling(requests_only=True)
+    elif args.mode == 'cprofile':
+        profiler.start_cprofile(sys.maxsize)
+    else:
+        profiler.tracemalloc_snapshot()
+    
+    # Profiled turns must not land in production telemetry or the shared reply cache
+    assistant = HiringAssistant(backend=OfflineBackend(), record_usage=False)
+    summary = replay(TranscriptLog(args.log_dir), assistant, limit=args.limit)
+    print(f"replayed {summary['turns']} turns from {summary['sessions']} sessions")
+    
+    if args.mode == 'sample':
+        print(f"wrote {profiler.stop_sampling()}")
+    elif args.mode == 'cprofile':
+        print(f"wrote {profiler.stop_cprofile()}")
+    else:
+        print(f"wrote {profiler.tracemalloc_snapshot()}")
@@ -0,0 +1,498 @@
+"""
+Question Bank Module
+====================
+Pre-generated, graded technical questions per technology and difficulty.
+
+The bank is built offline (python question_bank.py build) from the assistant's
+tech vocabulary plus stacks observed in the candidate store, and saved as a
+single versioned binary file:
+
+    b"TSQB" | format version (uint16) | header length (uint32) | JSON header | UTF-8 question blob
+
+The JSON header maps technology -> difficulty -> [(offset, length), ...] into the
+blob. Readers memory-map the file, so every worker process shares one copy of
+the question text through the OS page cache. Template questions keep a {tech}
+placeholder that is filled with the candidate's own spelling when assembled.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import serialization
+from utils import extract_numbered_items
+
+
+MAGIC = b'TSQB'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<4sHI')
+
+DIFFICULTIES = ('beginner', 'intermediate', 'advanced')
+
+DEFAULT_BANK_PATH = 'question_bank.bin'
+
+# Common spellings mapped onto the assistant's tech vocabulary
+TECH_ALIASES = {
+    'golang': 'go',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'angularjs': 'angular',
+    'node': 'node.js',
+    'nodejs': 'node.js',
+    'nextjs': 'next.js',
+    'postgres': 'postgresql',
+    'mongo': 'mongodb',
+    'k8s': 'kubernetes',
+    'sklearn': 'scikit-learn',
+    'cpp': 'c++',
+    'csharp': 'c#',
+    'expressjs': 'express',
+    'express.js': 'express'
+}
+
+# Offline templates used when the bank is built without an LLM
+QUESTION_TEMPLATES = {
+    'languages': {
+        'beginner': [
+            "What are some key features of {tech} that make it suitable for your projects?",
+            "How do you handle errors and exceptions in {tech}?",
+            "Which built-in data structures in {tech} do you use most, and why?"
+        ],
+        'intermediate': [
+            "How do you manage dependencies and project structure in a {tech} codebase?",
+            "Describe how you would write and organize unit tests for a {tech} module.",
+            "How does memory management work in {tech}, and how has it affected your code?"
+        ],
+        'advanced': [
+            "How would you profile and optimize a slow {tech} service in production?",
+            "Explain the concurrency model of {tech} and the trade-offs you have run into.",
+            "What {tech} language features or idioms do you avoid in large codebases, and why?"
+        ]
+    },
+    'frameworks': {
+        'beginner': [
+            "Describe your experience building applications with {tech}. What was your most challenging project?",
+            "How is a typical {tech} project structured?",
+            "How do you handle configuration and environment settings in {tech}?"
+        ],
+        'intermediate': [
+            "How do you manage state or data flow in a {tech} application?",
+            "How do you test features built with {tech}?",
+            "What are common performance pitfalls in {tech} and how do you avoid them?"
+        ],
+        'advanced': [
+            "How would you scale a {tech} application to handle 10x its current traffic?",
+            "Describe a time you had to work around a limitation of {tech}.",
+            "How do you approach upgrading {tech} across a major version in a large project?"
+        ]
+    },
+    'databases': {
+        'beginner': [
+            "When would you choose {tech} over other databases?",
+            "How do you model a one-to-many relationship in {tech}?",
+            "How do you back up and restore data in {tech}?"
+        ],
+        'intermediate': [
+            "How do you optimize queries in {tech} for better performance?",
+            "How do you use indexes in {tech}, and what are their costs?",
+            "How do you handle schema or data migrations in {tech}?"
+        ],
+        'advanced': [
+            "How would you scale {tech} for high write throughput?",
+            "How does {tech} handle transactions and consistency, and how has that shaped your designs?",
+            "Describe how you diagnosed and fixed a production incident involving {tech}."
+        ]
+    },
+    'tools': {
+        'beginner': [
+            "How do you use {tech} in your day-to-day workflow?",
+            "What problem does {tech} solve in your projects?",
+            "Walk through setting up {tech} for a new project."
+        ],
+        'intermediate': [
+            "How do you integrate {tech} into a CI/CD pipeline?",
+            "How do you manage secrets and configuration when using {tech}?",
+            "What {tech} best practices does your team follow?"
+        ],
+        'advanced': [
+            "How would you troubleshoot a failing deployment that relies on {tech}?",
+            "How do you make {tech}-based infrastructure reproducible and secure?",
+            "Describe the largest system you have run with {tech} and its main operational challenges."
+        ]
+    },
+    'ml_frameworks': {
+        'beginner': [
+            "What kinds of tasks have you used {tech} for?",
+            "How do you prepare and load data for work in {tech}?",
+            "How do you evaluate results produced with {tech}?"
+        ],
+        'intermediate': [
+            "How do you debug a model or pipeline built with {tech} that performs poorly?",
+            "How do you make experiments with {tech} reproducible?",
+            "How do you handle datasets that do not fit in memory when using {tech}?"
+        ],
+        'advanced': [
+            "How would you deploy and monitor a {tech}-based model in production?",
+            "How do you optimize training or inference speed with {tech}?",
+            "Describe a difficult modelling problem you solved with {tech}."
+        ]
+    },
+    'other': {
+        'beginner': [
+            "How have you used {tech} in your recent work?",
+            "What do you like and dislike about working with {tech}?",
+            "How did you learn {tech}, and how do you keep your knowledge current?"
+        ],
+        'intermediate': [
+            "What are best practices when working with {tech}?",
+            "How do you test or validate work that involves {tech}?",
+            "What problems have you run into with {tech} and how did you solve them?"
+        ],
+        'advanced': [
+            "How would you introduce {tech} to a team or project that has not used it?",
+            "What are the limits of {tech}, and when would you choose an alternative?",
+            "Describe the most complex system you have built involving {tech}."
+        ]
+    }
+}
+
+
+def normalize_tech(name: str) -> str:
+    """
+    Normalize a technology name for bank lookups
+    
+    Args:
+        name: Technology as typed by a candidate
+        
+    Returns:
+        str: Canonical lowercase name
+    """
+    key = re.sub(r'\s+', ' ', (name or '').strip().lower())
+    return TECH_ALIASES.get(key, key)
+
+
+def difficulty_mix(experience: Optional[str], count: int) -> List[str]:
+    """
+    Pick difficulty levels for a question set based on years of experience
+    
+    Args:
+        experience: Experience string (e.g. "5 years")
+        count: Number of questions
+        
+    Returns:
+        list: Difficulty per question
+    """
+    match = re.search(r'(\d+\.?\d*)', experience or '')
+    years = float(match.group(1)) if match else 2.0
+    
+    if years < 2:
+        pattern = ['beginner', 'beginner', 'intermediate', 'beginner', 'intermediate']
+    elif years < 5:
+        pattern = ['beginner', 'intermediate', 'intermediate', 'advanced', 'intermediate']
+    else:
+        pattern = ['intermediate', 'advanced', 'intermediate', 'advanced', 'advanced']
+    
+    return [pattern[i % len(pattern)] for i in range(count)]
+
+
+class QuestionBank:
+    """Read-only, memory-mapped question bank"""
+    
+    def __init__(self, path: str):
+        """
+        Open a bank file
+        
+        Args:
+            path: Path to a bank built by build_question_bank()
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a question bank file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported question bank format version {version}")
+        
+        header_start = _PREAMBLE.size
+        header = serialization.loads(self._mmap[header_start:header_start + header_length])
+        
+        self.bank_version = header['bank_version']
+        self.built_at = header.get('built_at', '')
+        self.index: Dict[str, Dict[str, List[List[int]]]] = header['index']
+        self._blob_start = header_start + header_length
+    
+    def close(self):
+        """Release the memory map"""
+        self._mmap.close()
+    
+    def __contains__(self, tech: str) -> bool:
+        return normalize_tech(tech) in self.index
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def technologies(self) -> List[str]:
+        """List the technologies covered by the bank"""
+        return sorted(self.index)
+    
+    def iter_questions(self) -> Iterator[Dict]:
+        """
+        Iterate over every stored question
+        
+        Yields:
+            dict: Raw question text (with its {tech} placeholder), technology and difficulty
+        """
+        start = self._blob_start
+        for tech in sorted(self.index):
+            for difficulty, entries in self.index[tech].items():
+                for offset, length in entries:
+                    text = self._mmap[start + offset:start + offset + length].decode('utf-8')
+                    yield {'text': text, 'tech': tech, 'difficulty': difficulty}
+    
+    def get(self, tech: str, difficulty: str) -> List[str]:
+        """
+        Get the stored questions for a technology and difficulty
+        
+        Args:
+            tech: Technology name (aliases are resolved; used as written in the questions)
+            difficulty: One of DIFFICULTIES
+            
+        Returns:
+            list: Questions (empty if not covered)
+        """
+        entries = self.index.get(normalize_tech(tech), {}).get(difficulty, [])
+        start = self._blob_start
+        return [
+            self._mmap[start + offset:start + offset + length].decode('utf-8').replace('{tech}', tech)
+            for offset, length in entries
+        ]
+    
+    def assemble(self, tech_stack: List[str], experience: Optional[str] = None,
+                 count: int = 5) -> Tuple[List[str], List[str]]:
+        """
+        Assemble a personalized question set from the bank
+        
+        Questions rotate across the covered technologies, difficulty follows the
+        candidate's experience, and the pick within each level is seeded by the
+        stack so different candidates see different questions.
+        
+        Args:
+            tech_stack: Candidate's technologies
+            experience: Candidate's experience string
+            count: Maximum number of questions
+            
+        Returns:
+            tuple: (questions, technologies not covered by the bank)
+        """
+        covered, uncovered = [], []
+        for tech in tech_stack:
+            key = normalize_tech(tech)
+            if key in self.index:
+                if key not in [normalize_tech(t) for t in covered]:
+                    covered.append(tech)
+            else:
+                uncovered.append(tech)
+        
+        if not covered:
+            return [], uncovered
+        
+        seed = int(hashlib.md5('|'.join(sorted(normalize_tech(t) for t in tech_stack)).encode()).hexdigest()[:8], 16)
+        questions: List[str] = []
+        used = set()
+        
+        for position, difficulty in enumerate(difficulty_mix(experience, count)):
+            tech = covered[position % len(covered)]
+            options = self.get(tech, difficulty) or self.get(tech, 'intermediate')
+            for attempt in range(len(options)):
+                question = options[(seed + position + attempt) % len(options)]
+                if question not in used:
+                    used.add(question)
+                    questions.append(question)
+                    break
+        
+        return questions, uncovered
+
+
+_banks: Dict[str, Optional[QuestionBank]] = {}
+_banks_lock = threading.Lock()
+
+
+def get_question_bank(path: Optional[str] = None) -> Optional[QuestionBank]:
+    """
+    Open the shared question bank for this process
+    
+    Args:
+        path: Bank file (defaults to QUESTION_BANK_PATH, then question_bank.bin)
+        
+    Returns:
+        Optional[QuestionBank]: The bank, or None if no bank has been built
+    """
+    path = path or os.getenv('QUESTION_BANK_PATH', DEFAULT_BANK_PATH)
+    with _banks_lock:
+        if path not in _banks:
+            _banks[path] = QuestionBank(path) if os.path.exists(path) else None
+        return _banks[path]
+
+
+def _parse_numbered_questions(text: str) -> List[str]:
+    """Extract questions from a numbered LLM response"""
+    return [item.strip('* ') for item in extract_numbered_items(text, bullets=True)]
+
+
+def _generate_with_llm(backend, tech: str, difficulty: str, per_level: int) -> List[str]:
+    """Ask the LLM for graded questions about one technology"""
+    prompt = f"""You are an expert technical interviewer. Write {per_level} {difficulty}-level screening questions about {tech}.
+
+Requirements:
+1. Each question assesses practical, real-world knowledge
+2. Keep each question to one or two sentences
+3. Output only a numbered list, one question per line
+
+Questions:"""
+    response = backend.generate([{"role": "user", "content": prompt}], max_tokens=400, temperature=0.7)
+    return _parse_numbered_questions(response)[:per_level]
+
+
+def collect_technologies(tech_categories: Dict[str, List[str]], observed: Iterable[Dict] = (),
+                         min_observed: int = 2) -> Dict[str, str]:
+    """
+    Collect the technologies to cover, with their category
+    
+    Args:
+        tech_categories: Category -> technologies (HiringAssistant.tech_categories)
+        observed: Candidate records whose tech stacks extend the vocabulary
+        min_observed: Minimum candidates listing a technology for it to be included
+        
+    Returns:
+        dict: Normalized technology -> category
+    """
+    technologies = {}
+    for category, items in tech_categories.items():
+        for tech in items:
+            technologies.setdefault(normalize_tech(tech), category)
+    known = dict(technologies)
+    
+    counts = Counter()
+    for record in observed:
+        counts.update({normalize_tech(tech) for tech in record.get('tech_stack', []) or [] if tech})
+    
+    for tech, count in counts.items():
+        if count >= min_observed and tech not in technologies:
+            # Whole-token matches only, so "spring boot" is a framework but "cargo" is not Go
+            tokens = (normalize_tech(token) for token in re.split(r'[\s/_-]+', tech))
+            technologies[tech] = next((known[token] for token in tokens if token in known), 'other')
+    
+    return technologies
+
+
+def build_question_bank(output_path: str, technologies: Dict[str, str], backend=None,
+                        per_level: int = 3) -> Dict:
+    """
+    Generate and write a question bank file
+    
+    Args:
+        output_path: Destination bank file
+        technologies: Normalized technology -> category (see collect_technologies)
+        backend: Optional LLMBackend; templates are used when None or when a call fails
+        per_level: Questions per technology and difficulty
+        
+    Returns:
+        dict: Build summary with bank_version and question counts
+    """
+    blob = bytearray()
+    index: Dict[str, Dict[str, List[List[int]]]] = {}
+    llm_generated = 0
+    
+    for tech in sorted(technologies):
+        category = technologies[tech]
+        templates = QUESTION_TEMPLATES.get(category, QUESTION_TEMPLATES['other'])
+        
+        for difficulty in DIFFICULTIES:
+            questions = []
+            if backend is not None:
+                try:
+                    questions = _generate_with_llm(backend, tech, difficulty, per_level)
+                    llm_generated += len(questions)
+                except Exception:
+                    questions = []
+            if not questions:
+                questions = templates[difficulty][:per_level]
+            
+            for question in questions:
+                encoded = question.encode('utf-8')
+                index.setdefault(tech, {}).setdefault(difficulty, []).append([len(blob), len(encoded)])
+                blob.extend(encoded)
+    
+    bank_version = hashlib.sha256(bytes(blob)).hexdigest()[:12]
+    header = serialization.dumpb({
+        'bank_version': bank_version,
+        'built_at': datetime.now().isoformat(),
+        'index': index
+    })
+    
+    # Write to a temporary file first so readers never map a half-written bank
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(blob)
+    os.replace(temp_path, output_path)
+    
+    return {
+        'bank_version': bank_version,
+        'technologies': len(index),
+        'questions': sum(len(entries) for levels in index.values() for entries in levels.values()),
+        'llm_generated': llm_generated,
+        'size_bytes': os.path.getsize(output_path)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build or inspect the technical question bank")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build_parser = subparsers.add_parser('build', help='Build the question bank')
+    build_parser.add_argument('--output', default=os.getenv('QUESTION_BANK_PATH', DEFAULT_BANK_PATH))
+    build_parser.add_argument('--data-dir', default='candidate_data', help='Candidate store for observed stacks')
+    build_parser.add_argument('--min-observed', type=int, default=2, help='Minimum candidates per observed technology')
+    build_parser.add_argument('--per-level', type=int, default=3, help='Questions per technology and difficulty')
+    build_parser.add_argument('--use-llm', action='store_true', help='Generate questions with the configured LLM backend')
+    
+    info_parser = subparsers.add_parser('info', help='Show bank version and coverage')
+    info_parser.add_argument('--path', default=os.getenv('QUESTION_BANK_PATH', DEFAULT_BANK_PATH))
+    
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        from chatbot_engine import TECH_CATEGORIES
+        from data_handler import CandidateDataHandler
+        
+        observed = CandidateDataHandler(data_dir=args.data_dir).iter_candidates() if os.path.isdir(args.data_dir) else []
+        technologies = collect_technologies(TECH_CATEGORIES, observed, args.min_observed)
+        backend = None
+        if args.use_llm:
+            from llm_backends import get_backend
+            backend = get_backend()
+        summary = build_question_bank(args.output, technologies, backend=backend, per_level=args.per_level)
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    else:
+        bank = QuestionBank(args.path)
+        print(f"bank_version: {bank.bank_version}")
+        print(f"built_at: {bank.built_at}")
+        print(f"technologies: {len(bank)}")
+        print(', '.join(bank.technologies()))
@@ -0,0 +1,477 @@
+"""
+Question Index Module
+=====================
+Local vector index for semantic retrieval of technical questions.
+
+Questions are embedded on the CPU, either with a sentence-transformers model
+(when installed) or with a dependency-free hashing embedder, and stored as an
+L2-normalized float32 NumPy matrix. An index is a directory:
+
+    meta.json        embedder settings, technology and difficulty labels
+    vectors.npy      (N, dim) float32 embeddings, stored column-major
+    offsets.npy      (N + 1,) int64 offsets of each question in texts.bin
+    texts.bin        UTF-8 question text
+    tech_ids.npy     (N,) int32 technology label per question
+    difficulty_ids.npy  (N,) int8 difficulty label per question
+
+Every array is opened with mmap_mode='r', so worker processes share one copy
+through the OS page cache. Search is an exact brute-force dot product (a single
+BLAS matrix-vector product) followed by maximal marginal relevance (MMR) over
+the best few dozen hits, so results are relevant to the stack and position
+without repeating the same question in different words. A hashing query has
+only a handful of non-zero dimensions, and with column-major vectors the dot
+product reads just those columns instead of the whole matrix.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import serialization
+from question_bank import DIFFICULTIES, difficulty_mix, normalize_tech
+
+
+DEFAULT_INDEX_PATH = 'question_index'
+DEFAULT_SENTENCE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Rows embedded and written per step while building
+BUILD_BATCH_SIZE = 1024
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.\-]*')
+_STOP_WORDS = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'do', 'does', 'for', 'from',
+               'how', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'to', 'what',
+               'when', 'which', 'why', 'with', 'would', 'you', 'your'}
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of words and word pairs"""
+    
+    name = 'hashing'
+    
+    def __init__(self, dim: int = 128):
+        """
+        Configure the embedder
+        
+        Args:
+            dim: Embedding dimension
+        """
+        self.dim = dim
+    
+    @property
+    def settings(self) -> Dict:
+        return {'embedder': self.name, 'dim': self.dim}
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+        """Hash a feature to a (column, sign) pair"""
+        h = zlib.crc32(feature.encode('utf-8'))
+        return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+    
+    def _features(self, text: str) -> List[str]:
+        """Words (stop words removed) plus adjacent word pairs"""
+        tokens = [t.rstrip('.') for t in _TOKEN_PATTERN.findall(text.lower())]
+        tokens = [t for t in tokens if t and t not in _STOP_WORDS]
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    
+    def encode(self, texts: List[str]):
+        """
+        Embed texts
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            numpy.ndarray: (len(texts), dim) float32 matrix with unit-length rows
+        """
+        import numpy as np
+        
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = self._bucket(feature, self.dim)
+                matrix[row, column] += sign
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class SentenceTransformerEmbedder:
+    """CPU sentence embeddings via sentence-transformers (e.g. all-MiniLM-L6-v2)"""
+    
+    name = 'sentence-transformers'
+    
+    def __init__(self, model_name: str = DEFAULT_SENTENCE_MODEL):
+        """Configure the model (loaded on first use)"""
+        self.model_name = model_name
+        self._model = None
+    
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device='cpu')
+        return self._model
+    
+    @property
+    def dim(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+    
+    @property
+    def settings(self) -> Dict:
+        return {'embedder': self.name, 'model': self.model_name, 'dim': self.dim}
+    
+    def encode(self, texts: List[str]):
+        import numpy as np
+        
+        vectors = self.model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(np.float32, copy=False)
+
+
+def create_embedder(name: Optional[str] = None, model: Optional[str] = None, dim: int = 128):
+    """
+    Create an embedder
+    
+    Args:
+        name: 'hashing' or 'sentence-transformers' (defaults to QUESTION_EMBEDDER,
+              then sentence-transformers if installed, else hashing)
+        model: sentence-transformers model name (defaults to EMBEDDING_MODEL)
+        dim: Dimension for the hashing embedder
+        
+    Returns:
+        Embedder with encode(texts) and settings
+    """
+    name = name or os.getenv('QUESTION_EMBEDDER')
+    
+    if name is None:
+        try:
+            import sentence_transformers  # noqa: F401
+            name = SentenceTransformerEmbedder.name
+        except ImportError:
+            name = HashingEmbedder.name
+    
+    if name == HashingEmbedder.name:
+        return HashingEmbedder(dim=dim)
+    if name == SentenceTransformerEmbedder.name:
+        return SentenceTransformerEmbedder(model or os.getenv('EMBEDDING_MODEL', DEFAULT_SENTENCE_MODEL))
+    
+    raise ValueError(f"Unknown embedder: {name}")
+
+
+class QuestionIndex:
+    """Read-only, memory-mapped question embedding index"""
+    
+    def __init__(self, path: str):
+        """
+        Open an index directory
+        
+        Args:
+            path: Directory written by build_question_index()
+        """
+        import numpy as np
+        
+        self.path = path
+        self.meta = serialization.load_file(os.path.join(path, 'meta.json'))
+        
+        self.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.tech_ids = np.load(os.path.join(path, 'tech_ids.npy'), mmap_mode='r')
+        self.difficulty_ids = np.load(os.path.join(path, 'difficulty_ids.npy'), mmap_mode='r')
+        self.texts = np.memmap(os.path.join(path, 'texts.bin'), dtype=np.uint8, mode='r') \
+            if self.offsets[-1] else np.zeros(0, dtype=np.uint8)
+        
+        self.techs: List[str] = self.meta['techs']
+        self._tech_lookup = {tech: i for i, tech in enumerate(self.techs)}
+        self.embedder = create_embedder(self.meta['embedder'], self.meta.get('model'), self.meta['dim'])
+    
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+    
+    def question(self, row: int, tech_spelling: Optional[Dict[str, str]] = None) -> str:
+        """
+        Get the text of a stored question
+        
+        Args:
+            row: Question row
+            tech_spelling: Normalized technology -> the candidate's spelling
+            
+        Returns:
+            str: Question with its {tech} placeholder filled
+        """
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        text = self.texts[start:end].tobytes().decode('utf-8')
+        tech = self.techs[int(self.tech_ids[row])]
+        return text.replace('{tech}', (tech_spelling or {}).get(tech, tech))
+    
+    def search(self, tech_stack: List[str], position: Optional[str] = None, k: int = 5,
+               experience: Optional[str] = None, candidates: int = 50,
+               diversity: float = 0.3, tech_boost: float = 0.2) -> List[Dict]:
+        """
+        Find relevant, diverse questions for a candidate
+        
+        Args:
+            tech_stack: Candidate's technologies
+            position: Desired position
+            k: Number of questions
+            experience: Experience string; questions at the matching level score higher
+            candidates: Best hits considered for MMR re-ranking
+            diversity: MMR trade-off (0 = pure relevance, 1 = pure novelty)
+            tech_boost: Score added to questions about a technology in the stack
+            
+        Returns:
+            list: Dicts with question, tech, difficulty and score
+        """
+        import numpy as np
+        
+        if not len(self) or not (tech_stack or position):
+            return []
+        
+        query = ' '.join(list(tech_stack) + ([position] if position else []))
+        query_vector = self.embedder.encode([query])[0]
+        scores = self._similarity(query_vector)
+        
+        # Boosts are per-label lookup tables, added in place in float32
+        stack_ids = [self._tech_lookup[key] for key in {normalize_tech(t) for t in tech_stack}
+                     if key in self._tech_lookup]
+        if stack_ids and tech_boost:
+            boost = np.zeros(len(self.techs), dtype=np.float32)
+            boost[stack_ids] = tech_boost
+            scores += np.take(boost, self.tech_ids)
+        
+        if experience:
+            levels = difficulty_mix(experience, 5)
+            boost = np.zeros(len(DIFFICULTIES), dtype=np.float32)
+            boost[DIFFICULTIES.index(max(set(levels), key=levels.count))] = 0.05
+            scores += np.take(boost, self.difficulty_ids)
+        
+        pool_size = min(max(candidates, k), len(self))
+        pool = np.argpartition(-scores, pool_size - 1)[:pool_size]
+        pool = pool[np.argsort(-scores[pool])]
+        
+        selected = self._mmr(self.vectors[pool], scores[pool], k, diversity)
+        spelling = {normalize_tech(t): t for t in tech_stack}
+        
+        return [
+            {
+                'question': self.question(int(pool[i]), spelling),
+                'tech': self.techs[int(self.tech_ids[pool[i]])],
+                'difficulty': DIFFICULTIES[int(self.difficulty_ids[pool[i]])],
+                'score': round(float(scores[pool[i]]), 4)
+            }
+            for i in selected
+        ]
+    
+    def _similarity(self, query_vector):
+        """Dot product of every stored question with the query"""
+        import numpy as np
+        
+        # A sparse query only needs its non-zero columns, which are contiguous in column-major
+        # indexes (row-major indexes built by older releases take the full product)
+        columns = np.flatnonzero(query_vector)
+        if self.vectors.flags.f_contiguous and len(columns) * 4 <= len(query_vector):
+            return self.vectors[:, columns] @ query_vector[columns]
+        return self.vectors @ query_vector
+    
+    @staticmethod
+    def _mmr(vectors, relevance, k: int, diversity: float) -> List[int]:
+        """Greedy maximal marginal relevance over a small candidate pool"""
+        import numpy as np
+        
+        similarity = vectors @ vectors.T
+        selected = [0]
+        redundancy = similarity[0].copy()
+        
+        while len(selected) < min(k, len(relevance)):
+            mmr = (1 - diversity) * relevance - diversity * redundancy
+            mmr[selected] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            np.maximum(redundancy, similarity[best], out=redundancy)
+        
+        return selected
+
+
+_indexes: Dict[str, Optional[QuestionIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_question_index(path: Optional[str] = None) -> Optional[QuestionIndex]:
+    """
+    Open the shared question index for this process
+    
+    Args:
+        path: Index directory (defaults to QUESTION_INDEX_PATH, then question_index)
+        
+    Returns:
+        Optional[QuestionIndex]: The index, or None if no index has been built
+    """
+    path = path or os.getenv('QUESTION_INDEX_PATH', DEFAULT_INDEX_PATH)
+    with _indexes_lock:
+        if path not in _indexes:
+            exists = os.path.exists(os.path.join(path, 'meta.json'))
+            _indexes[path] = QuestionIndex(path) if exists else None
+        return _indexes[path]
+
+
+def build_question_index(output_dir: str, questions: Iterable[Dict], embedder=None,
+                         batch_size: int = BUILD_BATCH_SIZE) -> Dict:
+    """
+    Embed questions and write an index directory
+    
+    Args:
+        output_dir: Destination directory
+        questions: Dicts with text, tech and difficulty (e.g. QuestionBank.iter_questions())
+        embedder: Embedder to use (defaults to create_embedder())
+        batch_size: Questions embedded per step
+        
+    Returns:
+        dict: Build summary
+    """
+    import numpy as np
+    
+    embedder = embedder or create_embedder()
+    questions = list(questions)
+    count = len(questions)
+    
+    # Build next to the destination and swap it in when complete, so a running
+    # process never sees its mapped files truncated or half written
+    output_dir = os.path.normpath(output_dir)
+    temp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    
+    techs = sorted({q['tech'] for q in questions})
+    tech_lookup = {tech: i for i, tech in enumerate(techs)}
+    
+    try:
+        vectors = np.lib.format.open_memmap(os.path.join(temp_dir, 'vectors.npy'), mode='w+',
+                                            dtype=np.float32, shape=(count, embedder.dim),
+                                            fortran_order=True)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        tech_ids = np.zeros(count, dtype=np.int32)
+        difficulty_ids = np.zeros(count, dtype=np.int8)
+        
+        with open(os.path.join(temp_dir, 'texts.bin'), 'wb') as f:
+            for start in range(0, count, batch_size):
+                batch = questions[start:start + batch_size]
+                vectors[start:start + len(batch)] = embedder.encode(
+                    [q['text'].replace('{tech}', q['tech']) for q in batch]
+                )
+                for row, question in enumerate(batch, start=start):
+                    data = question['text'].encode('utf-8')
+                    f.write(data)
+                    offsets[row + 1] = offsets[row] + len(data)
+                    tech_ids[row] = tech_lookup[question['tech']]
+                    difficulty_ids[row] = DIFFICULTIES.index(question.get('difficulty', 'intermediate'))
+        
+        vectors.flush()
+        del vectors
+        np.save(os.path.join(temp_dir, 'offsets.npy'), offsets)
+        np.save(os.path.join(temp_dir, 'tech_ids.npy'), tech_ids)
+        np.save(os.path.join(temp_dir, 'difficulty_ids.npy'), difficulty_ids)
+        
+        # meta.json is written last: its presence marks a complete index
+        meta = {**embedder.settings, 'count': count, 'techs': techs, 'difficulties': list(DIFFICULTIES)}
+        serialization.dump_file(meta, os.path.join(temp_dir, 'meta.json'), pretty=True)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    
+    # Readers that already mapped the old files keep them until they close
+    old_dir = f"{output_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.rename(output_dir, old_dir)
+    os.rename(temp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    
+    return {'questions': count, 'technologies': len(techs), 'embedder': embedder.name, 'dim': embedder.dim}
+
+
+def synthetic_questions(count: int) -> List[Dict]:
+    """Generate a large question set from the bank templates, for benchmarking"""
+    from question_bank import QUESTION_TEMPLATES
+    
+    templates = [(text, difficulty) for levels in QUESTION_TEMPLATES.values()
+                 for difficulty, items in levels.items() for text in items]
+    return [
+        {'text': templates[i % len(templates)][0], 'tech': f"tech{i // len(templates)}",
+         'difficulty': templates[i % len(templates)][1]}
+        for i in range(count)
+    ]
+
+
+def benchmark(index: QuestionIndex, queries: int = 200) -> Dict:
+    """
+    Measure search latency
+    
+    Args:
+        index: Open index
+        queries: Number of queries to time
+        
+    Returns:
+        dict: Question count and p50/p95 latency in milliseconds
+    """
+    stacks = [['Python', 'Django'], ['JavaScript', 'React', 'Node.js'], ['Java', 'Spring', 'MySQL'],
+              ['Go', 'Kubernetes', 'Docker'], ['tech7', 'tech42']]
+    timings = []
+    for i in range(queries):
+        start = time.perf_counter()
+        index.search(stacks[i % len(stacks)], 'Backend Engineer', experience='4 years')
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    timings.sort()
+    return {
+        'questions': len(index),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95)], 3)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build, query or benchmark the question embedding index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build_parser = subparsers.add_parser('build', help='Embed the question bank into an index')
+    build_parser.add_argument('--bank', default=os.getenv('QUESTION_BANK_PATH', 'question_bank.bin'))
+    build_parser.add_argument('--output', default=os.getenv('QUESTION_INDEX_PATH', DEFAULT_INDEX_PATH))
+    build_parser.add_argument('--embedder', choices=[HashingEmbedder.name, SentenceTransformerEmbedder.name])
+    
+    search_parser = subparsers.add_parser('search', help='Query the index')
+    search_parser.add_argument('tech_stack', help='Comma-separated technologies')
+    search_parser.add_argument('--position', default=None)
+    search_parser.add_argument('--experience', default=None)
+    search_parser.add_argument('-k', type=int, default=5)
+    search_parser.add_argument('--path', default=os.getenv('QUESTION_INDEX_PATH', DEFAULT_INDEX_PATH))
+    
+    bench_parser = subparsers.add_parser('benchmark', help='Time searches over a synthetic index')
+    bench_parser.add_argument('--count', type=int, default=100000, help='Synthetic questions')
+    bench_parser.add_argument('--output', default='question_index_bench')
+    bench_parser.add_argument('--embedder', choices=[HashingEmbedder.name, SentenceTransformerEmbedder.name])
+    
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        from question_bank import QuestionBank
+        
+        summary = build_question_index(args.output, QuestionBank(args.bank).iter_questions(),
+                                       create_embedder(args.embedder))
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    elif args.command == 'search':
+        index = QuestionIndex(args.path)
+        stack = [t.strip() for t in args.tech_stack.split(',') if t.strip()]
+        for hit in index.search(stack, args.position, args.k, args.experience):
+            print(f"[{hit['score']:.3f}] ({hit['tech']}, {hit['difficulty']}) {hit['question']}")
+    else:
+        build_question_index(args.output, synthetic_questions(args.count), create_embedder(args.embedder))
+        for key, value in benchmark(QuestionIndex(args.output)).items():
+            print(f"{key}: {value}")
@@ -0,0 +1,424 @@
+"""
+Rate Limiter Module
+===================
+Token-bucket rate limiting and weighted fair queuing for LLM calls.
+
+Every session in the process shares one provider quota. Instead of letting a
+burst of sessions hit the inference API at once (and trip its rate limit, so
+every candidate gets the fallback), calls wait in a single queue:
+
+- a global token bucket admits at most LLM_RATE_RPM calls per minute and
+  LLM_MAX_CONCURRENT at a time
+- optional per-tenant (LLM_TENANT_RPM) and per-session (LLM_SESSION_RPM)
+  buckets stop one tenant or one chatty session from draining the quota
+- waiting calls are ordered by self-clocked fair queuing: each flow
+  (tenant, session) gets a share proportional to its weight, where the weight
+  is the tenant weight (LLM_TENANT_WEIGHTS, e.g. "acme=2,trial=0.5") raised
+  by LLM_STAGE_BOOST per funnel stage, so candidates further along are
+  served first
+- a call that waits longer than LLM_QUEUE_TIMEOUT raises RateLimitExceeded,
+  which the engine handles like any backend failure (fallback reply)
+
+Callers describe the request through a context variable:
+
+    with llm_context(tenant='acme', session=session_id):
+        assistant.process_input(...)   # the engine adds the stage
+
+Queue wait times are available from get_scheduler().get_metrics().
+"""
+
+import bisect
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from llm_backends import LLMBackend
+
+
+class RateLimitExceeded(RuntimeError):
+    """A call waited longer than the queue timeout"""
+
+
+_request_context: ContextVar[Dict] = ContextVar('llm_request_context', default={})
+
+
+@contextmanager
+def llm_context(**fields):
+    """
+    Describe the LLM calls made inside the block
+    
+    Fields merge with any enclosing context; None values are ignored.
+    
+    Args:
+        fields: tenant, session, stage and priority (funnel position, 0 = first stage)
+    """
+    token = _request_context.set({**_request_context.get(),
+                                  **{key: value for key, value in fields.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def current_context() -> Dict:
+    """The request context of the calling thread or task"""
+    return _request_context.get()
+
+
+class TokenBucket:
+    """Token bucket refilled continuously; callers hold the scheduler lock"""
+    
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Create a full bucket
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Burst size (defaults to one second of tokens, at least 1)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 when they are now)"""
+        self._refill(now)
+        missing = min(cost, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+    
+    def take(self, cost: float):
+        self.tokens -= min(cost, self.capacity)
+    
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Ticket:
+    """A call waiting for admission"""
+    
+    __slots__ = ('tag', 'seq', 'tenant', 'flow', 'stage', 'cost', 'enqueued', 'admitted')
+    
+    def __init__(self, tag: float, seq: int, tenant: str, flow: tuple, stage: Optional[str], cost: float):
+        self.tag = tag
+        self.seq = seq
+        self.tenant = tenant
+        self.flow = flow
+        self.stage = stage
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.admitted = False
+    
+    def __lt__(self, other: '_Ticket') -> bool:
+        return (self.tag, self.seq) < (other.tag, other.seq)
+
+
+class FairScheduler:
+    """Admission control for LLM calls: global, tenant and session buckets plus fair ordering"""
+    
+    # Flows and buckets kept before idle ones are dropped
+    MAX_TRACKED = 4096
+    
+    def __init__(self, requests_per_minute: float, max_concurrent: int = 8,
+                 tenant_rpm: Optional[float] = None, session_rpm: Optional[float] = None,
+                 tenant_weights: Optional[Dict[str, float]] = None, stage_boost: float = 0.5,
+                 max_wait: float = 30.0, burst: Optional[float] = None):
+        """
+        Initialize the scheduler
+        
+        Args:
+            requests_per_minute: Provider quota shared by every call in the process
+            max_concurrent: Calls in flight at once
+            tenant_rpm: Per-tenant quota (None for no per-tenant limit)
+            session_rpm: Per-session quota (None for no per-session limit)
+            tenant_weights: Fair-share weight per tenant (default 1)
+            stage_boost: Extra weight per funnel stage (weight *= 1 + boost * priority)
+            max_wait: Seconds a call may wait before RateLimitExceeded
+            burst: Calls the global bucket admits back to back (defaults to one second's worth)
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.tenant_rpm = tenant_rpm
+        self.session_rpm = session_rpm
+        self.tenant_weights = tenant_weights or {}
+        self.stage_boost = max(0.0, stage_boost)
+        self.max_wait = max_wait
+        
+        self._global = TokenBucket(requests_per_minute / 60.0, burst)
+        self._tenant_buckets: Dict[str, TokenBucket] = {}
+        self._session_buckets: Dict[tuple, TokenBucket] = {}
+        self._finish_tags: Dict[tuple, float] = {}
+        self._virtual_time = 0.0
+        self._queue: List[_Ticket] = []
+        self._active = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        
+        self._metrics = {'requests': 0, 'admitted': 0, 'rejected': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+        self._recent_waits = deque(maxlen=1000)
+        self._tenant_waits: Dict[str, List[float]] = {}
+        self._stage_waits: Dict[str, List[float]] = {}
+    
+    def acquire(self, cost: float = 1.0) -> float:
+        """
+        Wait for admission under the calling context's tenant, session and stage
+        
+        Every successful acquire() must be paired with release().
+        
+        Args:
+            cost: Tokens the call consumes (requests in a batch)
+            
+        Returns:
+            float: Seconds spent waiting
+            
+        Raises:
+            RateLimitExceeded: The call was not admitted within max_wait
+        """
+        context = current_context()
+        tenant = str(context.get('tenant') or 'default')
+        session = context.get('session')
+        flow = (tenant, session)
+        weight = self.tenant_weights.get(tenant, 1.0) * (1.0 + self.stage_boost * max(0, context.get('priority', 0)))
+        
+        with self._cond:
+            self._metrics['requests'] += 1
+            start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+            ticket = _Ticket(start + cost / weight, next(self._seq), tenant, flow, context.get('stage'), cost)
+            self._finish_tags[flow] = ticket.tag
+            bisect.insort(self._queue, ticket)
+            self._forget_idle(ticket.enqueued)
+            
+            deadline = ticket.enqueued + self.max_wait
+            while True:
+                now = time.monotonic()
+                delay = self._dispatch(now)
+                if ticket.admitted:
+                    return now - ticket.enqueued
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._metrics['rejected'] += 1
+                    self._cond.notify_all()
+                    raise RateLimitExceeded(f"LLM call waited {self.max_wait:.0f}s for a rate-limit slot")
+                self._cond.wait(min(delay, remaining) if delay is not None else remaining)
+    
+    def release(self):
+        """Return an admitted call's concurrency slot"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+    
+    def _bucket(self, buckets: Dict, key, rpm: Optional[float]) -> Optional[TokenBucket]:
+        if rpm is None:
+            return None
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rpm / 60.0)
+        return bucket
+    
+    def _dispatch(self, now: float) -> Optional[float]:
+        """
+        Admit queued calls in tag order while capacity allows (caller holds the lock)
+        
+        A call held back only by its own tenant or session bucket is skipped, so
+        other flows keep the provider quota busy.
+        
+        Returns:
+            float: Seconds until another admission may become possible (None: wait for a release)
+        """
+        next_delay = None
+        admitted = False
+        index = 0
+        while index < len(self._queue):
+            if self._active >= self.max_concurrent:
+                next_delay = None
+                break
+            ticket = self._queue[index]
+            global_delay = self._global.delay(ticket.cost, now)
+            if global_delay > 0:
+                next_delay = global_delay if next_delay is None else min(next_delay, global_delay)
+                break
+            
+            buckets = [bucket for bucket in (
+                self._bucket(self._tenant_buckets, ticket.tenant, self.tenant_rpm),
+                self._bucket(self._session_buckets, ticket.flow, self.session_rpm if ticket.flow[1] else None)
+            ) if bucket is not None]
+            flow_delay = max((bucket.delay(ticket.cost, now) for bucket in buckets), default=0.0)
+            if flow_delay > 0:
+                next_delay = flow_delay if next_delay is None else min(next_delay, flow_delay)
+                index += 1
+                continue
+            
+            self._global.take(ticket.cost)
+            for bucket in buckets:
+                bucket.take(ticket.cost)
+            del self._queue[index]
+            ticket.admitted = True
+            self._active += 1
+            self._virtual_time = ticket.tag
+            self._record_wait(ticket, now - ticket.enqueued)
+            admitted = True
+        
+        if admitted:
+            self._cond.notify_all()
+        return next_delay
+    
+    def _forget_idle(self, now: float):
+        """Drop flow state that no longer affects scheduling (caller holds the lock)"""
+        if len(self._finish_tags) > self.MAX_TRACKED:
+            self._finish_tags = {flow: tag for flow, tag in self._finish_tags.items() if tag > self._virtual_time}
+        for buckets in (self._tenant_buckets, self._session_buckets):
+            if len(buckets) > self.MAX_TRACKED:
+                for key in [key for key, bucket in buckets.items() if bucket.is_full(now)]:
+                    del buckets[key]
+    
+    def _record_wait(self, ticket: _Ticket, wait: float):
+        self._metrics['admitted'] += 1
+        self._metrics['wait_total'] += wait
+        self._metrics['wait_max'] = max(self._metrics['wait_max'], wait)
+        self._recent_waits.append(wait)
+        for totals, key in ((self._tenant_waits, ticket.tenant), (self._stage_waits, ticket.stage or 'unknown')):
+            entry = totals.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += wait
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get admission and queue-wait metrics
+        
+        Returns:
+            dict: Counters, queue depth, calls in flight, wait percentiles over the
+                  last 1000 admissions and mean wait per tenant and per stage (ms)
+        """
+        with self._cond:
+            metrics = dict(self._metrics)
+            waits = sorted(self._recent_waits)
+            metrics['queued'] = len(self._queue)
+            metrics['active'] = self._active
+            tenants = {key: (count, total) for key, (count, total) in self._tenant_waits.items()}
+            stages = {key: (count, total) for key, (count, total) in self._stage_waits.items()}
+        
+        admitted = metrics['admitted']
+        metrics['wait_mean_ms'] = round(metrics.pop('wait_total') / admitted * 1000, 2) if admitted else 0.0
+        metrics['wait_max_ms'] = round(metrics.pop('wait_max') * 1000, 2)
+        metrics['wait_p50_ms'] = round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0
+        metrics['wait_p95_ms'] = round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0
+        metrics['tenant_wait_ms'] = {key: round(total / count * 1000, 2) for key, (count, total) in tenants.items()}
+        metrics['stage_wait_ms'] = {key: round(total / count * 1000, 2) for key, (count, total) in stages.items()}
+        return metrics
+
+
+class RateLimitedBackend(LLMBackend):
+    """Backend wrapper that admits calls through a FairScheduler"""
+    
+    name = 'rate_limited'
+    
+    def __init__(self, backend: LLMBackend, scheduler: FairScheduler):
+        """
+        Wrap a backend
+        
+        Args:
+            backend: Backend that performs generation
+            scheduler: Admission control shared by every wrapped backend in the process
+        """
+        self.backend = backend
+        self.scheduler = scheduler
+    
+    @property
+    def supports_batching(self) -> bool:
+        return self.backend.supports_batching
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        # The slot is held until the stream is exhausted or closed
+        self.scheduler.acquire()
+        try:
+            yield from self.backend.stream(messages, max_tokens=max_tokens, temperature=temperature)
+        finally:
+            self.scheduler.release()
+    
+    def generate(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> str:
+        self.scheduler.acquire()
+        try:
+            return self.backend.generate(messages, max_tokens=max_tokens, temperature=temperature)
+        finally:
+            self.scheduler.release()
+    
+    def generate_batch(self, requests: List[Dict]) -> List[str]:
+        self.scheduler.acquire(cost=len(requests))
+        try:
+            return self.backend.generate_batch(requests)
+        finally:
+            self.scheduler.release()
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "tenant=weight,..." into a dict"""
+    weights = {}
+    for item in spec.split(','):
+        if '=' in item:
+            tenant, weight = item.split('=', 1)
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Optional[FairScheduler]:
+    """
+    Get the process-wide scheduler configured from the environment
+    
+    Reads LLM_RATE_RPM (unset disables rate limiting), LLM_MAX_CONCURRENT,
+    LLM_TENANT_RPM, LLM_SESSION_RPM, LLM_TENANT_WEIGHTS, LLM_STAGE_BOOST and
+    LLM_QUEUE_TIMEOUT.
+    
+    Returns:
+        FairScheduler: Shared scheduler, or None when rate limiting is disabled
+    """
+    global _scheduler
+    rpm = os.getenv('LLM_RATE_RPM', '').strip()
+    if not rpm:
+        return None
+    
+    with _scheduler_lock:
+        if _scheduler is None:
+            tenant_rpm = os.getenv('LLM_TENANT_RPM', '').strip()
+            session_rpm = os.getenv('LLM_SESSION_RPM', '').strip()
+            _scheduler = FairScheduler(
+                float(rpm),
+                max_concurrent=int(os.getenv('LLM_MAX_CONCURRENT', '8')),
+                tenant_rpm=float(tenant_rpm) if tenant_rpm else None,
+                session_rpm=float(session_rpm) if session_rpm else None,
+                tenant_weights=parse_weights(os.getenv('LLM_TENANT_WEIGHTS', '')),
+                stage_boost=float(os.getenv('LLM_STAGE_BOOST', '0.5')),
+                max_wait=float(os.getenv('LLM_QUEUE_TIMEOUT', '30'))
+            )
+        return _scheduler
+
+
+def wrap_rate_limit(backend: LLMBackend) -> LLMBackend:
+    """
+    Put a backend behind the shared scheduler when rate limiting is configured
+    
+    Args:
+        backend: Backend that performs generation
+        
+    Returns:
+        LLMBackend: Wrapped (or unchanged) backend
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return backend
+    return RateLimitedBackend(backend, scheduler)
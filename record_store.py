@@ -0,0 +1,431 @@
+"""
+Record Store Module
+===================
+Storage backends for complete candidate records.
+
+- json: one indented JSON file per candidate under <data_dir>/json (original layout)
+- sqlite: a single <data_dir>/candidates.db file holding compact JSON compressed
+  with zlib and a preset dictionary of common record keys, keyed by candidate_id
+
+The SQLite store avoids per-file inode and indentation overhead, reads a record
+with one primary-key lookup and scans the pool with one sequential query instead
+of globbing and opening thousands of files.
+"""
+
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import serialization
+
+
+STORAGE_BACKENDS = ('json', 'sqlite')
+
+# Preset zlib dictionary: strings that recur in nearly every record. Small records
+# compress poorly on their own; priming the compressor with these fixes that.
+# Changing it requires a new RECORD_FORMAT byte.
+_RECORD_DICTIONARY = (
+    '"tech_stack": ["Python", "JavaScript", "Java", "React", "Node.js", "Django", "AWS", "Docker", '
+    '"PostgreSQL", "MongoDB", "Kubernetes", "TypeScript", "SQL"], "technical_answers": "", '
+    '"technical_questions": ["How do you ", "Describe ", "Explain ", "What are "], '
+    '"answer_scoring": {"version": 1, "method": "rubric", "answers_hash": "", "scored_at": "", '
+    '"questions": [{"question": "", "score": , "coverage": , "depth": , "specificity": }]}, '
+    '"answer_score": , "job_matches": [{"job_id": "", "title": "", "location": "", "score": , '
+    '"required_match": , "matched_skills": []}], "possible_duplicates": [], "first_applied": "", '
+    '"applications": [], "experience": " years", "position": "Software Engineer", '
+    '"location": "Remote", "phone": "+1 ", "email": "@gmail.com", "name": "", '
+    '"status": "pending_review", "timestamp": "2025-", "candidate_id": "'
+).encode('utf-8')
+
+RECORD_FORMAT = b'\x01'
+
+
+def encode_record(record: Dict) -> bytes:
+    """
+    Serialize a record to compact, dictionary-compressed bytes
+    
+    Args:
+        record: Candidate record
+        
+    Returns:
+        bytes: Format byte followed by the zlib stream
+    """
+    data = serialization.dumpb(record)
+    compressor = zlib.compressobj(level=6, zdict=_RECORD_DICTIONARY)
+    return RECORD_FORMAT + compressor.compress(data) + compressor.flush()
+
+
+def decode_record(blob: bytes) -> Dict:
+    """
+    Deserialize bytes written by encode_record()
+    
+    Args:
+        blob: Stored record
+        
+    Returns:
+        dict: Candidate record
+    """
+    if blob[:1] != RECORD_FORMAT:
+        raise ValueError(f"Unknown record format {blob[:1]!r}")
+    decompressor = zlib.decompressobj(zdict=_RECORD_DICTIONARY)
+    return serialization.loads(decompressor.decompress(blob[1:]) + decompressor.flush())
+
+
+class RecordStore:
+    """Interface for candidate record storage"""
+    
+    name = 'base'
+    
+    def get(self, candidate_id: str) -> Optional[Dict]:
+        """Fetch a record by ID (None if missing)"""
+        raise NotImplementedError
+    
+    def put(self, record: Dict):
+        """Insert or replace a record (keyed by record['candidate_id'])"""
+        raise NotImplementedError
+    
+    def delete(self, candidate_id: str) -> bool:
+        """Remove a record; True if it existed"""
+        raise NotImplementedError
+    
+    def delete_many(self, candidate_ids: List[str]) -> List[str]:
+        """Remove several records; returns the IDs that existed"""
+        return [candidate_id for candidate_id in candidate_ids if self.delete(candidate_id)]
+    
+    def iter_records(self) -> Iterator[Dict]:
+        """Yield every record in storage order"""
+        raise NotImplementedError
+    
+    def find_by_email(self, email: str) -> List[Dict]:
+        """Records whose email matches case-insensitively"""
+        email = email.lower()
+        return [record for record in self.iter_records() if record.get('email', '').lower() == email]
+    
+    def count(self) -> int:
+        return sum(1 for _ in self.iter_records())
+    
+    def disk_usage(self) -> int:
+        """Bytes allocated on disk by the store"""
+        raise NotImplementedError
+    
+    def last_modified(self) -> int:
+        """Latest modification time of the stored data (nanoseconds), for staleness checks"""
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+    
+    def __contains__(self, candidate_id: str) -> bool:
+        return self.get(candidate_id) is not None
+
+
+class JsonFileStore(RecordStore):
+    """One indented JSON file per candidate"""
+    
+    name = 'json'
+    
+    def __init__(self, json_dir: Path):
+        self.json_dir = Path(json_dir)
+        self.json_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, candidate_id: str) -> Path:
+        return self.json_dir / f"{candidate_id}.json"
+    
+    def get(self, candidate_id: str) -> Optional[Dict]:
+        json_file = self._path(candidate_id)
+        if json_file.exists():
+            return serialization.load_file(json_file)
+        return None
+    
+    def put(self, record: Dict):
+        serialization.dump_file(record, self._path(record['candidate_id']), pretty=True)
+    
+    def delete(self, candidate_id: str) -> bool:
+        json_file = self._path(candidate_id)
+        if json_file.exists():
+            json_file.unlink()
+            return True
+        return False
+    
+    def iter_records(self) -> Iterator[Dict]:
+        for json_file in self.json_dir.glob("*.json"):
+            yield serialization.load_file(json_file)
+    
+    def count(self) -> int:
+        return sum(1 for _ in self.json_dir.glob("*.json"))
+    
+    def disk_usage(self) -> int:
+        return sum(path.stat().st_blocks * 512 for path in self.json_dir.glob("*.json"))
+    
+    def last_modified(self) -> int:
+        # Records are rewritten in place, so the directory's own time only covers adds and deletes
+        times = [self.json_dir.stat().st_mtime_ns]
+        for path in self.json_dir.glob("*.json"):
+            try:
+                times.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return max(times)
+    
+    def __contains__(self, candidate_id: str) -> bool:
+        return self._path(candidate_id).exists()
+
+
+class SqliteRecordStore(RecordStore):
+    """Compressed records in a single SQLite file, with an email index"""
+    
+    name = 'sqlite'
+    
+    # Rows fetched per round trip while scanning
+    SCAN_BATCH = 500
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # One writer connection shared under a lock; scans open their own read connections
+        self._conn = self._connect()
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "candidate_id TEXT PRIMARY KEY, email TEXT, timestamp TEXT, data BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS records_email ON records (email)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Overwrite deleted records instead of leaving them in free pages (erasure)
+        conn.execute("PRAGMA secure_delete=ON")
+        return conn
+    
+    def get(self, candidate_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM records WHERE candidate_id = ?", (candidate_id,)).fetchone()
+        return decode_record(row[0]) if row else None
+    
+    def put(self, record: Dict):
+        self.put_many([record])
+    
+    def put_many(self, records: List[Dict]):
+        """Insert or replace several records in one transaction"""
+        rows = [
+            (record['candidate_id'], (record.get('email') or '').lower(), record.get('timestamp', ''),
+             encode_record(record))
+            for record in records
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (candidate_id, email, timestamp, data) VALUES (?, ?, ?, ?)", rows
+            )
+    
+    def delete(self, candidate_id: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM records WHERE candidate_id = ?", (candidate_id,))
+        return cursor.rowcount > 0
+    
+    def delete_many(self, candidate_ids: List[str]) -> List[str]:
+        """Remove several records in one transaction, then checkpoint the WAL so no copy survives"""
+        deleted = []
+        with self._lock:
+            with self._conn:
+                for start in range(0, len(candidate_ids), 500):
+                    chunk = candidate_ids[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    deleted.extend(row[0] for row in self._conn.execute(
+                        f"SELECT candidate_id FROM records WHERE candidate_id IN ({placeholders})", chunk))
+                    self._conn.execute(f"DELETE FROM records WHERE candidate_id IN ({placeholders})", chunk)
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+    
+    def iter_records(self) -> Iterator[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.execute("SELECT data FROM records")
+            while True:
+                rows = cursor.fetchmany(self.SCAN_BATCH)
+                if not rows:
+                    break
+                for (blob,) in rows:
+                    yield decode_record(blob)
+        finally:
+            conn.close()
+    
+    def find_by_email(self, email: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM records WHERE email = ?", (email.lower(),)).fetchall()
+        return [decode_record(blob) for (blob,) in rows]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    
+    def disk_usage(self) -> int:
+        paths = [self.db_path, Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")]
+        return sum(path.stat().st_blocks * 512 for path in paths if path.exists())
+    
+    def last_modified(self) -> int:
+        paths = [self.db_path, Path(f"{self.db_path}-wal")]
+        return max((path.stat().st_mtime_ns for path in paths if path.exists()), default=0)
+    
+    def vacuum(self):
+        """Checkpoint the WAL and reclaim space left by deletes"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_record_store(storage: str, data_dir: Path) -> RecordStore:
+    """
+    Create the record store for a data directory
+    
+    Args:
+        storage: 'json' or 'sqlite'
+        data_dir: Candidate data directory
+        
+    Returns:
+        RecordStore: Store instance
+    """
+    if storage == JsonFileStore.name:
+        return JsonFileStore(Path(data_dir) / "json")
+    if storage == SqliteRecordStore.name:
+        return SqliteRecordStore(Path(data_dir) / "candidates.db")
+    raise ValueError(f"storage must be one of {STORAGE_BACKENDS}")
+
+
+def migrate(data_dir: str, source: str = 'json', target: str = 'sqlite', batch_size: int = 500) -> int:
+    """
+    Copy every record from one storage backend to another
+    
+    Args:
+        data_dir: Candidate data directory
+        source: Backend to read
+        target: Backend to write
+        batch_size: Records written per transaction (SQLite target)
+        
+    Returns:
+        int: Records copied
+    """
+    source_store = create_record_store(source, Path(data_dir))
+    target_store = create_record_store(target, Path(data_dir))
+    
+    copied = 0
+    batch = []
+    for record in source_store.iter_records():
+        batch.append(record)
+        if len(batch) >= batch_size:
+            _put_all(target_store, batch)
+            copied += len(batch)
+            batch = []
+    if batch:
+        _put_all(target_store, batch)
+        copied += len(batch)
+    
+    target_store.close()
+    return copied
+
+
+def _put_all(store: RecordStore, records: List[Dict]):
+    if isinstance(store, SqliteRecordStore):
+        store.put_many(records)
+    else:
+        for record in records:
+            store.put(record)
+
+
+def _sample_record(i: int) -> Dict:
+    """Synthetic candidate record shaped like a completed application"""
+    stacks = [['Python', 'Django', 'PostgreSQL', 'Docker'], ['JavaScript', 'React', 'Node.js', 'MongoDB'],
+              ['Java', 'Spring', 'MySQL', 'Kubernetes'], ['Go', 'gRPC', 'Redis', 'AWS']]
+    return {
+        'candidate_id': f"{i:012x}",
+        'timestamp': f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+        'status': 'pending_review',
+        'name': f"Candidate {i}",
+        'email': f"candidate{i}@example.com",
+        'phone': f"+1 555 {i % 10000:04d}",
+        'experience': f"{i % 15} years",
+        'position': ['Backend Engineer', 'Frontend Developer', 'Data Scientist'][i % 3],
+        'location': ['Remote', 'Berlin', 'New York', 'Bangalore'][i % 4],
+        'tech_stack': stacks[i % len(stacks)],
+        'technical_answers': "I would profile the service first, then add caching and an index "
+                             f"on the hot query. In my last project this cut latency by {i % 90}%."
+    }
+
+
+def benchmark(count: int = 10000) -> Dict:
+    """
+    Compare the JSON-file and SQLite layouts on disk size, write, scan and lookup speed
+    
+    Args:
+        count: Synthetic records to store
+        
+    Returns:
+        dict: Metrics per backend
+    """
+    records = [_sample_record(i) for i in range(count)]
+    lookups = [records[(i * 7919) % count]['candidate_id'] for i in range(min(count, 1000))]
+    results = {}
+    
+    for storage in STORAGE_BACKENDS:
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = create_record_store(storage, Path(data_dir))
+            
+            start = time.perf_counter()
+            _put_all(store, records)
+            write_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            scanned = sum(1 for _ in store.iter_records())
+            scan_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for candidate_id in lookups:
+                store.get(candidate_id)
+            lookup_seconds = time.perf_counter() - start
+            
+            results[storage] = {
+                'records': scanned,
+                'disk_bytes': store.disk_usage(),
+                'write_seconds': round(write_seconds, 3),
+                'scan_seconds': round(scan_seconds, 3),
+                'lookup_us': round(lookup_seconds / len(lookups) * 1e6, 1)
+            }
+            store.close()
+    
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Candidate record storage tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    migrate_parser = subparsers.add_parser('migrate', help='Copy records between storage backends')
+    migrate_parser.add_argument('--data-dir', default='candidate_data')
+    migrate_parser.add_argument('--source', default='json', choices=STORAGE_BACKENDS)
+    migrate_parser.add_argument('--target', default='sqlite', choices=STORAGE_BACKENDS)
+    
+    bench_parser = subparsers.add_parser('benchmark', help='Compare storage backends')
+    bench_parser.add_argument('--count', type=int, default=10000)
+    
+    args = parser.parse_args()
+    
+    if args.command == 'migrate':
+        copied = migrate(args.data_dir, args.source, args.target)
+        print(f"Copied {copied} records from {args.source} to {args.target}")
+        print(f"Set CANDIDATE_STORAGE={args.target} to use the new store")
+    else:
+        for storage, metrics in benchmark(args.count).items():
+            print(f"{storage}: " + ', '.join(f"{key}={value}" for key, value in metrics.items()))
@@ -0,0 +1,418 @@
+"""
+Response Cache Module
+=====================
+Intent-normalized cache for the free-form replies of _generate_contextual_response.
+
+After the farewell, candidates mostly send the same few messages ("what's
+next?", "when will I hear back?", "thanks"). Each message is normalized
+(case, punctuation, contractions, filler words) and classified against a
+small set of intents with the dependency-free hashing embedder; the cache key
+is the intent when the classification is confident, otherwise the normalized
+text itself. A hit is served without calling the LLM.
+
+Replies are stored as templates. On a miss the engine asks the LLM for a
+reply to the message alone, without the candidate's data, writing slots
+({first_name}, {position}, ...) where details belong; the slots are filled in
+for whoever hits the entry. As a backstop a template is still refused when it
+has unknown slots, a run of four or more digits, or any name word or other
+value of the candidate it was generated for. Messages carrying data of their
+own (digits, an email address) always go to the LLM with the full context.
+
+Keys start with the tenant from the rate-limit context (see rate_limiter), so
+one client's replies, which can name its company or hiring process, are only
+served to that client's candidates.
+
+Entries expire after a TTL and the least recently used are evicted past
+max_entries. The cache is persisted to RESPONSE_CACHE_PATH (written behind,
+at most every few seconds, and on exit); each process keeps its own copy
+and the last writer wins.
+"""
+
+import atexit
+import itertools
+import os
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import serialization
+from question_index import HashingEmbedder
+from rate_limiter import current_context
+
+
+# Example phrasings per intent, compared with normalize_message() applied
+INTENTS = {
+    'next_steps': ["what's next", "what happens now", "what are the next steps", "what happens next",
+                   "what should I do now", "what do I do next"],
+    'timeline': ["when will I hear back", "how long does it take", "when will you contact me",
+                 "how soon will I get a response", "when can I expect a reply", "how long until I hear back"],
+    'status': ["what is the status of my application", "did you receive my application",
+               "was my application submitted", "is my application saved"],
+    'interview': ["what is the interview process", "when is the interview", "will there be a technical interview",
+                  "how do I schedule an interview"],
+    'thanks': ["thanks", "thank you", "thank you so much", "thanks a lot", "appreciate it", "great thanks"],
+    'acknowledge': ["ok", "okay", "sounds good", "great", "cool", "got it", "alright", "perfect"]
+}
+
+_CONTRACTIONS = [
+    (re.compile(r"\b(what|that|it|there|who|where|how)'s\b"), r"\1 is"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"'ll\b"), " will"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"'ve\b"), " have"),
+    (re.compile(r"'d\b"), " would")
+]
+_FILLER_WORDS = {'um', 'uh', 'hmm', 'so', 'well', 'please', 'hi', 'hey', 'hello', 'just', 'actually', 'btw'}
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+
+# Messages with their own data are answered by the LLM
+_SPECIFIC_PATTERN = re.compile(r'\d|@')
+
+# Longest normalized message cached by its text
+MAX_TEXT_KEY_CHARS = 160
+
+# Candidate fields turned into template slots, and the value used when a candidate lacks one
+SLOT_DEFAULTS = {
+    'name': 'there',
+    'first_name': 'there',
+    'email': 'your registered email',
+    'position': 'the role you applied for',
+    'location': 'your area'
+}
+
+# Four or more digits, allowing the separators of a reformatted phone number
+_DIGIT_RUN = re.compile(r'\d(?:[\s\-.()/+]*\d){3,}')
+
+_FORMATTER = string.Formatter()
+
+
+def normalize_message(text: str) -> str:
+    """
+    Reduce a message to the words that carry its meaning
+    
+    Args:
+        text: Raw candidate message
+        
+    Returns:
+        str: Lowercase words without punctuation, contractions expanded and filler removed
+    """
+    text = text.lower().replace('’', "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    words = _NON_WORD.sub(' ', text).replace("'", ' ').split()
+    return ' '.join(word for word in words if word not in _FILLER_WORDS)
+
+
+def _slot_values(candidate_data: Dict) -> Dict[str, str]:
+    """Non-empty slot values of a candidate"""
+    values = {field: str(candidate_data.get(field) or '').strip() for field in SLOT_DEFAULTS if field != 'first_name'}
+    values['first_name'] = values['name'].split()[0] if values['name'] else ''
+    return {slot: value for slot, value in values.items() if value}
+
+
+def _candidate_values(value) -> Iterator[str]:
+    """Every string in a candidate record, nested lists and dicts included"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _candidate_values(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _candidate_values(item)
+    elif value is not None:
+        yield str(value)
+
+
+def make_template(response: str, candidate_data: Dict) -> Optional[str]:
+    """
+    Check that a reply written with slots is safe to share between candidates
+    
+    Args:
+        response: LLM reply generated without candidate data, using SLOT_DEFAULTS slots
+        candidate_data: Candidate the reply is first shown to
+        
+    Returns:
+        str: Template for str.format_map, or None if the reply must not be shared
+    """
+    try:
+        fields = [(literal, field, spec, conversion) for literal, field, spec, conversion in _FORMATTER.parse(response)]
+    except ValueError:
+        return None
+    if any(field is not None and (field not in SLOT_DEFAULTS or spec or conversion)
+           for _, field, spec, conversion in fields):
+        return None
+    
+    text = ''.join(literal for literal, _, _, _ in fields)
+    if _DIGIT_RUN.search(text):
+        return None
+    
+    lowered = text.lower()
+    name_words = str(candidate_data.get('name') or '').split()
+    for value in itertools.chain(name_words, _candidate_values(candidate_data)):
+        value = value.strip().lower()
+        if len(value) > 2 and re.search(r'(?<!\w)' + re.escape(value) + r'(?!\w)', lowered):
+            return None
+    return response
+
+
+def render_template(template: str, candidate_data: Dict) -> str:
+    """Fill a template's slots for a candidate"""
+    return template.format_map({**SLOT_DEFAULTS, **_slot_values(candidate_data)})
+
+
+class ResponseCache:
+    """LRU/TTL cache of reply templates keyed by intent or normalized message"""
+    
+    def __init__(self, path: Optional[str] = None, max_entries: int = 512, ttl_seconds: float = 7 * 86400,
+                 confidence: float = 0.8, margin: float = 0.1, flush_interval: float = 5.0):
+        """
+        Open a response cache
+        
+        Args:
+            path: Persistence file (None keeps the cache in memory)
+            max_entries: Entries kept before the least recently used are evicted
+            ttl_seconds: Age after which an entry is regenerated
+            confidence: Lowest similarity to an intent's examples for an intent key
+            margin: Lowest lead of the best intent over the runner-up for an intent key
+            flush_interval: Shortest time between write-behind flushes (seconds)
+        """
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.confidence = confidence
+        self.margin = margin
+        self.flush_interval = flush_interval
+        
+        self.embedder = HashingEmbedder(dim=256)
+        self._intent_names = [intent for intent, examples in INTENTS.items() for _ in examples]
+        self._intent_vectors = self.embedder.encode(
+            [normalize_message(example) for examples in INTENTS.values() for example in examples])
+        
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = 0.0
+        self.metrics = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0, 'rejected': 0, 'evicted': 0}
+        
+        if self.path is not None:
+            self._load()
+            atexit.register(self.close)
+    
+    def _load(self):
+        """Read persisted entries, dropping expired ones"""
+        try:
+            state = serialization.load_file(self.path)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        entries = sorted(state.get('entries', {}).items(), key=lambda item: item[1].get('used', 0))
+        for key, entry in entries[-self.max_entries:]:
+            if now - entry.get('created', 0) < self.ttl_seconds:
+                self._entries[key] = entry
+    
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Match a message to an intent
+        
+        Args:
+            text: Normalized message
+            
+        Returns:
+            tuple: (intent, confidence), intent None when no intent is a clear match
+        """
+        vector = self.embedder.encode([text])[0]
+        if not vector.any():
+            return None, 0.0
+        similarities = self._intent_vectors @ vector
+        best: Dict[str, float] = {}
+        for intent, similarity in zip(self._intent_names, similarities.tolist()):
+            if similarity > best.get(intent, -1.0):
+                best[intent] = similarity
+        ranked = sorted(best.items(), key=lambda item: -item[1])
+        intent, confidence = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if confidence < self.confidence or confidence - runner_up < self.margin:
+            return None, confidence
+        return intent, confidence
+    
+    def key(self, user_input: str) -> Optional[str]:
+        """
+        Cache key of a message
+        
+        Args:
+            user_input: Raw candidate message
+            
+        Returns:
+            str: '<tenant>|intent:<name>' or '<tenant>|text:<normalized message>',
+                 or None if the message must go to the LLM
+        """
+        text = normalize_message(user_input)
+        if not text or _SPECIFIC_PATTERN.search(user_input):
+            with self._lock:
+                self.metrics['bypassed'] += 1
+            return None
+        tenant = current_context().get('tenant') or 'default'
+        intent, _ = self.classify(text)
+        if intent is not None:
+            return f"{tenant}|intent:{intent}"
+        if len(text) > MAX_TEXT_KEY_CHARS:
+            with self._lock:
+                self.metrics['bypassed'] += 1
+            return None
+        return f"{tenant}|text:{text}"
+    
+    def get(self, key: str, candidate_data: Dict) -> Optional[str]:
+        """
+        Cached reply for a key, personalized for the candidate
+        
+        Args:
+            key: Result of key()
+            candidate_data: Candidate to fill the template for
+            
+        Returns:
+            str: Reply, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['created'] >= self.ttl_seconds:
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry['used'] = now
+            entry['hits'] += 1
+            self.metrics['hits'] += 1
+            template = entry['template']
+        return render_template(template, candidate_data)
+    
+    def put(self, key: str, candidate_data: Dict, response: str) -> bool:
+        """
+        Store a reply template under a key
+        
+        Args:
+            key: Result of key()
+            candidate_data: Candidate the reply is first shown to
+            response: Reply generated without candidate data, with slots
+            
+        Returns:
+            bool: False if the reply is not safe to share (see make_template)
+        """
+        template = make_template(response, candidate_data)
+        with self._lock:
+            if template is None:
+                self.metrics['rejected'] += 1
+                return False
+            now = time.time()
+            self._entries[key] = {'template': template, 'created': now, 'used': now, 'hits': 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evicted'] += 1
+            self.metrics['stored'] += 1
+            self._dirty = True
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            # A failed write is retried with the next change or on close
+            try:
+                self.flush()
+            except OSError:
+                pass
+        return True
+    
+    def flush(self):
+        """Write the entries if they changed since the last write"""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {'entries': dict(self._entries)}
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            serialization.dump_file(state, temp_path, pretty=False)
+            os.replace(temp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+    
+    def close(self):
+        """Write pending changes"""
+        try:
+            self.flush()
+        except OSError:
+            # The cache directory was removed; there is nowhere left to write
+            pass
+    
+    def entries(self) -> Dict[str, Dict]:
+        """Cached entries, least recently used first"""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._entries.items()}
+    
+    def get_metrics(self) -> Dict:
+        """Hit, miss, bypass and store counts plus the current size"""
+        with self._lock:
+            lookups = self.metrics['hits'] + self.metrics['misses']
+            return {**self.metrics, 'entries': len(self._entries),
+                    'hit_rate': round(self.metrics['hits'] / lookups, 3) if lookups else None}
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: Optional[str] = None) -> Optional[ResponseCache]:
+    """
+    Get the shared response cache for this process
+    
+    Args:
+        path: Persistence file (defaults to RESPONSE_CACHE_PATH)
+        
+    Returns:
+        ResponseCache: Shared cache configured from RESPONSE_CACHE_* variables,
+                       or None when RESPONSE_CACHE_PATH is not set
+    """
+    path = path or os.getenv('RESPONSE_CACHE_PATH')
+    if not path:
+        return None
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(
+                path,
+                max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '512')),
+                ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL_HOURS', '168')) * 3600,
+                confidence=float(os.getenv('RESPONSE_CACHE_CONFIDENCE', '0.8'))
+            )
+        return _caches[path]
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Inspect the contextual response cache")
+    parser.add_argument('--path', default=os.getenv('RESPONSE_CACHE_PATH', 'response_cache.json'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='Print cached keys with their hit counts')
+    classify_parser = subparsers.add_parser('classify', help='Show the cache key of messages')
+    classify_parser.add_argument('messages', nargs='+')
+    args = parser.parse_args()
+    
+    cache = ResponseCache(args.path)
+    if args.command == 'list':
+        for key, entry in cache.entries().items():
+            print(f"{entry['hits']:>6}  {key}")
+    else:
+        for message in args.messages:
+            text = normalize_message(message)
+            intent, confidence = cache.classify(text) if text else (None, 0.0)
+            print(f"{message!r}: key={cache.key(message)} intent={intent} confidence={confidence:.2f}")
@@ -0,0 +1,452 @@
+"""
+Retention Module
+================
+Scheduled retention and compaction for the candidate data directory.
+
+One pass (run_once) applies three policies:
+
+- records whose timestamp is older than archive_after_days move out of the
+  record store into compressed cold segments, one gzip member per batch:
+
+      <data_dir>/archive/records-<created>-<pid>.jsonl.gz
+
+  Each archived record is registered in the artifact manifest, so erasure
+  still finds it and restore() can bring it back.
+- files in <data_dir>/exports older than export_max_age_days are removed.
+- legacy text logs are compressed into <data_dir>/archive/logs, and audit and
+  transcript segments older than log_max_age_days are removed.
+
+All file I/O goes through a byte-rate throttle and records move in small
+batches, so a pass running next to live screening only adds short, bounded
+pauses. Run it from the CLI (python retention.py run) or as a background thread
+(RetentionManager.start).
+"""
+
+import gzip
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import serialization
+
+
+# Pre-structured-logging text logs written by older releases
+LEGACY_LOGS = ('activity_log.txt', 'deletion_log.txt')
+
+# Bytes copied per throttled step
+COPY_CHUNK_SIZE = 256 * 1024
+
+
+class IOThrottle:
+    """Token bucket limiting the average byte rate of background I/O"""
+    
+    def __init__(self, bytes_per_second: float):
+        """
+        Args:
+            bytes_per_second: Sustained rate (0 disables throttling)
+        """
+        self.rate = bytes_per_second
+        self._allowance = bytes_per_second
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, nbytes: int):
+        """Account for nbytes of I/O, sleeping once the one-second burst is spent"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= nbytes
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+def read_archive_segment(path: Path) -> Iterator[Dict]:
+    """
+    Read the records of a cold segment
+    
+    Args:
+        path: Segment file
+        
+    Yields:
+        dict: Archived records; a torn final member is skipped
+    """
+    with gzip.open(path, 'rb') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield serialization.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+def rewrite_archive_segment(path: Path, drop_ids: Iterable[str]) -> List[Dict]:
+    """
+    Remove records from a cold segment
+    
+    Args:
+        path: Segment file
+        drop_ids: Candidate IDs to remove
+        
+    Returns:
+        list: The removed records
+    """
+    drop_ids = set(drop_ids)
+    path = Path(path)
+    if not path.exists():
+        return []
+    
+    kept, removed = [], []
+    for record in read_archive_segment(path):
+        (removed if record.get('candidate_id') in drop_ids else kept).append(record)
+    if not removed:
+        return []
+    
+    if kept:
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(b''.join(serialization.dumpb(record) + b'\n' for record in kept)))
+        os.replace(temp_path, path)
+    else:
+        path.unlink()
+    return removed
+
+
+def _record_time(record: Dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(record.get('timestamp', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetentionManager:
+    """Applies archive, export and log retention policies to a data directory"""
+    
+    def __init__(self, handler, archive_after_days: Optional[float] = 365,
+                 export_max_age_days: Optional[float] = 30, log_max_age_days: Optional[float] = 365,
+                 io_bytes_per_second: float = 4 * 1024 * 1024, batch_size: int = 200,
+                 segment_max_bytes: int = 32 * 1024 * 1024, transcript_dir: Optional[str] = None):
+        """
+        Initialize the retention manager
+        
+        Args:
+            handler: CandidateDataHandler owning the data directory
+            archive_after_days: Age after which records are archived (None disables)
+            export_max_age_days: Age after which export files are removed (None disables)
+            log_max_age_days: Age after which audit and transcript segments are removed (None disables)
+            io_bytes_per_second: Throttle for archive, copy and delete I/O (0 disables)
+            batch_size: Records archived per store transaction
+            segment_max_bytes: Size after which a new cold segment is started
+            transcript_dir: Transcript segment directory to prune
+        """
+        self.handler = handler
+        self.archive_after_days = archive_after_days
+        self.export_max_age_days = export_max_age_days
+        self.log_max_age_days = log_max_age_days
+        self.throttle = IOThrottle(io_bytes_per_second)
+        self.batch_size = max(1, batch_size)
+        self.segment_max_bytes = segment_max_bytes
+        self.transcript_dir = Path(transcript_dir) if transcript_dir else None
+        
+        self.archive_dir = handler.data_dir / "archive"
+        self._segment: Optional[Path] = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def run_once(self, dry_run: bool = False) -> Dict:
+        """
+        Apply every enabled policy once
+        
+        Args:
+            dry_run: Only count what would be archived or removed
+            
+        Returns:
+            dict: Counts per policy
+        """
+        with self._run_lock:
+            now = datetime.now()
+            summary = {'archived': 0, 'exports_removed': 0, 'logs_compressed': 0, 'segments_removed': 0}
+            if self.archive_after_days is not None:
+                summary['archived'] = self.archive_records(now - timedelta(days=self.archive_after_days), dry_run)
+            if self.export_max_age_days is not None:
+                summary['exports_removed'] = self.prune_exports(now - timedelta(days=self.export_max_age_days),
+                                                                dry_run)
+            if self.log_max_age_days is not None:
+                logs, segments = self.rotate_logs(now - timedelta(days=self.log_max_age_days), dry_run)
+                summary['logs_compressed'], summary['segments_removed'] = logs, segments
+            return summary
+    
+    def _current_segment(self) -> Path:
+        """Cold segment for the next batch, rolling over once the current one is full"""
+        if self._segment is None or not self._segment.exists() or \
+                self._segment.stat().st_size >= self.segment_max_bytes:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            created = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            self._segment = self.archive_dir / f"records-{created}-{os.getpid()}.jsonl.gz"
+        return self._segment
+    
+    def archive_records(self, cutoff: datetime, dry_run: bool = False) -> int:
+        """
+        Move records older than cutoff into cold segments
+        
+        Args:
+            cutoff: Records with an earlier timestamp are archived
+            dry_run: Only count them
+            
+        Returns:
+            int: Records archived
+        """
+        store = self.handler.store
+        
+        # Collect IDs first so the store is not modified while it is being scanned;
+        # the scan reads every record, so it is paced at the average record size
+        record_bytes = store.disk_usage() // max(store.count(), 1)
+        old_ids = []
+        for scanned, record in enumerate(self.handler.iter_candidates(), 1):
+            timestamp = _record_time(record)
+            if timestamp is not None and timestamp < cutoff:
+                old_ids.append(record['candidate_id'])
+            if scanned % self.batch_size == 0:
+                self.throttle.consume(record_bytes * self.batch_size)
+        if dry_run:
+            return len(old_ids)
+        
+        archived = 0
+        for start in range(0, len(old_ids), self.batch_size):
+            records = [r for r in (store.get(cid) for cid in old_ids[start:start + self.batch_size]) if r]
+            if not records:
+                continue
+            
+            raw = b''.join(serialization.dumpb(record) + b'\n' for record in records)
+            data = gzip.compress(raw)
+            segment = self._current_segment()
+            with open(segment, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            ids = [record['candidate_id'] for record in records]
+            self.handler.manifest.add_many((candidate_id, 'archive', str(segment)) for candidate_id in ids)
+            store.delete_many(ids)
+            for candidate_id in ids:
+                self.handler._remove_from_indexes(candidate_id)
+                self.handler.audit_log.log('ARCHIVE_CANDIDATE', candidate_id, segment=segment.name)
+            
+            archived += len(ids)
+            self.throttle.consume(len(raw) + len(data))
+        return archived
+    
+    def restore(self, candidate_ids: Iterable[str]) -> int:
+        """
+        Move archived records back into the record store
+        
+        Args:
+            candidate_ids: Candidates to restore
+            
+        Returns:
+            int: Records restored
+        """
+        ids = list(dict.fromkeys(candidate_ids))
+        segments: Dict[str, List[str]] = {}
+        for candidate_id, entries in self.handler.manifest.locations(ids).items():
+            for kind, location in entries:
+                if kind == 'archive':
+                    segments.setdefault(location, []).append(candidate_id)
+        
+        restored = 0
+        for location, segment_ids in segments.items():
+            for record in rewrite_archive_segment(Path(location), segment_ids):
+                self.handler._write_record(record)
+                self.handler._update_indexes(record)
+                self.handler.audit_log.log('RESTORE_CANDIDATE', record['candidate_id'])
+                restored += 1
+            self.handler.manifest.remove((candidate_id, 'archive', location) for candidate_id in segment_ids)
+        return restored
+    
+    def prune_exports(self, cutoff: datetime, dry_run: bool = False) -> int:
+        """
+        Remove export files last modified before cutoff
+        
+        Args:
+            cutoff: Older files are removed
+            dry_run: Only count them
+            
+        Returns:
+            int: Files removed
+        """
+        export_dir = self.handler.data_dir / "exports"
+        if not export_dir.is_dir():
+            return 0
+        
+        stale = [path for path in export_dir.iterdir()
+                 if path.is_file() and datetime.fromtimestamp(path.stat().st_mtime) < cutoff]
+        if dry_run:
+            return len(stale)
+        
+        removed = []
+        for path in stale:
+            size = path.stat().st_size
+            path.unlink()
+            removed.append(str(path))
+            self.throttle.consume(size)
+        self.handler.manifest.forget([], removed)
+        return len(removed)
+    
+    def rotate_logs(self, cutoff: datetime, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Compress legacy text logs and remove old audit and transcript segments
+        
+        Args:
+            cutoff: Segments last modified before this are removed
+            dry_run: Only count them
+            
+        Returns:
+            tuple: (text logs compressed, segments removed)
+        """
+        legacy = [self.handler.data_dir / name for name in LEGACY_LOGS]
+        legacy = [path for path in legacy if path.exists() and path.stat().st_size]
+        
+        old_segments = []
+        audit_dir = self.handler.audit_log.log_dir
+        # The segment the audit log has open stays, however long it has been idle
+        active = self.handler.audit_log.active_segment()
+        candidates = [path for path in audit_dir.glob("audit-*.jsonl") if path != active]
+        if self.transcript_dir is not None and self.transcript_dir.is_dir():
+            candidates.extend(self.transcript_dir.glob("segment-*.jsonl.gz"))
+        for path in candidates:
+            try:
+                if datetime.fromtimestamp(path.stat().st_mtime) < cutoff:
+                    old_segments.append(path)
+            except FileNotFoundError:
+                # Removed by another pass since the listing
+                continue
+        
+        if dry_run:
+            return len(legacy), len(old_segments)
+        
+        for path in legacy:
+            self._compress_log(path)
+        
+        removed = 0
+        for path in old_segments:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            path.with_name(path.name + '.idx').unlink(missing_ok=True)
+            self.throttle.consume(size)
+            removed += 1
+        
+        return len(legacy), removed
+    
+    def _compress_log(self, path: Path):
+        """Move a text log into archive/logs as gzip, copying in throttled chunks"""
+        target_dir = self.archive_dir / "logs"
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / f"{path.stem}-{datetime.now().strftime('%Y%m%d%H%M%S')}{path.suffix}.gz"
+        
+        with open(path, 'rb') as source, gzip.open(target, 'wb') as destination:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                destination.write(chunk)
+                self.throttle.consume(len(chunk))
+        path.unlink()
+    
+    def start(self, interval: float = 24 * 3600):
+        """
+        Run retention passes in a background thread
+        
+        Args:
+            interval: Seconds between passes
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except OSError:
+                    # Retry on the next pass
+                    pass
+                self._stop.wait(interval)
+        
+        self._thread = threading.Thread(target=loop, name='retention', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background thread after the current pass"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _env_days(name: str, default: str) -> Optional[float]:
+    value = os.getenv(name, default).strip()
+    return float(value) if value else None
+
+
+def create_retention_manager(handler, prune_transcripts: bool = True) -> RetentionManager:
+    """
+    Create a retention manager configured from the environment
+    
+    Reads RETENTION_ARCHIVE_DAYS, RETENTION_EXPORT_DAYS and RETENTION_LOG_DAYS
+    (empty disables a policy), RETENTION_IO_MBPS and TRANSCRIPT_LOG_DIR.
+    
+    Args:
+        handler: CandidateDataHandler owning the data directory
+        prune_transcripts: Also prune TRANSCRIPT_LOG_DIR; the transcript log is
+            shared by all tenants, so only one manager per process should
+        
+    Returns:
+        RetentionManager: New manager
+    """
+    return RetentionManager(
+        handler,
+        archive_after_days=_env_days('RETENTION_ARCHIVE_DAYS', '365'),
+        export_max_age_days=_env_days('RETENTION_EXPORT_DAYS', '30'),
+        log_max_age_days=_env_days('RETENTION_LOG_DAYS', '365'),
+        io_bytes_per_second=float(os.getenv('RETENTION_IO_MBPS', '4')) * 1024 * 1024,
+        transcript_dir=os.getenv('TRANSCRIPT_LOG_DIR', 'transcripts') if prune_transcripts else None
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from data_handler import CandidateDataHandler
+    
+    parser = argparse.ArgumentParser(description="Apply retention policies to the candidate data directory")
+    parser.add_argument('--data-dir', default='candidate_data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = subparsers.add_parser('run', help='Apply archive, export and log policies once')
+    run_parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+    
+    restore_parser = subparsers.add_parser('restore', help='Move archived records back into the store')
+    restore_parser.add_argument('ids', nargs='+')
+    
+    args = parser.parse_args()
+    handler = CandidateDataHandler(data_dir=args.data_dir)
+    manager = create_retention_manager(handler)
+    
+    if args.command == 'run':
+        start = time.perf_counter()
+        for key, value in manager.run_once(args.dry_run).items():
+            print(f"{key}: {value}")
+        print(f"seconds: {time.perf_counter() - start:.2f}")
+    else:
+        print(f"restored: {manager.restore(args.ids)}")
+    handler.close()
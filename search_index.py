@@ -0,0 +1,243 @@
+"""
+Search Index Module
+===================
+Local inverted index with BM25 ranking and facet filters over stored candidates.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import extract_keywords, validate_years_experience
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize text for indexing and querying
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        list: Normalized tokens
+    """
+    tokens = []
+    for word in extract_keywords(text):
+        # extract_keywords keeps dots and hyphens, so trim them from the edges
+        word = word.strip('.-')
+        if len(word) > 2:
+            tokens.append(word)
+    return tokens
+
+
+class CandidateSearchIndex:
+    """In-memory inverted index over candidate records"""
+    
+    # Fields that contribute to full-text search
+    FIELDS = ('technical_answers', 'tech_stack', 'position', 'location')
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Initialize an empty index with BM25 parameters"""
+        self.k1 = k1
+        self.b = b
+        
+        # term -> {candidate_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Set[str]] = {}
+        self.facets: Dict[str, Dict] = {}
+        self.total_length = 0
+        
+        self._lock = threading.RLock()
+    
+    def _document_text(self, record: Dict) -> str:
+        """Concatenate searchable fields of a record"""
+        parts = []
+        for field in self.FIELDS:
+            value = record.get(field, '')
+            if isinstance(value, list):
+                value = ' '.join(map(str, value))
+            parts.append(str(value or ''))
+        return ' '.join(parts)
+    
+    def _document_facets(self, record: Dict) -> Dict:
+        """Extract facet values used for filtering"""
+        return {
+            'location': str(record.get('location', '') or '').lower(),
+            'position': str(record.get('position', '') or '').lower(),
+            'experience': validate_years_experience(str(record.get('experience', '') or '')),
+            'tech_stack': {str(tech).lower().strip() for tech in record.get('tech_stack', []) or []},
+            'status': record.get('status', ''),
+            'timestamp': record.get('timestamp', '')
+        }
+    
+    def add(self, record: Dict):
+        """
+        Add or replace a candidate record in the index
+        
+        Args:
+            record: Stored candidate record (must contain candidate_id)
+        """
+        candidate_id = record.get('candidate_id')
+        if not candidate_id:
+            return
+        
+        tokens = tokenize(self._document_text(record))
+        # Whole tech names (e.g. "go", "c#") are too short for the keyword extractor
+        tokens.extend(tech for tech in self._document_facets(record)['tech_stack'] if tech)
+        
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        
+        with self._lock:
+            self.remove(candidate_id)
+            
+            for term, count in frequencies.items():
+                self.postings.setdefault(term, {})[candidate_id] = count
+            
+            self.doc_terms[candidate_id] = set(frequencies)
+            self.doc_lengths[candidate_id] = len(tokens)
+            self.facets[candidate_id] = self._document_facets(record)
+            self.total_length += len(tokens)
+    
+    def add_many(self, records: Iterable[Dict]):
+        """Add several records to the index"""
+        for record in records:
+            self.add(record)
+    
+    def remove(self, candidate_id: str) -> bool:
+        """
+        Remove a candidate from the index
+        
+        Args:
+            candidate_id: Unique candidate identifier
+        
+        Returns:
+            bool: True if the candidate was indexed
+        """
+        with self._lock:
+            if candidate_id not in self.doc_terms:
+                return False
+            
+            for term in self.doc_terms.pop(candidate_id):
+                postings = self.postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(candidate_id, None)
+                if not postings:
+                    del self.postings[term]
+            
+            self.total_length -= self.doc_lengths.pop(candidate_id, 0)
+            self.facets.pop(candidate_id, None)
+            return True
+    
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+    
+    def __contains__(self, candidate_id: str) -> bool:
+        return candidate_id in self.doc_lengths
+    
+    def _matches_facets(self, facets: Dict, location: Optional[str], position: Optional[str],
+                        min_experience: Optional[float], max_experience: Optional[float],
+                        tech_stack: Optional[List[str]], status: Optional[str]) -> bool:
+        """Check a document's facets against the requested filters"""
+        if location and location.lower() not in facets['location']:
+            return False
+        if position and position.lower() not in facets['position']:
+            return False
+        if min_experience is not None or max_experience is not None:
+            years = facets['experience']
+            if years is None:
+                return False
+            if min_experience is not None and years < min_experience:
+                return False
+            if max_experience is not None and years > max_experience:
+                return False
+        if tech_stack and not all(tech.lower().strip() in facets['tech_stack'] for tech in tech_stack):
+            return False
+        if status and facets['status'] != status:
+            return False
+        return True
+    
+    def search(self, query: str = '', location: Optional[str] = None, position: Optional[str] = None,
+               min_experience: Optional[float] = None, max_experience: Optional[float] = None,
+               tech_stack: Optional[List[str]] = None, status: Optional[str] = None,
+               limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank candidates by BM25 relevance, restricted by facet filters
+        
+        Args:
+            query: Free-text query (empty for facet-only search)
+            location: Substring match on location (case-insensitive)
+            position: Substring match on position (case-insensitive)
+            min_experience: Minimum years of experience
+            max_experience: Maximum years of experience
+            tech_stack: Technologies the candidate must all list
+            status: Exact record status
+            limit: Maximum number of results
+        
+        Returns:
+            list: (candidate_id, score) tuples, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        terms.extend(word for word in query.lower().split() if len(word) <= 2 and word not in terms)
+        
+        with self._lock:
+            def accept(candidate_id: str) -> bool:
+                return self._matches_facets(self.facets[candidate_id], location, position,
+                                            min_experience, max_experience, tech_stack, status)
+            
+            if not terms or not query.strip():
+                # Facet-only search: newest candidates first
+                matches = [cid for cid in self.facets if accept(cid)]
+                matches.sort(key=lambda cid: self.facets[cid]['timestamp'], reverse=True)
+                return [(cid, 0.0) for cid in matches[:limit]]
+            
+            total_docs = len(self.doc_lengths)
+            avg_length = (self.total_length / total_docs) if total_docs else 0.0
+            scores: Dict[str, float] = {}
+            
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                
+                doc_freq = len(postings)
+                idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+                
+                for candidate_id, freq in postings.items():
+                    if candidate_id not in scores and not accept(candidate_id):
+                        continue
+                    length_norm = 1 - self.b + self.b * (self.doc_lengths[candidate_id] / avg_length if avg_length else 0)
+                    term_score = idf * (freq * (self.k1 + 1)) / (freq + self.k1 * length_norm)
+                    scores[candidate_id] = scores.get(candidate_id, 0.0) + term_score
+            
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            return ranked[:limit]
+    
+    def facet_counts(self, field: str, candidate_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Count facet values, optionally restricted to a result set
+        
+        Args:
+            field: One of 'location', 'position', 'tech_stack', 'status'
+            candidate_ids: Restrict counting to these candidates
+        
+        Returns:
+            dict: Facet value -> count
+        """
+        counts: Dict[str, int] = {}
+        with self._lock:
+            ids = self.facets.keys() if candidate_ids is None else candidate_ids
+            for candidate_id in ids:
+                facets = self.facets.get(candidate_id)
+                if facets is None:
+                    continue
+                values = facets.get(field)
+                if isinstance(values, set):
+                    for value in values:
+                        counts[value] = counts.get(value, 0) + 1
+                elif values:
+                    counts[values] = counts.get(values, 0) + 1
+        return counts
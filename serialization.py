@@ -0,0 +1,358 @@
+"""
+Serialization Module
+====================
+JSON encoding and decoding shared by every module.
+
+Uses orjson when installed, then ujson, then the stdlib json module (set
+JSON_BACKEND to force one). All backends produce UTF-8 without ASCII escaping,
+accept datetime/date values (ISO 8601), sets and paths, and offer a compact mode
+for storage and a pretty (indent=2) mode for human-readable files.
+
+Large files can be decoded incrementally: iter_jsonl() reads JSON Lines one
+record at a time and iter_array() walks a top-level JSON array without loading
+the whole document.
+"""
+
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+from pathlib import PurePath
+from typing import Any, BinaryIO, Dict, Iterator, Union
+
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+# Bytes read per step when stream-decoding a JSON array
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _default(value: Any) -> Any:
+    """Encode types the JSON backends do not handle natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, PurePath):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumpb(obj: Any, pretty: bool, sort_keys: bool) -> bytes:
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys, default=_default)
+    else:
+        text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys, default=_default)
+    return text.encode('utf-8')
+
+
+def _stdlib_loads(data: Union[str, bytes]) -> Any:
+    return json.loads(data)
+
+
+def _orjson_functions():
+    import orjson
+    
+    def dumpb(obj: Any, pretty: bool, sort_keys: bool) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    
+    return dumpb, orjson.loads
+
+
+def _ujson_functions():
+    import ujson
+    
+    def dumpb(obj: Any, pretty: bool, sort_keys: bool) -> bytes:
+        text = ujson.dumps(obj, indent=2 if pretty else 0, ensure_ascii=False, sort_keys=sort_keys,
+                           escape_forward_slashes=False, default=_default)
+        return text.encode('utf-8')
+    
+    return dumpb, ujson.loads
+
+
+_dumpb = _stdlib_dumpb
+_loads = _stdlib_loads
+BACKEND = 'json'
+
+
+def use_backend(name: str = None) -> str:
+    """
+    Select the JSON backend
+    
+    Args:
+        name: 'orjson', 'ujson' or 'json' (defaults to JSON_BACKEND, then the
+              fastest one installed)
+              
+    Returns:
+        str: Backend now in use
+    """
+    global _dumpb, _loads, BACKEND
+    
+    name = name or os.getenv('JSON_BACKEND')
+    candidates = [name] if name else list(BACKENDS)
+    
+    for candidate in candidates:
+        try:
+            if candidate == 'orjson':
+                _dumpb, _loads = _orjson_functions()
+            elif candidate == 'ujson':
+                _dumpb, _loads = _ujson_functions()
+            elif candidate == 'json':
+                _dumpb, _loads = _stdlib_dumpb, _stdlib_loads
+            else:
+                raise ValueError(f"Unknown JSON backend: {candidate} (expected one of {', '.join(BACKENDS)})")
+        except ImportError:
+            if name:
+                raise
+            continue
+        BACKEND = candidate
+        return BACKEND
+    
+    return BACKEND
+
+
+use_backend()
+
+
+def dumpb(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes
+    
+    Args:
+        obj: Value to serialize
+        pretty: Indent with two spaces
+        sort_keys: Sort object keys (stable output for hashing)
+        
+    Returns:
+        bytes: Encoded JSON
+    """
+    return _dumpb(obj, pretty, sort_keys)
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """
+    Serialize to a JSON string
+    
+    Args:
+        obj: Value to serialize
+        pretty: Indent with two spaces
+        sort_keys: Sort object keys (stable output for hashing)
+        
+    Returns:
+        str: Encoded JSON
+    """
+    return _dumpb(obj, pretty, sort_keys).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    Parse JSON from a string or bytes
+    
+    Args:
+        data: Encoded JSON
+        
+    Returns:
+        Decoded value
+    """
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return _loads(data)
+
+
+def dump_file(obj: Any, path: Union[str, PurePath], pretty: bool = True):
+    """
+    Write a value to a JSON file
+    
+    Args:
+        obj: Value to serialize
+        path: Destination file
+        pretty: Indent with two spaces (the default for files people read)
+    """
+    with open(path, 'wb') as f:
+        f.write(_dumpb(obj, pretty, False))
+
+
+def load_file(path: Union[str, PurePath]) -> Any:
+    """
+    Read a JSON file
+    
+    Args:
+        path: Source file
+        
+    Returns:
+        Decoded value
+    """
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def _open_binary(source: Union[str, PurePath, BinaryIO]):
+    """Open a path for binary reading, or pass an open file through"""
+    if isinstance(source, (str, PurePath)):
+        return open(source, 'rb'), True
+    return source, False
+
+
+def iter_jsonl(source: Union[str, PurePath, BinaryIO]) -> Iterator[Any]:
+    """
+    Decode a JSON Lines file one record at a time
+    
+    Args:
+        source: Path or binary file object
+        
+    Yields:
+        Decoded value per non-empty line
+    """
+    f, owned = _open_binary(source)
+    try:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+    finally:
+        if owned:
+            f.close()
+
+
+def iter_array(source: Union[str, PurePath, BinaryIO], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Decode the items of a top-level JSON array without loading the whole file
+    
+    Args:
+        source: Path or binary file object containing a JSON array
+        chunk_size: Bytes read per step
+        
+    Yields:
+        Decoded array items in order
+    """
+    decoder = json.JSONDecoder()
+    f, owned = _open_binary(source)
+    reader = io.TextIOWrapper(f, encoding='utf-8')
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = reader.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+        return bool(chunk)
+    
+    try:
+        while True:
+            # Skip whitespace and separators
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer) or not fill():
+                    break
+            
+            if position >= len(buffer):
+                raise ValueError("Unexpected end of JSON array")
+            
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            
+            if buffer[position] == ']':
+                return
+            
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # A number cut by the chunk boundary ("3." of "3.14") decodes as a shorter
+                    # value, so an item only counts once the delimiter after it is buffered
+                    if eof or (end < len(buffer) and buffer[end] in ' \t\r\n,]'):
+                        break
+                except json.JSONDecodeError:
+                    # The item continues past the buffered text
+                    if eof:
+                        raise
+                fill()
+            position = end
+            yield item
+    finally:
+        reader.detach()
+        if owned:
+            f.close()
+
+
+def benchmark(count: int = 5000) -> Dict[str, Dict]:
+    """
+    Time candidate-store saves and loads with every installed backend
+    
+    Each backend writes the records as pretty JSON files (the json storage
+    layout) and as compact JSON Lines, then loads them back.
+    
+    Args:
+        count: Synthetic candidate records
+        
+    Returns:
+        dict: Seconds per operation for each backend
+    """
+    import tempfile
+    from pathlib import Path
+    from record_store import _sample_record
+    
+    records = [{**_sample_record(i), 'scored_at': datetime(2025, 1, 1, 12, 0, i % 60)} for i in range(count)]
+    previous = BACKEND
+    results = {}
+    
+    for name in BACKENDS:
+        try:
+            use_backend(name)
+        except ImportError:
+            continue
+        
+        timings = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            
+            start = time.perf_counter()
+            for record in records:
+                dump_file(record, temp_path / f"{record['candidate_id']}.json")
+            timings['save_files'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for json_file in temp_path.glob("*.json"):
+                load_file(json_file)
+            timings['load_files'] = time.perf_counter() - start
+            
+            jsonl_path = temp_path / "candidates.jsonl"
+            start = time.perf_counter()
+            with open(jsonl_path, 'wb') as f:
+                for record in records:
+                    f.write(dumpb(record) + b'\n')
+            timings['save_jsonl'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            sum(1 for _ in iter_jsonl(jsonl_path))
+            timings['load_jsonl'] = time.perf_counter() - start
+        
+        results[name] = {key: round(value, 4) for key, value in timings.items()}
+    
+    use_backend(previous)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends on the candidate store")
+    parser.add_argument('--count', type=int, default=5000, help='Synthetic records')
+    args = parser.parse_args()
+    
+    print(f"active backend: {BACKEND}")
+    for name, timings in benchmark(args.count).items():
+        print(f"{name}: " + ', '.join(f"{key}={value}s" for key, value in timings.items()))
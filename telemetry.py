@@ -0,0 +1,377 @@
+"""
+Telemetry Module
+================
+Conversation funnel telemetry: where candidates drop out and how long each stage takes.
+
+The engine and the front ends emit four events per stage:
+
+- stage_entered      the conversation moved into a stage (greeting on session start)
+- stage_completed    the stage's answer was accepted; carries the time spent in
+                     the stage and the number of rejected answers before it
+- validation_failed  an extractor rejected the answer (invalid email, phone,
+                     experience, empty tech stack) and the stage was asked again
+- exited             the candidate left with an exit command
+
+emit() only appends to an in-memory buffer; a background thread writes the
+batch to a local SQLite time-series store (TELEMETRY_DB) and, in the same
+transaction, folds it into per-hour, per-tenant, per-stage rollups, so
+reports never scan the raw events. Raw events can be pruned on their own;
+the rollups are kept.
+
+Time in stage and retries are tracked per session in the emitting process.
+When a session moves between processes (several API workers) the stage it
+was in on arrival has no duration; the counts are unaffected.
+
+    python telemetry.py report --hours 24
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import serialization
+from rate_limiter import current_context
+
+
+EVENTS = ('stage_entered', 'stage_completed', 'validation_failed', 'exited')
+
+# Rollup counter per event
+_COUNTERS = {
+    'stage_entered': 'entered',
+    'stage_completed': 'completed',
+    'validation_failed': 'validation_failed',
+    'exited': 'exited'
+}
+
+# Position of each event's counter in a stage_hourly row
+_COUNTER_INDEX = {event: index for index, event in enumerate(_COUNTERS)}
+
+# Events without a tenant are counted under the default partition (tenants.DEFAULT_TENANT)
+_DEFAULT_TENANT = 'default'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    session_id TEXT,
+    tenant TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    event TEXT NOT NULL,
+    duration_ms REAL,
+    retries INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS stage_hourly (
+    hour INTEGER NOT NULL,
+    tenant TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    entered INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    validation_failed INTEGER NOT NULL DEFAULT 0,
+    exited INTEGER NOT NULL DEFAULT 0,
+    duration_ms_total REAL NOT NULL DEFAULT 0,
+    duration_count INTEGER NOT NULL DEFAULT 0,
+    retries_total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, tenant, stage)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO stage_hourly (hour, tenant, stage, entered, completed, validation_failed, exited,
+                          duration_ms_total, duration_count, retries_total)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (hour, tenant, stage) DO UPDATE SET
+    entered = entered + excluded.entered,
+    completed = completed + excluded.completed,
+    validation_failed = validation_failed + excluded.validation_failed,
+    exited = exited + excluded.exited,
+    duration_ms_total = duration_ms_total + excluded.duration_ms_total,
+    duration_count = duration_count + excluded.duration_count,
+    retries_total = retries_total + excluded.retries_total
+"""
+
+
+def _rollup(batch: List[Tuple]) -> List[Tuple]:
+    """Fold a batch of event rows into stage_hourly increments"""
+    rows: Dict[Tuple, List] = {}
+    for ts, _, tenant, stage, event, duration_ms, retries, _ in batch:
+        key = (int(ts // 3600) * 3600, tenant, stage)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = [0, 0, 0, 0, 0.0, 0, 0]
+        row[_COUNTER_INDEX[event]] += 1
+        if event == 'stage_completed':
+            # Time in stage and retries describe stages that were got through
+            if duration_ms is not None:
+                row[4] += duration_ms
+                row[5] += 1
+            row[6] += retries or 0
+    return [key + tuple(row) for key, row in rows.items()]
+
+
+class Telemetry:
+    """Buffered funnel event writer with hourly rollups"""
+    
+    def __init__(self, db_path: str = "telemetry.db", batch_size: int = 256,
+                 flush_interval: float = 2.0, max_sessions: int = 10000):
+        """
+        Open a telemetry store
+        
+        Args:
+            db_path: SQLite file holding events and rollups
+            batch_size: Buffered events that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+            max_sessions: Sessions whose current stage is tracked for durations (least recent dropped)
+        """
+        self.db_path = str(db_path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_sessions = max_sessions
+        
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # session -> [stage, entered at, rejected answers]
+        self._sessions: "OrderedDict[str, List]" = OrderedDict()
+        
+        self._flusher = threading.Thread(target=self._flush_loop, name='telemetry', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+    
+    def emit(self, event: str, stage: str, session: Optional[str] = None, tenant: Optional[str] = None,
+             **detail):
+        """
+        Record a funnel event (never blocks on I/O)
+        
+        Args:
+            event: One of EVENTS
+            stage: Conversation stage the event belongs to
+            session: Session ID (defaults to the llm_context session)
+            tenant: Tenant ID (defaults to the llm_context tenant)
+            detail: Extra JSON-serializable fields kept with the raw event
+        """
+        if event not in _COUNTERS:
+            raise ValueError(f"Unknown telemetry event: {event}")
+        context = current_context()
+        session = session or context.get('session')
+        tenant = tenant or context.get('tenant') or _DEFAULT_TENANT
+        now = time.time()
+        duration_ms = retries = None
+        
+        with self._lock:
+            current = self._sessions.get(session) if session else None
+            if current is not None and current[0] != stage:
+                current = None
+            
+            if event == 'stage_entered' and session:
+                self._sessions[session] = [stage, now, 0]
+                self._sessions.move_to_end(session)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            elif event == 'validation_failed' and current is not None:
+                current[2] += 1
+                retries = current[2]
+            elif event in ('stage_completed', 'exited') and current is not None:
+                duration_ms = (now - current[1]) * 1000
+                retries = current[2]
+                del self._sessions[session]
+            
+            self._buffer.append((now, session, tenant, stage, event, duration_ms, retries,
+                                 serialization.dumps(detail) if detail else None))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+    
+    def _flush_loop(self):
+        """Write buffered events every flush_interval or when a batch fills"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Keep the loop alive; the events stay buffered for the next attempt
+                pass
+    
+    def flush(self) -> int:
+        """
+        Write buffered events and update the rollups in one transaction
+        
+        Returns:
+            int: Number of events written
+        """
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            
+            try:
+                with self._conn:
+                    self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    self._conn.executemany(_UPSERT, _rollup(batch))
+            except sqlite3.Error:
+                with self._lock:
+                    self._buffer[:0] = batch
+                raise
+            return len(batch)
+    
+    def close(self):
+        """Flush remaining events and stop the background writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        with self._write_lock:
+            self._conn.close()
+    
+    def _query(self, sql: str, params: Tuple) -> List[Dict]:
+        with self._write_lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def hourly(self, since: Optional[float] = None, tenant: Optional[str] = None,
+               stage: Optional[str] = None) -> List[Dict]:
+        """
+        Rollup rows by hour, tenant and stage
+        
+        Args:
+            since: Earliest hour to include (epoch seconds)
+            tenant: Only this tenant
+            stage: Only this stage
+            
+        Returns:
+            list: Rows ordered by hour, with 'hour' as epoch seconds (UTC)
+        """
+        sql = "SELECT * FROM stage_hourly WHERE hour >= ?"
+        params = [int(since // 3600) * 3600 if since else 0]
+        if tenant is not None:
+            sql += " AND tenant = ?"
+            params.append(tenant)
+        if stage is not None:
+            sql += " AND stage = ?"
+            params.append(stage)
+        return self._query(sql + " ORDER BY hour, tenant, stage", tuple(params))
+    
+    def stage_summary(self, since: Optional[float] = None, tenant: Optional[str] = None) -> List[Dict]:
+        """
+        Funnel totals per stage over the rollups
+        
+        Args:
+            since: Earliest hour to include (epoch seconds)
+            tenant: Only this tenant
+            
+        Returns:
+            list: Per stage (most entered first): entered, completed, validation_failed,
+                  exited, avg_duration_ms and retries_per_completion
+        """
+        sql = """SELECT stage, SUM(entered) AS entered, SUM(completed) AS completed,
+                        SUM(validation_failed) AS validation_failed, SUM(exited) AS exited,
+                        SUM(duration_ms_total) AS duration_ms_total, SUM(duration_count) AS duration_count,
+                        SUM(retries_total) AS retries_total
+                 FROM stage_hourly WHERE hour >= ?"""
+        params = [int(since // 3600) * 3600 if since else 0]
+        if tenant is not None:
+            sql += " AND tenant = ?"
+            params.append(tenant)
+        rows = self._query(sql + " GROUP BY stage ORDER BY entered DESC, stage", tuple(params))
+        
+        summary = []
+        for row in rows:
+            summary.append({
+                'stage': row['stage'],
+                'entered': row['entered'],
+                'completed': row['completed'],
+                'validation_failed': row['validation_failed'],
+                'exited': row['exited'],
+                'avg_duration_ms': round(row['duration_ms_total'] / row['duration_count'], 1)
+                if row['duration_count'] else None,
+                'retries_per_completion': round(row['retries_total'] / row['completed'], 2)
+                if row['completed'] else None
+            })
+        return summary
+    
+    def prune(self, older_than_days: float) -> int:
+        """
+        Delete raw events older than the cutoff (rollups are kept)
+        
+        Args:
+            older_than_days: Age in days
+            
+        Returns:
+            int: Number of events deleted
+        """
+        cutoff = time.time() - older_than_days * 86400
+        with self._write_lock, self._conn:
+            return self._conn.execute("DELETE FROM events WHERE ts < ?", (cutoff,)).rowcount
+
+
+_telemetry: Dict[str, Telemetry] = {}
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(db_path: Optional[str] = None) -> Optional[Telemetry]:
+    """
+    Get the shared telemetry store for this process
+    
+    Args:
+        db_path: SQLite file (defaults to TELEMETRY_DB)
+        
+    Returns:
+        Telemetry: Shared store, or None when TELEMETRY_DB is not set
+    """
+    db_path = db_path or os.getenv('TELEMETRY_DB')
+    if not db_path:
+        return None
+    with _telemetry_lock:
+        if db_path not in _telemetry:
+            _telemetry[db_path] = Telemetry(db_path)
+        return _telemetry[db_path]
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Report conversation funnel telemetry")
+    parser.add_argument('--db', default=os.getenv('TELEMETRY_DB', 'telemetry.db'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    report_parser = subparsers.add_parser('report', help='Per-stage drop-off, retries and time in stage')
+    report_parser.add_argument('--hours', type=float, default=24, help='Window to report (0 for all)')
+    report_parser.add_argument('--tenant', default=None)
+    report_parser.add_argument('--hourly', action='store_true', help='Print the hourly rollup rows')
+    
+    prune_parser = subparsers.add_parser('prune', help='Delete old raw events')
+    prune_parser.add_argument('--days', type=float, default=30)
+    
+    args = parser.parse_args()
+    telemetry = Telemetry(args.db)
+    
+    if args.command == 'prune':
+        print(f"Deleted {telemetry.prune(args.days)} events")
+    else:
+        since = time.time() - args.hours * 3600 if args.hours else None
+        print(f"{'stage':<22}{'entered':>9}{'completed':>11}{'failed':>8}{'exited':>8}{'avg s':>9}{'retries':>9}")
+        for row in telemetry.stage_summary(since, args.tenant):
+            duration = f"{row['avg_duration_ms'] / 1000:.1f}" if row['avg_duration_ms'] is not None else '-'
+            retries = row['retries_per_completion'] if row['retries_per_completion'] is not None else '-'
+            print(f"{row['stage']:<22}{row['entered']:>9}{row['completed']:>11}{row['validation_failed']:>8}"
+                  f"{row['exited']:>8}{duration:>9}{retries:>9}")
+        if args.hourly:
+            for row in telemetry.hourly(since, args.tenant):
+                hour = time.strftime('%Y-%m-%d %H:00', time.gmtime(row['hour']))
+                print(f"{hour} {row['tenant']} {row['stage']}: entered={row['entered']} "
+                      f"completed={row['completed']} failed={row['validation_failed']} exited={row['exited']}")
+    telemetry.close()
@@ -0,0 +1,187 @@
+"""
+Tenants Module
+==============
+Per-tenant storage partitions for screening on behalf of several client companies.
+
+Each tenant gets its own CandidateDataHandler over its own directory, so the
+record store, summary CSV, audit log, artifact manifest, search and dedup
+indexes and statistics of one tenant never see another tenant's candidates,
+and per-tenant work stays proportional to that tenant's size:
+
+    candidate_data/                 default tenant (existing single-tenant data stays in place)
+    candidate_data/tenants/acme/    tenant "acme"
+    candidate_data/tenants/globex/  tenant "globex"
+
+Tenants are the directories under tenants/ plus any listed in TENANTS
+(comma-separated; listed tenants are created on first use). Create one with:
+
+    python tenants.py create acme
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from data_handler import CandidateDataHandler
+
+
+DEFAULT_TENANT = 'default'
+
+# Tenant IDs become directory names
+TENANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+class UnknownTenant(ValueError):
+    """The tenant is not configured"""
+
+
+def validate_tenant_id(tenant: str) -> str:
+    """
+    Normalize and check a tenant ID
+    
+    Args:
+        tenant: Tenant ID (lowercase letters, digits, '-' and '_')
+        
+    Returns:
+        str: Normalized ID
+        
+    Raises:
+        ValueError: The ID cannot be used as a directory name
+    """
+    tenant = (tenant or '').strip().lower()
+    if not TENANT_ID_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant ID: {tenant!r}")
+    return tenant
+
+
+def tenant_data_dir(base_dir: Path, tenant: str) -> Path:
+    """Directory holding a tenant's partition"""
+    base_dir = Path(base_dir)
+    return base_dir if tenant == DEFAULT_TENANT else base_dir / 'tenants' / tenant
+
+
+class TenantRegistry:
+    """Opens one CandidateDataHandler per tenant and keeps it for the process"""
+    
+    def __init__(self, base_dir: str = "candidate_data", configured: Optional[List[str]] = None,
+                 **handler_options):
+        """
+        Initialize the registry
+        
+        Args:
+            base_dir: Root data directory (the default tenant's partition)
+            configured: Tenants created on first use (defaults to TENANTS)
+            handler_options: Extra CandidateDataHandler arguments (merge_policy, storage)
+        """
+        self.base_dir = Path(base_dir)
+        if configured is None:
+            configured = [t for t in os.getenv('TENANTS', '').split(',') if t.strip()]
+        self.configured = {validate_tenant_id(tenant) for tenant in configured}
+        self.handler_options = handler_options
+        self._handlers: Dict[str, CandidateDataHandler] = {}
+        self._lock = threading.Lock()
+    
+    def tenants(self) -> List[str]:
+        """
+        List known tenants
+        
+        Returns:
+            list: The default tenant first, then the others sorted
+        """
+        known = set(self.configured)
+        tenants_dir = self.base_dir / 'tenants'
+        if tenants_dir.is_dir():
+            known.update(path.name for path in tenants_dir.iterdir()
+                         if path.is_dir() and TENANT_ID_PATTERN.match(path.name))
+        known.discard(DEFAULT_TENANT)
+        return [DEFAULT_TENANT] + sorted(known)
+    
+    def create(self, tenant: str) -> CandidateDataHandler:
+        """Create a tenant's partition (if needed) and open it"""
+        tenant = validate_tenant_id(tenant)
+        tenant_data_dir(self.base_dir, tenant).mkdir(parents=True, exist_ok=True)
+        return self.get(tenant)
+    
+    def get(self, tenant: Optional[str] = None) -> CandidateDataHandler:
+        """
+        Get a tenant's data handler
+        
+        Args:
+            tenant: Tenant ID (None for the default tenant)
+            
+        Returns:
+            CandidateDataHandler: Handler over the tenant's partition
+            
+        Raises:
+            UnknownTenant: The tenant has no partition and is not configured
+        """
+        tenant = validate_tenant_id(tenant or DEFAULT_TENANT)
+        with self._lock:
+            handler = self._handlers.get(tenant)
+            if handler is None:
+                data_dir = tenant_data_dir(self.base_dir, tenant)
+                if tenant != DEFAULT_TENANT and tenant not in self.configured and not data_dir.is_dir():
+                    raise UnknownTenant(f"Unknown tenant: {tenant}")
+                data_dir.mkdir(parents=True, exist_ok=True)
+                handler = CandidateDataHandler(data_dir=str(data_dir), **self.handler_options)
+                self._handlers[tenant] = handler
+            return handler
+    
+    def get_statistics(self) -> Dict[str, Dict]:
+        """Statistics of every tenant, computed per partition"""
+        return {tenant: self.get(tenant).get_statistics() for tenant in self.tenants()}
+    
+    def close(self):
+        """Close every open handler"""
+        with self._lock:
+            handlers = list(self._handlers.values())
+            self._handlers.clear()
+        for handler in handlers:
+            handler.close()
+
+
+_registries: Dict[str, TenantRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_tenant_registry(base_dir: str = "candidate_data") -> TenantRegistry:
+    """
+    Get the shared registry for a data directory
+    
+    The chat app and the analytics page run in one process and must share
+    handlers, so the rollups they read and write are the same objects.
+    
+    Args:
+        base_dir: Root data directory
+        
+    Returns:
+        TenantRegistry: Shared registry
+    """
+    with _registries_lock:
+        registry = _registries.get(str(base_dir))
+        if registry is None:
+            registry = _registries[str(base_dir)] = TenantRegistry(base_dir)
+        return registry
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Manage tenant partitions")
+    parser.add_argument('--data-dir', default='candidate_data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List tenants and their candidate counts')
+    create_parser = subparsers.add_parser('create', help='Create a tenant partition')
+    create_parser.add_argument('tenant')
+    args = parser.parse_args()
+    
+    registry = TenantRegistry(args.data_dir)
+    if args.command == 'create':
+        registry.create(args.tenant)
+        print(f"Created {tenant_data_dir(registry.base_dir, validate_tenant_id(args.tenant))}")
+    else:
+        for tenant in registry.tenants():
+            print(f"{tenant}: {registry.get(tenant).store.count()} candidates")
+    registry.close()
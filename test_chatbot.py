@@ -12,12 +12,45 @@ from utils import (
     calculate_match_score,
     is_exit_command,
     extract_sentiment,
+    extract_numbered_items,
     parse_list_input
 )
 from data_handler import CandidateDataHandler
+from dedup import DeduplicationIndex, normalize_email, normalize_phone
+from exporters import EXPORT_FIELDS, iter_csv, records_to_csv
+from record_store import decode_record, encode_record, migrate
+from audit_log import AuditLog
+from retention import IOThrottle, RetentionManager, create_retention_manager
+from tenants import DEFAULT_TENANT, TenantRegistry, UnknownTenant, tenant_data_dir
 from chatbot_engine import HiringAssistant
+from llm_backends import LLMBackend, LlamaCppBackend, create_backend
+from llm_batching import CoalescingBackend
+from rate_limiter import FairScheduler, RateLimitExceeded, RateLimitedBackend, current_context, llm_context
+from answer_scoring import RubricScorer, ScoringPipeline, split_answers
+from job_matching import JobSpecStore, get_job_store, parse_job_description
+from transcript_log import OfflineBackend, TranscriptLog, replay, turn_event
+from telemetry import Telemetry
+from profiling import Profiler
+from response_cache import ResponseCache, normalize_message
+from question_bank import QuestionBank, build_question_bank, collect_technologies, difficulty_mix
+from question_index import HashingEmbedder, QuestionIndex, build_question_index
+import llm_backends
+import pdf_renderer
+import serialization
+import csv
+import importlib.util
+import io
+import json
 import os
+import re
 import shutil
+import tempfile
+import threading
+import time
+import unittest.mock
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 
 class TestUtils(unittest.TestCase):
@@ -64,6 +97,14 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(is_exit_command("goodbye"))
         self.assertFalse(is_exit_command("continue"))
         self.assertFalse(is_exit_command("yes"))
+        self.assertTrue(is_exit_command("ok bye!"))
+        self.assertFalse(is_exit_command("Backend Engineer"))
+        self.assertFalse(is_exit_command("The closest office to me"))
+        self.assertTrue(is_exit_command("  Please stop. "))
+        self.assertFalse(is_exit_command("Python, Docker, end-to-end"))
+        self.assertFalse(is_exit_command("close to Berlin"))
+        self.assertFalse(is_exit_command("I can stop by anytime"))
+        self.assertFalse(is_exit_command("close"))
     
     def test_extract_sentiment(self):
         """Test sentiment analysis"""
@@ -71,6 +112,13 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(extract_sentiment("This is terrible"), "negative")
         self.assertEqual(extract_sentiment("Hello there"), "neutral")
     
+    def test_extract_numbered_items(self):
+        """Test numbered and bulleted list parsing"""
+        text = "Questions:\n1. What is a closure?\n**2)** Explain the GIL\n- A bullet"
+        self.assertEqual(extract_numbered_items(text), ["What is a closure?", "Explain the GIL"])
+        self.assertEqual(extract_numbered_items(text, bullets=True),
+                         ["What is a closure?", "Explain the GIL", "A bullet"])
+    
     def test_parse_list_input(self):
         """Test list parsing"""
         result = parse_list_input("Python, JavaScript, Go")
@@ -145,6 +193,1768 @@ class TestDataHandler(unittest.TestCase):
         
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]["email"], "test@example.com")
+    
+    def test_export_csv_with_job_matches(self):
+        """Test a record holding job matches exports to CSV"""
+        candidate = {
+            "name": "Test User",
+            "email": "matches@example.com",
+            "tech_stack": ["Python", "Django"],
+            "job_matches": [{"job_id": "j1", "title": "Platform Engineer", "score": 80.0},
+                            {"job_id": "j2", "title": "Data Scientist", "score": 60.0}]
+        }
+        
+        candidate_id = self.handler.save_candidate_data(candidate)
+        export_file = self.handler.export_candidate_data(candidate_id, "csv")
+        
+        with open(export_file, newline="", encoding="utf-8") as f:
+            rows = dict(csv.reader(f))
+        self.assertEqual(rows["job_matches"], "Platform Engineer, Data Scientist")
+        self.assertEqual(rows["tech_stack"], "Python, Django")
+
+
+class TestRecordStore(unittest.TestCase):
+    """Test the packed SQLite record store"""
+    
+    def setUp(self):
+        """Set up a handler backed by SQLite"""
+        self.test_dir = "test_candidate_data"
+        self.handler = CandidateDataHandler(data_dir=self.test_dir, storage="sqlite")
+        self.record = {
+            "name": "Ada Lovelace",
+            "email": "Ada@Example.com",
+            "tech_stack": ["Python", "PostgreSQL"],
+            "technical_answers": "I index the hot columns."
+        }
+    
+    def tearDown(self):
+        """Clean up test data"""
+        self.handler.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_encoding_round_trip_is_compact(self):
+        """Test records decode unchanged and beat indented JSON on size"""
+        record = {"candidate_id": "abc123", "status": "pending_review", **self.record}
+        blob = encode_record(record)
+        
+        self.assertEqual(decode_record(blob), record)
+        self.assertLess(len(blob), len(json.dumps(record, indent=2)) / 2)
+    
+    def test_handler_crud(self):
+        """Test save, lookup by ID and email, update and delete through SQLite"""
+        candidate_id = self.handler.save_candidate_data(self.record)
+        
+        self.assertEqual(self.handler.get_candidate_data(candidate_id)["name"], "Ada Lovelace")
+        self.assertEqual(len(self.handler.search_by_email("ada@example.com")), 1)
+        self.handler.update_candidate_data(candidate_id, {"status": "shortlisted"})
+        self.assertEqual(next(self.handler.iter_candidates())["status"], "shortlisted")
+        self.assertTrue(self.handler.delete_candidate_data(candidate_id))
+        self.assertIsNone(self.handler.get_candidate_data(candidate_id))
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "json")))
+    
+    def test_migrate_from_json(self):
+        """Test existing JSON files are copied into the SQLite store"""
+        json_handler = CandidateDataHandler(data_dir=self.test_dir, storage="json")
+        candidate_id = json_handler.save_candidate_data(self.record)
+        
+        self.assertEqual(migrate(self.test_dir, "json", "sqlite"), 1)
+        self.assertEqual(self.handler.get_candidate_data(candidate_id)["email"], "Ada@Example.com")
+
+
+class TestCandidateSearch(unittest.TestCase):
+    """Test full-text and faceted candidate search"""
+    
+    def setUp(self):
+        """Set up test data directory with a few candidates"""
+        self.test_dir = "test_candidate_data"
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        
+        self.berlin_id = self.handler.save_candidate_data({
+            "name": "Anna Berg",
+            "email": "anna@example.com",
+            "experience": "4 years",
+            "position": "Backend Engineer",
+            "location": "Berlin, Germany",
+            "tech_stack": ["Python", "Kafka", "Go"],
+            "technical_answers": "I built Kafka consumers and tuned Kafka partitions"
+        })
+        self.junior_id = self.handler.save_candidate_data({
+            "name": "Ben Lee",
+            "email": "ben@example.com",
+            "experience": "1 years",
+            "position": "Developer",
+            "location": "Berlin",
+            "tech_stack": ["Java"],
+            "technical_answers": "I have read about Kafka"
+        })
+    
+    def tearDown(self):
+        """Clean up test data"""
+        self.handler.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_search_ranks_by_relevance(self):
+        """Test BM25 ranking over technical answers"""
+        results = self.handler.search_candidates("kafka")
+        self.assertEqual([r["candidate_id"] for r in results], [self.berlin_id, self.junior_id])
+        self.assertGreater(results[0]["search_score"], results[1]["search_score"])
+    
+    def test_search_facet_filters(self):
+        """Test location and experience filters"""
+        results = self.handler.search_candidates("kafka", location="berlin", min_experience=3)
+        self.assertEqual([r["candidate_id"] for r in results], [self.berlin_id])
+        
+        results = self.handler.search_candidates(tech_stack=["go"])
+        self.assertEqual([r["candidate_id"] for r in results], [self.berlin_id])
+    
+    def test_search_updates_on_delete(self):
+        """Test that deleted candidates drop out of the index"""
+        self.handler.search_candidates("kafka")
+        self.handler.delete_candidate_data(self.berlin_id)
+        results = self.handler.search_candidates("kafka")
+        self.assertEqual([r["candidate_id"] for r in results], [self.junior_id])
+        self.assertEqual(self.handler.get_search_facets("tech_stack"), {"java": 1})
+
+
+class TestDeduplication(unittest.TestCase):
+    """Test repeat applicant detection and merging"""
+    
+    def setUp(self):
+        """Set up test data directory"""
+        self.test_dir = "test_candidate_data"
+        self.candidate = {
+            "name": "John Doe",
+            "email": "John.Doe+jobs@gmail.com",
+            "phone": "+1 555-123-4567",
+            "experience": "5 years",
+            "tech_stack": ["Python", "Django"]
+        }
+        self.handlers = []
+    
+    def _handler(self, **kwargs) -> CandidateDataHandler:
+        """Open a handler that is closed (waiting for its compaction) before cleanup"""
+        handler = CandidateDataHandler(data_dir=self.test_dir, **kwargs)
+        self.handlers.append(handler)
+        return handler
+    
+    def tearDown(self):
+        """Clean up test data"""
+        for handler in self.handlers:
+            handler.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_normalization(self):
+        """Test email and phone normalization"""
+        self.assertEqual(normalize_email(" John.Doe+jobs@GMail.com "), "johndoe@gmail.com")
+        self.assertEqual(normalize_email("a.b+x@company.com"), "a.b@company.com")
+        self.assertEqual(normalize_phone("+1 (555) 123-4567"), "5551234567")
+        self.assertEqual(normalize_phone("123"), "")
+    
+    def test_repeat_application_is_merged(self):
+        """Test that a repeat applicant updates the original record"""
+        handler = self._handler()
+        first_id = handler.save_candidate_data(self.candidate)
+        second_id = handler.save_candidate_data({
+            "name": "John Doe",
+            "email": "johndoe@gmail.com",
+            "experience": "6 years",
+            "tech_stack": ["React"]
+        })
+        
+        self.assertEqual(first_id, second_id)
+        record = handler.get_candidate_data(first_id)
+        self.assertEqual(record["experience"], "6 years")
+        self.assertEqual(record["tech_stack"], ["Python", "Django", "React"])
+        self.assertEqual(record["applications"], 2)
+        self.assertEqual(handler.get_statistics()["total_candidates"], 1)
+    
+    def test_merge_keeps_one_summary_row(self):
+        """Test that merging replaces the candidate's summary CSV row"""
+        handler = self._handler()
+        other_id = handler.save_candidate_data({"name": "Jane Roe", "email": "jane@example.com"})
+        candidate_id = handler.save_candidate_data(self.candidate)
+        handler.save_candidate_data({**self.candidate, "experience": "6 years"})
+        handler.eraser.schedule_compaction().result()
+        
+        with open(handler.csv_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["candidate_id"] for row in rows], [other_id, candidate_id])
+        self.assertEqual(rows[1]["experience"], "6 years")
+    
+    def test_fuzzy_duplicates_are_flagged(self):
+        """Test that same name and stack with new contact details is flagged"""
+        handler = self._handler()
+        first_id = handler.save_candidate_data(self.candidate)
+        second_id = handler.save_candidate_data({
+            "name": "John Doe",
+            "email": "john@work.com",
+            "tech_stack": ["Python", "Django"]
+        })
+        
+        self.assertNotEqual(first_id, second_id)
+        self.assertEqual(handler.get_candidate_data(second_id)["possible_duplicates"], [first_id])
+    
+    def test_batch_deduplication(self):
+        """Test merging duplicates saved before deduplication existed"""
+        handler = self._handler(merge_policy='keep_both')
+        handler.save_candidate_data(self.candidate)
+        handler.save_candidate_data({**self.candidate, "email": "other@example.com"})
+        self.assertEqual(len(handler.get_all_candidates()), 2)
+        
+        report = self._handler().deduplicate_candidates()
+        self.assertEqual(report["groups"], 1)
+        self.assertEqual(report["merged"], 1)
+        self.assertEqual(len(handler.get_all_candidates()), 1)
+    
+    def test_batch_deduplication_cleans_summary_and_manifest(self):
+        """Test that merged-away records leave no summary rows and hand their artifacts over"""
+        handler = self._handler(merge_policy='keep_both')
+        first_id = handler.save_candidate_data(self.candidate)
+        second_id = handler.save_candidate_data({**self.candidate, "email": "other@example.com"})
+        handler.manifest.add(second_id, 'export', 'second.json')
+        
+        handler.deduplicate_candidates()
+        handler.eraser.schedule_compaction().result()
+        
+        with open(handler.csv_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["candidate_id"] for row in rows], [first_id])
+        self.assertEqual(handler.manifest.locations([first_id, second_id]),
+                         {first_id: [('export', 'second.json')]})
+    
+    def test_shared_key_survives_removal(self):
+        """Test that removing a record keeps the email key of another record sharing it"""
+        index = DeduplicationIndex()
+        index.add({"candidate_id": "a", "email": "john@example.com"})
+        index.add({"candidate_id": "b", "email": "john@example.com"})
+        index.add({"candidate_id": "a", "email": "john@example.com", "name": "John"})
+        self.assertEqual(index.find_exact({"email": "john@example.com"}), "a")
+        
+        index.remove("a")
+        self.assertEqual(index.find_exact({"email": "john@example.com"}), "b")
+        index.remove("b")
+        self.assertIsNone(index.find_exact({"email": "john@example.com"}))
+    
+    def test_concurrent_repeat_applications_merge(self):
+        """Test that simultaneous saves of one applicant produce a single record"""
+        handler = self._handler()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = set(pool.map(lambda _: handler.save_candidate_data(dict(self.candidate)), range(16)))
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(handler.store.count(), 1)
+    
+    def test_update_and_merge_do_not_lose_writes(self):
+        """Test a score written during a repeat application's merge survives it"""
+        handler = self._handler()
+        candidate_id = handler.save_candidate_data(self.candidate)
+        get = handler.store.get
+        
+        def slow_get(record_id):
+            record = get(record_id)
+            time.sleep(0.05)
+            return record
+        
+        with unittest.mock.patch.object(handler.store, "get", side_effect=slow_get), \
+                ThreadPoolExecutor(max_workers=2) as pool:
+            merge = pool.submit(handler.save_candidate_data, {**self.candidate, "experience": "6 years"})
+            score = pool.submit(handler.update_candidate_data, candidate_id, {"answer_scoring": {"score": 80}})
+            merge.result()
+            score.result()
+        
+        record = handler.get_candidate_data(candidate_id)
+        self.assertEqual(record["experience"], "6 years")
+        self.assertEqual(record["answer_scoring"], {"score": 80})
+
+
+class TestBulkExport(unittest.TestCase):
+    """Test streaming exports of the whole candidate pool"""
+    
+    def setUp(self):
+        """Set up test data directory with a few candidates"""
+        self.test_dir = "test_candidate_data"
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        for i in range(3):
+            self.handler.save_candidate_data({
+                "name": f"Candidate {i}",
+                "email": f"candidate{i}@example.com",
+                "tech_stack": ["Python", "Go"]
+            })
+    
+    def tearDown(self):
+        """Clean up test data"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_stream_jsonl(self):
+        """Test JSONL export has one record per line"""
+        data = b''.join(self.handler.stream_all_candidates('jsonl')).decode('utf-8')
+        lines = data.strip().split('\n')
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["tech_stack"], ["Python", "Go"])
+    
+    def test_stream_csv_in_chunks(self):
+        """Test CSV export is split into chunks and keeps every row"""
+        chunks = list(iter_csv(self.handler.iter_candidates(), chunk_size=64))
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][EXPORT_FIELDS.index("tech_stack")], "Python, Go")
+    
+    def test_records_to_csv(self):
+        """Test single-candidate CSV uses the session data keys as columns"""
+        data = records_to_csv([{"name": "Jane", "tech_stack": ["Python", "SQL"]}]).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(data)))
+        self.assertEqual(rows, [["name", "tech_stack"], ["Jane", "Python, SQL"]])
+    
+    def test_export_all_candidates(self):
+        """Test export to the exports directory"""
+        path = self.handler.export_all_candidates('csv')
+        self.assertTrue(os.path.exists(path))
+        with self.assertRaises(ValueError):
+            self.handler.export_all_candidates('docx')
+
+
+class StaticBackend(LLMBackend):
+    """Backend returning a canned response, recording every request"""
+    
+    def __init__(self, response="1. Explain Python generators."):
+        self.response = response
+        self.calls = []
+    
+    def stream(self, messages, max_tokens=512, temperature=0.7):
+        self.calls.append(messages)
+        yield self.response
+
+
+class FailingBackend(LLMBackend):
+    """Backend that always fails, like an unreachable inference API"""
+    
+    def stream(self, messages, max_tokens=512, temperature=0.7):
+        raise ConnectionError("backend unavailable")
+
+
+@unittest.skipUnless(importlib.util.find_spec("reportlab"), "reportlab not installed")
+class TestPdfRenderer(unittest.TestCase):
+    """Test PDF rendering of candidate profiles"""
+    
+    def setUp(self):
+        """Build a few candidate records"""
+        self.candidates = [{
+            "candidate_id": f"cand{i}",
+            "name": f"Candidate {i}",
+            "email": f"candidate{i}@example.com",
+            "tech_stack": ["Python", "Go"],
+            "timestamp": datetime.now().isoformat()
+        } for i in range(3)]
+    
+    def count_pages(self, pdf):
+        """Count page objects in a PDF document"""
+        return len(re.findall(rb'/Type\s*/Page(?!s)', pdf))
+    
+    def test_single_profile(self):
+        """Test one profile renders to a one-page PDF"""
+        pdf = pdf_renderer.render_candidate_pdf(self.candidates[0])
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(self.count_pages(pdf), 1)
+    
+    def test_profiles_document(self):
+        """Test the combined document has one page per profile"""
+        pdf = pdf_renderer.render_profiles_document(self.candidates)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(self.count_pages(pdf), 3)
+    
+    def test_profiles_zip(self):
+        """Test the zip holds one PDF per candidate"""
+        data = pdf_renderer.render_profiles_zip(self.candidates)
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["cand0.pdf", "cand1.pdf", "cand2.pdf"])
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b'%PDF'))
+    
+    def test_batch_across_processes(self):
+        """Test a pooled batch returns one PDF per candidate"""
+        candidates = [dict(self.candidates[0], candidate_id=f"c{i}", name=f"Pooled {i}")
+                      for i in range(pdf_renderer.MIN_POOL_BATCH)]
+        pdfs = pdf_renderer.render_batch(candidates, processes=2)
+        self.assertEqual(len(pdfs), len(candidates))
+        for pdf in pdfs:
+            self.assertTrue(pdf.startswith(b'%PDF'))
+            self.assertEqual(self.count_pages(pdf), 1)
+
+
+class SlowBackend(LLMBackend):
+    """Backend that echoes the prompt after a delay, counting calls"""
+    
+    def __init__(self, supports_batching=False):
+        self.supports_batching = supports_batching
+        self.calls = 0
+    
+    def stream(self, messages, max_tokens=512, temperature=0.7):
+        self.calls += 1
+        time.sleep(0.05)
+        yield messages[0]["content"]
+    
+    def generate_batch(self, requests):
+        self.calls += 1
+        time.sleep(0.05)
+        return [request["messages"][0]["content"] for request in requests]
+
+
+class ThrottledBackend(SlowBackend):
+    """Backend that refuses calls made under one session"""
+    
+    def __init__(self, throttled_session, supports_batching=False):
+        super().__init__(supports_batching)
+        self.throttled_session = throttled_session
+    
+    def _check_quota(self):
+        time.sleep(0.05)
+        if current_context().get("session") == self.throttled_session:
+            raise RateLimitExceeded("session quota exhausted")
+    
+    def stream(self, messages, max_tokens=512, temperature=0.7):
+        self._check_quota()
+        yield messages[0]["content"]
+    
+    def generate_batch(self, requests):
+        self._check_quota()
+        return [request["messages"][0]["content"] for request in requests]
+
+
+class TestRequestCoalescing(unittest.TestCase):
+    """Test single-flight coalescing and micro-batching of LLM calls"""
+    
+    def _run_concurrently(self, backend, prompts):
+        """Issue one generate() per prompt from separate threads"""
+        results = {}
+        
+        def call(index, prompt):
+            results[index] = backend.generate([{"role": "user", "content": prompt}])
+        
+        threads = [threading.Thread(target=call, args=(i, p)) for i, p in enumerate(prompts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [results[i] for i in range(len(prompts))]
+    
+    def test_identical_prompts_share_one_call(self):
+        """Test duplicate in-flight prompts are coalesced"""
+        inner = SlowBackend()
+        backend = CoalescingBackend(inner)
+        results = self._run_concurrently(backend, ["same prompt"] * 6)
+        
+        self.assertEqual(results, ["same prompt"] * 6)
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(backend.get_metrics()["calls_saved"], 5)
+    
+    def test_distinct_prompts_are_batched(self):
+        """Test distinct prompts are grouped when the backend batches"""
+        inner = SlowBackend(supports_batching=True)
+        backend = CoalescingBackend(inner, max_batch_size=8, max_wait_ms=50)
+        prompts = [f"prompt {i}" for i in range(4)]
+        
+        self.assertEqual(self._run_concurrently(backend, prompts), prompts)
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(backend.get_metrics()["avg_batch_size"], 4.0)
+    
+    def test_local_backend_is_batched(self):
+        """Test the llama.cpp backend takes the batching path"""
+        backend = CoalescingBackend(LlamaCppBackend("model.gguf"))
+        self.assertTrue(backend.supports_batching)
+    
+    def _run_sessions(self, backend, calls):
+        """Issue (session, prompt) calls from separate threads, a little apart"""
+        results = {}
+        
+        def call(index, session, prompt):
+            with llm_context(session=session):
+                try:
+                    results[index] = backend.generate([{"role": "user", "content": prompt}])
+                except RateLimitExceeded as e:
+                    results[index] = e
+        
+        threads = [threading.Thread(target=call, args=(i, session, prompt)) for i, (session, prompt) in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return [results[i] for i in range(len(calls))]
+    
+    def test_throttled_leader_does_not_fail_other_sessions(self):
+        """Test callers coalesced onto a throttled session's call retry under their own quota"""
+        backend = CoalescingBackend(ThrottledBackend("throttled"))
+        results = self._run_sessions(backend, [("throttled", "same prompt"), ("other", "same prompt")])
+        
+        self.assertIsInstance(results[0], RateLimitExceeded)
+        self.assertEqual(results[1], "same prompt")
+    
+    def test_throttled_batch_requeues_other_sessions(self):
+        """Test a batch refused for its first session is retried for the others"""
+        backend = CoalescingBackend(ThrottledBackend("throttled", supports_batching=True), max_wait_ms=50)
+        results = self._run_sessions(backend, [("throttled", "first"), ("other", "second")])
+        
+        self.assertIsInstance(results[0], RateLimitExceeded)
+        self.assertEqual(results[1], "second")
+
+
+class TestQuestionBank(unittest.TestCase):
+    """Test the pre-generated question bank"""
+    
+    def setUp(self):
+        """Build a template-only bank in a temporary directory"""
+        self.temp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.temp_dir, "bank.bin")
+        technologies = collect_technologies(HiringAssistant(backend=StaticBackend()).tech_categories)
+        self.summary = build_question_bank(path, technologies)
+        self.bank = QuestionBank(path)
+    
+    def tearDown(self):
+        """Clean up the bank file"""
+        self.bank.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_difficulty_mix(self):
+        """Test experience shifts the mix toward harder questions"""
+        self.assertEqual(len(difficulty_mix("1 year", 5)), 5)
+        self.assertGreater(difficulty_mix("8 years", 5).count("advanced"),
+                           difficulty_mix("1 year", 5).count("advanced"))
+    
+    def test_observed_technologies_match_whole_tokens(self):
+        """Test observed technologies are categorized by whole tokens, not substrings"""
+        observed = [{"tech_stack": ["Spring Boot", "Cargo", "Golang-Migrate"]}] * 2
+        technologies = collect_technologies({"languages": ["go"], "frameworks": ["spring"]}, observed)
+        
+        self.assertEqual(technologies["spring boot"], "frameworks")
+        self.assertEqual(technologies["cargo"], "other")
+        self.assertEqual(technologies["golang-migrate"], "languages")
+    
+    def test_assemble_reports_uncovered(self):
+        """Test assembly covers known technologies and reports the rest"""
+        questions, uncovered = self.bank.assemble(["Python", "Django", "Elixir"], "3 years")
+        
+        self.assertEqual(len(questions), 5)
+        self.assertEqual(uncovered, ["Elixir"])
+        self.assertTrue(any("Django" in question for question in questions))
+    
+    def test_covered_stack_skips_llm(self):
+        """Test a fully covered stack is answered without calling the backend"""
+        backend = StaticBackend()
+        chatbot = HiringAssistant(backend=backend, question_bank=self.bank)
+        response = chatbot.generate_technical_questions(["Python", "PostgreSQL"], "5 years")
+        
+        self.assertIn("Technical Assessment Questions", response)
+        self.assertIn("5. ", response)
+        self.assertEqual(backend.calls, [])
+    
+    def test_uncovered_technologies_use_llm(self):
+        """Test only technologies missing from the bank go to the backend"""
+        backend = StaticBackend("1. How does Elixir supervise processes?")
+        chatbot = HiringAssistant(backend=backend, question_bank=self.bank)
+        response = chatbot.generate_technical_questions(["Python", "Elixir"])
+        
+        self.assertEqual(len(backend.calls), 1)
+        self.assertIn("Elixir", backend.calls[0][0]["content"])
+        self.assertNotIn("Python", backend.calls[0][0]["content"])
+        self.assertIn("supervise processes", response)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+class TestQuestionIndex(unittest.TestCase):
+    """Test semantic question retrieval"""
+    
+    def setUp(self):
+        """Index a template-only question bank with the hashing embedder"""
+        self.temp_dir = tempfile.mkdtemp()
+        bank_path = os.path.join(self.temp_dir, "bank.bin")
+        index_path = os.path.join(self.temp_dir, "index")
+        technologies = collect_technologies(HiringAssistant(backend=StaticBackend()).tech_categories)
+        build_question_bank(bank_path, technologies)
+        
+        bank = QuestionBank(bank_path)
+        build_question_index(index_path, bank.iter_questions(), HashingEmbedder())
+        bank.close()
+        self.index = QuestionIndex(index_path)
+    
+    def tearDown(self):
+        """Clean up index files"""
+        del self.index
+        shutil.rmtree(self.temp_dir)
+    
+    def test_search_returns_stack_questions(self):
+        """Test results are about the candidate's technologies"""
+        hits = self.index.search(["PostgreSQL", "Django"], "Backend Engineer", k=5)
+        
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(hit["tech"] in ("postgresql", "django") for hit in hits))
+        self.assertTrue(any("PostgreSQL" in hit["question"] for hit in hits))
+    
+    def test_results_are_diverse(self):
+        """Test MMR does not return the same question twice"""
+        hits = self.index.search(["Python"], k=5, diversity=0.5)
+        self.assertEqual(len({hit["question"] for hit in hits}), len(hits))
+    
+    def test_sparse_query_matches_full_product(self):
+        """Test scoring only a sparse query's columns gives the full dot product"""
+        import numpy as np
+        
+        query_vector = self.index.embedder.encode(["PostgreSQL Django Backend Engineer"])[0]
+        
+        self.assertTrue(self.index.vectors.flags.f_contiguous)
+        self.assertTrue(np.allclose(self.index._similarity(query_vector),
+                                    np.asarray(self.index.vectors) @ query_vector, atol=1e-6))
+    
+    def test_rebuild_swaps_directory(self):
+        """Test rebuilding leaves an open index intact and swaps in the new one"""
+        index_path = os.path.join(self.temp_dir, "index")
+        build_question_index(index_path, [{"text": "Explain {tech} channels", "tech": "go"}], HashingEmbedder())
+        
+        self.assertTrue(self.index.search(["Python"], k=3))
+        rebuilt = QuestionIndex(index_path)
+        self.assertEqual(rebuilt.meta["count"], 1)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["bank.bin", "index"])
+        del rebuilt
+    
+    def test_fallback_uses_index(self):
+        """Test fallback questions come from the index when the LLM fails"""
+        chatbot = HiringAssistant(backend=FailingBackend(), question_index=self.index)
+        response = chatbot._generate_fallback_questions(["Kubernetes"], "DevOps Engineer")
+        
+        self.assertIn("Kubernetes", response)
+        self.assertNotIn("stay updated", response)
+
+
+class TestAnswerScoring(unittest.TestCase):
+    """Test grading of technical answers"""
+    
+    def setUp(self):
+        """Set up test data directory with answered candidates"""
+        self.test_dir = "test_candidate_data"
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        self.questions = [
+            "How do you optimize queries in PostgreSQL for better performance?",
+            "How do you handle errors and exceptions in Python?"
+        ]
+        for i in range(5):
+            self.handler.save_candidate_data({
+                "name": f"Candidate {i}",
+                "email": f"scored{i}@example.com",
+                "tech_stack": ["Python", "PostgreSQL"],
+                "technical_questions": self.questions,
+                "technical_answers": "1. I add an index after checking EXPLAIN ANALYZE because sequential "
+                                     "scans hurt query performance.\n2. I catch specific exceptions and log them."
+            })
+    
+    def tearDown(self):
+        """Clean up test data"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_split_numbered_answers(self):
+        """Test numbered replies are matched to their questions"""
+        answers = split_answers("1. First answer\n2. Second answer", 3)
+        self.assertEqual(answers, ["First answer", "Second answer", ""])
+    
+    def test_rubric_prefers_detailed_answers(self):
+        """Test a specific answer outscores a vague one and non-answers score zero"""
+        rubric = RubricScorer()
+        question = self.questions[0]
+        detailed = rubric.score(question, "I optimize PostgreSQL queries by adding an index on filtered "
+                                          "columns, because EXPLAIN showed a 200ms sequential scan.")
+        vague = rubric.score(question, "I make them faster.")
+        
+        self.assertGreater(detailed["score"], vague["score"])
+        self.assertEqual(rubric.score(question, "I don't know")["score"], 0.0)
+    
+    def test_backlog_is_scored_once(self):
+        """Test backlog scoring writes scores and resumes without rescoring"""
+        pipeline = ScoringPipeline(self.handler, workers=2, batch_size=2)
+        first = pipeline.score_backlog()
+        second = pipeline.score_backlog()
+        pipeline.shutdown()
+        
+        self.assertEqual(first["scored"], 5)
+        self.assertEqual(second["scored"], 0)
+        for record in self.handler.iter_candidates():
+            self.assertGreater(record["answer_score"], 0)
+            self.assertEqual(len(record["answer_scoring"]["questions"]), 2)
+    
+    def test_llm_pass(self):
+        """Test the optional LLM grade is combined with the rubric score"""
+        backend = StaticBackend('{"score": 8, "feedback": "Solid answer."}')
+        pipeline = ScoringPipeline(self.handler, use_llm=True, backend=backend)
+        candidate_id = next(self.handler.iter_candidates())["candidate_id"]
+        record = pipeline.submit(candidate_id).result()
+        pipeline.shutdown()
+        
+        scoring = record["answer_scoring"]
+        self.assertEqual(scoring["method"], "rubric+llm")
+        self.assertEqual(scoring["questions"][0]["llm_score"], 8.0)
+        self.assertEqual(scoring["questions"][0]["feedback"], "Solid answer.")
+    
+    def test_questions_are_recorded(self):
+        """Test the questions asked are stored for later scoring"""
+        chatbot = HiringAssistant(backend=FailingBackend())
+        response = chatbot.process_input("Python, Django", "collect_tech_stack", {})
+        questions = response["extracted_data"]["technical_questions"]
+        
+        self.assertGreaterEqual(len(questions), 3)
+        self.assertTrue(all(question in response["message"] for question in questions))
+
+
+class TestJobMatching(unittest.TestCase):
+    """Test job spec parsing and candidate-to-role matching"""
+    
+    def setUp(self):
+        """Set up a job store with two open roles"""
+        self.test_dir = "test_job_data"
+        self.store = JobSpecStore(data_dir=self.test_dir)
+        self.backend_job = self.store.add_job(
+            "Backend Engineer",
+            "Requirements:\n- Python and Django\n- PostgreSQL\nNice to have:\n- Docker, Kubernetes",
+            location="Remote"
+        )
+        self.frontend_job = self.store.add_job("Frontend Engineer", required=["React.js", "TypeScript"])
+    
+    def tearDown(self):
+        """Clean up test data"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_shared_store_appears_once_jobs_exist(self):
+        """Test a missing job directory is not cached as 'no jobs'"""
+        data_dir = os.path.join(tempfile.mkdtemp(), "jobs_later")
+        self.addCleanup(shutil.rmtree, os.path.dirname(data_dir))
+        
+        self.assertIsNone(get_job_store(data_dir))
+        JobSpecStore(data_dir=data_dir).add_job("Backend Engineer", required=["Python"])
+        self.assertIsNotNone(get_job_store(data_dir))
+    
+    def test_parse_required_and_nice_to_have(self):
+        """Test skills are split by section and word boundaries are respected"""
+        parsed = parse_job_description("Must have: Java, Spring\nExperience with Redis is a plus")
+        self.assertEqual(parsed["required"], ["java", "spring"])
+        self.assertEqual(parsed["nice_to_have"], ["redis"])
+        self.assertEqual(self.frontend_job["required_skills"], ["react", "typescript"])
+    
+    def test_match_ranks_roles(self):
+        """Test the best role comes first and unrelated roles are left out"""
+        matches = self.store.match(["Python", "Django", "Postgres"])
+        
+        self.assertEqual([m["job_id"] for m in matches], [self.backend_job["job_id"]])
+        self.assertEqual(matches[0]["required_match"], 100.0)
+        self.assertEqual(matches[0]["score"], 75.0)
+    
+    def test_closed_jobs_do_not_match(self):
+        """Test closing a job removes it from the index, also after reload"""
+        self.store.close_job(self.frontend_job["job_id"])
+        self.assertEqual(self.store.match(["React"]), [])
+        self.assertEqual(JobSpecStore(data_dir=self.test_dir).match(["React"]), [])
+    
+    def test_summary_lists_matches(self):
+        """Test matches computed at the tech stack stage appear in the application summary"""
+        chatbot = HiringAssistant(backend=FailingBackend(), job_store=self.store)
+        response = chatbot.process_input("Python, Django, PostgreSQL", "collect_tech_stack", {})
+        summary = chatbot.process_input("Use an index.", "technical_questions", response["extracted_data"])
+        
+        self.assertEqual(summary["stage"], "farewell")
+        self.assertIn("Backend Engineer", summary["message"])
+        self.assertIn("(Remote)", summary["message"])
+        self.assertIn("Backend Engineer", chatbot.generate_farewell(response["extracted_data"]))
+    
+    def test_jobs_added_elsewhere_are_picked_up(self):
+        """Test a store reloads when another process adds or closes jobs"""
+        other = JobSpecStore(data_dir=self.test_dir)
+        job = other.add_job("Rust Engineer", required=["Rust"])
+        self.assertEqual([m["job_id"] for m in self.store.match(["Rust"])], [job["job_id"]])
+        
+        other.close_job(job["job_id"])
+        self.assertEqual(self.store.match(["Rust"]), [])
+
+
+class TestTranscriptLog(unittest.TestCase):
+    """Test the compressed transcript event log and replay"""
+    
+    def setUp(self):
+        """Set up a log directory"""
+        self.test_dir = "test_transcripts"
+        self.log = TranscriptLog(self.test_dir, flush_interval=60)
+    
+    def tearDown(self):
+        """Clean up segments"""
+        self.log.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def _record_session(self, session_id, inputs):
+        """Run inputs through the assistant and log each turn"""
+        chatbot = HiringAssistant(backend=OfflineBackend())
+        stage, data = "greeting", {}
+        for seq, user_input in enumerate(inputs, start=1):
+            response = chatbot.process_input(user_input, stage, data)
+            self.log.append(turn_event(session_id, seq, user_input, stage, response, 1.0,
+                                       chatbot.take_llm_usage()))
+            stage = response["stage"]
+            data.update(response["extracted_data"])
+    
+    def test_batches_append_members(self):
+        """Test each flush appends a gzip member and all events read back"""
+        for i in range(5):
+            self.log.append({"type": "turn", "session_id": "s1", "seq": i})
+            if i % 2:
+                self.log.flush()
+        self.log.flush()
+        
+        self.assertEqual(len(self.log.segments()), 1)
+        self.assertEqual([e["seq"] for e in self.log.iter_events("s1")], [0, 1, 2, 3, 4])
+    
+    def test_segments_roll_over(self):
+        """Test a new segment starts once the current one is full"""
+        log = TranscriptLog(self.test_dir, segment_max_bytes=1, flush_interval=60)
+        for i in range(3):
+            log.append({"session_id": "s2", "seq": i})
+            log.flush()
+        log.close()
+        
+        self.assertEqual(len(log.segments()), 3)
+        self.assertEqual(len(log.sessions()["s2"]), 3)
+    
+    def test_torn_member_is_skipped(self):
+        """Test a partially written batch does not hide earlier events"""
+        self.log.append({"session_id": "s3", "seq": 1})
+        self.log.flush()
+        with open(self.log.segments()[0], "ab") as f:
+            f.write(b"\x1f\x8b\x08\x00partial")
+        
+        self.assertEqual(len(list(self.log.iter_events())), 1)
+    
+    def test_replay_matches_recording(self):
+        """Test a recorded session replays through process_input without mismatches"""
+        self._record_session("s4", ["Jane Doe", "jane@example.com", "+1 555 123 4567", "5 years",
+                                    "Backend Engineer", "Berlin", "Python, Django", "Generators are lazy"])
+        self.log.flush()
+        
+        summary = replay(self.log, HiringAssistant(backend=OfflineBackend()))
+        
+        self.assertEqual(summary["sessions"], 1)
+        self.assertEqual(summary["turns"], 8)
+        self.assertEqual(summary["failed_sessions"], {})
+
+
+class TestTelemetry(unittest.TestCase):
+    """Test funnel telemetry events and hourly rollups"""
+    
+    def setUp(self):
+        """Set up a telemetry store"""
+        self.test_dir = tempfile.mkdtemp()
+        self.telemetry = Telemetry(os.path.join(self.test_dir, "telemetry.db"), flush_interval=60)
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.addCleanup(self.telemetry.close)
+    
+    def test_conversation_events(self):
+        """Test the engine reports stage changes and rejected answers per session"""
+        chatbot = HiringAssistant(backend=OfflineBackend(), telemetry=self.telemetry)
+        self.telemetry.emit("stage_entered", "greeting", session="s1", tenant="acme")
+        stage, data = "greeting", {}
+        with llm_context(tenant="acme", session="s1"):
+            for user_input in ["Jane Doe", "not an email", "jane@example.com", "555", "+1 555 123 4567"]:
+                response = chatbot.process_input(user_input, stage, data)
+                stage = response["stage"]
+                data.update(response["extracted_data"])
+        self.telemetry.emit("exited", stage, session="s1", tenant="acme")
+        self.assertEqual(self.telemetry.flush(), 10)
+        
+        summary = {row["stage"]: row for row in self.telemetry.stage_summary(tenant="acme")}
+        self.assertEqual(summary["collect_email"]["validation_failed"], 1)
+        self.assertEqual(summary["collect_email"]["retries_per_completion"], 1.0)
+        self.assertEqual(summary["collect_phone"]["completed"], 1)
+        self.assertIsNotNone(summary["collect_phone"]["avg_duration_ms"])
+        self.assertEqual(summary["collect_experience"]["entered"], 1)
+        self.assertEqual(summary["collect_experience"]["exited"], 1)
+        self.assertEqual(self.telemetry.stage_summary(tenant="globex"), [])
+    
+    def test_replays_skip_shared_telemetry(self):
+        """Test an assistant built for replay does not fall back to the shared telemetry or cache"""
+        with unittest.mock.patch("chatbot_engine.get_telemetry", return_value=self.telemetry), \
+                unittest.mock.patch("chatbot_engine.get_response_cache", return_value=object()):
+            self.assertIs(HiringAssistant(backend=OfflineBackend()).telemetry, self.telemetry)
+            chatbot = HiringAssistant(backend=OfflineBackend(), record_usage=False)
+        
+        self.assertIsNone(chatbot.telemetry)
+        self.assertIsNone(chatbot.response_cache)
+        chatbot.process_input("Jane Doe", "greeting", {})
+        self.assertEqual(self.telemetry.flush(), 0)
+    
+    def test_hourly_rollups(self):
+        """Test batches fold into per-hour rows that survive pruning the raw events"""
+        for session in ("a", "b", "c"):
+            self.telemetry.emit("stage_entered", "collect_email", session=session)
+        self.telemetry.flush()
+        self.telemetry.emit("stage_completed", "collect_email", session="a")
+        self.telemetry.flush()
+        
+        rows = self.telemetry.hourly(stage="collect_email")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["tenant"], rows[0]["entered"], rows[0]["completed"]), (DEFAULT_TENANT, 3, 1))
+        self.assertEqual(rows[0]["hour"] % 3600, 0)
+        
+        self.assertEqual(self.telemetry.prune(older_than_days=-1), 4)
+        self.assertEqual(self.telemetry.hourly()[0]["entered"], 3)
+        with self.assertRaises(ValueError):
+            self.telemetry.emit("clicked", "greeting")
+
+
+class TestProfiling(unittest.TestCase):
+    """Test runtime profiling hooks"""
+    
+    def setUp(self):
+        """Set up a profiler writing to a temporary directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.profiler = Profiler(self.test_dir, sample_interval=0.001)
+    
+    def _busy(self, seconds):
+        """Burn CPU inside a profiled request"""
+        with self.profiler.request():
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                sum(range(100))
+    
+    def test_idle_requests(self):
+        """Test requests are not tracked while nothing is profiling"""
+        self.assertFalse(self.profiler.active)
+        self._busy(0.001)
+        self.assertEqual(self.profiler.files(), [])
+    
+    def test_cprofile_window(self):
+        """Test the window closes itself after N requests and writes pstats and collapsed stacks"""
+        self.profiler.start_cprofile(requests=2)
+        self._busy(0.01)
+        self.assertEqual(self.profiler.status()["cprofile_remaining"], 1)
+        with self.profiler.request():
+            # Nested requests count once
+            self._busy(0.01)
+        
+        self.assertFalse(self.profiler.active)
+        names = sorted(path.suffix for path in self.profiler.files())
+        self.assertEqual(names, [".folded", ".prof"])
+        folded = [path for path in self.profiler.files() if path.suffix == ".folded"][0].read_text()
+        self.assertIn("_busy", folded)
+    
+    def test_sampling_request_threads(self):
+        """Test request-only sampling writes collapsed stacks of the request thread"""
+        self.profiler.start_sampling(requests_only=True)
+        self._busy(0.2)
+        path = self.profiler.stop_sampling()
+        
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("_busy" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertIsNone(self.profiler.stop_sampling())
+    
+    def test_tracemalloc_snapshots(self):
+        """Test snapshots are written with a growth report against the previous one"""
+        self.addCleanup(self.profiler.stop_tracemalloc)
+        self.profiler.tracemalloc_snapshot()
+        retained = [bytearray(1024) for _ in range(100)]
+        path = self.profiler.tracemalloc_snapshot()
+        
+        self.assertTrue(path.exists())
+        self.assertIn("traced:", path.with_suffix(".txt").read_text())
+        self.assertEqual(len(retained), 100)
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the intent-normalized cache of contextual replies"""
+    
+    def setUp(self):
+        """Set up a cache file"""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.path = os.path.join(self.test_dir, "response_cache.json")
+    
+    def test_keys(self):
+        """Test paraphrases share an intent key and messages with data bypass the cache"""
+        cache = ResponseCache()
+        self.assertEqual(normalize_message("Um, what's NEXT??"), "what is next")
+        self.assertEqual(cache.key("What's next?"), "default|intent:next_steps")
+        self.assertEqual(cache.key("what happens next"), "default|intent:next_steps")
+        self.assertEqual(cache.key("When will I hear back?"), cache.key("when do i hear back from you"))
+        self.assertEqual(cache.key("Do you offer remote work?"), "default|text:do you offer remote work")
+        self.assertIsNone(cache.key("Please change my email to jane@example.com"))
+    
+    def test_tenants_do_not_share_replies(self):
+        """Test a reply cached for one tenant is not served to another"""
+        backend = StaticBackend("We will email you within a week.")
+        chatbot = HiringAssistant(backend=backend, response_cache=ResponseCache())
+        for tenant in ("acme", "globex", "acme"):
+            with llm_context(tenant=tenant):
+                chatbot.process_input("What's next?", "farewell", {})
+        
+        self.assertEqual(len(backend.calls), 2)
+        self.assertEqual(chatbot.response_cache.get_metrics()["hits"], 1)
+    
+    def test_hits_skip_the_llm(self):
+        """Test a cached reply is personalized through slots without calling the backend"""
+        backend = StaticBackend("Thanks {first_name}! You will hear back about the {position} role within a week.")
+        chatbot = HiringAssistant(backend=backend, response_cache=ResponseCache())
+        jane = {"name": "Jane Doe", "position": "Data Scientist", "tech_stack": ["Python"]}
+        bob = {"name": "Bob Smith", "position": "Platform Engineer", "tech_stack": ["Go"]}
+        
+        first = chatbot.process_input("When will I hear back?", "farewell", jane)
+        second = chatbot.process_input("when do i hear back from you", "farewell", bob)
+        
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(first["message"],
+                         "Thanks Jane! You will hear back about the Data Scientist role within a week.")
+        self.assertEqual(second["message"],
+                         "Thanks Bob! You will hear back about the Platform Engineer role within a week.")
+        self.assertEqual(chatbot.response_cache.get_metrics()["hits"], 1)
+    
+    def test_cached_replies_are_generated_without_candidate_data(self):
+        """Test the prompt behind a shared reply carries none of the candidate's details"""
+        backend = StaticBackend("You're welcome, {first_name}!")
+        chatbot = HiringAssistant(backend=backend, response_cache=ResponseCache())
+        candidate = {"name": "John Smith", "phone": "+1 555 0100",
+                     "technical_answers": ["I would put pgbouncer in front of Postgres"]}
+        
+        reply = chatbot.process_input("Thanks!", "farewell", candidate)
+        
+        self.assertEqual(reply["message"], "You're welcome, John!")
+        prompt = backend.calls[0][0]["content"]
+        for detail in ("John", "Smith", "555", "pgbouncer"):
+            self.assertNotIn(detail, prompt)
+    
+    def test_personal_replies_are_not_cached(self):
+        """Test replies carrying a candidate's details are never shared"""
+        cache = ResponseCache()
+        candidate = {"name": "John Smith", "phone": "+1 555 0100", "tech_stack": ["Django"],
+                     "technical_answers": ["pgbouncer"], "job_matches": [{"title": "Backend Engineer"}]}
+        
+        self.assertFalse(cache.put("k", candidate, "Thanks Mr. Smith! I liked your answer about pgbouncer."))
+        self.assertFalse(cache.put("k", candidate, "We will call you at +1-555-0100."))
+        self.assertFalse(cache.put("k", candidate, "Your Django experience looks great!"))
+        self.assertFalse(cache.put("k", candidate, "The Backend Engineer team will be in touch."))
+        self.assertFalse(cache.put("k", candidate, "Reference {candidate_id} for {name.__class__}"))
+        self.assertTrue(cache.put("k", candidate, "Thanks {first_name}, we will be in touch."))
+        self.assertEqual(cache.get_metrics()["rejected"], 5)
+    
+    def test_unshareable_reply_uses_full_context(self):
+        """Test a template that fails the check falls back to a personalized, uncached reply"""
+        backend = StaticBackend("Your Django experience looks great!")
+        chatbot = HiringAssistant(backend=backend, response_cache=ResponseCache())
+        candidate = {"name": "Jane Doe", "tech_stack": ["Django"]}
+        for _ in range(2):
+            reply = chatbot.process_input("Thanks!", "farewell", candidate)
+        
+        self.assertEqual(reply["message"], "Your Django experience looks great!")
+        self.assertEqual(len(backend.calls), 4)
+        self.assertIn("Django", backend.calls[1][0]["content"])
+        self.assertEqual(chatbot.response_cache.get_metrics()["entries"], 0)
+    
+    def test_streamed_replies_are_cached(self):
+        """Test the streaming path stores and serves the same entries"""
+        backend = StaticBackend("You're welcome, {first_name}!")
+        chatbot = HiringAssistant(backend=backend, response_cache=ResponseCache())
+        for _ in range(2):
+            events = list(chatbot.stream_input("thank you so much", "farewell", {"name": "Ana Lima"}))
+            self.assertEqual(events[-1]["message"], "You're welcome, Ana!")
+        self.assertEqual(len(backend.calls), 1)
+    
+    def test_eviction_expiry_and_persistence(self):
+        """Test LRU eviction, TTL expiry and reloading from disk"""
+        cache = ResponseCache(self.path, max_entries=2)
+        for key in ("text:a", "text:b"):
+            cache.put(key, {}, key)
+        cache.get("text:a", {})
+        cache.put("text:c", {}, "c")
+        cache.close()
+        
+        reloaded = ResponseCache(self.path, max_entries=2)
+        self.assertEqual(set(reloaded.entries()), {"text:a", "text:c"})
+        self.assertEqual(reloaded.get("text:c", {}), "c")
+        
+        expired = ResponseCache(self.path, ttl_seconds=0)
+        self.assertEqual(expired.entries(), {})
+
+
+class TestSerialization(unittest.TestCase):
+    """Test the JSON serialization layer"""
+    
+    def setUp(self):
+        """Set up a scratch directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.backend = serialization.BACKEND
+    
+    def tearDown(self):
+        """Restore the backend and clean up"""
+        serialization.use_backend(self.backend)
+        shutil.rmtree(self.test_dir)
+    
+    def test_datetimes_and_sets(self):
+        """Test datetimes, sets and non-ASCII text serialize on every backend"""
+        record = {"when": datetime(2025, 1, 2, 3, 4, 5), "skills": {"python"}, "name": "Zoë"}
+        
+        for name in serialization.BACKENDS:
+            try:
+                serialization.use_backend(name)
+            except ImportError:
+                continue
+            self.assertEqual(serialization.loads(serialization.dumps(record)),
+                             {"when": "2025-01-02T03:04:05", "skills": ["python"], "name": "Zoë"})
+    
+    def test_pretty_and_compact(self):
+        """Test compact output has no whitespace and pretty output matches stdlib indent=2"""
+        record = {"b": [1, 2], "a": {"c": None}}
+        
+        self.assertEqual(serialization.dumps(record, sort_keys=True), '{"a":{"c":null},"b":[1,2]}')
+        self.assertEqual(serialization.dumps(record, pretty=True), json.dumps(record, indent=2))
+    
+    def test_stdlib_fallback(self):
+        """Test the stdlib backend can be forced"""
+        self.assertEqual(serialization.use_backend("json"), "json")
+        self.assertEqual(serialization.dumpb({"a": 1}), b'{"a":1}')
+        
+        with self.assertRaises(ValueError):
+            serialization.use_backend("pickle")
+    
+    def test_stream_decoding(self):
+        """Test JSON Lines and top-level arrays decode item by item"""
+        records = [{"id": i, "text": "x" * (i * 7)} for i in range(50)]
+        
+        jsonl_path = os.path.join(self.test_dir, "records.jsonl")
+        with open(jsonl_path, "wb") as f:
+            for record in records:
+                f.write(serialization.dumpb(record) + b"\n")
+        self.assertEqual(list(serialization.iter_jsonl(jsonl_path)), records)
+        
+        array_path = os.path.join(self.test_dir, "records.json")
+        serialization.dump_file(records, array_path)
+        self.assertEqual(list(serialization.iter_array(array_path, chunk_size=16)), records)
+        self.assertEqual(list(serialization.iter_array(io.BytesIO(b"[]"))), [])
+    
+    def test_iter_array_numbers_across_chunks(self):
+        """Test numbers split by a chunk boundary are not cut short"""
+        numbers = [12345, 678901, 3.14159, -42, 7, 1e10]
+        data = serialization.dumpb(numbers)
+        for chunk_size in range(1, 8):
+            self.assertEqual(list(serialization.iter_array(io.BytesIO(data), chunk_size=chunk_size)), numbers)
+
+
+class TestAuditLog(unittest.TestCase):
+    """Test the structured audit log"""
+    
+    def setUp(self):
+        """Set up a log directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.log = AuditLog(self.test_dir, flush_interval=60)
+    
+    def tearDown(self):
+        """Clean up segments"""
+        self.log.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_query_uses_sidecar_index(self):
+        """Test rotated segments are queried through their sidecar index"""
+        for i in range(30):
+            self.log.log("SAVE" if i % 3 else "DELETE", f"c{i % 5}", data={"i": i})
+        self.log.rotate()
+        self.log.log("SAVE", "c0", data={"i": 30})
+        self.log.flush()
+        
+        self.assertEqual(len(self.log.segments()), 2)
+        self.assertTrue(os.path.exists(str(self.log.segments()[0]) + ".idx"))
+        
+        events = list(self.log.query(action="DELETE", candidate_id="c0"))
+        self.assertEqual([e["data"]["i"] for e in events], [0, 15])
+        self.assertEqual(len(list(self.log.query(candidate_id="c0"))), 7)
+        self.assertEqual(len(list(self.log.query(limit=4))), 4)
+    
+    def test_size_rotation(self):
+        """Test a new segment starts once the current one passes max_bytes"""
+        log = AuditLog(self.test_dir, max_bytes=1, flush_interval=60)
+        for i in range(3):
+            log.log("SAVE", f"c{i}")
+            log.flush()
+        log.close()
+        
+        self.assertEqual(len(log.segments()), 3)
+        self.assertEqual(len(list(log.query(action="SAVE"))), 3)
+    
+    def test_unindexed_segment_is_scanned(self):
+        """Test segments without a sidecar are still searchable and can be reindexed"""
+        self.log.log("SAVE", "c1")
+        self.log.rotate()
+        os.remove(str(self.log.segments()[0]) + ".idx")
+        
+        self.assertEqual(len(list(self.log.query(candidate_id="c1"))), 1)
+        self.assertEqual(self.log.reindex(min_age=0), 1)
+        self.assertEqual(len(list(self.log.query(candidate_id="c1"))), 1)
+    
+    def test_recent_ring_buffer(self):
+        """Test recent events are served from memory, newest first"""
+        log = AuditLog(self.test_dir, ring_size=3, flush_interval=60)
+        for i in range(5):
+            log.log("SAVE", f"c{i}")
+        
+        self.assertEqual([e["candidate_id"] for e in log.recent()], ["c4", "c3", "c2"])
+        self.assertEqual(log.segments(), [])
+        log.close()
+    
+    def test_handler_logs_saves_and_deletions(self):
+        """Test the data handler records saves and deletions in the audit log"""
+        handler = CandidateDataHandler(data_dir=os.path.join(self.test_dir, "data"))
+        candidate_id = handler.save_candidate_data({"name": "Ann", "email": "ann@example.com",
+                                                    "phone": "5551234567"})
+        saved = handler.audit_log.recent(candidate_id=candidate_id)
+        self.assertEqual(saved[0]["data"]["email"], "an***@example.com")
+        
+        handler.delete_candidate_data(candidate_id)
+        handler.close()
+        
+        events = list(handler.audit_log.query(candidate_id=candidate_id))
+        self.assertEqual([e["action"] for e in events], ["SAVE_CANDIDATE_DATA", "ERASE_CANDIDATE"])
+        self.assertNotIn("data", events[0])
+
+
+class TestErasure(unittest.TestCase):
+    """Test erasure of candidates and their derived artifacts"""
+    
+    def setUp(self):
+        """Set up a data directory with a few candidates"""
+        self.test_dir = tempfile.mkdtemp()
+        self.transcripts = TranscriptLog(os.path.join(self.test_dir, "transcripts"), flush_interval=60)
+        self.ids = []
+    
+    def tearDown(self):
+        """Clean up"""
+        self.transcripts.close()
+        shutil.rmtree(self.test_dir)
+    
+    def _populate(self, storage):
+        handler = CandidateDataHandler(data_dir=os.path.join(self.test_dir, storage), storage=storage)
+        for i in range(4):
+            candidate_id = handler.save_candidate_data({"name": f"Person {i}", "email": f"p{i}@example.com",
+                                                        "phone": f"55500000{i:02d}"})
+            handler.register_artifact(candidate_id, "transcript", f"session-{i}")
+            self.transcripts.append({"type": "turn", "session_id": f"session-{i}", "input": f"p{i}@example.com"})
+            self.ids.append(candidate_id)
+        return handler
+    
+    def _check_batch_erasure(self, storage):
+        handler = self._populate(storage)
+        export_file = handler.export_candidate_data(self.ids[0])
+        bulk_file = handler.export_all_candidates("jsonl")
+        
+        result = handler.erase_candidates(self.ids[:2], transcript_log=self.transcripts)
+        handler.eraser.shutdown()
+        self.addCleanup(handler.close)
+        
+        self.assertEqual(result["records"], 2)
+        self.assertEqual(result["files"], 2)
+        self.assertEqual(result["transcript_events"], 2)
+        self.assertFalse(os.path.exists(export_file))
+        self.assertFalse(os.path.exists(bulk_file))
+        self.assertEqual({r["candidate_id"] for r in handler.get_all_candidates()}, set(self.ids[2:]))
+        self.assertEqual(set(self.transcripts.sessions()), {"session-2", "session-3"})
+        
+        with open(handler.csv_file, encoding="utf-8") as f:
+            summary = f.read()
+        self.assertNotIn("p0@example.com", summary)
+        self.assertIn("p2@example.com", summary)
+        self.assertEqual(handler.manifest.tombstones(), set())
+        
+        for event in handler.audit_log.query(candidate_id=self.ids[0]):
+            self.assertNotIn("data", event)
+        self.assertEqual(len(list(handler.audit_log.query(action="ERASE_CANDIDATE"))), 2)
+    
+    def test_batch_erasure_json(self):
+        """Test a batch erasure purges records, exports, transcripts, audit details and summary rows"""
+        self._check_batch_erasure("json")
+    
+    def test_batch_erasure_sqlite(self):
+        """Test batch erasure against the SQLite record store"""
+        self._check_batch_erasure("sqlite")
+    
+    def test_unknown_ids(self):
+        """Test erasing unknown IDs reports nothing deleted"""
+        handler = CandidateDataHandler(data_dir=os.path.join(self.test_dir, "empty"))
+        
+        self.assertFalse(handler.delete_candidate_data("missing"))
+        self.assertEqual(handler.erase_candidates(["a", "b", "a"])["requested"], 2)
+        handler.close()
+
+
+class TestRetention(unittest.TestCase):
+    """Test archiving, export pruning and log rotation"""
+    
+    def setUp(self):
+        """Set up a handler with old and new candidates"""
+        self.test_dir = tempfile.mkdtemp()
+        self.handler = CandidateDataHandler(data_dir=os.path.join(self.test_dir, "data"))
+        self.old_ids, self.new_ids = [], []
+        for i in range(5):
+            candidate_id = self.handler.save_candidate_data({"name": f"Old {i}", "email": f"old{i}@example.com"})
+            self.handler.update_candidate_data(candidate_id, {"timestamp": "2020-01-01T00:00:00"})
+            self.old_ids.append(candidate_id)
+        self.new_ids.append(self.handler.save_candidate_data({"name": "New", "email": "new@example.com"}))
+        self.manager = RetentionManager(self.handler, archive_after_days=365, export_max_age_days=30,
+                                        log_max_age_days=None, io_bytes_per_second=0, batch_size=2)
+    
+    def tearDown(self):
+        """Clean up"""
+        self.handler.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_archive_and_restore(self):
+        """Test old records move to cold segments and can be restored"""
+        self.assertEqual(self.manager.run_once(dry_run=True)["archived"], 5)
+        self.assertEqual(self.manager.run_once()["archived"], 5)
+        
+        self.assertEqual([r["candidate_id"] for r in self.handler.get_all_candidates()], self.new_ids)
+        self.assertEqual(len(list(self.manager.archive_dir.glob("records-*.jsonl.gz"))), 1)
+        
+        self.assertEqual(self.manager.restore(self.old_ids[:1]), 1)
+        self.assertEqual(self.handler.get_candidate_data(self.old_ids[0])["name"], "Old 0")
+        self.assertEqual(self.manager.restore(self.old_ids[:1]), 0)
+    
+    def test_erasure_reaches_archive(self):
+        """Test erasing an archived candidate removes it from the cold segment"""
+        self.manager.run_once()
+        
+        self.assertTrue(self.handler.delete_candidate_data(self.old_ids[1]))
+        self.assertEqual(self.manager.restore(self.old_ids), 4)
+        self.assertIsNone(self.handler.get_candidate_data(self.old_ids[1]))
+    
+    def test_prune_exports_and_compress_logs(self):
+        """Test stale exports are removed and legacy text logs compressed"""
+        export_file = self.handler.export_candidate_data(self.new_ids[0])
+        os.utime(export_file, (0, 0))
+        fresh_file = self.handler.export_candidate_data(self.old_ids[0], format="csv")
+        legacy_log = self.handler.data_dir / "activity_log.txt"
+        legacy_log.write_text("old entry\n", encoding="utf-8")
+        
+        self.manager.log_max_age_days = 90
+        summary = self.manager.run_once()
+        
+        self.assertEqual(summary["exports_removed"], 1)
+        self.assertEqual(summary["logs_compressed"], 1)
+        self.assertFalse(os.path.exists(export_file))
+        self.assertTrue(os.path.exists(fresh_file))
+        self.assertFalse(legacy_log.exists())
+        self.assertEqual(len(list((self.manager.archive_dir / "logs").glob("activity_log-*.txt.gz"))), 1)
+    
+    def test_transcript_pruning_tolerates_concurrent_removal(self):
+        """Test a segment removed by another pass is skipped, not an error"""
+        transcript_dir = os.path.join(self.test_dir, "transcripts")
+        os.makedirs(transcript_dir)
+        for name in ("segment-1.jsonl.gz", "segment-2.jsonl.gz"):
+            path = os.path.join(transcript_dir, name)
+            open(path, "wb").close()
+            os.utime(path, (0, 0))
+        manager = RetentionManager(self.handler, archive_after_days=None, export_max_age_days=None,
+                                   log_max_age_days=90, io_bytes_per_second=0, transcript_dir=transcript_dir)
+        
+        def remove_others(nbytes):
+            for name in os.listdir(transcript_dir):
+                os.remove(os.path.join(transcript_dir, name))
+        
+        with unittest.mock.patch.object(manager.throttle, "consume", side_effect=remove_others):
+            self.assertEqual(manager.run_once()["segments_removed"], 1)
+        self.assertEqual(os.listdir(transcript_dir), [])
+    
+    def test_rotation_keeps_active_audit_segment(self):
+        """Test an idle audit segment that is still open for writing is not removed"""
+        self.handler.audit_log.flush()
+        active = self.handler.audit_log.active_segment()
+        os.utime(active, (0, 0))
+        manager = RetentionManager(self.handler, archive_after_days=None, export_max_age_days=None,
+                                   log_max_age_days=90, io_bytes_per_second=0)
+        
+        self.assertEqual(manager.run_once()["segments_removed"], 0)
+        self.assertTrue(active.exists())
+    
+    def test_archive_scan_is_throttled(self):
+        """Test scanning the store for old records goes through the I/O throttle"""
+        with unittest.mock.patch.object(self.manager.throttle, "consume") as consume:
+            self.assertEqual(self.manager.archive_records(datetime.now(), dry_run=True), 6)
+        self.assertEqual(consume.call_count, 3)
+    
+    def test_only_one_manager_prunes_transcripts(self):
+        """Test tenant managers can leave the shared transcript log alone"""
+        self.assertIsNotNone(create_retention_manager(self.handler).transcript_dir)
+        self.assertIsNone(create_retention_manager(self.handler, prune_transcripts=False).transcript_dir)
+    
+    def test_throttle_limits_rate(self):
+        """Test the I/O throttle sleeps once the burst allowance is spent"""
+        throttle = IOThrottle(bytes_per_second=100000)
+        start = time.perf_counter()
+        for _ in range(3):
+            throttle.consume(50000)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.4)
+
+
+class TestAnalytics(unittest.TestCase):
+    """Test incrementally maintained dashboard rollups"""
+    
+    def setUp(self):
+        """Set up a handler with a few candidates"""
+        self.test_dir = tempfile.mkdtemp()
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        self.ids = [
+            self.handler.save_candidate_data({"name": "Ada", "email": "ada@example.com", "phone": "1",
+                                              "experience": "6 years", "position": "Backend",
+                                              "location": "London", "tech_stack": ["Python", "Go"],
+                                              "technical_answers": "..."}),
+            self.handler.save_candidate_data({"name": "Bob", "email": "bob@example.com", "phone": "2",
+                                              "experience": "1 year", "position": "Frontend",
+                                              "tech_stack": ["React"]}),
+            self.handler.save_candidate_data({"name": "Cy", "email": "cy@example.com"})
+        ]
+    
+    def tearDown(self):
+        """Clean up"""
+        self.handler.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_statistics_follow_changes(self):
+        """Test statistics track saves, updates and erasures without scanning records"""
+        stats = self.handler.get_statistics()
+        self.assertEqual(stats["total_candidates"], 3)
+        self.assertEqual(stats["tech_stack_frequency"], {"Python": 1, "Go": 1, "React": 1})
+        self.assertEqual(stats["experience_ranges"]["5-10 years"], 1)
+        self.assertEqual(stats["positions"], {"Backend": 1, "Frontend": 1, "Unknown": 1})
+        
+        self.handler.update_candidate_data(self.ids[1], {"position": "Backend"})
+        self.handler.delete_candidate_data(self.ids[0])
+        stats = self.handler.get_statistics()
+        self.assertEqual(stats["positions"], {"Backend": 1, "Unknown": 1})
+        self.assertEqual(stats["tech_stack_frequency"], {"React": 1})
+    
+    def test_funnel_inferred_from_fields(self):
+        """Test each candidate counts up to the last funnel field collected in order"""
+        funnel = {row["stage"]: row for row in self.handler.rollups.funnel()}
+        self.assertEqual(funnel["Email"]["reached"], 3)
+        self.assertEqual((funnel["Phone"]["reached"], funnel["Phone"]["dropped"]), (2, 1))
+        self.assertEqual(funnel["Location"]["dropped"], 1)
+        self.assertEqual(funnel["Technical answers"]["reached"], 1)
+    
+    def test_persisted_and_rebuilt(self):
+        """Test rollups reload from disk and are rebuilt when the file is stale"""
+        version = self.handler.rollups.version
+        expected = self.handler.get_statistics()
+        self.handler.close()
+        
+        reopened = CandidateDataHandler(data_dir=self.test_dir)
+        self.assertEqual((reopened.rollups.version, reopened.get_statistics()), (version, expected))
+        reopened.store.delete(self.ids[2])
+        reopened.close()
+        
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        self.assertEqual(self.handler.get_statistics()["total_candidates"], 2)
+    
+    def test_quiet_change_is_flushed(self):
+        """Test a change with no follow-up is written by the timer, without close()"""
+        self.handler.rollups.flush_interval = 0.1
+        self.handler.update_candidate_data(self.ids[1], {"position": "Backend"})
+        time.sleep(0.5)
+        
+        reopened = CandidateDataHandler(data_dir=self.test_dir)
+        self.assertEqual(reopened.get_statistics()["positions"], {"Backend": 2, "Unknown": 1})
+        reopened.store.close()
+    
+    def test_store_changes_after_flush_force_rebuild(self):
+        """Test a same-count file older than the store is rebuilt rather than trusted"""
+        self.handler.close()
+        time.sleep(0.05)
+        record = self.handler.store.get(self.ids[1])
+        self.handler.store.put({**record, "position": "Data"})
+        
+        self.handler = CandidateDataHandler(data_dir=self.test_dir)
+        self.assertEqual(self.handler.get_statistics()["positions"], {"Backend": 1, "Data": 1, "Unknown": 1})
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test token buckets and fair scheduling of LLM calls"""
+    
+    def test_global_rate(self):
+        """Test the global bucket spaces calls once the burst is spent"""
+        scheduler = FairScheduler(requests_per_minute=600, burst=1)
+        start = time.perf_counter()
+        for _ in range(4):
+            scheduler.acquire()
+            scheduler.release()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25)
+    
+    def test_later_stage_served_first(self):
+        """Test a candidate further along the funnel overtakes an earlier queued one"""
+        scheduler = FairScheduler(requests_per_minute=6000, max_concurrent=1)
+        order = []
+        
+        def call(stage, priority):
+            with llm_context(session=stage, stage=stage, priority=priority):
+                scheduler.acquire()
+            order.append(stage)
+            scheduler.release()
+        
+        scheduler.acquire()
+        threads = []
+        for stage, priority in (("greeting", 0), ("technical_questions", 8)):
+            thread = threading.Thread(target=call, args=(stage, priority))
+            thread.start()
+            threads.append(thread)
+            while scheduler.get_metrics()["queued"] < len(threads):
+                time.sleep(0.01)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(order, ["technical_questions", "greeting"])
+        self.assertIn("greeting", scheduler.get_metrics()["stage_wait_ms"])
+    
+    def test_session_limit(self):
+        """Test a session over its quota times out without blocking other sessions"""
+        scheduler = FairScheduler(requests_per_minute=6000, session_rpm=60, max_wait=0.2)
+        with llm_context(tenant="acme", session="chatty"):
+            scheduler.acquire()
+            scheduler.release()
+            with self.assertRaises(RateLimitExceeded):
+                scheduler.acquire()
+        with llm_context(tenant="acme", session="quiet"):
+            self.assertLess(scheduler.acquire(), 0.1)
+            scheduler.release()
+        
+        metrics = scheduler.get_metrics()
+        self.assertEqual((metrics["admitted"], metrics["rejected"]), (2, 1))
+        self.assertIn("acme", metrics["tenant_wait_ms"])
+    
+    def test_backend_failure_falls_back(self):
+        """Test the engine answers with fallback questions when the queue times out"""
+        scheduler = FairScheduler(requests_per_minute=6000, max_concurrent=1, max_wait=0.05)
+        chatbot = HiringAssistant(backend=RateLimitedBackend(StaticBackend(), scheduler))
+        scheduler.acquire()
+        questions = chatbot.generate_technical_questions(["Python"])
+        scheduler.release()
+        
+        self.assertIn("Technical Assessment Questions", questions)
+        response = chatbot.process_input("Python", "collect_tech_stack", {})
+        self.assertEqual(response["stage"], "technical_questions")
+        self.assertIn("collect_tech_stack", scheduler.get_metrics()["stage_wait_ms"])
+
+
+class TestTenants(unittest.TestCase):
+    """Test per-tenant storage partitions"""
+    
+    def setUp(self):
+        """Set up a registry with one configured tenant"""
+        self.test_dir = tempfile.mkdtemp()
+        self.registry = TenantRegistry(self.test_dir, configured=["acme"])
+    
+    def tearDown(self):
+        """Clean up"""
+        self.registry.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_partitions_are_isolated(self):
+        """Test records, search and statistics stay within their tenant"""
+        acme = self.registry.get("acme")
+        acme.save_candidate_data({"name": "Ada", "email": "ada@example.com", "location": "London"})
+        self.registry.get().save_candidate_data({"name": "Bob", "email": "bob@example.com", "location": "London"})
+        
+        self.assertEqual(acme.data_dir, tenant_data_dir(self.test_dir, "acme"))
+        self.assertIs(self.registry.get("ACME"), acme)
+        self.assertEqual([r["name"] for r in acme.search_candidates(location="London")], ["Ada"])
+        stats = self.registry.get_statistics()
+        self.assertEqual({tenant: s["total_candidates"] for tenant, s in stats.items()},
+                         {DEFAULT_TENANT: 1, "acme": 1})
+    
+    def test_unknown_and_invalid_tenants(self):
+        """Test only configured or created tenants open, and IDs must be safe directory names"""
+        with self.assertRaises(UnknownTenant):
+            self.registry.get("globex")
+        self.registry.create("globex")
+        self.assertEqual(self.registry.tenants(), [DEFAULT_TENANT, "acme", "globex"])
+        for tenant in ("../etc", "a b", ""):
+            with self.assertRaises(ValueError):
+                self.registry.create(tenant)
+
+
+@unittest.skipUnless(importlib.util.find_spec("starlette"), "starlette not installed")
+class TestApiServer(unittest.TestCase):
+    """Test the HTTP API around the screening engine"""
+    
+    def setUp(self):
+        """Set up a test client over a temporary data directory"""
+        from starlette.testclient import TestClient
+        from api_server import ScreeningService, SessionStore, create_app
+        
+        self.test_dir = tempfile.mkdtemp()
+        self.tenants = TenantRegistry(os.path.join(self.test_dir, "data"), configured=["acme"])
+        self.backend = StaticBackend("Happy to help with that.")
+        service = ScreeningService(self.tenants, SessionStore(os.path.join(self.test_dir, "sessions.db")),
+                                   assistant_factory=lambda: HiringAssistant(backend=self.backend))
+        self.client = TestClient(create_app(service, admin_token="secret"))
+        self.client.__enter__()
+        self.admin = {"Authorization": "Bearer secret"}
+    
+    def tearDown(self):
+        """Clean up"""
+        self.client.__exit__(None, None, None)
+        self.tenants.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_full_conversation(self):
+        """Test a screening runs over HTTP and saves the candidate on exit"""
+        response = self.client.post("/sessions")
+        self.assertEqual(response.status_code, 201)
+        session_id = response.json()["session_id"]
+        
+        for message in ["Jane Doe", "jane@example.com", "555-123-4567", "4 years",
+                        "Data Scientist", "Berlin", "Python, Django"]:
+            reply = self.client.post(f"/sessions/{session_id}/messages", json={"content": message}).json()
+        self.assertEqual(reply["stage"], "technical_questions")
+        state = self.client.get(f"/sessions/{session_id}", headers=self.admin).json()
+        self.assertEqual(state["candidate_data"]["location"], "Berlin")
+        self.assertNotIn("candidate_data", self.client.get(f"/sessions/{session_id}").json())
+        
+        reply = self.client.post(f"/sessions/{session_id}/messages", json={"content": "bye"}).json()
+        self.assertTrue(reply["done"])
+        candidate = self.client.get(f"/candidates/{reply['candidate_id']}", headers=self.admin).json()
+        self.assertEqual(candidate["email"], "jane@example.com")
+        
+        response = self.client.post(f"/sessions/{session_id}/messages", json={"content": "hello"})
+        self.assertEqual(response.status_code, 409)
+    
+    def test_exit_words_inside_answers(self):
+        """Test answers containing exit words inside other words don't end the session"""
+        session_id = self.client.post("/sessions").json()["session_id"]
+        for message in ["Jane Doe", "jane@example.com", "555-123-4567", "4 years", "Backend Engineer",
+                        "Frontend hub, closest office"]:
+            reply = self.client.post(f"/sessions/{session_id}/messages", json={"content": message}).json()
+        
+        self.assertFalse(reply["done"])
+        self.assertEqual(reply["stage"], "collect_tech_stack")
+        state = self.client.get(f"/sessions/{session_id}", headers=self.admin).json()
+        self.assertEqual(state["candidate_data"]["position"], "Backend Engineer")
+    
+    def test_stream_message(self):
+        """Test streamed replies arrive as token events followed by the result"""
+        session_id = self.client.post("/sessions").json()["session_id"]
+        state = self.client.get(f"/sessions/{session_id}").json()
+        self.assertEqual(state["stage"], "greeting")
+        
+        for message in ["Jane Doe", "jane@example.com", "555-123-4567", "4 years",
+                        "Data Scientist", "Berlin", "Python", "my answers"]:
+            self.client.post(f"/sessions/{session_id}/messages", json={"content": message})
+        
+        response = self.client.post(f"/sessions/{session_id}/messages/stream", json={"content": "What's next?"})
+        events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+        self.assertEqual(events, ["event: token", "event: result"])
+        result = json.loads(response.text.strip().split("\n\n")[-1].split("data: ", 1)[1])
+        self.assertEqual(result["message"], "Happy to help with that.")
+        self.assertEqual(result["stage"], "farewell")
+    
+    def test_websocket_conversation(self):
+        """Test a WebSocket session streams turns and resumes by session ID"""
+        with self.client.websocket_connect("/sessions/ws") as websocket:
+            session = websocket.receive_json()
+            self.assertEqual(session["type"], "session")
+            websocket.send_json({"type": "message", "content": "Jane Doe"})
+            frames = [websocket.receive_json(), websocket.receive_json()]
+            self.assertEqual([f["type"] for f in frames], ["token", "result"])
+            self.assertEqual(frames[1]["stage"], "collect_email")
+            websocket.send_json({"type": "ping"})
+            self.assertEqual(websocket.receive_json()["type"], "pong")
+        
+        with self.client.websocket_connect(f"/sessions/ws?session_id={session['session_id']}") as websocket:
+            self.assertEqual(websocket.receive_json()["stage"], "collect_email")
+            websocket.send_json({"type": "message", "content": "bye"})
+            frames = [websocket.receive_json(), websocket.receive_json()]
+            self.assertTrue(frames[1]["done"])
+            self.assertEqual(websocket.receive()["type"], "websocket.close")
+    
+    def test_websocket_eviction(self):
+        """Test silent peers are closed after a missed heartbeat and idle ones after the timeout"""
+        from starlette.testclient import TestClient
+        from starlette.websockets import WebSocketDisconnect
+        from api_server import create_app
+        
+        with unittest.mock.patch.dict(os.environ, {"WS_HEARTBEAT_SECONDS": "0.05", "WS_IDLE_TIMEOUT_SECONDS": "0.3"}):
+            app = create_app(self.client.app.state.service)
+        
+        with TestClient(app) as client:
+            with client.websocket_connect("/sessions/ws") as websocket:
+                websocket.receive_json()
+                self.assertEqual(websocket.receive_json()["type"], "ping")
+                with self.assertRaises(WebSocketDisconnect) as closed:
+                    websocket.receive_json()
+                self.assertEqual((closed.exception.code, closed.exception.reason), (1001, "Heartbeat timeout"))
+            
+            with client.websocket_connect("/sessions/ws") as websocket:
+                websocket.receive_json()
+                with self.assertRaises(WebSocketDisconnect) as closed:
+                    while True:
+                        if websocket.receive_json()["type"] == "ping":
+                            websocket.send_json({"type": "pong"})
+                self.assertEqual((closed.exception.code, closed.exception.reason), (1001, "Idle timeout"))
+            self.assertEqual(client.get("/health").json()["websockets"], 0)
+    
+    def test_tenant_partitions(self):
+        """Test sessions and candidate requests use the tenant they name"""
+        headers = {"X-Tenant": "acme", **self.admin}
+        session = self.client.post("/sessions", headers=headers).json()
+        self.assertEqual(session["tenant"], "acme")
+        for message in ["Jane Doe", "jane@example.com", "bye"]:
+            reply = self.client.post(f"/sessions/{session['session_id']}/messages", json={"content": message}).json()
+        
+        self.assertEqual(self.client.get(f"/candidates/{reply['candidate_id']}", headers=headers).status_code, 200)
+        self.assertEqual(self.client.get(f"/candidates/{reply['candidate_id']}", headers=self.admin).status_code, 404)
+        self.assertEqual(self.client.post("/sessions", headers={"X-Tenant": "globex"}).status_code, 404)
+    
+    def test_errors(self):
+        """Test unknown sessions, empty messages and bad bodies are rejected"""
+        self.assertEqual(self.client.get("/sessions/missing").status_code, 404)
+        self.assertEqual(self.client.post("/sessions/missing/messages", json={"content": "hi"}).status_code, 404)
+        session_id = self.client.post("/sessions").json()["session_id"]
+        self.assertEqual(self.client.post(f"/sessions/{session_id}/messages", json={}).status_code, 400)
+        self.assertEqual(self.client.post(f"/sessions/{session_id}/messages", json=[1]).status_code, 400)
+    
+    def test_candidate_crud(self):
+        """Test creating, updating, searching and deleting candidates"""
+        self.assertEqual(self.client.post("/candidates", json={"name": "No Email"}, headers=self.admin).status_code, 400)
+        created = self.client.post("/candidates", json={"name": "Ada Lovelace", "email": "ada@example.com",
+                                                         "location": "London"}, headers=self.admin).json()
+        candidate_id = created["candidate_id"]
+        
+        updated = self.client.patch(f"/candidates/{candidate_id}", json={"location": "Paris"}, headers=self.admin).json()
+        self.assertEqual(updated["location"], "Paris")
+        results = self.client.get("/candidates", params={"location": "Paris"}, headers=self.admin).json()["candidates"]
+        self.assertEqual([r["candidate_id"] for r in results], [candidate_id])
+        
+        self.assertEqual(self.client.delete(f"/candidates/{candidate_id}", headers=self.admin).status_code, 200)
+        self.assertEqual(self.client.get(f"/candidates/{candidate_id}", headers=self.admin).status_code, 404)
+        self.assertEqual(self.client.delete(f"/candidates/{candidate_id}", headers=self.admin).status_code, 404)
+    
+    def test_candidate_routes_require_admin(self):
+        """Test the candidate routes refuse missing or wrong tokens, and everything when no token is set"""
+        from starlette.testclient import TestClient
+        from api_server import create_app
+        
+        self.assertEqual(self.client.get("/candidates").status_code, 401)
+        self.assertEqual(self.client.get("/candidates", headers={"Authorization": "Bearer wrong"}).status_code, 401)
+        self.assertEqual(self.client.delete("/candidates/abc").status_code, 401)
+        self.assertEqual(self.client.get("/candidates", headers=self.admin).status_code, 200)
+        
+        with unittest.mock.patch.dict(os.environ, {"API_ADMIN_TOKEN": ""}):
+            app = create_app(self.client.app.state.service)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/candidates", headers=self.admin).status_code, 403)
 
 
 class TestChatbotEngine(unittest.TestCase):
@@ -187,6 +1997,47 @@ class TestChatbotEngine(unittest.TestCase):
         self.assertIn("Django", categorized["frameworks"])
         self.assertIn("PostgreSQL", categorized["databases"])
         self.assertIn("Docker", categorized["tools"])
+    
+    def test_questions_use_configured_backend(self):
+        """Test question generation goes through the injected backend"""
+        backend = StaticBackend()
+        chatbot = HiringAssistant(backend=backend)
+        questions = chatbot.generate_technical_questions(["Python"])
+        
+        self.assertEqual(len(backend.calls), 1)
+        self.assertIn("Explain Python generators", questions)
+    
+    def test_backend_failure_uses_fallback_questions(self):
+        """Test fallback questions when the backend is unavailable"""
+        chatbot = HiringAssistant(backend=FailingBackend())
+        questions = chatbot.generate_technical_questions(["Python"])
+        self.assertIn("Technical Assessment Questions", questions)
+    
+    def test_local_stream_releases_model_before_reader_finishes(self):
+        """Test a slow reader of a local stream does not hold the model lock"""
+        class FakeLlama:
+            def create_chat_completion(self, messages, max_tokens, temperature, stream):
+                for word in ("one ", "two ", "three"):
+                    yield {"choices": [{"delta": {"content": word}}]}
+        
+        backend = LlamaCppBackend("fake.gguf", n_threads=1)
+        key = (backend.model_path, backend.n_ctx, backend.n_threads, backend.n_batch)
+        with unittest.mock.patch.dict(llm_backends._local_models, {key: (FakeLlama(), threading.Lock())}):
+            chunks = backend.stream([{"role": "user", "content": "Hi"}])
+            self.assertEqual(next(chunks), "one ")
+            
+            # Generation finished in the background while the reader is paused
+            self.assertTrue(backend.model_lock.acquire(timeout=2))
+            backend.model_lock.release()
+            self.assertEqual("".join(chunks), "two three")
+            
+            # Another instance on the same model waits on the same lock
+            self.assertIs(LlamaCppBackend("fake.gguf", n_threads=1).model_lock, backend.model_lock)
+    
+    def test_unknown_backend_rejected(self):
+        """Test backend selection validates the configured name"""
+        with self.assertRaises(ValueError):
+            create_backend("no_such_backend")
 
 
 def run_tests():
@@ -0,0 +1,413 @@
+"""
+Transcript Log Module
+=====================
+Append-only, compressed event log of every conversation turn, with replay.
+
+Each turn is one JSON event (session, stage, input, extracted data, latency,
+LLM usage). Events are buffered and written in batches by a background thread;
+every batch becomes one gzip member appended to the current segment file:
+
+    transcripts/segment-<created>-<pid>-<n>.jsonl.gz
+
+Concatenated gzip members read back as a single stream, so segments are never
+rewritten. A segment is closed once it passes segment_max_bytes and each
+process writes its own segments. A crash loses at most the unflushed batch;
+a torn final member is skipped on read.
+
+The replay tool re-runs recorded sessions through HiringAssistant.process_input,
+reporting stage/field mismatches and per-turn latency, so the log doubles as a
+regression and performance corpus.
+"""
+
+import atexit
+import gzip
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import serialization
+from llm_backends import LLMBackend
+
+
+# Fields filled from LLM output, which legitimately differ between runs
+NONDETERMINISTIC_FIELDS = ('technical_questions', 'job_matches')
+
+
+class TranscriptLog:
+    """Batched writer and reader for gzip segment files"""
+    
+    def __init__(self, log_dir: str = "transcripts", segment_max_bytes: int = 8 * 1024 * 1024,
+                 batch_size: int = 64, flush_interval: float = 1.0):
+        """
+        Open a transcript log
+        
+        Args:
+            log_dir: Directory holding segment files
+            segment_max_bytes: Size after which a new segment is started
+            batch_size: Buffered events that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+        """
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._segment: Optional[Path] = None
+        self._segment_count = 0
+        
+        self._flusher = threading.Thread(target=self._flush_loop, name='transcript-log', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+    
+    def append(self, event: Dict):
+        """
+        Queue an event for writing
+        
+        Args:
+            event: JSON-serializable event; 'ts' is added if missing
+        """
+        event.setdefault('ts', datetime.now().isoformat())
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+    
+    def _flush_loop(self):
+        """Write buffered events every flush_interval or when a batch fills"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError:
+                # Keep the loop alive; the events stay buffered for the next attempt
+                pass
+    
+    def _current_segment(self) -> Path:
+        """Segment for the next batch, rolling over once the current one is full"""
+        if self._segment is None or self._segment.stat().st_size >= self.segment_max_bytes:
+            self._segment_count += 1
+            created = datetime.now().strftime('%Y%m%d%H%M%S')
+            self._segment = self.log_dir / f"segment-{created}-{os.getpid()}-{self._segment_count:04d}.jsonl.gz"
+        return self._segment
+    
+    def flush(self) -> int:
+        """
+        Write buffered events as one gzip member
+        
+        Returns:
+            int: Number of events written
+        """
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            
+            data = b''.join(serialization.dumpb(event) + b'\n' for event in batch)
+            try:
+                with open(self._current_segment(), 'ab') as f:
+                    f.write(gzip.compress(data, compresslevel=6))
+            except OSError:
+                with self._lock:
+                    self._buffer[:0] = batch
+                raise
+            return len(batch)
+    
+    def close(self):
+        """Flush remaining events and stop the background writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+    
+    def segments(self) -> List[Path]:
+        """Segment files in write order"""
+        return sorted(self.log_dir.glob("segment-*.jsonl.gz"))
+    
+    def purge_sessions(self, session_ids) -> int:
+        """
+        Remove every event of the given sessions (erasure)
+        
+        Each segment holding one of the sessions is rewritten once, whatever
+        the number of sessions.
+        
+        Args:
+            session_ids: Sessions to remove
+            
+        Returns:
+            int: Number of events removed
+        """
+        wanted = set(session_ids)
+        self.flush()
+        removed = 0
+        
+        with self._write_lock:
+            for segment in self.segments():
+                events = list(_read_segment(segment))
+                kept = [event for event in events if event.get('session_id') not in wanted]
+                if len(kept) == len(events):
+                    continue
+                
+                removed += len(events) - len(kept)
+                if segment == self._segment:
+                    self._segment = None
+                if kept:
+                    temp_path = segment.with_name(segment.name + '.tmp')
+                    data = b''.join(serialization.dumpb(event) + b'\n' for event in kept)
+                    with open(temp_path, 'wb') as f:
+                        f.write(gzip.compress(data, compresslevel=6))
+                    os.replace(temp_path, segment)
+                else:
+                    segment.unlink()
+        
+        return removed
+    
+    def iter_events(self, session_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Read events from every segment
+        
+        Args:
+            session_id: Only yield events of this session
+            
+        Yields:
+            dict: Events in write order per segment
+        """
+        for segment in self.segments():
+            for event in _read_segment(segment):
+                if session_id is None or event.get('session_id') == session_id:
+                    yield event
+    
+    def sessions(self) -> Dict[str, List[Dict]]:
+        """
+        Group events by session
+        
+        Returns:
+            dict: Session ID -> events ordered by sequence number
+        """
+        grouped = defaultdict(list)
+        for event in self.iter_events():
+            grouped[event.get('session_id', '')].append(event)
+        for events in grouped.values():
+            events.sort(key=lambda event: event.get('seq', 0))
+        return dict(grouped)
+
+
+def _read_segment(path: Path) -> Iterator[Dict]:
+    """Decode every complete gzip member of a segment"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            text = decompressor.decompress(data)
+        except zlib.error:
+            return
+        if not decompressor.eof:
+            # Torn member from an interrupted write
+            return
+        for line in text.splitlines():
+            if line:
+                yield serialization.loads(line)
+        data = decompressor.unused_data
+
+
+def turn_event(session_id: str, seq: int, user_input: str, stage: str, response: Dict,
+               latency_ms: float, llm_usage: Optional[Dict] = None) -> Dict:
+    """
+    Build the event for one processed turn
+    
+    Args:
+        session_id: Conversation identifier
+        seq: Turn number within the session
+        user_input: Raw user input
+        stage: Stage the input was processed in
+        response: Result of HiringAssistant.process_input
+        latency_ms: Processing time
+        llm_usage: LLM calls and token estimates for the turn
+        
+    Returns:
+        dict: Event ready for TranscriptLog.append
+    """
+    return {
+        'type': 'turn',
+        'session_id': session_id,
+        'seq': seq,
+        'stage': stage,
+        'input': user_input,
+        'next_stage': response.get('stage'),
+        'extracted': response.get('extracted_data', {}),
+        'response_chars': len(response.get('message', '')),
+        'latency_ms': round(latency_ms, 2),
+        'llm': llm_usage or {}
+    }
+
+
+class OfflineBackend(LLMBackend):
+    """Backend that is always unavailable, so replays exercise the deterministic fallbacks"""
+    
+    name = 'offline'
+    
+    def stream(self, messages: List[Dict], max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        raise ConnectionError("LLM disabled for offline replay")
+
+
+def replay_session(events: List[Dict], assistant) -> Dict:
+    """
+    Re-run a recorded session through process_input
+    
+    Args:
+        events: Session events (turn events are replayed, others skipped)
+        assistant: HiringAssistant to replay against
+        
+    Returns:
+        dict: Turns, mismatches and per-turn latencies
+    """
+    candidate_data: Dict = {}
+    stage = None
+    mismatches = []
+    latencies = []
+    
+    for event in events:
+        if event.get('type') != 'turn':
+            continue
+        
+        stage = stage or event['stage']
+        start = time.perf_counter()
+        result = assistant.process_input(event['input'], stage, candidate_data)
+        latencies.append((time.perf_counter() - start) * 1000)
+        
+        expected = {k: v for k, v in event.get('extracted', {}).items() if k not in NONDETERMINISTIC_FIELDS}
+        actual = {k: v for k, v in result['extracted_data'].items() if k not in NONDETERMINISTIC_FIELDS}
+        if result['stage'] != event.get('next_stage') or actual != expected:
+            mismatches.append({
+                'seq': event.get('seq'),
+                'stage': stage,
+                'expected_stage': event.get('next_stage'),
+                'actual_stage': result['stage'],
+                'expected': expected,
+                'actual': actual
+            })
+        
+        stage = result['stage']
+        candidate_data.update(result['extracted_data'])
+    
+    return {'turns': len(latencies), 'mismatches': mismatches, 'latencies_ms': latencies}
+
+
+def replay(log: TranscriptLog, assistant, session_id: Optional[str] = None,
+           limit: Optional[int] = None) -> Dict:
+    """
+    Replay recorded sessions and summarize correctness and latency
+    
+    Args:
+        log: Transcript log to read
+        assistant: HiringAssistant to replay against
+        session_id: Replay only this session
+        limit: Maximum sessions to replay
+        
+    Returns:
+        dict: Session/turn counts, mismatching sessions and latency percentiles
+    """
+    sessions = log.sessions()
+    if session_id is not None:
+        sessions = {session_id: sessions.get(session_id, [])}
+    
+    summary = {'sessions': 0, 'turns': 0, 'failed_sessions': {}}
+    latencies: List[float] = []
+    start = time.perf_counter()
+    
+    for sid, events in list(sessions.items())[:limit]:
+        result = replay_session(events, assistant)
+        summary['sessions'] += 1
+        summary['turns'] += result['turns']
+        latencies.extend(result['latencies_ms'])
+        if result['mismatches']:
+            summary['failed_sessions'][sid] = result['mismatches']
+    
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if latencies:
+        summary['p50_ms'] = round(latencies[len(latencies) // 2], 3)
+        summary['p95_ms'] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3)
+        summary['turns_per_second'] = round(len(latencies) / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+_logs: Dict[str, TranscriptLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_transcript_log(log_dir: Optional[str] = None) -> TranscriptLog:
+    """
+    Get the shared transcript log for this process
+    
+    Args:
+        log_dir: Segment directory (defaults to TRANSCRIPT_LOG_DIR, then transcripts)
+        
+    Returns:
+        TranscriptLog: Shared log
+    """
+    log_dir = log_dir or os.getenv('TRANSCRIPT_LOG_DIR', 'transcripts')
+    with _logs_lock:
+        if log_dir not in _logs:
+            _logs[log_dir] = TranscriptLog(log_dir)
+        return _logs[log_dir]
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Inspect and replay conversation transcripts")
+    parser.add_argument('--log-dir', default=os.getenv('TRANSCRIPT_LOG_DIR', 'transcripts'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    subparsers.add_parser('stats', help='Count segments, sessions and events')
+    
+    dump_parser = subparsers.add_parser('dump', help='Print the events of one session')
+    dump_parser.add_argument('session_id')
+    
+    replay_parser = subparsers.add_parser('replay', help='Re-run sessions through process_input')
+    replay_parser.add_argument('--session', default=None, help='Replay a single session')
+    replay_parser.add_argument('--limit', type=int, default=None, help='Maximum sessions')
+    replay_parser.add_argument('--offline', action='store_true', help='Disable the LLM (deterministic fallbacks)')
+    replay_parser.add_argument('--show-mismatches', action='store_true')
+    
+    args = parser.parse_args()
+    log = TranscriptLog(args.log_dir)
+    
+    if args.command == 'stats':
+        sessions = log.sessions()
+        print(f"segments: {len(log.segments())}")
+        print(f"bytes: {sum(path.stat().st_size for path in log.segments())}")
+        print(f"sessions: {len(sessions)}")
+        print(f"events: {sum(len(events) for events in sessions.values())}")
+    elif args.command == 'dump':
+        for event in log.iter_events(args.session_id):
+            print(serialization.dumps(event))
+    else:
+        from chatbot_engine import HiringAssistant
+        
+        # Replayed turns are not real sessions: keep them out of telemetry and the shared reply cache
+        assistant = HiringAssistant(backend=OfflineBackend() if args.offline else None, record_usage=False)
+        summary = replay(log, assistant, args.session, args.limit)
+        failed = summary.pop('failed_sessions')
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+        print(f"failed_sessions: {len(failed)}")
+        if args.show_mismatches:
+            print(serialization.dumps(failed, pretty=True))
@@ -164,9 +164,17 @@ def format_phone_number(phone: str) -> str:
     return cleaned
 
 
+# The whole message must be an exit word, optionally with a courtesy word around it
+EXIT_PATTERN = re.compile(
+    r'(?:(?:please|ok|okay|thanks|thank you)[\s,]+)?'
+    r'(?:exit|quit|bye|goodbye|end|stop)'
+    r'(?:[\s,]+(?:please|now|thanks|thank you))?'
+)
+
+
 def is_exit_command(text: str) -> bool:
     """
-    Check if the text contains an exit command
+    Check if the text is an exit command
     
     Args:
         text: Input text
@@ -174,8 +182,8 @@ def is_exit_command(text: str) -> bool:
     Returns:
         bool: True if exit command detected
     """
-    exit_keywords = ['exit', 'quit', 'bye', 'goodbye', 'end', 'stop', 'close']
-    return any(keyword in text.lower() for keyword in exit_keywords)
+    # Answers that merely contain an exit word ("end-to-end", "I can stop by") are not exits
+    return EXIT_PATTERN.fullmatch(text.lower().strip().strip('.!?,; ')) is not None
 
 
 def extract_sentiment(text: str) -> str:
@@ -263,3 +271,23 @@ def validate_years_experience(experience: str) -> Optional[float]:
             pass
     
     return None
+
+
+def extract_numbered_items(text: str, bullets: bool = False) -> list:
+    """
+    Extract the items of a numbered list ("1. ...", "2) ...")
+    
+    Args:
+        text: Text containing a numbered list
+        bullets: Also accept "- ..." and "* ..." items
+        
+    Returns:
+        list: Item texts in order, without their numbers
+    """
+    marker = r'(?:\d+[.)]|[-*])' if bullets else r'\d+[.)]'
+    items = []
+    for line in text.splitlines():
+        match = re.match(r'^\s*\**' + marker + r'\**\s+(.*\S)', line)
+        if match:
+            items.append(match.group(1).strip())
+    return items